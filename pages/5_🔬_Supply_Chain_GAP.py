@@ -39,11 +39,15 @@ from utils.supply_chain_gap import (
     VERSION,
     get_state,
     get_data_loader,
+    load_gap_inputs,
+    get_result_cache,
+    recalculate_gap,
     get_calculator,
     get_filters,
     get_charts,
     get_formatter,
     export_to_excel,
+    export_to_excel_file,
     get_export_filename,
     render_kpi_cards,
     render_data_freshness,
@@ -60,8 +64,10 @@ from utils.supply_chain_gap import (
     manufacturing_period_fragment,
     trading_period_fragment,
     raw_period_fragment,
-    UI_CONFIG
+    UI_CONFIG,
+    EXPORT_CONFIG
 )
+from utils.excel_stream import ExcelArtifact
 
 
 def initialize_system():
@@ -79,7 +85,8 @@ def initialize_system():
 def calculate_gap(
     data_loader,
     calculator,
-    filter_values: Dict[str, Any]
+    filter_values: Dict[str, Any],
+    force_refresh: bool = False
 ):
     """
     Load all data and calculate full Supply Chain GAP.
@@ -87,98 +94,29 @@ def calculate_gap(
     v2.3.1: Load ALL data (entity only, no brand/product filter in SQL).
     Brand/product filter is applied AFTER calculation as display filter.
     This ensures Raw Material GAP accounts for ALL demand (cross-brand).
+    
+    The calculated result is shared across sessions through the GAP result
+    cache and reused while the source tables' change markers are unchanged.
+    When the change was notified with its product IDs (e.g. MO confirm), the
+    cached result is patched for those products instead of recomputed.
+    force_refresh bypasses the cache (Refresh button).
     """
     
     with st.spinner("🔬 Calculating Supply Chain GAP..."):
-        
-        # =====================================================================
-        # LOAD DATA — entity only, NO brand/product filter
-        # Brand/product applied later as display filter on results
-        # =====================================================================
-        
-        # Load FG Supply (ALL products in entity)
-        fg_supply = data_loader.load_fg_supply(
-            entity_name=filter_values.get('entity'),
-            exclude_expired=filter_values.get('exclude_expired', True)
-        )
-        
-        # Load FG Demand (ALL products in entity)
-        fg_demand = data_loader.load_fg_demand(
-            entity_name=filter_values.get('entity')
-        )
-        
-        # Load FG Safety Stock (ALL products in entity)
-        fg_safety = None
-        if filter_values.get('include_fg_safety', True):
-            fg_safety = data_loader.load_fg_safety_stock(
-                entity_name=filter_values.get('entity')
-            )
-        
-        # Validate FG data
-        if fg_supply.empty and fg_demand.empty:
-            st.warning("No FG data available for selected filters")
-            return None
-        
-        # Load Classification (ALL products)
-        classification = data_loader.load_product_classification(
-            entity_name=filter_values.get('entity')
-        )
-        
-        # Load BOM Explosion
-        bom_explosion = data_loader.load_bom_explosion(
-            entity_name=filter_values.get('entity'),
-            include_alternatives=filter_values.get('include_alternatives', True)
-        )
-        
-        # Load Existing MO Demand
-        existing_mo = None
-        if filter_values.get('include_existing_mo', True):
-            existing_mo = data_loader.load_existing_mo_demand(
-                entity_name=filter_values.get('entity'),
-                include_draft_mo=filter_values.get('include_draft_mo', False)
-            )
-        
-        # Load Raw Material Supply (summary for net GAP, detail for period GAP)
-        raw_supply = data_loader.load_raw_material_supply_summary(
-            entity_name=filter_values.get('entity')
-        )
-        
-        # Load Raw Material Supply Detail (has availability_date for period allocation)
-        raw_supply_detail = data_loader.load_raw_material_supply(
-            entity_name=filter_values.get('entity'),
-            exclude_expired=filter_values.get('exclude_expired', True)
-        )
-        
-        # Load Raw Safety Stock
-        raw_safety = None
-        if filter_values.get('include_raw_safety', True):
-            raw_safety = data_loader.load_raw_material_safety_stock(
-                entity_name=filter_values.get('entity')
+        result, from_cache = get_result_cache().get_or_compute(
+            filter_values,
+            data_loader,
+            compute=lambda: _load_and_calculate(data_loader, calculator, filter_values),
+            force_refresh=force_refresh,
+            incremental=lambda previous, ids: recalculate_gap(
+                previous, ids, data_loader, filter_values, calculator
             )
-        
-        # Calculate full GAP
-        result = calculator.calculate(
-            fg_supply_df=fg_supply,
-            fg_demand_df=fg_demand,
-            fg_safety_stock_df=fg_safety,
-            classification_df=classification,
-            bom_explosion_df=bom_explosion,
-            existing_mo_demand_df=existing_mo,
-            raw_supply_df=raw_supply,
-            raw_supply_detail_df=raw_supply_detail,
-            raw_safety_stock_df=raw_safety,
-            selected_supply_sources=filter_values.get('supply_sources'),
-            selected_demand_sources=filter_values.get('demand_sources'),
-            include_fg_safety=filter_values.get('include_fg_safety', True),
-            include_raw_safety=filter_values.get('include_raw_safety', True),
-            include_alternatives=filter_values.get('include_alternatives', True),
-            include_existing_mo=filter_values.get('include_existing_mo', True),
-            include_draft_mo=filter_values.get('include_draft_mo', False),
-            period_type=filter_values.get('period_type', 'Weekly'),
-            track_backlog=filter_values.get('track_backlog', True)
         )
+        if result is None:
+            return None
         
-        logger.info(f"Supply Chain GAP calculated: {result.get_summary()}")
+        if from_cache:
+            logger.info(f"Supply Chain GAP served from shared cache: {result.get_summary()}")
         
         # =====================================================================
         # POST-PROCESS: Apply display filter (brand/product) on results
@@ -189,6 +127,62 @@ def calculate_gap(
         return result
 
 
+def _load_and_calculate(data_loader, calculator, filter_values: Dict[str, Any]):
+    """Load all source views and run the full GAP calculation (uncached)."""
+    
+    # =====================================================================
+    # LOAD DATA — entity only, NO brand/product filter
+    # Brand/product applied later as display filter on results
+    # All source views are read concurrently (one pooled connection each),
+    # so the wait is ~ the slowest view instead of the sum of all views.
+    # =====================================================================
+    load = load_gap_inputs(data_loader, filter_values)
+    
+    fg_supply = load.get('fg_supply')
+    fg_demand = load.get('fg_demand')
+    fg_safety = load.get('fg_safety')          # None if FG safety disabled
+    
+    # Validate FG data
+    if fg_supply.empty and fg_demand.empty:
+        st.warning("No FG data available for selected filters")
+        return None
+    
+    classification = load.get('classification')
+    bom_explosion = load.get('bom_explosion')
+    existing_mo = load.get('existing_mo')      # None if existing MO disabled
+    raw_supply = load.get('raw_supply')        # summary for net GAP
+    raw_supply_detail = load.get('raw_supply_detail')  # availability_date for period GAP
+    raw_safety = load.get('raw_safety')        # None if raw safety disabled
+    
+    # Calculate full GAP
+    result = calculator.calculate(
+        fg_supply_df=fg_supply,
+        fg_demand_df=fg_demand,
+        fg_safety_stock_df=fg_safety,
+        classification_df=classification,
+        bom_explosion_df=bom_explosion,
+        existing_mo_demand_df=existing_mo,
+        raw_supply_df=raw_supply,
+        raw_supply_detail_df=raw_supply_detail,
+        raw_safety_stock_df=raw_safety,
+        selected_supply_sources=filter_values.get('supply_sources'),
+        selected_demand_sources=filter_values.get('demand_sources'),
+        include_fg_safety=filter_values.get('include_fg_safety', True),
+        include_raw_safety=filter_values.get('include_raw_safety', True),
+        include_alternatives=filter_values.get('include_alternatives', True),
+        alternative_mode=filter_values.get('alternative_mode', 'single'),
+        include_existing_mo=filter_values.get('include_existing_mo', True),
+        include_draft_mo=filter_values.get('include_draft_mo', False),
+        period_type=filter_values.get('period_type', 'Weekly'),
+        track_backlog=filter_values.get('track_backlog', True)
+    )
+    
+    result.load_stats = load.get_summary()
+    logger.info(f"Supply Chain GAP calculated: {result.get_summary()}")
+    
+    return result
+
+
 def _apply_display_filter(result, filter_values: Dict[str, Any]):
     """
     Tag FG products as in_filter based on brand/product selection.
@@ -234,8 +228,8 @@ def _compute_raw_demand_breakdown(result):
     - demand_from_selected: BOM demand originating from filtered FG shortage
     - demand_from_others: BOM demand originating from non-filtered FG shortage
     
-    Note: Uses simplified single-level BOM explosion for attribution.
-    Total required_qty (from multi-level calculator) remains the accurate number.
+    Attribution reads the pegging table emitted by the multi-level calculator
+    (leaf demand per FG root across all BOM levels) — no BOM re-explosion.
     """
     if result.raw_gap_df.empty:
         return
@@ -246,51 +240,14 @@ def _compute_raw_demand_breakdown(result):
         result.raw_gap_df['demand_from_others'] = 0.0
         return
     
-    if result.fg_gap_df.empty or result.bom_explosion_df.empty:
+    if result.fg_gap_df.empty or result.raw_pegging_df.empty:
         result.raw_gap_df['demand_from_selected'] = 0.0
         result.raw_gap_df['demand_from_others'] = result.raw_gap_df.get('required_qty', 0)
         return
     
-    # Get filtered manufacturing shortage IDs
+    # FG products in the display filter (pegging roots are manufacturing shortage only)
     filtered_fg = result.fg_gap_df[result.fg_gap_df.get('in_filter', True)]
-    filtered_shortage_ids = filtered_fg[filtered_fg['net_gap'] < 0]['product_id'].tolist() if not filtered_fg.empty else []
-    
-    mfg_ids = result.manufacturing_df['product_id'].tolist() if not result.manufacturing_df.empty else []
-    filtered_mfg_ids = [pid for pid in filtered_shortage_ids if pid in mfg_ids]
-    
-    if not filtered_mfg_ids:
-        result.raw_gap_df['demand_from_selected'] = 0.0
-        result.raw_gap_df['demand_from_others'] = result.raw_gap_df.get('required_qty', 0)
-        return
-    
-    # Simplified BOM explosion for filtered MFG shortage only
-    bom = result.bom_explosion_df
-    id_col = 'output_product_id' if 'output_product_id' in bom.columns else 'fg_product_id'
-    
-    shortage_data = result.fg_gap_df[
-        (result.fg_gap_df['product_id'].isin(filtered_mfg_ids)) &
-        (result.fg_gap_df['net_gap'] < 0)
-    ][['product_id', 'net_gap']].copy()
-    
-    merged = bom.merge(
-        shortage_data.rename(columns={'product_id': id_col, 'net_gap': 'fg_shortage'}),
-        on=id_col, how='inner'
-    )
-    
-    if merged.empty:
-        result.raw_gap_df['demand_from_selected'] = 0.0
-        result.raw_gap_df['demand_from_others'] = result.raw_gap_df.get('required_qty', 0)
-        return
-    
-    # Calculate demand per material from filtered FG
-    merged['fg_shortage'] = merged['fg_shortage'].abs()
-    bom_out = merged['bom_output_quantity'].fillna(1).replace(0, 1) if 'bom_output_quantity' in merged.columns else 1
-    qty_per = merged['quantity_per_output'].fillna(1) if 'quantity_per_output' in merged.columns else 1
-    scrap = merged['scrap_rate'].fillna(0) if 'scrap_rate' in merged.columns else 0
-    
-    merged['demand_qty'] = (merged['fg_shortage'] / bom_out) * qty_per * (1 + scrap / 100)
-    
-    demand_map = merged.groupby('material_id')['demand_qty'].sum()
+    demand_map = result.get_pegged_demand(filtered_fg['product_id'])
     
     result.raw_gap_df['demand_from_selected'] = (
         result.raw_gap_df['material_id'].map(demand_map).fillna(0).round(0)
@@ -306,6 +263,14 @@ def _compute_raw_demand_breakdown(result):
     )
 
 
+def _clear_export_cache():
+    """Drop exports of earlier results (and their temp files) from session state"""
+    for key in [k for k in st.session_state.keys() if str(k).startswith('export_cache_')]:
+        cached = st.session_state.pop(key)
+        if isinstance(cached, ExcelArtifact):
+            cached.cleanup()
+
+
 def main():
     """Main application"""
     
@@ -393,7 +358,9 @@ def main():
         saved_filters = state.get_filters()
         if saved_filters:
             try:
-                new_result = calculate_gap(data_loader, calculator, saved_filters)
+                new_result = calculate_gap(
+                    data_loader, calculator, saved_filters, force_refresh=True
+                )
                 if new_result:
                     state.set_result(new_result)
                     st.rerun()
@@ -473,12 +440,25 @@ def main():
     
     with col1:
         try:
-            # Cache export data by result timestamp
+            # Cache export by result timestamp — spilled to a temp file, so
+            # session state holds a path instead of the workbook bytes
             cache_key = f"export_cache_{result.timestamp.isoformat()}"
+            cached = st.session_state.get(cache_key)
+            if isinstance(cached, ExcelArtifact) and not cached.exists():
+                # Temp file removed underneath us — rebuild
+                del st.session_state[cache_key]
             if cache_key not in st.session_state:
-                st.session_state[cache_key] = export_to_excel(result, state.get_filters() or filter_values)
+                _clear_export_cache()
+                export_filters = state.get_filters() or filter_values
+                if EXPORT_CONFIG.get('spill_to_file', True):
+                    st.session_state[cache_key] = export_to_excel_file(result, export_filters)
+                else:
+                    st.session_state[cache_key] = export_to_excel(result, export_filters)
             
-            excel_data = st.session_state[cache_key]
+            cached = st.session_state[cache_key]
+            # Spilled export: hand over the reader, not the bytes — Streamlit
+            # calls it when the button is clicked instead of on every rerun
+            excel_data = cached.read_bytes if isinstance(cached, ExcelArtifact) else cached
             filename = get_export_filename()
             
             st.download_button(
@@ -0,0 +1,96 @@
+# tests/test_bom_graph_cache.py
+
+"""Cached ACTIVE-BOM graph of BOMManager (utils/bom/manager.py)"""
+
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, event, text
+
+from utils.bom.manager import BOMManager, invalidate_bom_graph
+
+SCHEMA = [
+    """CREATE TABLE bom_headers (
+        id INTEGER PRIMARY KEY, product_id INTEGER, output_qty REAL, status TEXT,
+        delete_flag INTEGER DEFAULT 0, updated_by INTEGER, updated_date TEXT, created_date TEXT
+    )""",
+    """CREATE TABLE bom_details (
+        id INTEGER PRIMARY KEY, bom_header_id INTEGER, material_id INTEGER,
+        material_type TEXT, quantity REAL, uom TEXT, scrap_rate REAL
+    )""",
+    """CREATE TABLE bom_material_alternatives (
+        id INTEGER PRIMARY KEY, bom_detail_id INTEGER, alternative_material_id INTEGER,
+        material_type TEXT, quantity REAL, uom TEXT, scrap_rate REAL, priority INTEGER,
+        is_active INTEGER, notes TEXT, created_date TEXT
+    )""",
+    "INSERT INTO bom_headers (id, product_id, output_qty, status) VALUES (1, 100, 1, 'ACTIVE'), (2, 200, 2, 'ACTIVE')",
+    """INSERT INTO bom_details (id, bom_header_id, material_id, material_type, quantity, uom, scrap_rate)
+       VALUES (11, 1, 200, 'RAW_MATERIAL', 2, 'KG', 0), (12, 1, 300, 'RAW_MATERIAL', 1, 'KG', 0),
+              (21, 2, 400, 'RAW_MATERIAL', 3, 'KG', 5)""",
+    """INSERT INTO bom_material_alternatives
+       (id, bom_detail_id, alternative_material_id, material_type, quantity, uom, scrap_rate, priority, is_active)
+       VALUES (1, 12, 301, 'RAW_MATERIAL', 1, 'KG', 0, 1, 1)""",
+]
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'bom.db'}")
+
+    @event.listens_for(engine, 'connect')
+    def _now(dbapi_conn, _):
+        dbapi_conn.create_function('NOW', 0, lambda: datetime.now().isoformat(sep=' '))
+
+    with engine.begin() as conn:
+        for statement in SCHEMA:
+            conn.execute(text(statement))
+
+    engine.graph_builds = 0
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _count(conn, cursor, statement, *args):
+        if 'UNION ALL' in statement and statement.lstrip().startswith('SELECT'):
+            engine.graph_builds += 1
+
+    invalidate_bom_graph()
+    yield engine
+    invalidate_bom_graph()
+    engine.dispose()
+
+
+def _manager(engine) -> BOMManager:
+    manager = BOMManager.__new__(BOMManager)
+    manager.engine = engine
+    return manager
+
+
+def _qty(graph, product_id, material_id) -> float:
+    lines = graph.bom_lines(product_id)
+    return float(lines.loc[lines['material_id'] == material_id, 'quantity_per_output'].iloc[0])
+
+
+def test_graph_is_reused_until_the_bom_changes(engine):
+    manager = _manager(engine)
+
+    graph = manager.get_bom_graph()
+    assert _manager(engine).get_bom_graph() is graph
+    assert engine.graph_builds == 1
+
+    # Edit through BOMManager: invalidated even though no marker column moves
+    manager.update_bom_material(11, {'material_type': 'RAW_MATERIAL', 'quantity': 5, 'scrap_rate': 0}, 1)
+    graph = manager.get_bom_graph()
+    assert _qty(graph, 100, 200) == 5
+    assert engine.graph_builds == 2
+
+    # Status change by another process: caught by the snapshot marker
+    with engine.begin() as conn:
+        conn.execute(text("UPDATE bom_headers SET status = 'INACTIVE', updated_date = NOW() WHERE id = 2"))
+    graph = manager.get_bom_graph()
+    assert graph.bom_lines(200).empty
+    assert engine.graph_builds == 3
+
+    manager.update_bom_status(2, 'ACTIVE', 1)
+    graph = manager.get_bom_graph()
+    assert _qty(graph, 200, 400) == 3
+    assert manager.get_bom_graph() is graph
+    assert engine.graph_builds == 4
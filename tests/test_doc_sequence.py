@@ -0,0 +1,178 @@
+# tests/test_doc_sequence.py
+
+"""
+Document number sequences under concurrency (utils/doc_sequence.py)
+
+Runs against an in-memory fake of the MySQL statements the sequence uses
+(single-statement atomicity, per-connection LAST_INSERT_ID), and against a
+real MySQL database when DOC_SEQUENCE_TEST_DB_URL is set, e.g.
+    DOC_SEQUENCE_TEST_DB_URL=mysql+pymysql://user:pw@localhost/scratch
+"""
+
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from utils.doc_sequence import SEQUENCE_TABLE, DocumentSequence
+
+DOC_TABLE = 'document_sequence_test_docs'
+WORKERS = 16
+PER_WORKER = 25
+
+
+class FakeMySQL:
+    """Counter rows + document numbers; each statement runs atomically"""
+
+    def __init__(self):
+        self.counters = {}
+        self.documents = defaultdict(list)
+        self.lock = threading.Lock()
+
+
+class FakeResult:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def fetchone(self):
+        return self._rows[0] if self._rows else None
+
+    def scalar(self):
+        return self._rows[0][0] if self._rows else None
+
+
+class FakeConnection:
+    def __init__(self, db: FakeMySQL):
+        self.db = db
+        self.last_insert_id = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def commit(self):
+        pass
+
+    def execute(self, clause, params=None):
+        sql = ' '.join(str(clause).split())
+        params = params or {}
+        db = self.db
+
+        if sql.startswith('CREATE TABLE'):
+            return FakeResult([])
+        if sql.startswith(f'SELECT 1 FROM {SEQUENCE_TABLE} WHERE prefix'):
+            with db.lock:
+                rows = [(1,)] if params['prefix'] in db.counters else []
+            time.sleep(0.0005)   # let first uses of a prefix race
+            return FakeResult(rows)
+        if sql.startswith('SELECT COALESCE(MAX(CAST(SUBSTRING_INDEX'):
+            prefix = params['pattern'].rstrip('%')
+            with db.lock:
+                suffixes = [int(d.rsplit('-', 1)[1]) for d in db.documents[DOC_TABLE] if d.startswith(prefix)]
+            return FakeResult([(max(suffixes, default=0),)])
+        if sql.startswith(f'INSERT INTO {SEQUENCE_TABLE}') and 'LAST_INSERT_ID(last_value + 1)' in sql:
+            with db.lock:
+                prefix = params['prefix']
+                if prefix in db.counters:
+                    db.counters[prefix] += 1
+                else:
+                    db.counters[prefix] = params['seed']
+                self.last_insert_id = db.counters[prefix]
+            return FakeResult([])
+        if sql == 'SELECT LAST_INSERT_ID()':
+            return FakeResult([(self.last_insert_id,)])
+        raise AssertionError(f"Unexpected SQL: {sql}")
+
+
+class FakeEngine:
+    def __init__(self, db: FakeMySQL):
+        self.db = db
+
+    def connect(self):
+        return FakeConnection(self.db)
+
+    @contextmanager
+    def begin(self):
+        yield FakeConnection(self.db)
+
+
+@pytest.fixture(params=['fake', 'mysql'])
+def backend(request):
+    """(engine, seed(prefix, count) existing documents, tag unique to this run)"""
+    tag = f'T{uuid.uuid4().hex[:6]}'
+    if request.param == 'fake':
+        db = FakeMySQL()
+
+        def seed(prefix, count):
+            db.documents[DOC_TABLE].extend(f'{prefix}{n:03d}' for n in range(1, count + 1))
+
+        yield FakeEngine(db), seed, tag
+        return
+
+    url = os.getenv('DOC_SEQUENCE_TEST_DB_URL')
+    if not url:
+        pytest.skip('DOC_SEQUENCE_TEST_DB_URL not set')
+    engine = create_engine(url, pool_size=WORKERS * 2, max_overflow=0)
+    with engine.begin() as conn:
+        conn.execute(text(f"""
+            CREATE TABLE IF NOT EXISTS {DOC_TABLE} (
+                id BIGINT AUTO_INCREMENT PRIMARY KEY,
+                doc_no VARCHAR(64) NOT NULL UNIQUE
+            )
+        """))
+
+    def seed(prefix, count):
+        with engine.begin() as conn:
+            for n in range(1, count + 1):
+                conn.execute(text(f"INSERT INTO {DOC_TABLE} (doc_no) VALUES (:d)"), {'d': f'{prefix}{n:03d}'})
+
+    yield engine, seed, tag
+    with engine.begin() as conn:
+        conn.execute(text(f"DELETE FROM {DOC_TABLE} WHERE doc_no LIKE :p"), {'p': f'%-{tag}-%'})
+        conn.execute(text(f"DELETE FROM {SEQUENCE_TABLE} WHERE prefix LIKE :p"), {'p': f'%-{tag}-%'})
+    engine.dispose()
+
+
+def test_concurrent_numbers_are_unique_and_gapless(backend):
+    engine, seed, tag = backend
+    sequence = DocumentSequence(engine)
+    # Two fresh prefixes and one continuing 7 existing documents
+    prefixes = [f'MO-{tag}-A-', f'MO-{tag}-B-', f'BOM-{tag}-C-']
+    seed(prefixes[1], 7)
+
+    drawn = defaultdict(list)
+    errors = []
+    drawn_lock = threading.Lock()
+
+    def worker(index):
+        for i in range(PER_WORKER):
+            prefix = prefixes[(index + i) % len(prefixes)]
+            try:
+                value = sequence.next_value(prefix, DOC_TABLE, 'doc_no')
+            except Exception as e:
+                with drawn_lock:
+                    errors.append(repr(e))
+                continue
+            with drawn_lock:
+                drawn[prefix].append(value)
+
+    threads = [threading.Thread(target=worker, args=(w,)) for w in range(WORKERS)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert not errors
+    assert sum(len(v) for v in drawn.values()) == WORKERS * PER_WORKER
+    for prefix in prefixes:
+        values = sorted(drawn[prefix])
+        first = 8 if prefix == prefixes[1] else 1
+        assert len(values) == len(set(values)), f"{prefix}: repeated numbers"
+        assert values == list(range(first, first + len(values))), f"{prefix}: gaps"
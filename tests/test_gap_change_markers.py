@@ -0,0 +1,143 @@
+# tests/test_gap_change_markers.py
+
+"""GAP result cache change-marker probe (result_cache + data_loader)"""
+
+import re
+import threading
+
+import pytest
+from pymysql.converters import escape_item
+
+from utils.supply_chain_gap.data_loader import SupplyChainDataLoader
+from utils.supply_chain_gap.result_cache import GAPResultCache
+
+# View → objects it reads (name, is_view)
+VIEW_USAGE = {
+    'unified_demand_view': [('sales_order_lines', False), ('demand_base_view', True)],
+    'demand_base_view': [('customer_forecasts', False)],
+    'safety_stock_current_view': [('safety_stock_levels', False)],
+    'raw_material_safety_stock_view': [('safety_stock_levels', False)],
+}
+# Existing (table, column) → leads an index
+COLUMNS = {
+    ('sales_order_lines', 'updated_date'): True,
+    ('sales_order_lines', 'created_date'): False,
+    ('customer_forecasts', 'created_date'): True,
+    ('inventory_histories', 'created_date'): True,
+}
+
+
+def _in_list(query: str, column: str):
+    match = re.search(rf"{column} IN \(([^)]*)\)", query)
+    assert match, f"{column} IN (...) not bound in: {query}"
+    return re.findall(r"'([^']*)'", match.group(1))
+
+
+class FakeMySQLConnection:
+    """
+    DBAPI connection that formats parameters the way pymysql does
+    (query % escaped_args) — `:name` placeholders stay unbound and fail.
+    Also answers SQLAlchemy-style conn.execute(text(...)) for the probes.
+    """
+
+    def __init__(self):
+        self.executed = []
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+    def run(self, query: str):
+        self.executed.append(query)
+        if re.search(r"(?<![\w:]):[A-Za-z_]\w*", query):
+            raise RuntimeError(f"1064 syntax error near unbound placeholder: {query}")
+        if 'VIEW_TABLE_USAGE' in query:
+            names = _in_list(query, 'u.VIEW_NAME')
+            return ['table_name', 'is_view'], [
+                (table, int(is_view)) for view in names for table, is_view in VIEW_USAGE.get(view, [])
+            ]
+        if 'information_schema.COLUMNS' in query:
+            tables, columns = _in_list(query, 'c.TABLE_NAME'), _in_list(query, 'c.COLUMN_NAME')
+            return ['table_name', 'column_name', 'is_indexed'], [
+                (t, c, int(indexed)) for (t, c), indexed in COLUMNS.items()
+                if t in tables and c in columns
+            ]
+        select_list = re.search(r"SELECT (.*) FROM", query).group(1)
+        return [], [tuple(1 for _ in select_list.split(', '))]
+
+    def execute(self, clause, params=None):
+        _, rows = self.run(str(clause))
+        return FakeResult(rows)
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.description = None
+        self._rows = []
+
+    def execute(self, query, args=None):
+        if args:
+            query = query % {k: escape_item(v, 'utf8') for k, v in args.items()}
+        names, self._rows = self.conn.run(query)
+        self.description = [(name, None, None, None, None, None, None) for name in names]
+
+    def fetchall(self):
+        return list(self._rows)
+
+    def close(self):
+        pass
+
+
+class FakeResult:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def fetchone(self):
+        return self._rows[0] if self._rows else None
+
+
+@pytest.fixture
+def loader():
+    data_loader = SupplyChainDataLoader.__new__(SupplyChainDataLoader)
+    data_loader._engine = None
+    data_loader._local = threading.local()
+    return data_loader
+
+
+@pytest.mark.filterwarnings('ignore::UserWarning')
+def test_resolve_view_tables_binds_names_and_recurses(loader):
+    conn = FakeMySQLConnection()
+    with loader.bind_connection(conn):
+        tables = loader.resolve_view_tables(['unified_demand_view', 'safety_stock_current_view'])
+
+    assert tables == ['sales_order_lines', 'safety_stock_levels', 'customer_forecasts']
+    assert "IN ('unified_demand_view','safety_stock_current_view')" in conn.executed[0]
+
+
+@pytest.mark.filterwarnings('ignore::UserWarning')
+def test_probe_covers_view_tables_with_indexed_columns_only(loader):
+    conn = FakeMySQLConnection()
+    cache = GAPResultCache(max_entries=1, max_age_seconds=60)
+    with loader.bind_connection(conn):
+        markers = cache._probe_markers(loader)
+
+    spec = cache._marker_spec
+    assert spec is not None
+    # View base tables are probed, uncounted, with their indexed timestamp columns
+    assert spec['sales_order_lines'] == ('updated_date',)
+    assert spec['customer_forecasts'] == ('created_date',)
+    assert spec['safety_stock_levels'] == ()
+    assert spec['inventory_histories'] == ('created_date',)
+    assert markers['sales_order_lines'] == (('max_id', 1), ('updated_date', 1))
+    assert markers['safety_stock_levels'] == (('max_id', 1),)
+    assert markers['manufacturing_orders'][0] == ('count', 1)
+    assert not any(':t0' in q or ':v0' in q for q in conn.executed)
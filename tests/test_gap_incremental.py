@@ -0,0 +1,206 @@
+# tests/test_gap_incremental.py
+
+"""Incremental GAP patch vs full recalculation (utils/supply_chain_gap/incremental.py)"""
+
+import pandas as pd
+import pytest
+
+from utils.supply_chain_gap.calculator import SupplyChainGAPCalculator
+from utils.supply_chain_gap.incremental import IncrementalGAPCalculator
+
+TODAY = pd.Timestamp.now().normalize()
+
+# FG 100/101/103 are manufactured, 102 is traded.
+# Semi-finished: 200 (→ 300, 301), 201 (→ 302, 202), 202 (→ 303).
+# Raw 304 is a primary with alternative 305.
+BOM = [
+    # (output, material, bom_out, qty_per, scrap, is_primary, primary, priority)
+    (100, 200, 1, 2.0, 0, 1, None, None),
+    (100, 300, 1, 1.0, 5, 1, None, None),
+    (100, 304, 2, 3.0, 0, 1, None, None),
+    (100, 305, 2, 3.0, 0, 0, 304, 1),
+    (101, 201, 1, 1.0, 0, 1, None, None),
+    (101, 300, 1, 0.5, 0, 1, None, None),
+    (103, 200, 1, 1.0, 0, 1, None, None),
+    (103, 302, 1, 1.0, 10, 1, None, None),
+    (200, 300, 1, 1.5, 0, 1, None, None),
+    (200, 301, 4, 1.0, 0, 1, None, None),
+    (201, 302, 1, 2.0, 0, 1, None, None),
+    (201, 202, 1, 1.0, 0, 1, None, None),
+    (202, 303, 1, 3.0, 2, 1, None, None),
+]
+
+
+def _fg_supply(rows):
+    return pd.DataFrame([{
+        'product_id': pid, 'product_name': f'FG {pid}', 'pt_code': f'FG{pid}', 'brand': 'B',
+        'package_size': '1kg', 'standard_uom': 'KG', 'unit_cost_usd': 1.0,
+        'supply_source': source, 'available_quantity': qty,
+        'availability_date': TODAY + pd.Timedelta(days=days), 'availability_status': 'CONFIRMED',
+    } for pid, source, qty, days in rows])
+
+
+def _fg_demand(rows):
+    return pd.DataFrame([{
+        'product_id': pid, 'product_name': f'FG {pid}', 'pt_code': f'FG{pid}', 'brand': 'B',
+        'package_size': '1kg', 'standard_uom': 'KG', 'customer': customer,
+        'demand_source': 'OC_PENDING', 'required_quantity': qty, 'total_value_usd': qty * 10.0,
+        'selling_unit_price': 10.0, 'required_date': TODAY + pd.Timedelta(days=days),
+    } for pid, customer, qty, days in rows])
+
+
+def _raw_supply(rows):
+    """One summary row per material: (material, inventory, purchase order)"""
+    return pd.DataFrame([{
+        'material_id': mid, 'inventory_qty': inv, 'purchase_order_qty': po,
+        'total_supply': inv + po,
+    } for mid, inv, po in rows])
+
+
+def _raw_supply_detail(rows):
+    return pd.DataFrame([{
+        'material_id': mid, 'supply_source': source, 'available_quantity': qty,
+        'availability_date': TODAY + pd.Timedelta(days=days), 'availability_status': 'CONFIRMED',
+    } for mid, source, qty, days in rows])
+
+
+def _existing_mo(rows):
+    return pd.DataFrame([{
+        'material_id': mid, 'pending_qty': qty, 'mo_status': 'CONFIRMED',
+        'scheduled_date': TODAY + pd.Timedelta(days=days),
+    } for mid, qty, days in rows])
+
+
+def _bom() -> pd.DataFrame:
+    return pd.DataFrame([{
+        'output_product_id': out, 'material_id': mid, 'bom_output_quantity': bom_out,
+        'quantity_per_output': qty_per, 'scrap_rate': scrap,
+        'material_pt_code': f'M{mid}', 'material_name': f'Material {mid}', 'material_uom': 'KG',
+        'material_type': 'RAW_MATERIAL', 'is_primary': is_primary,
+        'primary_material_id': primary, 'alternative_priority': priority,
+    } for out, mid, bom_out, qty_per, scrap, is_primary, primary, priority in BOM])
+
+
+def _baseline():
+    return {
+        'fg_supply': _fg_supply([
+            (100, 'INVENTORY', 20, 0), (101, 'INVENTORY', 5, 0),
+            (101, 'PURCHASE_ORDER', 10, 20), (102, 'INVENTORY', 50, 0), (103, 'INVENTORY', 30, 0),
+        ]),
+        'fg_demand': _fg_demand([
+            (100, 'C1', 60, 7), (100, 'C2', 40, 21), (101, 'C1', 80, 14),
+            (101, 'C3', 25, 28), (102, 'C2', 70, 7),
+        ]),
+        'fg_safety': pd.DataFrame({'product_id': [100, 102], 'safety_stock_qty': [5, 10],
+                                   'reorder_point': [8, 15]}),
+        'classification': pd.DataFrame({'product_id': [100, 101, 102, 103], 'has_bom': [1, 1, 0, 1]}),
+        'raw_supply': _raw_supply([
+            (200, 30, 0), (201, 10, 5), (202, 0, 0), (300, 120, 40), (301, 5, 0),
+            (302, 40, 0), (303, 60, 30), (304, 10, 0), (305, 50, 0),
+        ]),
+        'raw_supply_detail': _raw_supply_detail([
+            (200, 'INVENTORY', 30, 0), (201, 'INVENTORY', 10, 0), (201, 'PURCHASE_ORDER', 5, 10),
+            (300, 'INVENTORY', 120, 0), (300, 'PURCHASE_ORDER', 40, 14), (301, 'INVENTORY', 5, 0),
+            (302, 'INVENTORY', 40, 0), (303, 'INVENTORY', 60, 0), (303, 'PURCHASE_ORDER', 30, 21),
+            (304, 'INVENTORY', 10, 0), (305, 'INVENTORY', 50, 0),
+        ]),
+        'raw_safety': pd.DataFrame({'material_id': [300, 302, 201], 'safety_stock_qty': [20, 5, 2]}),
+        'existing_mo': _existing_mo([(300, 15, 3), (303, 12, 5), (303, 8, 12)]),
+    }
+
+
+# Added, changed and removed rows, keyed by product / material id:
+# the complete post-delta rows of each changed id (what a scoped reload returns)
+DELTA_IDS = {100, 101, 103, 200, 300, 303, 305}
+
+
+def _delta():
+    return {
+        'fg_supply': _fg_supply([(100, 'INVENTORY', 20, 0), (101, 'INVENTORY', 5, 0),
+                                 (101, 'PURCHASE_ORDER', 10, 20), (101, 'CAN_PENDING', 12, 3),
+                                 (103, 'INVENTORY', 30, 0)]),
+        'fg_demand': _fg_demand([(100, 'C1', 90, 7), (100, 'C2', 40, 21), (101, 'C1', 80, 14),
+                                 (103, 'C4', 75, 10)]),
+        'fg_safety': pd.DataFrame({'product_id': [100], 'safety_stock_qty': [5], 'reorder_point': [8]}),
+        'classification': pd.DataFrame({'product_id': [100, 101, 103], 'has_bom': [1, 1, 1]}),
+        'raw_supply': _raw_supply([(200, 30, 25), (300, 60, 40), (303, 60, 30), (305, 50, 300)]),
+        'raw_supply_detail': _raw_supply_detail([
+            (200, 'INVENTORY', 30, 0), (200, 'PURCHASE_ORDER', 25, 7),
+            (300, 'INVENTORY', 60, 0), (300, 'PURCHASE_ORDER', 40, 14),
+            (303, 'INVENTORY', 60, 0), (303, 'PURCHASE_ORDER', 30, 21),
+            (305, 'INVENTORY', 50, 0), (305, 'PURCHASE_ORDER', 300, 5),
+        ]),
+        'raw_safety': pd.DataFrame({'material_id': [300], 'safety_stock_qty': [20]}),
+        'existing_mo': _existing_mo([(303, 12, 5)]),
+    }
+
+
+ID_COLS = {
+    'fg_supply': 'product_id', 'fg_demand': 'product_id', 'fg_safety': 'product_id',
+    'classification': 'product_id', 'raw_supply': 'material_id',
+    'raw_supply_detail': 'material_id', 'raw_safety': 'material_id', 'existing_mo': 'material_id',
+}
+
+
+def _apply(baseline, delta, ids):
+    return {
+        key: pd.concat([df[~df[ID_COLS[key]].isin(ids)], delta[key]], ignore_index=True)
+        for key, df in baseline.items()
+    }
+
+
+def _calculate(calc, frames, **options):
+    return calc.calculate(
+        fg_supply_df=frames['fg_supply'],
+        fg_demand_df=frames['fg_demand'],
+        fg_safety_stock_df=frames['fg_safety'],
+        classification_df=frames['classification'],
+        bom_explosion_df=_bom(),
+        existing_mo_demand_df=frames['existing_mo'],
+        raw_supply_df=frames['raw_supply'],
+        raw_supply_detail_df=frames['raw_supply_detail'],
+        raw_safety_stock_df=frames['raw_safety'],
+        **options
+    )
+
+
+def _assert_same(actual: pd.DataFrame, expected: pd.DataFrame, keys):
+    assert not expected.empty
+    keys = [k for k in keys if k in expected.columns]
+    normalize = lambda df: df.sort_values(keys, kind='mergesort').reset_index(drop=True)
+    pd.testing.assert_frame_equal(
+        normalize(actual), normalize(expected), check_like=True, check_dtype=False
+    )
+
+
+@pytest.mark.parametrize('options', [
+    {},
+    {'alternative_mode': 'combined', 'include_raw_safety': False},
+])
+def test_incremental_matches_full_recalculation(options):
+    calc = SupplyChainGAPCalculator()
+    baseline = _baseline()
+    after = _apply(baseline, _delta(), DELTA_IDS)
+
+    previous = _calculate(calc, baseline, **options)
+    assert not previous.semi_finished_gap_df.empty
+    patched, update = IncrementalGAPCalculator(calc).recalculate(previous, DELTA_IDS, _delta())
+    full = _calculate(calc, after, **options)
+
+    assert patched is not None, update.fallback_reason
+    _assert_same(patched.fg_gap_df, full.fg_gap_df, ['product_id'])
+    _assert_same(patched.raw_gap_df, full.raw_gap_df, ['material_id'])
+    _assert_same(patched.semi_finished_gap_df, full.semi_finished_gap_df, ['bom_level', 'material_id'])
+    _assert_same(patched.raw_pegging_df, full.raw_pegging_df, ['material_id', 'fg_product_id', 'bom_level'])
+    _assert_same(patched.alternative_analysis_df, full.alternative_analysis_df,
+                 ['primary_material_id', 'alternative_material_id'])
+    _assert_same(patched.production_status_df, full.production_status_df, ['product_id'])
+    _assert_same(patched.fg_period_gap_df, full.fg_period_gap_df, ['product_id', 'period'])
+    _assert_same(patched.raw_period_gap_df, full.raw_period_gap_df, ['material_id', 'period'])
+    assert patched.max_bom_depth == full.max_bom_depth
+    assert patched.raw_metrics == full.raw_metrics
+
+    # The previous result (shared through the result cache) is left untouched
+    again = _calculate(calc, baseline, **options)
+    _assert_same(previous.raw_gap_df, again.raw_gap_df, ['material_id'])
+    _assert_same(previous.semi_finished_gap_df, again.semi_finished_gap_df, ['bom_level', 'material_id'])
@@ -0,0 +1,73 @@
+# tests/test_gap_pegging.py
+
+"""Raw material pegging vs the multi-level material GAP (calculator + bom_graph)"""
+
+import pandas as pd
+import pytest
+
+from utils.supply_chain_gap.calculator import SupplyChainGAPCalculator
+
+# FG 1 and 2 share semi-finished 10 (partly covered by stock), which uses
+# semi-finished 11; raw 20 is used at levels 1, 2 and 3.
+BOM = [
+    # (output, material, bom_out, qty_per, scrap)
+    (1, 10, 1, 2.0, 0),
+    (1, 20, 1, 1.0, 5),
+    (2, 10, 2, 3.0, 0),
+    (2, 21, 1, 0.5, 0),
+    (10, 11, 1, 1.0, 0),
+    (10, 20, 4, 1.0, 2),
+    (11, 20, 1, 1.5, 0),
+    (11, 22, 3, 2.0, 10),
+]
+
+
+def _frames():
+    products = [1, 2, 3]
+    fg = lambda pid: {'product_id': pid, 'product_name': f'FG {pid}', 'pt_code': f'FG{pid}',
+                      'brand': 'B', 'package_size': '1kg', 'standard_uom': 'KG'}
+    return dict(
+        fg_supply_df=pd.DataFrame([
+            {**fg(pid), 'supply_source': 'INVENTORY', 'available_quantity': qty, 'unit_cost_usd': 1.0}
+            for pid, qty in [(1, 10), (2, 5), (3, 50)]
+        ]),
+        fg_demand_df=pd.DataFrame([
+            {**fg(pid), 'customer': 'C1', 'demand_source': 'OC_PENDING',
+             'required_quantity': qty, 'total_value_usd': qty * 4.0,
+             'required_date': pd.Timestamp.now().normalize() + pd.Timedelta(days=14)}
+            for pid, qty in [(1, 70), (2, 45), (3, 80)]
+        ]),
+        classification_df=pd.DataFrame({'product_id': products, 'has_bom': [1, 1, 0]}),
+        bom_explosion_df=pd.DataFrame([{
+            'output_product_id': out, 'material_id': mid, 'bom_output_quantity': bom_out,
+            'quantity_per_output': qty_per, 'scrap_rate': scrap, 'is_primary': 1,
+        } for out, mid, bom_out, qty_per, scrap in BOM]),
+        raw_supply_df=pd.DataFrame({
+            'material_id': [10, 11, 20, 21, 22],
+            'total_supply': [40.0, 15.0, 30.0, 0.0, 12.0],
+        }),
+        raw_supply_detail_df=pd.DataFrame(),
+        raw_safety_stock_df=pd.DataFrame({'material_id': [10, 20], 'safety_stock_qty': [4.0, 6.0]}),
+        existing_mo_demand_df=pd.DataFrame({'material_id': [20, 22], 'pending_qty': [25.0, 9.0]}),
+    )
+
+
+@pytest.mark.parametrize('include_raw_safety', [True, False])
+def test_pegged_qty_sums_to_raw_required_qty(include_raw_safety):
+    result = SupplyChainGAPCalculator().calculate(**_frames(), include_raw_safety=include_raw_safety)
+
+    assert result.max_bom_depth == 3
+    assert not result.semi_finished_gap_df.empty
+    pegging = result.raw_pegging_df
+    assert set(pegging['fg_product_id']) == {1, 2}
+    assert set(pegging['bom_level']) == {1, 2, 3}
+
+    # Existing MO demand is not pegged: compare against required_qty only
+    raw = result.raw_gap_df.set_index('material_id')
+    pegged = pegging.groupby('material_id')['pegged_qty'].sum()
+    assert sorted(pegged.index) == sorted(raw.index)
+    pd.testing.assert_series_equal(
+        pegged.sort_index(), raw['required_qty'].sort_index(),
+        check_names=False, check_exact=False, rtol=1e-12
+    )
+    assert (raw['total_required_qty'] > raw['required_qty']).any()
@@ -0,0 +1,49 @@
+# tests/test_po_pricing_resolver.py
+
+"""Vendor resolution (utils/supply_chain_planning/po_pricing_resolver.py)"""
+
+import pandas as pd
+import pytest
+
+from utils.supply_chain_planning.po_pricing_resolver import POPricingResolver
+
+
+def _pricing() -> pd.DataFrame:
+    rows = []
+    # (product, vendor, usd price, lead max, lead min)
+    for product_id, vendor_id, price, lead_max, lead_min in [
+        (1, 10, 2.0, 10.6, 4.4),
+        (1, 11, 3.0, 7.5, 2.5),
+        (2, 12, 5.0, 20.4, None),
+        (3, 13, 1.5, None, 3.6),
+        (4, 14, 4.0, 8.5, 1.5),
+    ]:
+        rows.append({
+            'product_id': product_id, 'pt_code': f'P{product_id}', 'product_name': f'Product {product_id}',
+            'vendor_id': vendor_id, 'vendor_name': f'Vendor {vendor_id}',
+            'standard_unit_price': price, 'standard_unit_price_usd': price,
+            'lead_time_max_days': lead_max, 'lead_time_min_days': lead_min,
+        })
+    return pd.DataFrame(rows)
+
+
+@pytest.mark.parametrize('strategy', ['CHEAPEST', 'FASTEST'])
+def test_batch_matches_single_product_on_fractional_lead_times(strategy):
+    resolver = POPricingResolver(_pricing())
+    product_ids = [1, 2, 3, 4]
+
+    batch = resolver.resolve_batch(product_ids, strategy=strategy)
+
+    for product_id in product_ids:
+        single = resolver.resolve_product(product_id, strategy=strategy)
+        assert batch[product_id].vendor_id == single.vendor_id
+        assert batch[product_id].lead_time_max_days == single.lead_time_max_days
+        assert batch[product_id].lead_time_min_days == single.lead_time_min_days
+
+
+def test_fractional_lead_times_are_rounded():
+    match = POPricingResolver(_pricing()).resolve_batch([1, 2], strategy='CHEAPEST')
+    assert match[1].lead_time_max_days == 11
+    assert match[1].lead_time_min_days == 4
+    assert match[2].lead_time_max_days == 20
+    assert match[2].lead_time_min_days is None
@@ -66,6 +66,8 @@ from .db import (
     execute_query_df,
     execute_update,
     execute_many,
+    bulk_insert,
+    bulk_update,
     get_connection_pool_status,
 )
 
@@ -123,6 +125,8 @@ __all__ = [
     'execute_query_df',
     'execute_update',
     'execute_many',
+    'bulk_insert',
+    'bulk_update',
     'get_connection_pool_status',
     
     # S3 (optional)
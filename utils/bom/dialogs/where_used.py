@@ -1,8 +1,12 @@
 # utils/bom/dialogs/where_used.py
 """
-Where Used Analysis Dialog with Alternatives Support - VERSION 2.1
+Where Used Analysis Dialog with Alternatives Support - VERSION 2.2
 Find which BOMs use a specific product/material (primary or alternative)
 
+Changes in v2.2:
+- Added Multi-level Usage section (indirect usage through semi-finished BOMs,
+  walked on the shared BOMGraph index)
+
 Changes in v2.1:
 - Updated output product display to unified format with legacy_code
 - Added format_product_display for consistent product display
@@ -60,6 +64,7 @@ def show_where_used_dialog():
     
     if results is not None:
         _render_results(results, state, manager)
+        _render_multilevel_usage(state.get_where_used_indirect())
     
     st.markdown("---")
     
@@ -75,8 +80,16 @@ def _perform_search(product_id: int, state: StateManager, manager: BOMManager):
         
         results = manager.get_where_used(product_id)
         
+        # Multi-level usage is supplementary — failure must not block the search
+        try:
+            indirect = manager.get_multilevel_where_used(product_id)
+        except BOMException as e:
+            logger.warning(f"Multi-level where used unavailable: {e}")
+            indirect = None
+        
         state.set_where_used_product(product_id)
         state.set_where_used_results(results)
+        state.set_where_used_indirect(indirect)
         
         state.set_loading(False)
     
@@ -209,6 +222,51 @@ def _render_results(results: pd.DataFrame, state: StateManager, manager: BOMMana
         _export_results(results, state)
 
 
+def _render_multilevel_usage(indirect: pd.DataFrame):
+    """Render indirect usage (through semi-finished BOMs, ACTIVE BOMs only)"""
+    if indirect is None or indirect.empty:
+        return
+    
+    indirect = indirect[indirect['depth'] > 1]
+    if indirect.empty:
+        return
+    
+    st.markdown("### Multi-level Usage")
+    
+    with st.expander(
+        f"🧬 Used indirectly in {len(indirect)} product(s) "
+        f"({int(indirect['is_top_level'].sum())} top-level)",
+        expanded=False
+    ):
+        display_df = indirect.copy()
+        display_df['product_display'] = display_df.apply(
+            lambda row: format_product_display(
+                code=row.get('product_code', ''),
+                name=row.get('product_name', ''),
+                package_size=row.get('package_size'),
+                brand=row.get('brand'),
+                legacy_code=row.get('legacy_code')
+            ),
+            axis=1
+        )
+        display_df['qty_per_unit'] = display_df['qty_per_unit'].apply(lambda x: format_number(x, 4))
+        display_df['is_top_level'] = display_df['is_top_level'].map({True: '✅', False: ''})
+        
+        st.dataframe(
+            display_df[['product_display', 'depth', 'qty_per_unit', 'is_top_level']],
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                "product_display": st.column_config.TextColumn("Product", width="large"),
+                "depth": st.column_config.NumberColumn("BOM Level", width="small"),
+                "qty_per_unit": st.column_config.TextColumn("Qty / Unit", width="small"),
+                "is_top_level": st.column_config.TextColumn("Top Level", width="small"),
+            }
+        )
+    
+    st.markdown("---")
+
+
 def _export_results(results: pd.DataFrame, state: StateManager):
     """Export results to Excel"""
     try:
@@ -1,8 +1,20 @@
 # utils/bom/manager.py
 """
-Bill of Materials (BOM) Management - VERSION 2.6
+Bill of Materials (BOM) Management - VERSION 2.9
 Complete CRUD operations with creator info support
 
+Changes in v2.9:
+- get_bom_graph() reuses the compiled BOMGraph while the BOM snapshot marker
+  is unchanged; BOM create/update/status/delete paths invalidate it
+
+Changes in v2.8:
+- clone_bom() writes details and alternatives with multi-row INSERTs
+- BOM codes allocated from the shared document sequence (no range lock)
+
+Changes in v2.7:
+- Added get_bom_graph() / get_multilevel_where_used() — multi-level where used
+  walks the shared BOMGraph index instead of one query per level
+
 Changes in v2.6:
 - Added deactivate_boms_for_product() method for Active BOM Conflict Resolution
 - Supports auto-deactivation of existing BOMs when activating new one
@@ -29,13 +41,15 @@ Changes in v2.1:
 """
 
 import logging
+import threading
 from datetime import date, datetime
 from typing import Dict, List, Optional, Any
 import pandas as pd
 import numpy as np
 from sqlalchemy import text
 
-from ..db import get_db_engine
+from ..db import get_db_engine, bulk_insert
+from ..doc_sequence import next_document_number
 
 logger = logging.getLogger(__name__)
 
@@ -55,6 +69,23 @@ def convert_to_native(value: Any) -> Any:
     else:
         return value
 
+# ==================== BOM Graph Cache ====================
+
+# Compiled ACTIVE-BOM graph shared by all BOMManager instances, reused while
+# the BOM snapshot marker is unchanged. Writes through BOMManager bump the
+# generation, so a graph built concurrently with a write is never stored.
+_bom_graph_cache: Dict[str, Any] = {'marker': None, 'graph': None, 'generation': 0}
+_bom_graph_lock = threading.Lock()
+
+
+def invalidate_bom_graph():
+    """Drop the cached BOM graph (call after any BOM line / status change)"""
+    with _bom_graph_lock:
+        _bom_graph_cache['marker'] = None
+        _bom_graph_cache['graph'] = None
+        _bom_graph_cache['generation'] += 1
+
+
 # ==================== BOM Code Constants ====================
 
 BOM_TYPE_PREFIX = {
@@ -525,6 +556,7 @@ class BOMManager:
                     })
             
             trans.commit()
+            invalidate_bom_graph()
             logger.info(f"BOM created: {bom_code} (ID: {bom_id})")
             return bom_code
         
@@ -561,25 +593,7 @@ class BOMManager:
         # Build prefix: BOM-KIT-202512-
         prefix = f"BOM-{type_prefix}-{today.strftime('%Y%m')}-"
         
-        query = text("""
-            SELECT bom_code FROM bom_headers 
-            WHERE bom_code LIKE :prefix
-            ORDER BY bom_code DESC 
-            LIMIT 1
-        """)
-        
-        result = conn.execute(query, {'prefix': f"{prefix}%"})
-        row = result.fetchone()
-        
-        if row:
-            last_code = row[0]
-            # Extract number from last segment: "BOM-KIT-202512-025" -> 25
-            last_num = int(last_code.split('-')[-1])
-            new_num = last_num + 1
-        else:
-            new_num = 1
-        
-        return f"{prefix}{new_num:03d}"
+        return next_document_number(prefix, 'bom_headers', 'bom_code', conn=conn)
 
 
     # ==================== UPDATE Operations ====================
@@ -606,6 +620,7 @@ class BOMManager:
                 })
                 conn.commit()
             
+            invalidate_bom_graph()
             logger.info(f"BOM status updated: {bom_id} -> {new_status}")
         
         except Exception as e:
@@ -649,6 +664,7 @@ class BOMManager:
                 })
                 conn.commit()
                 
+                invalidate_bom_graph()
                 deactivated_count = result.rowcount
                 logger.info(f"Deactivated {deactivated_count} BOMs for product {product_id}, keeping BOM {exclude_bom_id} active")
                 return deactivated_count
@@ -711,6 +727,7 @@ class BOMManager:
                 })
                 conn.commit()
             
+            invalidate_bom_graph()
             logger.info(f"BOM material updated: {detail_id}")
         
         except Exception as e:
@@ -763,6 +780,7 @@ class BOMManager:
                 })
                 conn.commit()
             
+            invalidate_bom_graph()
             logger.info(f"Material added to BOM: {bom_header_id}")
         
         except Exception as e:
@@ -811,6 +829,7 @@ class BOMManager:
                 })
                 conn.commit()
             
+            invalidate_bom_graph()
             logger.info(f"Alternative added to material: {bom_detail_id}")
         
         except Exception as e:
@@ -843,6 +862,7 @@ class BOMManager:
                 })
                 conn.commit()
             
+            invalidate_bom_graph()
             logger.info(f"Alternative updated: {alternative_id}")
         
         except Exception as e:
@@ -872,6 +892,7 @@ class BOMManager:
                 })
                 conn.commit()
             
+            invalidate_bom_graph()
             logger.info(f"BOM deleted: {bom_id}")
         
         except Exception as e:
@@ -901,6 +922,7 @@ class BOMManager:
             conn.execute(mat_query, {'detail_id': detail_id})
             
             trans.commit()
+            invalidate_bom_graph()
             logger.info(f"Material deleted: {detail_id}")
         
         except Exception as e:
@@ -924,6 +946,7 @@ class BOMManager:
                 conn.execute(query, {'alternative_id': alternative_id})
                 conn.commit()
             
+            invalidate_bom_graph()
             logger.info(f"Alternative deleted: {alternative_id}")
         
         except Exception as e:
@@ -1042,53 +1065,32 @@ class BOMManager:
             
             new_bom_id = result.lastrowid
             
-            # Clone materials
-            for material in materials:
-                material_id = convert_to_native(material['material_id'])
-                
-                detail_query = text("""
-                    INSERT INTO bom_details (
-                        bom_header_id, material_id, material_type,
-                        quantity, uom, scrap_rate
-                    ) VALUES (
-                        :bom_header_id, :material_id, :material_type,
-                        :quantity, :uom, :scrap_rate
-                    )
-                """)
-                
-                detail_result = conn.execute(detail_query, {
-                    'bom_header_id': new_bom_id,
-                    'material_id': material_id,
-                    'material_type': str(material['material_type']),
-                    'quantity': float(material['quantity']),
-                    'uom': str(material['uom']),
-                    'scrap_rate': float(material.get('scrap_rate', 0))
-                })
-                
-                new_detail_id = detail_result.lastrowid
-                
-                # Clone alternatives
-                alternatives = material.get('alternatives', [])
-                for alt in alternatives:
+            # Clone materials (one multi-row INSERT)
+            detail_rows = [{
+                'bom_header_id': new_bom_id,
+                'material_id': convert_to_native(material['material_id']),
+                'material_type': str(material['material_type']),
+                'quantity': float(material['quantity']),
+                'uom': str(material['uom']),
+                'scrap_rate': float(material.get('scrap_rate', 0))
+            } for material in materials]
+            bulk_insert(conn, 'bom_details', detail_rows)
+            
+            # New header → its detail ids in ascending order follow insert order
+            new_detail_ids = [row[0] for row in conn.execute(text("""
+                SELECT id FROM bom_details WHERE bom_header_id = :bom_id ORDER BY id
+            """), {'bom_id': new_bom_id})]
+            
+            # Clone alternatives (one multi-row INSERT)
+            alt_rows = []
+            for material, new_detail_id in zip(materials, new_detail_ids):
+                for alt in material.get('alternatives', []):
                     # Support both 'material_id' and 'alternative_material_id' keys
                     alt_mat_id = alt.get('alternative_material_id') or alt.get('material_id')
-                    alt_material_id = convert_to_native(alt_mat_id)
-                    
-                    alt_query = text("""
-                        INSERT INTO bom_material_alternatives (
-                            bom_detail_id, alternative_material_id,
-                            material_type, quantity, uom, scrap_rate,
-                            priority, is_active, notes, created_date
-                        ) VALUES (
-                            :bom_detail_id, :alternative_material_id,
-                            :material_type, :quantity, :uom, :scrap_rate,
-                            :priority, :is_active, :notes, NOW()
-                        )
-                    """)
                     
-                    conn.execute(alt_query, {
+                    alt_rows.append({
                         'bom_detail_id': new_detail_id,
-                        'alternative_material_id': alt_material_id,
+                        'alternative_material_id': convert_to_native(alt_mat_id),
                         'material_type': str(alt.get('material_type', material['material_type'])),
                         'quantity': float(alt['quantity']),
                         'uom': str(alt['uom']),
@@ -1097,8 +1099,11 @@ class BOMManager:
                         'is_active': convert_to_native(alt.get('is_active', 1)),
                         'notes': str(alt.get('notes', '') or '')
                     })
+            bulk_insert(conn, 'bom_material_alternatives', alt_rows,
+                        sql_values={'created_date': 'NOW()'})
             
             trans.commit()
+            invalidate_bom_graph()
             logger.info(f"BOM cloned: {source_bom_id} -> {new_bom_id} ({bom_code})")
             return bom_code
         
@@ -1187,4 +1192,134 @@ class BOMManager:
             return pd.read_sql(query, self.engine, params=(product_id, product_id))
         except Exception as e:
             logger.error(f"Error getting where used: {e}")
-            raise BOMException(f"Failed to get where used: {str(e)}")
\ No newline at end of file
+            raise BOMException(f"Failed to get where used: {str(e)}")
+    
+    def get_bom_graph(self):
+        """
+        Compile all ACTIVE BOMs (primary lines + alternatives) into a BOMGraph.
+        
+        The compiled graph is cached (shared across BOMManager instances) and
+        reused while the BOM snapshot marker is unchanged; the write paths of
+        this class invalidate it.
+        
+        Returns:
+            BOMGraph (utils.supply_chain_gap.bom_graph)
+        """
+        from utils.supply_chain_gap.bom_graph import BOMGraph
+        
+        try:
+            marker = self._bom_snapshot_marker()
+        except Exception as e:
+            logger.error(f"Error reading BOM snapshot marker: {e}")
+            raise BOMException(f"Failed to build BOM graph: {str(e)}")
+        
+        with _bom_graph_lock:
+            if _bom_graph_cache['graph'] is not None and _bom_graph_cache['marker'] == marker:
+                return _bom_graph_cache['graph']
+            generation = _bom_graph_cache['generation']
+        
+        query = """
+            SELECT 
+                h.product_id as output_product_id,
+                h.output_qty as bom_output_quantity,
+                d.material_id,
+                d.quantity as quantity_per_output,
+                d.scrap_rate,
+                1 as is_primary
+            FROM bom_details d
+            JOIN bom_headers h ON d.bom_header_id = h.id
+            WHERE h.delete_flag = 0
+            AND h.status = 'ACTIVE'
+            
+            UNION ALL
+            
+            SELECT 
+                h.product_id as output_product_id,
+                h.output_qty as bom_output_quantity,
+                a.alternative_material_id as material_id,
+                a.quantity as quantity_per_output,
+                a.scrap_rate,
+                0 as is_primary
+            FROM bom_material_alternatives a
+            JOIN bom_details d ON a.bom_detail_id = d.id
+            JOIN bom_headers h ON d.bom_header_id = h.id
+            WHERE h.delete_flag = 0
+            AND h.status = 'ACTIVE'
+        """
+        
+        try:
+            graph = BOMGraph(pd.read_sql(query, self.engine))
+        except Exception as e:
+            logger.error(f"Error building BOM graph: {e}")
+            raise BOMException(f"Failed to build BOM graph: {str(e)}")
+        
+        with _bom_graph_lock:
+            if _bom_graph_cache['generation'] == generation:
+                _bom_graph_cache['marker'] = marker
+                _bom_graph_cache['graph'] = graph
+        return graph
+    
+    def _bom_snapshot_marker(self) -> tuple:
+        """
+        Cheap fingerprint of the BOM tables: ACTIVE header count, last header
+        change, and row count + MAX(id) of lines and alternatives. Catches
+        status changes and added/removed lines made by other processes; line
+        edits made through this class invalidate the cache directly.
+        """
+        query = text("""
+            SELECT
+                (SELECT COUNT(*) FROM bom_headers
+                 WHERE delete_flag = 0 AND status = 'ACTIVE') AS active_boms,
+                (SELECT MAX(id) FROM bom_headers) AS max_header_id,
+                (SELECT MAX(updated_date) FROM bom_headers) AS header_updated,
+                (SELECT COUNT(*) FROM bom_details) AS detail_count,
+                (SELECT MAX(id) FROM bom_details) AS max_detail_id,
+                (SELECT COUNT(*) FROM bom_material_alternatives) AS alternative_count,
+                (SELECT MAX(id) FROM bom_material_alternatives) AS max_alternative_id
+        """)
+        with self.engine.connect() as conn:
+            return tuple(conn.execute(query).fetchone())
+    
+    def get_multilevel_where_used(self, product_id: int, bom_graph=None) -> pd.DataFrame:
+        """
+        Find every product that uses a material directly or through
+        semi-finished BOMs (ACTIVE BOMs only).
+        
+        Args:
+            product_id: Product ID to search for
+            bom_graph: Optional precompiled BOMGraph (see get_bom_graph)
+            
+        Returns:
+            DataFrame with columns:
+            - product_id, depth (1 = direct), qty_per_unit, is_top_level
+            - product_code, product_name, legacy_code, package_size, brand
+        """
+        product_id = convert_to_native(product_id)
+        graph = bom_graph if bom_graph is not None else self.get_bom_graph()
+        
+        usage = graph.where_used(product_id)
+        if usage.empty:
+            return usage
+        
+        ids = [convert_to_native(i) for i in usage['product_id'].tolist()]
+        placeholders = ', '.join(['%s'] * len(ids))
+        query = f"""
+            SELECT 
+                p.id as product_id,
+                p.pt_code as product_code,
+                p.name as product_name,
+                p.legacy_pt_code as legacy_code,
+                p.package_size,
+                b.brand_name as brand
+            FROM products p
+            LEFT JOIN brands b ON p.brand_id = b.id
+            WHERE p.id IN ({placeholders})
+        """
+        
+        try:
+            products = pd.read_sql(query, self.engine, params=tuple(ids))
+        except Exception as e:
+            logger.error(f"Error getting multi-level where used: {e}")
+            raise BOMException(f"Failed to get multi-level where used: {str(e)}")
+        
+        return usage.merge(products, on='product_id', how='left')
\ No newline at end of file
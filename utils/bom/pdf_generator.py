@@ -36,10 +36,8 @@ from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import mm
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
 from reportlab.platypus import (
-    SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image
+    SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
 )
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
 
 # Import database and S3 utilities
 try:
@@ -56,6 +54,11 @@ except ImportError:
         def get_company_logo_from_s3_enhanced(company_id, logo_path):
             return None
 
+try:
+    from utils.pdf_assets import get_pdf_assets
+except ImportError:
+    from ..pdf_assets import get_pdf_assets
+
 logger = logging.getLogger(__name__)
 
 
@@ -170,7 +173,6 @@ class BOMPDFGenerator:
     
     def __init__(self):
         self.engine = get_db_engine()
-        self._registered_fonts = set()
         self.font_available = self._setup_fonts()
     
     def _get_project_root(self) -> Path:
@@ -181,49 +183,8 @@ class BOMPDFGenerator:
         return project_root
     
     def _setup_fonts(self) -> bool:
-        """Setup DejaVu fonts for Vietnamese text support"""
-        try:
-            project_root = self._get_project_root()
-            fonts_dir = project_root / 'fonts'
-            
-            if not fonts_dir.exists():
-                logger.warning(f"Fonts directory not found: {fonts_dir}")
-                return False
-            
-            dejavu_regular = fonts_dir / 'DejaVuSans.ttf'
-            dejavu_bold = fonts_dir / 'DejaVuSans-Bold.ttf'
-            
-            if not dejavu_regular.exists():
-                logger.warning(f"DejaVuSans.ttf not found in {fonts_dir}")
-                return False
-            
-            # Register regular font
-            try:
-                if 'DejaVuSans' not in self._registered_fonts:
-                    pdfmetrics.registerFont(TTFont('DejaVuSans', str(dejavu_regular)))
-                    self._registered_fonts.add('DejaVuSans')
-                    logger.info("DejaVuSans font registered")
-            except Exception as e:
-                if 'already registered' not in str(e).lower():
-                    raise
-                self._registered_fonts.add('DejaVuSans')
-            
-            # Register bold font
-            try:
-                if dejavu_bold.exists() and 'DejaVuSans-Bold' not in self._registered_fonts:
-                    pdfmetrics.registerFont(TTFont('DejaVuSans-Bold', str(dejavu_bold)))
-                    self._registered_fonts.add('DejaVuSans-Bold')
-                    logger.info("DejaVuSans-Bold font registered")
-            except Exception as e:
-                if 'already registered' not in str(e).lower():
-                    raise
-                self._registered_fonts.add('DejaVuSans-Bold')
-            
-            return True
-            
-        except Exception as e:
-            logger.error(f"Font setup error: {e}")
-            return False
+        """Setup DejaVu fonts for Vietnamese text support (registered once per process)"""
+        return get_pdf_assets().register_fonts(self._get_project_root() / 'fonts')
     
     def get_company_info(self, company_id: Optional[int] = None, 
                          company_info: Optional[Dict] = None) -> Dict[str, Any]:
@@ -273,7 +234,13 @@ class BOMPDFGenerator:
         }
     
     def _fetch_company_by_id(self, company_id: int) -> Optional[Dict[str, Any]]:
-        """Fetch company by ID"""
+        """Fetch company by ID (cached across documents)"""
+        return get_pdf_assets().get_company(
+            ('company', company_id), lambda: self._load_company_by_id(company_id)
+        )
+    
+    def _load_company_by_id(self, company_id: int) -> Optional[Dict[str, Any]]:
+        """Query a company row by ID (None if missing or failed)"""
         query = """
             SELECT 
                 c.id, c.english_name, c.local_name,
@@ -292,6 +259,10 @@ class BOMPDFGenerator:
         return None
     
     def get_custom_styles(self) -> Dict[str, Any]:
+        """Custom paragraph styles (built once per font setup, shared read-only)"""
+        return get_pdf_assets().get_styles(('bom', self.font_available), self._build_custom_styles)
+    
+    def _build_custom_styles(self) -> Dict[str, Any]:
         """Create custom paragraph styles"""
         styles = getSampleStyleSheet()
         base_font = 'DejaVuSans' if self.font_available else 'Helvetica'
@@ -388,13 +359,11 @@ class BOMPDFGenerator:
         logo_img = None
         if S3_AVAILABLE:
             try:
-                logo_bytes = get_company_logo_from_s3_enhanced(
+                logo = get_pdf_assets().get_logo(
                     resolved_company['id'], resolved_company.get('logo_path')
                 )
-                if logo_bytes:
-                    logo_buffer = BytesIO(logo_bytes)
-                    logo_img = Image(logo_buffer, width=35*mm, height=18*mm, kind='proportional')
-                    logger.info("Logo loaded from S3")
+                if logo:
+                    logo_img = logo.flowable(width=35*mm, height=18*mm)
             except Exception as e:
                 logger.warning(f"Could not load logo: {e}")
         
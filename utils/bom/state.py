@@ -433,6 +433,14 @@ class StateManager:
         """Set where used search results"""
         self.update_dialog_state(self.DIALOG_WHERE_USED, {'results': results})
     
+    def get_where_used_indirect(self) -> Optional[Any]:
+        """Get multi-level (indirect) where used results"""
+        return self.get_dialog_state(self.DIALOG_WHERE_USED).get('indirect_results')
+    
+    def set_where_used_indirect(self, results: Any):
+        """Set multi-level (indirect) where used results"""
+        self.update_dialog_state(self.DIALOG_WHERE_USED, {'indirect_results': results})
+    
     # ==================== Export Dialog State ====================
     
     def get_export_format(self) -> Optional[str]:
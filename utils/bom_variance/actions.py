@@ -17,7 +17,7 @@ from dataclasses import dataclass, field
 from sqlalchemy import text
 from sqlalchemy.exc import SQLAlchemyError
 
-from utils.db import get_db_engine
+from utils.db import get_db_engine, bulk_insert
 from .config import ApplyMode
 
 logger = logging.getLogger(__name__)
@@ -356,6 +356,7 @@ def clone_bom_with_adjustments(
             
             detail_id_map = {}  # old_detail_id -> new_detail_id
             changes_applied = []
+            detail_rows = []
             
             for detail in details:
                 old_detail_id = detail[0]
@@ -387,16 +388,7 @@ def clone_bom_with_adjustments(
                     new_qty = original_qty
                     new_scrap = original_scrap
                 
-                # Insert new detail
-                insert_detail_query = """
-                    INSERT INTO bom_details (
-                        bom_header_id, material_id, material_type, quantity, uom, scrap_rate, notes
-                    ) VALUES (
-                        :bom_header_id, :material_id, :material_type, :quantity, :uom, :scrap_rate, :notes
-                    )
-                """
-                
-                conn.execute(text(insert_detail_query), {
+                detail_rows.append({
                     'bom_header_id': new_bom_id,
                     'material_id': material_id,
                     'material_type': material_type,
@@ -405,9 +397,15 @@ def clone_bom_with_adjustments(
                     'scrap_rate': new_scrap,
                     'notes': detail_notes
                 })
-                
-                new_detail_id = conn.execute(text("SELECT LAST_INSERT_ID()")).fetchone()[0]
-                detail_id_map[old_detail_id] = new_detail_id
+            
+            # Insert new details (one multi-row INSERT); the new header's
+            # detail ids in ascending order follow insert order
+            bulk_insert(conn, 'bom_details', detail_rows)
+            new_detail_ids = [row[0] for row in conn.execute(text("""
+                SELECT id FROM bom_details WHERE bom_header_id = :bom_id ORDER BY id
+            """), {'bom_id': new_bom_id})]
+            for detail, new_detail_id in zip(details, new_detail_ids):
+                detail_id_map[detail[0]] = new_detail_id
             
             # Step 3: Clone bom_material_alternatives with adjustments
             get_alternatives_query = """
@@ -422,6 +420,7 @@ def clone_bom_with_adjustments(
             
             alternatives = conn.execute(text(get_alternatives_query), {'source_bom_id': source_bom_id}).fetchall()
             
+            alt_rows = []
             for alt in alternatives:
                 old_detail_id = alt[1]
                 new_detail_id = detail_id_map.get(old_detail_id)
@@ -459,18 +458,7 @@ def clone_bom_with_adjustments(
                     new_qty = original_qty
                     new_scrap = original_scrap
                 
-                # Insert new alternative
-                insert_alt_query = """
-                    INSERT INTO bom_material_alternatives (
-                        bom_detail_id, alternative_material_id, material_type,
-                        quantity, uom, scrap_rate, priority, is_active, notes
-                    ) VALUES (
-                        :bom_detail_id, :alternative_material_id, :material_type,
-                        :quantity, :uom, :scrap_rate, :priority, :is_active, :notes
-                    )
-                """
-                
-                conn.execute(text(insert_alt_query), {
+                alt_rows.append({
                     'bom_detail_id': new_detail_id,
                     'alternative_material_id': alt_material_id,
                     'material_type': material_type,
@@ -482,6 +470,9 @@ def clone_bom_with_adjustments(
                     'notes': alt_notes
                 })
             
+            # Insert new alternatives (one multi-row INSERT)
+            bulk_insert(conn, 'bom_material_alternatives', alt_rows)
+            
             # Step 4: Log audit trail
             log_variance_adjustment(
                 conn=conn,
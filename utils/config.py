@@ -317,6 +317,7 @@ class Config:
             # Database pool
             "DB_POOL_SIZE": int(os.getenv("DB_POOL_SIZE", "5")),
             "DB_POOL_RECYCLE": int(os.getenv("DB_POOL_RECYCLE", "3600")),
+            "DB_BULK_CHUNK_SIZE": int(os.getenv("DB_BULK_CHUNK_SIZE", "500")),
             
             # Cache
             "CACHE_TTL_SECONDS": int(os.getenv("CACHE_TTL_SECONDS", "300")),
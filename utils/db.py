@@ -10,6 +10,7 @@ Features:
 - Query execution helpers (V1)
 - Context managers for transactions (V1)
 - Pool status with invalidatedcount (V2)
+- Bulk write helpers: multi-row INSERT, keyed CASE UPDATE, chunked executemany
 
 Compatibility:
 - V1: context managers, query helpers (execute_query, execute_update, etc.)
@@ -267,29 +268,172 @@ def execute_update(query: str, params: Dict = None) -> int:
         return result.rowcount
 
 
-def execute_many(query: str, params_list: List[Dict]) -> int:
+def execute_many(query: str, params_list: List[Dict], conn=None,
+                 chunk_size: Optional[int] = None) -> int:
     """
-    Execute query with multiple parameter sets
+    Execute query with multiple parameter sets (driver executemany)
+    
+    pymysql rewrites INSERT ... VALUES executemany into multi-row INSERTs,
+    so each chunk is one round trip.
     
     Args:
         query: SQL query string
         params_list: List of parameter dictionaries
+        conn: Existing connection/transaction (own transaction if None)
+        chunk_size: Parameter sets per call (default DB_BULK_CHUNK_SIZE)
         
     Returns:
         Total number of affected rows
     """
-    engine = get_db_engine()
-    total_rows = 0
+    if not params_list:
+        return 0
     
-    with engine.connect() as conn:
-        for params in params_list:
-            result = conn.execute(text(query), params)
-            total_rows += result.rowcount
-        conn.commit()
+    if conn is None:
+        with get_db_engine().begin() as own_conn:
+            return execute_many(query, params_list, conn=own_conn, chunk_size=chunk_size)
+    
+    stmt = text(query)
+    total_rows = 0
+    for chunk in _chunked(params_list, chunk_size):
+        result = conn.execute(stmt, chunk)
+        total_rows += max(result.rowcount or 0, 0)
     
     return total_rows
 
 
+# ==================== BULK WRITE HELPERS ====================
+
+def get_bulk_chunk_size() -> int:
+    """Rows per bulk statement (APP_CONFIG DB_BULK_CHUNK_SIZE)"""
+    app_config = config.app_config if hasattr(config, 'app_config') else APP_CONFIG
+    return max(1, int(app_config.get("DB_BULK_CHUNK_SIZE", 500)))
+
+
+def _chunked(rows: List, chunk_size: Optional[int] = None):
+    size = chunk_size or get_bulk_chunk_size()
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+def bulk_insert(conn, table: str, rows: List[Dict[str, Any]],
+                columns: Optional[List[str]] = None,
+                sql_values: Optional[Dict[str, str]] = None,
+                chunk_size: Optional[int] = None) -> int:
+    """
+    Multi-row INSERT: one statement per chunk of rows
+    
+    Usage:
+        bulk_insert(conn, 'bom_details', rows,
+                    sql_values={'created_date': 'NOW()'})
+    
+    Args:
+        conn: Connection inside the caller's transaction
+        table: Target table
+        rows: Row dicts (bound as parameters)
+        columns: Columns to insert (default: keys of the first row)
+        sql_values: Column → SQL expression used for every row (e.g. NOW())
+        chunk_size: Rows per statement (default DB_BULK_CHUNK_SIZE)
+        
+    Returns:
+        Number of inserted rows
+        
+    Note:
+        Generated ids follow row order; callers that need them read them back
+        (e.g. WHERE parent_id = :new_parent ORDER BY id).
+    """
+    if not rows:
+        return 0
+    
+    columns = list(columns or rows[0].keys())
+    sql_values = sql_values or {}
+    all_columns = columns + [c for c in sql_values if c not in columns]
+    column_sql = ', '.join(f'`{c}`' for c in all_columns)
+    
+    inserted = 0
+    for chunk in _chunked(rows, chunk_size):
+        params = {}
+        value_rows = []
+        for i, row in enumerate(chunk):
+            placeholders = []
+            for j, col in enumerate(columns):
+                params[f'p{i}_{j}'] = row.get(col)
+                placeholders.append(f':p{i}_{j}')
+            placeholders.extend(sql_values[c] for c in all_columns[len(columns):])
+            value_rows.append(f"({', '.join(placeholders)})")
+        
+        conn.execute(
+            text(f"INSERT INTO {table} ({column_sql}) VALUES {', '.join(value_rows)}"),
+            params
+        )
+        inserted += len(chunk)
+    
+    return inserted
+
+
+def bulk_update(conn, table: str, key_column: str, rows: List[Dict[str, Any]],
+                set_columns: List[str],
+                where: Optional[str] = None, where_params: Optional[Dict] = None,
+                chunk_size: Optional[int] = None) -> int:
+    """
+    Keyed multi-row UPDATE: one statement per chunk
+    
+        UPDATE table
+        SET col = CASE key WHEN :k0 THEN :v0 ... ELSE col END, ...
+        WHERE key IN (...) [AND where]
+    
+    Args:
+        conn: Connection inside the caller's transaction
+        table: Target table
+        key_column: Column identifying the row (rows[i][key_column])
+        rows: Row dicts with key_column + set_columns; the last row wins on
+            duplicate keys (same as applying single UPDATEs in order)
+        set_columns: Columns to update
+        where: Extra condition (e.g. 'manufacturing_order_id = :order_id')
+        where_params: Parameters for where
+        chunk_size: Rows per statement (default DB_BULK_CHUNK_SIZE)
+        
+    Returns:
+        Number of affected rows
+    """
+    if not rows:
+        return 0
+    
+    latest: Dict[Any, Dict[str, Any]] = {}
+    for row in rows:
+        latest[row[key_column]] = row
+    unique_rows = list(latest.values())
+    
+    affected = 0
+    for chunk in _chunked(unique_rows, chunk_size):
+        params = dict(where_params or {})
+        key_sql = []
+        for i, row in enumerate(chunk):
+            params[f'k{i}'] = row[key_column]
+            key_sql.append(f':k{i}')
+        
+        assignments = []
+        for j, col in enumerate(set_columns):
+            whens = []
+            for i, row in enumerate(chunk):
+                params[f'v{i}_{j}'] = row.get(col)
+                whens.append(f"WHEN :k{i} THEN :v{i}_{j}")
+            assignments.append(
+                f"`{col}` = CASE `{key_column}` {' '.join(whens)} ELSE `{col}` END"
+            )
+        
+        query = (
+            f"UPDATE {table} SET {', '.join(assignments)} "
+            f"WHERE `{key_column}` IN ({', '.join(key_sql)})"
+        )
+        if where:
+            query += f" AND ({where})"
+        
+        result = conn.execute(text(query), params)
+        affected += max(result.rowcount or 0, 0)
+    
+    return affected
+
+
 # ==================== EXPORTS ====================
 
 __all__ = [
@@ -303,4 +447,7 @@ __all__ = [
     'execute_query_df',
     'execute_update',
     'execute_many',
+    'get_bulk_chunk_size',
+    'bulk_insert',
+    'bulk_update',
 ]
\ No newline at end of file
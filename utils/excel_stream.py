@@ -0,0 +1,360 @@
+# utils/excel_stream.py
+"""
+Streaming Excel Writer
+
+Version: 1.1.0
+Features:
+- xlsxwriter workbook in constant_memory mode: each row is flushed to a temp
+  file as soon as the next row starts, so memory stays flat regardless of
+  sheet size (pd.ExcelWriter + openpyxl keeps every cell object alive)
+- Rows are written straight from DataFrames in chunks (no per-sheet copy of
+  the whole frame as Python objects)
+- Formatting is declared up front and applied while writing: header style,
+  column widths, number / currency / date formats, freeze panes, auto-filter
+  and per-row fills (urgency / readiness colors)
+- Output to a BytesIO or spilled to a temp file (ExcelArtifact) so callers
+  can keep a path in session state instead of the workbook bytes
+
+v1.1.0:
+- Dates outside date_cols keep the row style / fill (merged with the date
+  number format) instead of showing as serial numbers in styled mode
+- to_tempfile sweeps stale export temp files (at most once per
+  CLEANUP_INTERVAL_SECONDS per process)
+
+Because constant_memory writes strictly row by row, everything that styles a
+row (fills, formats) must be known when the row is written — hence row_fills
+is a per-row Series, not a post-processing step.
+
+Used by the Supply Chain GAP, PO Planning and Production Planning exports.
+
+Usage:
+    with ExcelStreamWriter(BytesIO()) as writer:
+        writer.write_sheet(df, 'Summary', number_cols=['Qty'])
+    buffer = writer.target
+
+    artifact = ExcelStreamWriter.to_tempfile(lambda w: w.write_sheet(df, 'Data'))
+    data = artifact.read_bytes()
+"""
+
+import logging
+import math
+import os
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from datetime import date, datetime
+from io import BytesIO
+from typing import Any, Callable, Dict, Iterable, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+HEADER_FILL_HEX = '2E75B6'
+HEADER_FONT_COLOR = 'FFFFFF'
+BORDER_COLOR = 'D9D9D9'
+DEFAULT_CHUNK_ROWS = 5000
+ARTIFACT_PREFIX = 'xlsx_export_'
+ARTIFACT_MAX_AGE_SECONDS = 24 * 3600
+CLEANUP_INTERVAL_SECONDS = 3600
+
+_cleanup_lock = threading.Lock()
+_last_cleanup = 0.0
+
+
+@dataclass
+class ExcelArtifact:
+    """An export spilled to a temp file — keep this (not the bytes) in session state"""
+    path: str
+    size: int = 0
+    created_at: Optional[datetime] = None
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    def read_bytes(self) -> bytes:
+        with open(self.path, 'rb') as f:
+            return f.read()
+
+    def open(self):
+        return open(self.path, 'rb')
+
+    def cleanup(self):
+        """Delete the temp file (safe to call twice)"""
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"Could not remove export file {self.path}: {e}")
+
+
+class ExcelStreamWriter:
+    """
+    Multi-sheet xlsx writer on xlsxwriter.
+
+    Args:
+        target: file path or binary buffer (BytesIO)
+        constant_memory: stream rows (True) or keep the workbook in memory
+        styled: blue header band + cell borders (False = plain bold header,
+            like pandas' default to_excel output)
+        chunk_rows: rows converted from the DataFrame per step
+        default_widths: column name → width used when write_sheet gets none
+        default_width: fallback width; None = max(len(header) + 2, 12)
+    """
+
+    def __init__(
+        self,
+        target: Union[str, BytesIO],
+        constant_memory: bool = True,
+        styled: bool = True,
+        chunk_rows: int = DEFAULT_CHUNK_ROWS,
+        default_widths: Optional[Dict[str, float]] = None,
+        default_width: Optional[float] = None
+    ):
+        import xlsxwriter
+
+        self.target = target
+        self.styled = styled
+        self.chunk_rows = max(int(chunk_rows), 1)
+        self.default_widths = dict(default_widths or {})
+        self.default_width = default_width
+        self.sheet_names = []
+        self._formats: Dict[Any, Any] = {}
+
+        self.workbook = xlsxwriter.Workbook(target, {
+            'constant_memory': constant_memory,
+            'nan_inf_to_errors': True,
+            'default_date_format': 'yyyy-mm-dd',
+            'tmpdir': tempfile.gettempdir(),
+        })
+
+    # =========================================================================
+    # CONTEXT / FACTORIES
+    # =========================================================================
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def close(self):
+        self.workbook.close()
+        if isinstance(self.target, BytesIO):
+            self.target.seek(0)
+
+    @classmethod
+    def to_buffer(cls, write: Callable[['ExcelStreamWriter'], None], **kwargs) -> BytesIO:
+        """Run write(writer) into a new BytesIO (rewound)"""
+        buffer = BytesIO()
+        with cls(buffer, **kwargs) as writer:
+            write(writer)
+        return buffer
+
+    @classmethod
+    def to_tempfile(cls, write: Callable[['ExcelStreamWriter'], None], **kwargs) -> ExcelArtifact:
+        """Run write(writer) into a temp .xlsx file; removed again if writing fails"""
+        _cleanup_stale_artifacts_throttled()
+        fd, path = tempfile.mkstemp(prefix=ARTIFACT_PREFIX, suffix='.xlsx')
+        os.close(fd)
+        try:
+            with cls(path, **kwargs) as writer:
+                write(writer)
+        except Exception:
+            ExcelArtifact(path).cleanup()
+            raise
+        return ExcelArtifact(path=path, size=os.path.getsize(path), created_at=datetime.now())
+
+    # =========================================================================
+    # SHEETS
+    # =========================================================================
+
+    def write_sheet(
+        self,
+        df: pd.DataFrame,
+        sheet_name: str,
+        currency_cols: Optional[Iterable[str]] = None,
+        number_cols: Optional[Iterable[str]] = None,
+        date_cols: Optional[Iterable[str]] = None,
+        col_widths: Optional[Dict[str, float]] = None,
+        row_fills: Optional[pd.Series] = None
+    ):
+        """
+        Write one DataFrame as a sheet (header row + data rows, no index).
+
+        Args:
+            currency_cols / number_cols / date_cols: column names to format
+                as $#,##0.00 / #,##0 / yyyy-mm-dd
+            col_widths: per-column width overrides
+            row_fills: hex fill color per row (aligned by position; None/NaN = no fill)
+        """
+        ws = self.workbook.add_worksheet(sheet_name)
+        self.sheet_names.append(sheet_name)
+        columns = [str(c) for c in df.columns]
+        nrows, ncols = len(df), len(columns)
+
+        # Column widths
+        widths = dict(self.default_widths)
+        widths.update(col_widths or {})
+        for ci, name in enumerate(columns):
+            if name in widths:
+                width = widths[name]
+            elif self.default_width is not None:
+                width = self.default_width
+            else:
+                width = max(len(name) + 2, 12)
+            ws.set_column(ci, ci, width)
+
+        # Header
+        header_fmt = self._format('header')
+        for ci, name in enumerate(columns):
+            ws.write_string(0, ci, name, header_fmt)
+        if self.styled:
+            ws.freeze_panes(1, 0)
+            if nrows > 0 and ncols > 0:
+                ws.autofilter(0, 0, nrows, ncols - 1)
+
+        # Per-column number format kind
+        kinds = []
+        curr, num, dates = set(currency_cols or []), set(number_cols or []), set(date_cols or [])
+        for name in columns:
+            kinds.append('currency' if name in curr else 'number' if name in num
+                         else 'date' if name in dates else None)
+
+        fills = None
+        if row_fills is not None:
+            fills = pd.Series(row_fills).reset_index(drop=True).where(lambda s: s.notna(), None).tolist()
+
+        for start in range(0, nrows, self.chunk_rows):
+            chunk = df.iloc[start:start + self.chunk_rows]
+            col_values = [_column_values(chunk.iloc[:, ci]) for ci in range(ncols)]
+            for offset in range(len(chunk)):
+                row = start + offset
+                fill = fills[row] if fills is not None and row < len(fills) else None
+                for ci in range(ncols):
+                    self._write_cell(ws, row + 1, ci, col_values[ci][offset], kinds[ci], fill)
+        return ws
+
+    def _write_cell(self, ws, row: int, col: int, value, kind: Optional[str], fill: Optional[str]):
+        if isinstance(value, (datetime, date)):
+            # A date needs a date num_format whatever the column kind — the
+            # 'date' format carries the same style / fill as the rest of the row
+            ws.write_datetime(row, col, value, self._format('date', fill))
+            return
+        fmt = self._format(kind, fill)
+        if value is None:
+            ws.write_blank(row, col, None, fmt)
+        elif isinstance(value, bool):
+            ws.write_boolean(row, col, value, fmt)
+        elif isinstance(value, (int, float)):
+            ws.write_number(row, col, value, fmt)
+        else:
+            ws.write_string(row, col, value if isinstance(value, str) else str(value), fmt)
+
+    # =========================================================================
+    # FORMATS (cached — xlsxwriter formats are workbook objects)
+    # =========================================================================
+
+    def _format(self, kind: Optional[str], fill: Optional[str] = None):
+        key = (kind, fill)
+        if key in self._formats:
+            return self._formats[key]
+
+        props: Dict[str, Any] = {}
+        if kind == 'header':
+            props = {'bold': True, 'border': 1}
+            if self.styled:
+                props.update({
+                    'font_name': 'Arial', 'font_size': 10,
+                    'font_color': '#' + HEADER_FONT_COLOR, 'bg_color': '#' + HEADER_FILL_HEX,
+                    'align': 'center', 'valign': 'vcenter', 'text_wrap': True,
+                    'border_color': '#' + BORDER_COLOR,
+                })
+        else:
+            if self.styled:
+                props.update({'font_name': 'Arial', 'font_size': 10, 'valign': 'vcenter',
+                              'border': 1, 'border_color': '#' + BORDER_COLOR})
+            if kind == 'currency':
+                props['num_format'] = '$#,##0.00'
+            elif kind == 'number':
+                props['num_format'] = '#,##0'
+            elif kind == 'date':
+                props['num_format'] = 'yyyy-mm-dd'
+            if fill:
+                props.update({'bg_color': '#' + fill, 'pattern': 1})
+
+        fmt = self.workbook.add_format(props) if props else None
+        self._formats[key] = fmt
+        return fmt
+
+
+def _column_values(series: pd.Series) -> list:
+    """One chunk of a column → Python values xlsxwriter can write (NaN/NaT → None)"""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        if getattr(series.dt, 'tz', None) is not None:
+            series = series.dt.tz_localize(None)
+        return [None if pd.isna(v) else v.to_pydatetime() for v in series]
+    if pd.api.types.is_bool_dtype(series):
+        return series.tolist()
+    if pd.api.types.is_numeric_dtype(series):
+        values = series.to_numpy(dtype=float, na_value=np.nan)
+        return [None if math.isnan(v) else v for v in values.tolist()]
+    out = []
+    for v in series.tolist():
+        if v is None or (isinstance(v, float) and math.isnan(v)) or v is pd.NaT:
+            out.append(None)
+        elif isinstance(v, pd.Timestamp):
+            out.append(v.to_pydatetime().replace(tzinfo=None))
+        elif isinstance(v, (np.integer, np.floating)):
+            out.append(v.item())
+        elif isinstance(v, np.bool_):
+            out.append(bool(v))
+        elif isinstance(v, pd.Timedelta) or v is pd.NA:
+            out.append(None if v is pd.NA else str(v))
+        else:
+            out.append(v)
+    return out
+
+
+def cleanup_stale_artifacts(max_age_seconds: float = ARTIFACT_MAX_AGE_SECONDS) -> int:
+    """Remove export temp files older than max_age_seconds (e.g. from dead sessions)"""
+    removed = 0
+    tmpdir = tempfile.gettempdir()
+    cutoff = datetime.now().timestamp() - max_age_seconds
+    try:
+        names = os.listdir(tmpdir)
+    except OSError:
+        return 0
+    for name in names:
+        if not (name.startswith(ARTIFACT_PREFIX) and name.endswith('.xlsx')):
+            continue
+        path = os.path.join(tmpdir, name)
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                removed += 1
+        except OSError:
+            continue
+    return removed
+
+
+def _cleanup_stale_artifacts_throttled():
+    """cleanup_stale_artifacts at most once per CLEANUP_INTERVAL_SECONDS per process"""
+    global _last_cleanup
+    now = time.monotonic()
+    if _last_cleanup and now - _last_cleanup < CLEANUP_INTERVAL_SECONDS:
+        return
+    with _cleanup_lock:
+        if _last_cleanup and now - _last_cleanup < CLEANUP_INTERVAL_SECONDS:
+            return
+        _last_cleanup = now
+    try:
+        removed = cleanup_stale_artifacts()
+        if removed:
+            logger.info(f"Removed {removed} stale Excel export temp file(s)")
+    except Exception as e:
+        logger.warning(f"Stale Excel export cleanup failed: {e}")
@@ -0,0 +1,218 @@
+# utils/inventory_quality/balance_snapshots.py
+"""
+Monthly closing-balance snapshots for the inventory period summary
+
+Opening balance = (closing balance of the last snapshotted month before the
+period) + (ledger movements from that month end to the period start).
+Without snapshots every report summed inventory_histories since the first
+row; with them a report only reads the current month's delta + the period.
+
+Table: inventory_balance_snapshots (created on first build)
+    snapshot_month  first day of month (UTC) — balance is as of the
+                    NEXT month's first instant (exclusive)
+    product_id, warehouse_id (0 = no warehouse), closing_qty
+Only non-zero balances are stored; a missing row means zero.
+
+Builder: build_balance_snapshots() processes only months after the last
+snapshot, up to the last COMPLETE month (UTC), one transaction per month:
+    closing(m) = closing(m - 1) + movements in m
+Ledger rows are append-only; if history inside a snapshotted month is
+corrected (e.g. soft-deleted), rebuild from that month:
+    build_balance_snapshots(rebuild_from=date(2025, 3, 1))
+
+The period summary calls ensure_balance_snapshots() before reading, so new
+complete months are built lazily on first use (checked at most once per
+ENSURE_INTERVAL_SECONDS per process, serialized across processes with
+GET_LOCK — a process that finds the lock taken reads what is there).
+
+Version: 1.1.0
+"""
+
+import logging
+import threading
+import time
+from datetime import date, datetime
+from typing import Any, Dict, Optional
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_TABLE = 'inventory_balance_snapshots'
+STOCK_IN_PATTERN = 'stockIn%'
+LOCK_NAME = 'inventory_balance_snapshots_build'
+ENSURE_INTERVAL_SECONDS = 3600
+
+_ensure_lock = threading.Lock()
+_last_ensure = 0.0
+
+_CREATE_TABLE = f"""
+    CREATE TABLE IF NOT EXISTS {SNAPSHOT_TABLE} (
+        snapshot_month DATE NOT NULL,
+        product_id BIGINT NOT NULL,
+        warehouse_id BIGINT NOT NULL DEFAULT 0,
+        closing_qty DECIMAL(24, 5) NOT NULL,
+        created_date DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (snapshot_month, product_id, warehouse_id),
+        KEY idx_ibs_product (product_id, snapshot_month)
+    )
+"""
+
+# closing(m) = closing(m - 1) + signed movements in [m, m + 1 month)
+_INSERT_MONTH = f"""
+    INSERT INTO {SNAPSHOT_TABLE} (snapshot_month, product_id, warehouse_id, closing_qty)
+    SELECT :month, x.product_id, x.warehouse_id, ROUND(SUM(x.qty), 5)
+    FROM (
+        SELECT s.product_id, s.warehouse_id, s.closing_qty AS qty
+        FROM {SNAPSHOT_TABLE} s
+        WHERE s.snapshot_month = :prev_month
+
+        UNION ALL
+
+        SELECT ih.product_id, COALESCE(ih.warehouse_id, 0) AS warehouse_id,
+               CASE WHEN ih.type LIKE :sin_pattern THEN ih.quantity
+                    ELSE -ih.quantity END AS qty
+        FROM inventory_histories ih
+        WHERE ih.delete_flag = 0
+          AND ih.created_date >= :month_start
+          AND ih.created_date < :month_end
+    ) x
+    GROUP BY x.product_id, x.warehouse_id
+    HAVING ABS(SUM(x.qty)) > 0.000001
+"""
+
+
+def month_start(value) -> date:
+    """First day of the month containing value"""
+    return date(value.year, value.month, 1)
+
+
+def add_months(month: date, n: int) -> date:
+    """Shift a first-of-month date by n months"""
+    index = month.year * 12 + month.month - 1 + n
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def get_latest_snapshot_month(conn, before_or_at: Optional[date] = None) -> Optional[date]:
+    """Latest snapshotted month (optionally capped). None if no snapshots/table."""
+    query = f"SELECT MAX(snapshot_month) FROM {SNAPSHOT_TABLE}"
+    params = {}
+    if before_or_at is not None:
+        query += " WHERE snapshot_month <= :cap"
+        params['cap'] = before_or_at
+    try:
+        value = conn.execute(text(query), params).scalar()
+    except Exception:
+        return None
+    if value is None:
+        return None
+    return month_start(value)
+
+
+def get_opening_snapshot_month(conn, from_utc) -> Optional[date]:
+    """Latest snapshot whose balance instant (month end) is <= from_utc"""
+    return get_latest_snapshot_month(conn, add_months(month_start(from_utc), -1))
+
+
+def build_balance_snapshots(
+    engine=None,
+    through: Optional[date] = None,
+    rebuild_from: Optional[date] = None,
+) -> Dict[str, Any]:
+    """
+    Snapshot every month not yet snapshotted, up to the last complete month.
+
+    Args:
+        through: Last month to snapshot (default: previous month, UTC)
+        rebuild_from: Delete snapshots from this month on and rebuild them
+
+    Returns:
+        {'months_built': [...], 'rows_inserted': int}
+    """
+    if engine is None:
+        from utils.db import get_db_engine
+        engine = get_db_engine()
+
+    last_complete = add_months(month_start(datetime.utcnow()), -1)
+    through = min(month_start(through), last_complete) if through else last_complete
+
+    with engine.begin() as conn:
+        conn.execute(text(_CREATE_TABLE))
+        if rebuild_from is not None:
+            conn.execute(
+                text(f"DELETE FROM {SNAPSHOT_TABLE} WHERE snapshot_month >= :m"),
+                {'m': month_start(rebuild_from)},
+            )
+
+    with engine.connect() as conn:
+        latest = get_latest_snapshot_month(conn)
+        if latest is not None:
+            first = add_months(latest, 1)
+        else:
+            first_ts = conn.execute(text(
+                "SELECT MIN(created_date) FROM inventory_histories WHERE delete_flag = 0"
+            )).scalar()
+            if first_ts is None:
+                return {'months_built': [], 'rows_inserted': 0}
+            first = month_start(first_ts)
+
+    months_built = []
+    rows_inserted = 0
+    month = first
+    while month <= through:
+        with engine.begin() as conn:
+            result = conn.execute(text(_INSERT_MONTH), {
+                'month': month,
+                'prev_month': add_months(month, -1),
+                'month_start': datetime(month.year, month.month, 1),
+                'month_end': datetime.combine(add_months(month, 1), datetime.min.time()),
+                'sin_pattern': STOCK_IN_PATTERN,
+            })
+            rows_inserted += max(result.rowcount or 0, 0)
+        months_built.append(month)
+        month = add_months(month, 1)
+
+    if months_built:
+        logger.info(
+            f"Inventory balance snapshots: built {len(months_built)} month(s) "
+            f"{months_built[0]:%Y-%m}..{months_built[-1]:%Y-%m}, {rows_inserted} rows"
+        )
+    return {'months_built': months_built, 'rows_inserted': rows_inserted}
+
+
+def ensure_balance_snapshots(engine=None) -> Dict[str, Any]:
+    """
+    Build missing complete months (throttled per process; never raises).
+
+    Returns build_balance_snapshots()'s result, or {'skipped': True} when
+    throttled, already up to date or another process holds the build lock.
+    """
+    global _last_ensure
+    skipped = {'skipped': True, 'months_built': [], 'rows_inserted': 0}
+    with _ensure_lock:
+        if _last_ensure and time.monotonic() - _last_ensure < ENSURE_INTERVAL_SECONDS:
+            return skipped
+        # Throttle failures too — the summary falls back to the ledger meanwhile
+        _last_ensure = time.monotonic()
+
+    try:
+        if engine is None:
+            from utils.db import get_db_engine
+            engine = get_db_engine()
+
+        last_complete = add_months(month_start(datetime.utcnow()), -1)
+        with engine.connect() as conn:
+            if get_latest_snapshot_month(conn) == last_complete:
+                return skipped
+
+        with engine.connect() as lock_conn:
+            got = lock_conn.execute(text("SELECT GET_LOCK(:name, 0)"), {'name': LOCK_NAME}).scalar()
+            if not got:
+                return skipped
+            try:
+                return build_balance_snapshots(engine)
+            finally:
+                lock_conn.execute(text("SELECT RELEASE_LOCK(:name)"), {'name': LOCK_NAME})
+    except Exception as e:
+        logger.warning(f"Inventory balance snapshot build failed: {e}")
+        return skipped
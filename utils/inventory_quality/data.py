@@ -488,7 +488,9 @@ class InventoryQualityData:
         Logic:
         - Stock In types: inventory_histories.type LIKE 'stockIn%'
         - Stock Out types: all other types
-        - Opening = sum(stock_in before period) - sum(stock_out before period)
+        - Opening = closing balance of the last monthly snapshot before the
+          period (inventory_balance_snapshots) + movements from that month
+          end to the period start; full ledger sum if no snapshot exists
         - Closing = Opening + Period Stock In - Period Stock Out
         
         Args:
@@ -502,53 +504,75 @@ class InventoryQualityData:
             opening_qty, stock_in_qty, stock_out_qty, closing_qty
         """
         try:
-            query = """
+            from .balance_snapshots import (
+                SNAPSHOT_TABLE, add_months, ensure_balance_snapshots,
+                get_opening_snapshot_month,
+            )
+            
+            ensure_balance_snapshots(_self.engine)
+            with _self.engine.connect() as conn:
+                snapshot_month = get_opening_snapshot_month(conn, from_date_utc)
+            
+            params = {
+                'sin_pattern': 'stockIn%',
+                'from_utc': from_date_utc,
+                'to_utc': to_date_utc,
+            }
+            
+            # Ledger rows: before the period (opening delta) + inside the period
+            ledger = """
+                    SELECT 
+                        ih.product_id,
+                        CASE WHEN ih.created_date < :from_utc THEN
+                            CASE WHEN ih.type LIKE :sin_pattern THEN ih.quantity ELSE -ih.quantity END
+                        ELSE 0 END AS opening_qty,
+                        CASE WHEN ih.type LIKE :sin_pattern AND ih.created_date >= :from_utc
+                            THEN ih.quantity ELSE 0 END AS stock_in_qty,
+                        CASE WHEN ih.type NOT LIKE :sin_pattern AND ih.created_date >= :from_utc
+                            THEN ih.quantity ELSE 0 END AS stock_out_qty
+                    FROM inventory_histories ih
+                    WHERE ih.delete_flag = 0
+                      AND ih.created_date < :to_utc
+            """
+            if warehouse_id:
+                ledger += " AND ih.warehouse_id = :warehouse_id"
+                params['warehouse_id'] = warehouse_id
+            
+            # Opening from snapshot → ledger only from the snapshot month end
+            if snapshot_month is not None:
+                ledger += " AND ih.created_date >= :snapshot_end"
+                params['snapshot_end'] = add_months(snapshot_month, 1)
+                params['snapshot_month'] = snapshot_month
+                opening = f"""
+                    SELECT s.product_id, s.closing_qty AS opening_qty,
+                           0 AS stock_in_qty, 0 AS stock_out_qty
+                    FROM {SNAPSHOT_TABLE} s
+                    WHERE s.snapshot_month = :snapshot_month
+                """
+                if warehouse_id:
+                    opening += " AND s.warehouse_id = :warehouse_id"
+                movements = f"{opening}\n                    UNION ALL\n{ledger}"
+            else:
+                movements = ledger
+            
+            query = f"""
                 SELECT 
-                    ih.product_id,
+                    x.product_id,
                     p.pt_code AS product_code,
                     p.legacy_pt_code AS legacy_code,
                     p.name AS product_name,
                     p.uom,
                     p.package_size,
                     b.brand_name AS brand,
-                    
-                    ROUND(
-                        COALESCE(SUM(CASE 
-                            WHEN ih.type LIKE :sin_pattern 
-                                 AND ih.created_date < :from_utc 
-                            THEN ih.quantity ELSE 0 END), 0)
-                        - COALESCE(SUM(CASE 
-                            WHEN ih.type NOT LIKE :sin_pattern 
-                                 AND ih.created_date < :from_utc 
-                            THEN ih.quantity ELSE 0 END), 0)
-                    , 5) AS opening_qty,
-                    
-                    ROUND(COALESCE(SUM(CASE 
-                        WHEN ih.type LIKE :sin_pattern
-                             AND ih.created_date >= :from_utc 
-                             AND ih.created_date < :to_utc
-                        THEN ih.quantity ELSE 0 END), 0), 5) AS stock_in_qty,
-                    
-                    ROUND(COALESCE(SUM(CASE 
-                        WHEN ih.type NOT LIKE :sin_pattern
-                             AND ih.created_date >= :from_utc 
-                             AND ih.created_date < :to_utc
-                        THEN ih.quantity ELSE 0 END), 0), 5) AS stock_out_qty
-                    
-                FROM inventory_histories ih
-                JOIN products p ON ih.product_id = p.id
+                    ROUND(COALESCE(SUM(x.opening_qty), 0), 5) AS opening_qty,
+                    ROUND(COALESCE(SUM(x.stock_in_qty), 0), 5) AS stock_in_qty,
+                    ROUND(COALESCE(SUM(x.stock_out_qty), 0), 5) AS stock_out_qty
+                FROM ({movements}
+                ) x
+                JOIN products p ON x.product_id = p.id
                 LEFT JOIN brands b ON p.brand_id = b.id
-                WHERE ih.delete_flag = 0
+                WHERE 1=1
             """
-            params = {
-                'sin_pattern': 'stockIn%',
-                'from_utc': from_date_utc,
-                'to_utc': to_date_utc,
-            }
-            
-            if warehouse_id:
-                query += " AND ih.warehouse_id = :warehouse_id"
-                params['warehouse_id'] = warehouse_id
             
             if product_search:
                 query += " AND (p.name LIKE :search OR p.pt_code LIKE :search OR p.legacy_pt_code LIKE :search OR p.package_size LIKE :search)"
@@ -560,7 +584,7 @@ class InventoryQualityData:
                 # Tối ưu hóa: Lọc product_id dựa trên nguồn gốc giao dịch (MO hoặc Stock In) 
                 # mà không quan tâm đến số lượng còn lại (remain)
                 query += f"""
-                    AND ih.product_id IN (
+                    AND x.product_id IN (
                         -- 1. Lấy sản phẩm từ Nhập kho sản xuất
                         SELECT DISTINCT pr.product_id 
                         FROM production_receipts pr
@@ -588,7 +612,7 @@ class InventoryQualityData:
                     params[f'eid_{i}'] = eid
 
             query += """
-                GROUP BY ih.product_id, p.pt_code, p.legacy_pt_code, p.name, p.uom, 
+                GROUP BY x.product_id, p.pt_code, p.legacy_pt_code, p.name, p.uom, 
                          p.package_size, b.brand_name
                 ORDER BY p.name
             """
@@ -0,0 +1,355 @@
+# utils/pdf_assets.py
+"""
+PDF Asset Cache
+
+Version: 1.2.0
+Features:
+- Company logos: bytes + decoded reportlab ImageReader, keyed by company and
+  logo path, tagged with the S3 ETag. Within the TTL a logo costs no S3 call;
+  after it, one HEAD revalidates the ETag (GET again only if it changed).
+  "No logo" results are cached too, with a shorter TTL. When S3 cannot be
+  reached, nothing new is cached and a stale logo keeps being served.
+- Company header rows (warehouse → company, company id → company), TTL cached
+- DejaVu fonts registered once per process (TTFont parsing is the slow part)
+- Paragraph style sheets built once per (generator, font availability)
+- All caches are LRU with TTL and size bounds, thread-safe
+- prime(): seed another process's cache (batch render workers) with the
+  companies / logos the parent already resolved
+
+Every document generator (BOM, material issue / return / receipt / order)
+used to run a company query, build a fresh S3Manager (bucket HEAD), try up
+to three keys with HEAD + GET and rebuild its style sheet on every call.
+In steady state a document now needs no S3 round trip and no style rebuild.
+
+Usage:
+    assets = get_pdf_assets()
+    font_ok = assets.register_fonts(project_root / 'fonts')
+    styles = assets.get_styles(('issue', font_ok), build_styles)
+    company = assets.get_company(('warehouse', warehouse_id), load_company)
+    logo = assets.get_logo(company['id'], company.get('logo_path'))
+    if logo:
+        img = logo.flowable(width=50*mm, height=15*mm)
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from io import BytesIO
+from pathlib import Path
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+LOGO_TTL_SECONDS = 6 * 3600          # Serve without revalidation for this long
+LOGO_MISS_TTL_SECONDS = 15 * 60      # Cache "no logo found" for this long
+LOGO_RETRY_SECONDS = 5 * 60          # Serve a stale logo this long while S3 is unreachable
+LOGO_MAX_ENTRIES = 64
+LOGO_MAX_BYTES = 32 * 1024 * 1024    # Evict least-recently-used logos beyond this
+COMPANY_TTL_SECONDS = 15 * 60
+COMPANY_MAX_ENTRIES = 256
+STYLES_MAX_ENTRIES = 32
+
+
+class BoundedTTLCache:
+    """
+    LRU cache with per-entry TTL, an entry limit and an optional byte budget.
+
+    get() returns (value, fresh): expired entries are kept (not fresh) so the
+    caller can revalidate them instead of refetching; they are still evicted
+    first by the size bounds because they are not refreshed on access.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: Optional[int] = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: 'OrderedDict[Hashable, Tuple[Any, float, int]]' = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'stale': 0, 'misses': 0, 'evictions': 0}
+
+    def get(self, key: Hashable) -> Tuple[Any, bool]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats['misses'] += 1
+                return None, False
+            value, expires_at, _ = entry
+            self._entries.move_to_end(key)
+            if time.monotonic() < expires_at:
+                self._stats['hits'] += 1
+                return value, True
+            self._stats['stale'] += 1
+            return value, False
+
+    def put(self, key: Hashable, value: Any, ttl: float, size: int = 0):
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[2]
+            self._entries[key] = (value, time.monotonic() + ttl, size)
+            self._bytes += size
+            self._evict()
+
+    def touch(self, key: Hashable, ttl: float):
+        """Extend an entry's lifetime (e.g. after a successful revalidation)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries[key] = (entry[0], time.monotonic() + ttl, entry[2])
+                self._entries.move_to_end(key)
+
+    def invalidate(self, key: Optional[Hashable] = None):
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+                self._bytes = 0
+            else:
+                entry = self._entries.pop(key, None)
+                if entry is not None:
+                    self._bytes -= entry[2]
+
+    def _evict(self):
+        while self._entries and (
+            len(self._entries) > self.max_entries
+            or (self.max_bytes is not None and self._bytes > self.max_bytes and len(self._entries) > 1)
+        ):
+            _, (_, _, size) = self._entries.popitem(last=False)
+            self._bytes -= size
+            self._stats['evictions'] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self._stats, 'entries': len(self._entries), 'bytes': self._bytes}
+
+
+@dataclass
+class LogoAsset:
+    """A company logo as downloaded once: raw bytes, S3 key/ETag, decoded reader"""
+    company_id: Any
+    data: bytes
+    key: Optional[str] = None
+    etag: Optional[str] = None
+    _reader: Any = field(default=None, repr=False)
+
+    @property
+    def image_reader(self):
+        """Decoded reportlab ImageReader (built on first use)"""
+        if self._reader is None:
+            from reportlab.lib.utils import ImageReader
+            self._reader = ImageReader(BytesIO(self.data))
+        return self._reader
+
+    @property
+    def pixel_size(self) -> Tuple[int, int]:
+        return self.image_reader.getSize()
+
+    def flowable(self, width: float, height: float, kind: str = 'proportional'):
+        """Platypus Image for a story (each flowable gets its own stream)"""
+        from reportlab.platypus import Image
+        return Image(BytesIO(self.data), width=width, height=height, kind=kind)
+
+    def __getstate__(self):
+        # The decoded reader is process-local; pickles carry bytes only
+        state = self.__dict__.copy()
+        state['_reader'] = None
+        return state
+
+
+class PDFAssetCache:
+    """Process-wide cache of the shared inputs of every PDF generator"""
+
+    def __init__(self):
+        self.logos = BoundedTTLCache(LOGO_MAX_ENTRIES, LOGO_MAX_BYTES)
+        self.companies = BoundedTTLCache(COMPANY_MAX_ENTRIES)
+        self.styles = BoundedTTLCache(STYLES_MAX_ENTRIES)
+        self._fonts: Dict[str, bool] = {}
+        self._font_lock = threading.Lock()
+        self._logo_locks: Dict[Hashable, threading.Lock] = {}
+        self._logo_locks_guard = threading.Lock()
+
+    # =========================================================================
+    # LOGOS
+    # =========================================================================
+
+    def get_logo(self, company_id: Any, logo_path: Optional[str] = None) -> Optional[LogoAsset]:
+        """
+        Company logo, or None if the company has none.
+        Fresh entry → no S3 call; stale entry → HEAD + ETag compare; miss → fetch.
+        """
+        key = self.logo_key(company_id, logo_path)
+        logo, fresh = self.logos.get(key)
+        if fresh:
+            return logo
+
+        # One fetch per logo at a time (concurrent sessions share the result)
+        with self._logo_lock(key):
+            logo, fresh = self.logos.get(key)
+            if fresh:
+                return logo
+            if logo is not None and logo.key:
+                unchanged = self._etag_unchanged(logo)
+                if unchanged is None:
+                    # S3 unreachable: keep the good logo, retry later
+                    self.logos.touch(key, LOGO_RETRY_SECONDS)
+                    return logo
+                if unchanged:
+                    self.logos.touch(key, LOGO_TTL_SECONDS)
+                    return logo
+            return self._fetch_logo(key, company_id, logo_path, stale=logo)
+
+    @staticmethod
+    def logo_key(company_id: Any, logo_path: Optional[str] = None) -> Tuple[Any, str]:
+        return (company_id, logo_path or '')
+
+    def _fetch_logo(self, key, company_id, logo_path,
+                    stale: Optional[LogoAsset] = None) -> Optional[LogoAsset]:
+        try:
+            from .s3_utils import fetch_company_logo
+            found = fetch_company_logo(company_id, logo_path)
+        except Exception as e:
+            logger.warning(f"Logo fetch failed for company {company_id}: {e}")
+            # Not cached as "no logo": S3 may just be unreachable right now
+            if stale is not None:
+                self.logos.touch(key, LOGO_RETRY_SECONDS)
+            return stale
+
+        if not found:
+            self.logos.put(key, None, LOGO_MISS_TTL_SECONDS)
+            return None
+        logo = LogoAsset(company_id=company_id, data=found['data'],
+                         key=found.get('key'), etag=found.get('etag'))
+        self.logos.put(key, logo, LOGO_TTL_SECONDS, size=len(logo.data))
+        return logo
+
+    def _etag_unchanged(self, logo: LogoAsset) -> Optional[bool]:
+        """True = unchanged, False = changed or gone, None = S3 unreachable"""
+        if not logo.etag:
+            return False
+        try:
+            from .s3_utils import get_object_etag
+            etag = get_object_etag(logo.key)
+        except Exception as e:
+            logger.warning(f"Logo revalidation failed for {logo.key}: {e}")
+            return None
+        return etag == logo.etag
+
+    def _logo_lock(self, key) -> threading.Lock:
+        with self._logo_locks_guard:
+            lock = self._logo_locks.get(key)
+            if lock is None:
+                lock = self._logo_locks[key] = threading.Lock()
+            return lock
+
+    # =========================================================================
+    # COMPANIES / STYLES / FONTS
+    # =========================================================================
+
+    def get_company(self, key: Hashable, load: Callable[[], Optional[Dict[str, Any]]]) -> Optional[Dict[str, Any]]:
+        """
+        Company header row via load() (None = not found / error, not cached).
+        Returns a copy so callers may modify it.
+        """
+        company, fresh = self.companies.get(key)
+        if not fresh:
+            company = load()
+            if company is None:
+                return None
+            self.companies.put(key, company, COMPANY_TTL_SECONDS)
+        return dict(company)
+
+    def get_styles(self, key: Hashable, build: Callable[[], Any]):
+        """Style sheet built once per key — treat the result as read-only"""
+        styles, fresh = self.styles.get(key)
+        if not fresh:
+            styles = build()
+            self.styles.put(key, styles, float('inf'))
+        return styles
+
+    def register_fonts(self, fonts_dir: Path) -> bool:
+        """
+        Register DejaVuSans / DejaVuSans-Bold from fonts_dir once per process.
+        Returns True if the regular font is available.
+        """
+        fonts_dir = Path(fonts_dir)
+        cache_key = str(fonts_dir.resolve())
+        with self._font_lock:
+            if cache_key in self._fonts:
+                return self._fonts[cache_key]
+            available = self._register_dejavu(fonts_dir)
+            self._fonts[cache_key] = available
+            return available
+
+    @staticmethod
+    def _register_dejavu(fonts_dir: Path) -> bool:
+        from reportlab.pdfbase import pdfmetrics
+        from reportlab.pdfbase.ttfonts import TTFont
+
+        try:
+            if not fonts_dir.exists():
+                logger.warning(f"Fonts directory not found: {fonts_dir}")
+                return False
+
+            dejavu_regular = fonts_dir / 'DejaVuSans.ttf'
+            dejavu_bold = fonts_dir / 'DejaVuSans-Bold.ttf'
+            if not dejavu_regular.exists():
+                logger.warning(f"DejaVuSans.ttf not found in {fonts_dir}")
+                return False
+
+            registered = set(pdfmetrics.getRegisteredFontNames())
+            if 'DejaVuSans' not in registered:
+                pdfmetrics.registerFont(TTFont('DejaVuSans', str(dejavu_regular)))
+                logger.info("DejaVuSans font registered")
+            if dejavu_bold.exists() and 'DejaVuSans-Bold' not in registered:
+                pdfmetrics.registerFont(TTFont('DejaVuSans-Bold', str(dejavu_bold)))
+                logger.info("DejaVuSans-Bold font registered")
+            return True
+
+        except Exception as e:
+            logger.error(f"Font setup error: {e}")
+            return False
+
+    def prime(self, companies: Optional[Dict[Hashable, Dict[str, Any]]] = None,
+              logos: Optional[Dict[Tuple[Any, str], Optional[LogoAsset]]] = None):
+        """
+        Seed the caches with assets resolved elsewhere (e.g. by the process
+        that dispatches batch renders), so this process needs no DB/S3 calls.
+        logos is keyed by logo_key(); None values record "no logo".
+        """
+        for key, company in (companies or {}).items():
+            if company is not None:
+                self.companies.put(key, company, COMPANY_TTL_SECONDS)
+        for key, logo in (logos or {}).items():
+            if logo is None:
+                self.logos.put(key, None, LOGO_MISS_TTL_SECONDS)
+            else:
+                self.logos.put(key, logo, LOGO_TTL_SECONDS, size=len(logo.data))
+
+    def clear(self):
+        """Drop cached logos, companies and styles (fonts stay registered)"""
+        self.logos.invalidate()
+        self.companies.invalidate()
+        self.styles.invalidate()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'logos': self.logos.get_stats(),
+            'companies': self.companies.get_stats(),
+            'styles': self.styles.get_stats(),
+            'fonts': dict(self._fonts),
+        }
+
+
+_pdf_assets: Optional[PDFAssetCache] = None
+_pdf_assets_lock = threading.Lock()
+
+
+def get_pdf_assets() -> PDFAssetCache:
+    """Get or create the process-wide PDFAssetCache"""
+    global _pdf_assets
+    if _pdf_assets is None:
+        with _pdf_assets_lock:
+            if _pdf_assets is None:
+                _pdf_assets = PDFAssetCache()
+    return _pdf_assets
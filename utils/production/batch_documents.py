@@ -0,0 +1,400 @@
+# utils/production/batch_documents.py
+"""
+Batch PDF generation for production documents
+
+Prints many material issues / returns / production receipts / orders at
+once (end-of-shift printing) instead of one dialog round trip each:
+
+  1. Load       set-based: per document type one header query + one lines
+                query for all requested ids (generator.load_data_bulk)
+  2. Assets     company row + logo resolved once per warehouse in this
+                process (PDFAssetCache), then shipped to the workers
+  3. Render     reportlab is pure Python and holds the GIL, so documents
+                are rendered in a process pool (spawn context — the
+                Streamlit process has live threads and DB pools that must
+                not be forked). Small batches render in-process.
+  4. Bundle     one merged PDF (needs pypdf) or a ZIP of single PDFs
+  5. Upload     optional, per document via S3Manager.upload_pdf (threads)
+
+Workers only call generator.render_pdf() on pre-loaded data; with the
+primed asset cache they make no DB or S3 calls.
+
+Usage:
+    service = get_batch_document_service()
+    result = service.generate([('issue', 101), ('issue', 102), ('receipt', 55)])
+    content, filename, mime = result.bundle()        # merged PDF, else ZIP
+    service.upload(result)                           # optional
+
+Version: 1.0.0
+"""
+
+import importlib
+import logging
+import multiprocessing
+import os
+import threading
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from io import BytesIO
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from utils.pdf_assets import get_pdf_assets
+
+try:
+    from pypdf import PdfReader, PdfWriter
+    PYPDF_AVAILABLE = True
+except ImportError:
+    PYPDF_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+
+BATCH_DOCUMENTS_CONFIG = {
+    'max_workers': max(1, min(4, (os.cpu_count() or 2) - 1)),
+    'in_process_threshold': 6,     # fewer documents → render in this process
+    'chunk_size': 8,               # documents per worker task
+    'id_chunk_size': 500,          # ids per bulk load query
+    'upload_workers': 8,           # concurrent S3 uploads
+}
+
+
+@dataclass(frozen=True)
+class DocumentType:
+    """How to load, render, name and file one kind of document"""
+    name: str
+    module: str             # pdf_generator module (exposes `pdf_generator`)
+    header_key: str         # key of the header dict in the generator's data
+    number_field: str       # document number column in the header
+    filename_prefix: str
+    s3_folder: str
+    default_layout: str
+
+
+DOCUMENT_TYPES: Dict[str, DocumentType] = {
+    'issue': DocumentType(
+        'issue', 'utils.production.issues.pdf_generator', 'issue', 'issue_no',
+        'Issue', 'production/material-issues', 'landscape'),
+    'return': DocumentType(
+        'return', 'utils.production.returns.pdf_generator', 'return', 'return_no',
+        'Return', 'production/material-returns', 'landscape'),
+    'receipt': DocumentType(
+        'receipt', 'utils.production.completions.pdf_generator', 'receipt', 'receipt_no',
+        'Receipt', 'production/receipts', 'portrait'),
+    'order': DocumentType(
+        'order', 'utils.production.orders.pdf_generator', 'order', 'order_no',
+        'Order', 'production/orders', 'landscape'),
+}
+
+
+@dataclass
+class BatchDocument:
+    """One requested document and its outcome"""
+    doc_type: str
+    doc_id: int
+    doc_no: str = ''
+    pdf: Optional[bytes] = None
+    error: Optional[str] = None
+    upload: Optional[Dict[str, Any]] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.pdf is not None
+
+    @property
+    def filename(self) -> str:
+        prefix = DOCUMENT_TYPES[self.doc_type].filename_prefix
+        number = str(self.doc_no or self.doc_id).replace('/', '-').replace('\\', '-')
+        return f"{prefix}_{number}.pdf"
+
+
+@dataclass
+class BatchResult:
+    """Documents in request order, plus timing"""
+    documents: List[BatchDocument] = field(default_factory=list)
+    load_seconds: float = 0.0
+    render_seconds: float = 0.0
+
+    @property
+    def succeeded(self) -> List[BatchDocument]:
+        return [d for d in self.documents if d.ok]
+
+    @property
+    def failed(self) -> List[BatchDocument]:
+        return [d for d in self.documents if not d.ok]
+
+    def to_pdf(self) -> bytes:
+        """All rendered documents merged into one PDF (request order)"""
+        if not PYPDF_AVAILABLE:
+            raise RuntimeError("pypdf is required to merge PDFs — use to_zip() instead")
+        writer = PdfWriter()
+        for doc in self.succeeded:
+            writer.append(PdfReader(BytesIO(doc.pdf)))
+        buffer = BytesIO()
+        writer.write(buffer)
+        return buffer.getvalue()
+
+    def to_zip(self) -> bytes:
+        """All rendered documents as single PDFs in one ZIP (PDFs are already compressed)"""
+        buffer = BytesIO()
+        seen: Dict[str, int] = {}
+        with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_STORED) as zf:
+            for doc in self.succeeded:
+                name = doc.filename
+                if name in seen:
+                    seen[name] += 1
+                    name = name[:-4] + f"_{seen[name]}.pdf"
+                else:
+                    seen[name] = 0
+                zf.writestr(name, doc.pdf)
+        return buffer.getvalue()
+
+    def bundle(self, output: str = 'pdf', basename: str = 'production_documents') -> Tuple[bytes, str, str]:
+        """
+        (content, filename, mime) for a download button.
+        output='pdf' falls back to ZIP when pypdf is not installed.
+        """
+        if output == 'pdf' and PYPDF_AVAILABLE:
+            return self.to_pdf(), f"{basename}.pdf", 'application/pdf'
+        if output == 'pdf':
+            logger.warning("pypdf not installed — bundling batch as ZIP")
+        return self.to_zip(), f"{basename}.zip", 'application/zip'
+
+
+# ==================== Worker side ====================
+
+def _render_chunk(doc_type: str, items: List[Tuple[int, Dict[str, Any]]],
+                  language: str, layout: str, options: Dict[str, Any],
+                  assets: Optional[Dict[str, Any]] = None) -> List[Tuple[int, Optional[bytes], Optional[str]]]:
+    """Render pre-loaded documents of one type → [(doc_id, pdf, error)]"""
+    if assets:
+        get_pdf_assets().prime(**assets)
+    generator = importlib.import_module(DOCUMENT_TYPES[doc_type].module).pdf_generator
+
+    rendered = []
+    for doc_id, data in items:
+        try:
+            rendered.append((doc_id, generator.render_pdf(data, language, layout, **options), None))
+        except Exception as e:
+            logger.error(f"Batch render failed for {doc_type} {doc_id}: {e}", exc_info=True)
+            rendered.append((doc_id, None, str(e)))
+    return rendered
+
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor(max_workers: int) -> ProcessPoolExecutor:
+    """Shared worker pool (spawned once, reused across batches)"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=max_workers,
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+        return _executor
+
+
+def _reset_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+# ==================== Service ====================
+
+class BatchDocumentService:
+    """Set-based load + parallel render + bundling for production documents"""
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self.max_workers = max_workers or BATCH_DOCUMENTS_CONFIG['max_workers']
+
+    def generate(self, documents: Iterable[Tuple[str, int]], language: str = 'vi',
+                 layout: Optional[str] = None, include_materials: bool = True) -> BatchResult:
+        """
+        Render many documents.
+
+        Args:
+            documents: (doc_type, id) pairs — doc_type in DOCUMENT_TYPES;
+                the result (and a merged PDF) keeps this order, duplicates dropped
+            language: 'vi' or 'en'
+            layout: 'landscape' / 'portrait'; None = each type's default
+            include_materials: orders only — include the materials table
+
+        Returns:
+            BatchResult (documents that could not be loaded carry an error)
+        """
+        requested = list(dict.fromkeys((str(t), int(i)) for t, i in documents))
+        unknown = {t for t, _ in requested if t not in DOCUMENT_TYPES}
+        if unknown:
+            raise ValueError(f"Unknown document type(s): {', '.join(sorted(unknown))}")
+
+        result = BatchResult()
+        if not requested:
+            return result
+
+        ids_by_type: Dict[str, List[int]] = {}
+        for doc_type, doc_id in requested:
+            ids_by_type.setdefault(doc_type, []).append(doc_id)
+
+        # 1-2. Load data + shared assets
+        started = time.perf_counter()
+        loaded = {t: self._load(t, ids, include_materials) for t, ids in ids_by_type.items()}
+        assets = self._resolve_assets(loaded)
+        result.load_seconds = time.perf_counter() - started
+
+        # 3. Render
+        started = time.perf_counter()
+        tasks = []
+        for doc_type, data_by_id in loaded.items():
+            options = {'include_materials': include_materials} if doc_type == 'order' else {}
+            doc_layout = layout or DOCUMENT_TYPES[doc_type].default_layout
+            items = list(data_by_id.items())
+            size = BATCH_DOCUMENTS_CONFIG['chunk_size']
+            for start in range(0, len(items), size):
+                tasks.append((doc_type, items[start:start + size], language, doc_layout, options))
+
+        rendered = self._render(tasks, assets)
+        result.render_seconds = time.perf_counter() - started
+
+        # Assemble in request order
+        for doc_type, doc_id in requested:
+            spec = DOCUMENT_TYPES[doc_type]
+            data = loaded[doc_type].get(doc_id)
+            doc = BatchDocument(doc_type=doc_type, doc_id=doc_id)
+            if data is None:
+                doc.error = f"{doc_type} {doc_id} not found"
+            else:
+                doc.doc_no = str(data[spec.header_key].get(spec.number_field) or '')
+                doc.pdf, doc.error = rendered.get((doc_type, doc_id), (None, 'not rendered'))
+            result.documents.append(doc)
+
+        logger.info(
+            f"✅ Batch PDFs: {len(result.succeeded)}/{len(requested)} rendered "
+            f"(load {result.load_seconds:.2f}s, render {result.render_seconds:.2f}s)"
+        )
+        return result
+
+    # ==================== Steps ====================
+
+    def _load(self, doc_type: str, ids: Sequence[int], include_materials: bool) -> Dict[int, Dict[str, Any]]:
+        generator = importlib.import_module(DOCUMENT_TYPES[doc_type].module).pdf_generator
+        kwargs = {'include_materials': include_materials} if doc_type == 'order' else {}
+        size = BATCH_DOCUMENTS_CONFIG['id_chunk_size']
+
+        loaded: Dict[int, Dict[str, Any]] = {}
+        for start in range(0, len(ids), size):
+            loaded.update(generator.load_data_bulk(list(ids[start:start + size]), **kwargs))
+        return loaded
+
+    def _resolve_assets(self, loaded: Dict[str, Dict[int, Dict[str, Any]]]) -> Dict[str, Any]:
+        """Company + logo per warehouse, resolved once here and shipped to the workers"""
+        assets = get_pdf_assets()
+        companies: Dict[Any, Dict[str, Any]] = {}
+        logos: Dict[Any, Any] = {}
+
+        for doc_type, data_by_id in loaded.items():
+            spec = DOCUMENT_TYPES[doc_type]
+            module = importlib.import_module(spec.module)
+            warehouse_ids = {
+                data[spec.header_key].get('warehouse_id') for data in data_by_id.values()
+            } - {None}
+            for warehouse_id in warehouse_ids:
+                key = ('warehouse', warehouse_id)
+                if key not in companies:
+                    companies[key] = module.pdf_generator.get_company_info(warehouse_id)
+                company = companies[key]
+                logo_key = assets.logo_key(company.get('id'), company.get('logo_path'))
+                if module.S3_AVAILABLE and logo_key not in logos:
+                    try:
+                        logos[logo_key] = assets.get_logo(company.get('id'), company.get('logo_path'))
+                    except Exception as e:
+                        logger.warning(f"Could not load logo for batch: {e}")
+
+        return {'companies': companies, 'logos': logos}
+
+    def _render(self, tasks: List[tuple], assets: Dict[str, Any]) -> Dict[Tuple[str, int], Tuple[Optional[bytes], Optional[str]]]:
+        rendered: Dict[Tuple[str, int], Tuple[Optional[bytes], Optional[str]]] = {}
+
+        def collect(doc_type, chunk_result):
+            for doc_id, pdf, error in chunk_result:
+                rendered[(doc_type, doc_id)] = (pdf, error)
+
+        total = sum(len(task[1]) for task in tasks)
+        pending = tasks
+        if self.max_workers > 1 and total >= BATCH_DOCUMENTS_CONFIG['in_process_threshold']:
+            pending = []
+            try:
+                executor = _get_executor(self.max_workers)
+                futures = {executor.submit(_render_chunk, *task, assets): task for task in tasks}
+                for future in as_completed(futures):
+                    task = futures[future]
+                    try:
+                        collect(task[0], future.result())
+                    except Exception as e:
+                        logger.warning(f"Render worker failed ({e}) — rendering chunk in-process")
+                        if isinstance(e, BrokenProcessPool):
+                            _reset_executor()
+                        pending.append(task)
+            except BrokenProcessPool as e:
+                logger.warning(f"Render pool unavailable ({e}) — rendering in-process")
+                _reset_executor()
+                pending = [t for t in tasks if any((t[0], i) not in rendered for i, _ in t[1])]
+
+        # Small batches and fallbacks: this process's asset cache is already warm
+        for task in pending:
+            collect(task[0], _render_chunk(*task))
+        return rendered
+
+    # ==================== Upload ====================
+
+    def upload(self, result: BatchResult, metadata: Optional[Dict[str, str]] = None) -> BatchResult:
+        """
+        Upload every rendered document through S3Manager.upload_pdf (into
+        the document type's folder). Sets doc.upload to upload_pdf's result.
+        """
+        from utils.s3_utils import get_s3_manager
+
+        s3_manager = get_s3_manager()
+        docs = result.succeeded
+
+        def _upload(doc: BatchDocument) -> Dict[str, Any]:
+            doc_metadata = {
+                'document_type': doc.doc_type,
+                'document_id': str(doc.doc_id),
+                'document_no': doc.doc_no,
+                **(metadata or {}),
+            }
+            try:
+                return s3_manager.upload_pdf(
+                    doc.pdf, doc.filename, metadata=doc_metadata,
+                    folder=DOCUMENT_TYPES[doc.doc_type].s3_folder
+                )
+            except Exception as e:
+                logger.error(f"Upload failed for {doc.filename}: {e}")
+                return {'success': False, 'error': str(e)}
+
+        with ThreadPoolExecutor(max_workers=BATCH_DOCUMENTS_CONFIG['upload_workers']) as pool:
+            for doc, upload in zip(docs, pool.map(_upload, docs)):
+                doc.upload = upload
+
+        uploaded = sum(1 for d in docs if d.upload and d.upload.get('success'))
+        logger.info(f"✅ Uploaded {uploaded}/{len(docs)} batch PDFs")
+        return result
+
+
+_service: Optional[BatchDocumentService] = None
+
+
+def get_batch_document_service() -> BatchDocumentService:
+    """Get or create the BatchDocumentService"""
+    global _service
+    if _service is None:
+        _service = BatchDocumentService()
+    return _service
@@ -3,8 +3,11 @@
 Production Receipts Manager - Business logic for Production Output Recording
 Record production output with QC breakdown, close orders manually
 
-Version: 4.0.0
+Version: 4.2.0
 Changes:
+- v4.2.0: Receipts, QC updates and order close notify the Supply Chain GAP
+          result cache (gap_notify)
+- v4.1.0: QC updates queue the MO for the overview pivot rollup refresh
 - v4.0.0: Production Receipts refactoring
   - complete_production() now accepts passed_qty/pending_qty/failed_qty
   - REMOVED auto-complete: MO stays IN_PROGRESS after receipt
@@ -25,6 +28,8 @@ import pandas as pd
 from sqlalchemy import text
 
 from utils.db import get_db_engine
+from utils.doc_sequence import next_document_number
+from utils.production.gap_notify import collect_order_changes, notify_gap_cache
 from .common import get_vietnam_now
 
 logger = logging.getLogger(__name__)
@@ -202,26 +207,28 @@ class CompletionManager:
                     'order_id': order_id,
                     'user_id': user_id
                 })
+                change = collect_order_changes(conn, order_id, group_id=group_id)
                 
                 logger.info(
                     f"✅ Recorded production output for order {order_id}: "
                     f"PASSED={passed_qty}, PENDING={pending_qty}, FAILED={failed_qty}"
                 )
                 
-                main = created_receipts[0]
-                return {
-                    'receipt_no': main['receipt_no'],
-                    'receipt_id': main['receipt_id'],
-                    'order_completed': False,  # Never auto-complete
-                    'quantity': total_produced,
-                    'batch_no': batch_no,
-                    'quality_status': main['status'],
-                    'receipts': created_receipts
-                }
-                
             except Exception as e:
                 logger.error(f"❌ Error recording production for order {order_id}: {e}")
                 raise
+        
+        notify_gap_cache(change)
+        main = created_receipts[0]
+        return {
+            'receipt_no': main['receipt_no'],
+            'receipt_id': main['receipt_id'],
+            'order_completed': False,  # Never auto-complete
+            'quantity': total_produced,
+            'batch_no': batch_no,
+            'quality_status': main['status'],
+            'receipts': created_receipts
+        }
     
     # ==================== Close Order ====================
     
@@ -290,17 +297,20 @@ class CompletionManager:
                     'user_id': user_id
                 })
                 
-                logger.info(f"🔒 Closed manufacturing order {order['order_no']} (ID: {order_id}) by user {user_id}")
+                change = collect_order_changes(conn, order_id)
                 
-                return {
-                    'success': True,
-                    'order_no': order['order_no'],
-                    'order_id': order_id
-                }
+                logger.info(f"🔒 Closed manufacturing order {order['order_no']} (ID: {order_id}) by user {user_id}")
                 
             except Exception as e:
                 logger.error(f"❌ Error closing order {order_id}: {e}")
                 raise
+        
+        notify_gap_cache(change)
+        return {
+            'success': True,
+            'order_no': order['order_no'],
+            'order_id': order_id
+        }
     
     # ==================== Update Quality Status (Original - Full Batch) ====================
     
@@ -371,12 +381,19 @@ class CompletionManager:
                     # Remove from inventory
                     self._remove_stock_in_production(conn, receipt, keycloak_id or str(user_id))
                 
+                # QC edits set no timestamp → queue the MO for the overview pivot rollups
+                from utils.production.overview.pivot_rollups import queue_pivot_refresh
+                queue_pivot_refresh(conn, [receipt['manufacturing_order_id']])
+                change = collect_order_changes(conn, receipt['manufacturing_order_id'], group_id=group_id)
+                
                 logger.info(f"✅ Updated quality status for receipt {receipt_id}: {old_status} → {new_status}")
-                return True
                 
             except Exception as e:
                 logger.error(f"❌ Error updating quality status for receipt {receipt_id}: {e}")
                 raise
+        
+        notify_gap_cache(change)
+        return True
     
     # ==================== Update Quality Status (Partial QC Support) ====================
     
@@ -503,16 +520,21 @@ class CompletionManager:
                             )
                             new_receipts.append({'receipt_no': failed_receipt_no, 'status': 'FAILED', 'qty': failed_qty})
                 
-                logger.info(f"✅ Partial QC updated for receipt {receipt_id}: PASSED={passed_qty}, PENDING={pending_qty}, FAILED={failed_qty}")
+                from utils.production.overview.pivot_rollups import queue_pivot_refresh
+                queue_pivot_refresh(conn, [receipt['manufacturing_order_id']])
+                change = collect_order_changes(conn, receipt['manufacturing_order_id'], group_id=group_id)
                 
-                return {
-                    'success': True,
-                    'new_receipts': new_receipts
-                }
+                logger.info(f"✅ Partial QC updated for receipt {receipt_id}: PASSED={passed_qty}, PENDING={pending_qty}, FAILED={failed_qty}")
                 
             except Exception as e:
                 logger.error(f"❌ Error in partial QC update for receipt {receipt_id}: {e}")
                 return {'success': False, 'error': str(e)}
+        
+        notify_gap_cache(change)
+        return {
+            'success': True,
+            'new_receipts': new_receipts
+        }
     
     # ==================== Private Helper Methods ====================
     
@@ -722,22 +744,9 @@ class CompletionManager:
     def _generate_receipt_number(self, conn) -> str:
         """Generate unique receipt number PR-YYYYMMDD-XXX"""
         timestamp = get_vietnam_now().strftime('%Y%m%d')
-        prefix = f"PR-{timestamp}-"
-        
-        query = text("""
-            SELECT COALESCE(
-                MAX(CAST(SUBSTRING_INDEX(receipt_no, '-', -1) AS UNSIGNED)), 0
-            ) + 1 as next_num
-            FROM production_receipts
-            WHERE receipt_no LIKE :pattern
-            FOR UPDATE
-        """)
-        
-        result = conn.execute(query, {'pattern': f'{prefix}%'})
-        row = result.fetchone()
-        next_num = int(row[0]) if row and row[0] else 1
-        
-        return f"{prefix}{next_num:03d}"
+        return next_document_number(
+            f"PR-{timestamp}-", 'production_receipts', 'receipt_no', conn=conn
+        )
     
     def _add_production_to_inventory(self, conn, order: Dict, quantity: float,
                                      batch_no: str, warehouse_id: int,
@@ -3,8 +3,12 @@
 Database queries for Production Receipts domain
 All SQL queries are centralized here for easy maintenance
 
-Version: 2.2.0
+Version: 2.4.0
 Changes:
+- v2.4.0: get_receipt_details_bulk() for batch printing
+  (detail SQL shared with get_receipt_details)
+- v2.3.0: get_all_active_receipts() served from the delta-sync store
+  (one store per include_completed variant)
 - v2.2.0: Allow under-production MO completion
   - Removed produced_qty >= planned_qty filter from ready-to-close queries
   - _derive_ready_to_close(), get_ready_to_close_orders(), get_live_stats()
@@ -32,11 +36,131 @@ from sqlalchemy import text
 from sqlalchemy.exc import OperationalError, DatabaseError
 
 from utils.db import get_db_engine
+from utils.production.delta_store import DeltaEntity, get_delta_store
 from .common import PerformanceTimer
 
 logger = logging.getLogger(__name__)
 
 
+# ==================== Delta-sync entities ====================
+
+_RECEIPTS_SELECT = """
+    SELECT 
+        pr.id,
+        pr.receipt_no,
+        pr.receipt_date,
+        pr.quantity,
+        pr.uom,
+        pr.batch_no,
+        pr.expired_date,
+        pr.quality_status,
+        pr.notes,
+        pr.created_date,
+        mo.order_no,
+        mo.id as order_id,
+        mo.order_date,
+        mo.scheduled_date,
+        mo.planned_qty,
+        mo.produced_qty,
+        mo.status as order_status,
+        DATEDIFF(NOW(), pr.created_date) as age_days,
+        p.id as product_id,
+        p.name as product_name,
+        p.pt_code,
+        p.legacy_pt_code,
+        p.package_size,
+        b.brand_name as brand_name,
+        w.id as warehouse_id,
+        w.name as warehouse_name,
+        CASE 
+            WHEN mo.planned_qty > 0 
+            THEN ROUND((mo.produced_qty / mo.planned_qty) * 100, 1)
+            ELSE 0
+        END as yield_rate
+    FROM production_receipts pr
+    JOIN manufacturing_orders mo ON pr.manufacturing_order_id = mo.id
+    JOIN products p ON pr.product_id = p.id
+    LEFT JOIN brands b ON p.brand_id = b.id
+    JOIN warehouses w ON pr.warehouse_id = w.id
+    WHERE 1=1
+"""
+
+# Receipt QC/quantity edits do not set a timestamp → compared via the id query
+_RECEIPTS_IDS = """
+    SELECT pr.id, pr.quantity, pr.quality_status, pr.notes
+    FROM production_receipts pr
+    JOIN manufacturing_orders mo ON pr.manufacturing_order_id = mo.id
+    WHERE 1=1
+"""
+
+_ACTIVE_FILTER = " AND mo.status != 'COMPLETED'"
+
+
+def _refresh_age_days(df: pd.DataFrame) -> pd.DataFrame:
+    """Recompute age_days over the whole cache (rows are fetched at different times)"""
+    created = pd.to_datetime(df['created_date'])
+    df['age_days'] = (pd.Timestamp.now().normalize() - created.dt.normalize()).dt.days
+    return df
+
+
+def _receipts_entity(name: str, extra_filter: str = '') -> DeltaEntity:
+    return DeltaEntity(
+        name=name,
+        select_sql=_RECEIPTS_SELECT + extra_filter,
+        key_sql='pr.id',
+        # MO status / produced_qty changes bump mo.updated_date
+        changed_sql=['pr.created_date', 'mo.updated_date'],
+        ids_sql=_RECEIPTS_IDS + extra_filter,
+        check_columns=['quantity', 'quality_status', 'notes'],
+        post_process=_refresh_age_days,
+    )
+
+
+RECEIPTS_ACTIVE_DELTA_ENTITY = _receipts_entity('receipts_active', _ACTIVE_FILTER)
+RECEIPTS_ALL_DELTA_ENTITY = _receipts_entity('receipts_all')
+
+
+_RECEIPT_DETAILS_SELECT = """
+    SELECT 
+        pr.id,
+        pr.receipt_no,
+        pr.receipt_date,
+        pr.quantity,
+        pr.uom,
+        pr.batch_no,
+        pr.expired_date,
+        pr.quality_status,
+        pr.notes,
+        pr.created_by,
+        pr.created_date,
+        mo.id as manufacturing_order_id,
+        mo.order_no,
+        mo.order_date,
+        mo.scheduled_date,
+        mo.planned_qty,
+        mo.produced_qty,
+        mo.status as order_status,
+        p.id as product_id,
+        p.name as product_name,
+        p.pt_code,
+        p.legacy_pt_code,
+        p.package_size,
+        br.brand_name as brand_name,
+        w.id as warehouse_id,
+        w.name as warehouse_name,
+        bh.bom_name,
+        CONCAT(e.first_name, ' ', e.last_name) as created_by_name
+    FROM production_receipts pr
+    JOIN manufacturing_orders mo ON pr.manufacturing_order_id = mo.id
+    JOIN products p ON pr.product_id = p.id
+    LEFT JOIN brands br ON p.brand_id = br.id
+    JOIN warehouses w ON pr.warehouse_id = w.id
+    LEFT JOIN bom_headers bh ON mo.bom_header_id = bh.id
+    LEFT JOIN users u ON pr.created_by = u.id
+    LEFT JOIN employees e ON u.employee_id = e.id
+"""
+
+
 class DatabaseConnectionError(Exception):
     """Custom exception for database connection errors"""
     pass
@@ -209,46 +333,7 @@ class CompletionQueries:
     
     def get_receipt_details(self, receipt_id: int) -> Optional[Dict[str, Any]]:
         """Get full receipt details including order and product info"""
-        query = """
-            SELECT 
-                pr.id,
-                pr.receipt_no,
-                pr.receipt_date,
-                pr.quantity,
-                pr.uom,
-                pr.batch_no,
-                pr.expired_date,
-                pr.quality_status,
-                pr.notes,
-                pr.created_by,
-                pr.created_date,
-                mo.id as manufacturing_order_id,
-                mo.order_no,
-                mo.order_date,
-                mo.scheduled_date,
-                mo.planned_qty,
-                mo.produced_qty,
-                mo.status as order_status,
-                p.id as product_id,
-                p.name as product_name,
-                p.pt_code,
-                p.legacy_pt_code,
-                p.package_size,
-                br.brand_name as brand_name,
-                w.id as warehouse_id,
-                w.name as warehouse_name,
-                bh.bom_name,
-                CONCAT(e.first_name, ' ', e.last_name) as created_by_name
-            FROM production_receipts pr
-            JOIN manufacturing_orders mo ON pr.manufacturing_order_id = mo.id
-            JOIN products p ON pr.product_id = p.id
-            LEFT JOIN brands br ON p.brand_id = br.id
-            JOIN warehouses w ON pr.warehouse_id = w.id
-            LEFT JOIN bom_headers bh ON mo.bom_header_id = bh.id
-            LEFT JOIN users u ON pr.created_by = u.id
-            LEFT JOIN employees e ON u.employee_id = e.id
-            WHERE pr.id = %s
-        """
+        query = _RECEIPT_DETAILS_SELECT + " WHERE pr.id = %s"
         
         try:
             result = pd.read_sql(query, self.engine, params=(receipt_id,))
@@ -259,6 +344,21 @@ class CompletionQueries:
             logger.error(f"Error getting receipt details for {receipt_id}: {e}")
             return None
     
+    def get_receipt_details_bulk(self, receipt_ids: List[int]) -> pd.DataFrame:
+        """Details for several receipts in one query (batch printing)"""
+        receipt_ids = [int(i) for i in dict.fromkeys(receipt_ids)]
+        if not receipt_ids:
+            return pd.DataFrame()
+        
+        placeholders = ', '.join(['%s'] * len(receipt_ids))
+        query = _RECEIPT_DETAILS_SELECT + f" WHERE pr.id IN ({placeholders})"
+        
+        try:
+            return pd.read_sql(query, self.engine, params=tuple(receipt_ids))
+        except Exception as e:
+            logger.error(f"Error getting receipt details for {len(receipt_ids)} receipts: {e}")
+            return pd.DataFrame()
+    
     def get_receipt_materials(self, order_id: int) -> pd.DataFrame:
         """Get material usage for an order"""
         query = """
@@ -834,55 +934,11 @@ class CompletionQueries:
         This replaces per-page get_receipts + get_filtered_stats + get_duplicate_batch_info
         with a SINGLE cached DB hit.
         """
-        query = """
-            SELECT 
-                pr.id,
-                pr.receipt_no,
-                pr.receipt_date,
-                pr.quantity,
-                pr.uom,
-                pr.batch_no,
-                pr.expired_date,
-                pr.quality_status,
-                pr.notes,
-                pr.created_date,
-                mo.order_no,
-                mo.id as order_id,
-                mo.order_date,
-                mo.scheduled_date,
-                mo.planned_qty,
-                mo.produced_qty,
-                mo.status as order_status,
-                DATEDIFF(NOW(), pr.created_date) as age_days,
-                p.id as product_id,
-                p.name as product_name,
-                p.pt_code,
-                p.legacy_pt_code,
-                p.package_size,
-                b.brand_name as brand_name,
-                w.id as warehouse_id,
-                w.name as warehouse_name,
-                CASE 
-                    WHEN mo.planned_qty > 0 
-                    THEN ROUND((mo.produced_qty / mo.planned_qty) * 100, 1)
-                    ELSE 0
-                END as yield_rate
-            FROM production_receipts pr
-            JOIN manufacturing_orders mo ON pr.manufacturing_order_id = mo.id
-            JOIN products p ON pr.product_id = p.id
-            LEFT JOIN brands b ON p.brand_id = b.id
-            JOIN warehouses w ON pr.warehouse_id = w.id
-            WHERE 1=1
-        """
-        
-        if not include_completed:
-            query += " AND mo.status != 'COMPLETED'"
-        
-        query += " ORDER BY pr.created_date DESC"
+        entity = RECEIPTS_ALL_DELTA_ENTITY if include_completed else RECEIPTS_ACTIVE_DELTA_ENTITY
         
         try:
             import time as _t; _t0 = _t.perf_counter()
-            result = pd.read_sql(query, self.engine)
+            result = get_delta_store(entity).get()
             _ms = (_t.perf_counter() - _t0) * 1000
             logger.info(f"[PERF] get_all_active_receipts: {_ms:.0f}ms ({len(result)} rows, completed={include_completed})")
             self._connection_error = None
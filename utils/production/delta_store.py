@@ -0,0 +1,245 @@
+# utils/production/delta_store.py
+"""
+Delta-sync bootstrap store for the production tabs
+
+The tab bootstraps (orders, issues, returns, completions) used to reload
+every row with all joins every 30s in every Streamlit process. A
+DeltaSyncStore keeps one DataFrame per entity per process and, after the
+first full load, syncs with small queries:
+
+  1. Changed rows   full SELECT restricted to created/updated >= watermark
+  2. Live ids       id-only query with the base filter (+ optional cheap
+                    check columns) → rows gone from it are dropped
+                    (deletions, soft deletes, rows leaving the filter);
+                    rows whose check columns differ from the cache, or
+                    ids the cache has never seen, are re-fetched by id
+  3. Watermark      DB NOW() taken before step 1, minus a small overlap
+
+A full reload still runs every `full_reload_seconds` (picks up renamed
+products/warehouses/employees and recomputes time-based columns).
+
+Every get() syncs — callers keep their own short cache (the pages'
+@st.cache_data), and _cached_bootstrap.clear() after a write therefore
+always sees the write on the next render.
+
+Usage:
+    store = get_delta_store(ORDERS_ENTITY)
+    orders = store.get()        # copy, synced
+    store.invalidate()          # force full reload on next get()
+
+Version: 1.0.0
+"""
+
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+import pandas as pd
+from sqlalchemy import text
+
+from utils.db import get_db_engine
+
+logger = logging.getLogger(__name__)
+
+
+DELTA_SYNC_CONFIG = {
+    'full_reload_seconds': 900,        # periodic full reload
+    'watermark_overlap_seconds': 5,    # re-read window for in-flight transactions
+    'id_chunk_size': 500,              # ids per re-fetch query
+}
+
+
+@dataclass
+class DeltaEntity:
+    """
+    How to load one entity.
+
+    select_sql must be 'SELECT ... FROM ... WHERE <base filter>' without
+    ORDER BY; conditions are appended with AND.
+    """
+    name: str
+    select_sql: str
+    key_sql: str                          # key expression in select_sql, e.g. 'o.id'
+    changed_sql: List[str]                # timestamp expressions, e.g. ['o.created_date']
+    ids_sql: str                          # SELECT <key> AS id [, check columns] ... WHERE <base filter>
+    check_columns: List[str] = field(default_factory=list)
+    key_column: str = 'id'
+    sort_by: List[str] = field(default_factory=lambda: ['created_date', 'id'])
+    sort_ascending: bool = False
+    params: Dict[str, Any] = field(default_factory=dict)
+    post_process: Optional[Callable[[pd.DataFrame], pd.DataFrame]] = None
+
+
+class DeltaSyncStore:
+    """Process-wide cached DataFrame for one entity, kept current by delta sync"""
+
+    def __init__(self, entity: DeltaEntity, engine=None):
+        self.entity = entity
+        self._engine = engine
+        self._df: Optional[pd.DataFrame] = None
+        self._since: Optional[datetime] = None
+        self._built_at: float = 0.0
+        self._synced_at: float = 0.0
+        self._unjoinable: set = set()
+        self._lock = threading.Lock()
+        self._stats = {'full_loads': 0, 'delta_syncs': 0, 'rows_refreshed': 0, 'rows_dropped': 0}
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            self._engine = get_db_engine()
+        return self._engine
+
+    # ==================== Public API ====================
+
+    def get(self) -> pd.DataFrame:
+        """Synced copy of the entity DataFrame (raises on DB errors)"""
+        with self._lock:
+            now = time.monotonic()
+            if self._df is None or now - self._built_at > DELTA_SYNC_CONFIG['full_reload_seconds']:
+                self._full_load()
+            else:
+                self._delta_sync()
+            return self._df.copy()
+
+    def invalidate(self):
+        """Drop the cache — next get() does a full load"""
+        with self._lock:
+            self._df = None
+            self._unjoinable = set()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self._stats,
+            'entity': self.entity.name,
+            'rows': len(self._df) if self._df is not None else 0,
+            'watermark': self._since,
+        }
+
+    # ==================== Sync ====================
+
+    def _full_load(self):
+        _t0 = time.perf_counter()
+        since = self._read_watermark()
+        df = self._read(self.entity.select_sql)
+
+        self._df = self._finalize(df)
+        self._since = since
+        self._built_at = self._synced_at = time.monotonic()
+        self._unjoinable = set()
+        self._stats['full_loads'] += 1
+        logger.info(
+            f"[PERF] delta_store[{self.entity.name}] full load: "
+            f"{(time.perf_counter() - _t0) * 1000:.0f}ms ({len(df)} rows)"
+        )
+
+    def _delta_sync(self):
+        _t0 = time.perf_counter()
+        entity = self.entity
+        key = entity.key_column
+        since = self._read_watermark()
+
+        # 1. Rows created/updated since the watermark
+        changed_filter = ' OR '.join(f"{expr} >= :_since" for expr in entity.changed_sql)
+        changed = self._read(f"{entity.select_sql} AND ({changed_filter})", {'_since': self._since})
+
+        # 2. Live ids (+ check columns) → deletions and silent updates
+        live = self._read(entity.ids_sql)
+        live_ids = set(live['id'])
+
+        df = self._df
+        dropped = int((~df[key].isin(live_ids)).sum())
+        if dropped:
+            df = df[df[key].isin(live_ids)]
+
+        refetch = set()
+        if entity.check_columns and not df.empty:
+            cached = df.set_index(key)[entity.check_columns]
+            current = live.set_index('id')[entity.check_columns].reindex(cached.index)
+            differs = ((cached != current) & ~(cached.isna() & current.isna())).any(axis=1)
+            refetch.update(differs[differs].index)
+
+        changed_ids = set(changed[key]) if not changed.empty else set()
+        unseen = live_ids - set(df[key]) - changed_ids - self._unjoinable
+        refetch = (refetch | unseen) - changed_ids
+
+        fetched = self._read_by_ids(refetch)
+        self._unjoinable |= unseen - (set(fetched[key]) if not fetched.empty else set())
+
+        updates = [f for f in (changed, fetched) if not f.empty]
+        if updates:
+            upd = pd.concat(updates, ignore_index=True).drop_duplicates(key, keep='last')
+            df = pd.concat([df[~df[key].isin(upd[key])], upd], ignore_index=True)
+
+        if updates or dropped:
+            df = self._finalize(df)
+
+        self._df = df
+        self._since = since
+        self._synced_at = time.monotonic()
+        n_refreshed = len(changed_ids) + (len(fetched) if not fetched.empty else 0)
+        self._stats['delta_syncs'] += 1
+        self._stats['rows_refreshed'] += n_refreshed
+        self._stats['rows_dropped'] += dropped
+        logger.info(
+            f"[PERF] delta_store[{entity.name}] delta sync: "
+            f"{(time.perf_counter() - _t0) * 1000:.0f}ms "
+            f"({n_refreshed} refreshed, {dropped} dropped, {len(df)} rows)"
+        )
+
+    # ==================== Helpers ====================
+
+    def _read(self, sql: str, params: Optional[Dict[str, Any]] = None) -> pd.DataFrame:
+        all_params = {**self.entity.params, **(params or {})}
+        return pd.read_sql(text(sql), self.engine, params=all_params)
+
+    def _read_by_ids(self, ids) -> pd.DataFrame:
+        ids = sorted(int(i) for i in ids)
+        if not ids:
+            return pd.DataFrame()
+        frames = []
+        size = DELTA_SYNC_CONFIG['id_chunk_size']
+        for start in range(0, len(ids), size):
+            chunk = ids[start:start + size]
+            params = {f'_id_{i}': v for i, v in enumerate(chunk)}
+            placeholders = ', '.join(f':{k}' for k in params)
+            frames.append(self._read(
+                f"{self.entity.select_sql} AND {self.entity.key_sql} IN ({placeholders})", params
+            ))
+        return pd.concat(frames, ignore_index=True)
+
+    def _read_watermark(self) -> datetime:
+        with self.engine.connect() as conn:
+            db_now = conn.execute(text("SELECT NOW()")).scalar()
+        overlap = timedelta(seconds=DELTA_SYNC_CONFIG['watermark_overlap_seconds'])
+        return pd.Timestamp(db_now).to_pydatetime() - overlap
+
+    def _finalize(self, df: pd.DataFrame) -> pd.DataFrame:
+        entity = self.entity
+        if entity.post_process is not None and not df.empty:
+            df = entity.post_process(df)
+        sort_cols = [c for c in entity.sort_by if c in df.columns]
+        if sort_cols and not df.empty:
+            df = df.sort_values(sort_cols, ascending=entity.sort_ascending, kind='mergesort')
+        return df.reset_index(drop=True)
+
+
+# ==================== Registry ====================
+
+_stores: Dict[str, DeltaSyncStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_delta_store(entity: DeltaEntity) -> DeltaSyncStore:
+    """Process-wide store for entity (keyed by entity.name)"""
+    store = _stores.get(entity.name)
+    if store is None:
+        with _stores_lock:
+            store = _stores.get(entity.name)
+            if store is None:
+                store = DeltaSyncStore(entity)
+                _stores[entity.name] = store
+    return store
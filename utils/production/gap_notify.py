@@ -0,0 +1,113 @@
+# utils/production/gap_notify.py
+"""
+Supply Chain GAP cache notifications for production writes
+
+The shared GAP result cache (utils.supply_chain_gap.result_cache) patches a
+stale result for the notified products only when the notified rows explain
+every change marker. Production writers therefore report, after commit, the
+products a manufacturing order touches and the ids of its rows in the
+marker tables:
+
+    with engine.begin() as conn:
+        ...write...
+        change = collect_order_changes(conn, order_id, group_id=group_id)
+    notify_gap_cache(change)
+
+Rows are collected per order (not per statement): every row of the order in
+manufacturing_orders / manufacturing_order_materials / material_issues /
+material_returns / production_receipts, plus the inventory_histories rows
+of the write's group_id and of the order's receipts. Notifying a row that
+did not change is harmless — its products are recalculated anyway.
+
+Version: 1.0.0
+"""
+
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class OrderChange:
+    """Products + marker-table row ids written for one manufacturing order"""
+    product_ids: Tuple[int, ...] = ()
+    rows: Dict[str, Tuple[int, ...]] = field(default_factory=dict)
+
+
+_ORDER_ROWS_QUERIES = {
+    'manufacturing_orders': "SELECT id FROM manufacturing_orders WHERE id = :order_id",
+    'manufacturing_order_materials': """
+        SELECT id FROM manufacturing_order_materials WHERE manufacturing_order_id = :order_id
+    """,
+    'material_issues': "SELECT id FROM material_issues WHERE manufacturing_order_id = :order_id",
+    'material_returns': "SELECT id FROM material_returns WHERE manufacturing_order_id = :order_id",
+    'production_receipts': """
+        SELECT id FROM production_receipts WHERE manufacturing_order_id = :order_id
+    """,
+}
+
+# Output product, required materials and every material actually moved
+# (alternatives included)
+_ORDER_PRODUCTS_QUERY = """
+    SELECT product_id FROM manufacturing_orders WHERE id = :order_id
+    UNION
+    SELECT material_id FROM manufacturing_order_materials
+    WHERE manufacturing_order_id = :order_id
+    UNION
+    SELECT mid.material_id
+    FROM material_issue_details mid
+    JOIN material_issues mi ON mi.id = mid.material_issue_id
+    WHERE mi.manufacturing_order_id = :order_id
+"""
+
+_ORDER_INVENTORY_QUERY = """
+    SELECT ih.id, ih.product_id
+    FROM inventory_histories ih
+    JOIN production_receipts pr ON pr.id = ih.action_detail_id
+    WHERE ih.type = 'stockInProduction'
+      AND pr.manufacturing_order_id = :order_id
+"""
+
+
+def collect_order_changes(conn, order_id: int, group_id: Optional[str] = None) -> OrderChange:
+    """
+    Products and marker-table rows of an order, read inside the write's
+    transaction (so the order's new rows are visible)
+
+    Args:
+        conn: Connection of the write transaction
+        order_id: Manufacturing order ID
+        group_id: inventory_histories.group_id of the write, if it moved stock
+    """
+    params = {'order_id': order_id}
+    rows = {
+        table: tuple(int(r[0]) for r in conn.execute(text(query), params))
+        for table, query in _ORDER_ROWS_QUERIES.items()
+    }
+    product_ids = {int(r[0]) for r in conn.execute(text(_ORDER_PRODUCTS_QUERY), params)
+                   if r[0] is not None}
+
+    inventory = list(conn.execute(text(_ORDER_INVENTORY_QUERY), params))
+    if group_id:
+        inventory.extend(conn.execute(text("""
+            SELECT id, product_id FROM inventory_histories WHERE group_id = :group_id
+        """), {'group_id': group_id}))
+    rows['inventory_histories'] = tuple(sorted({int(r[0]) for r in inventory}))
+    product_ids.update(int(r[1]) for r in inventory if r[1] is not None)
+
+    return OrderChange(product_ids=tuple(sorted(product_ids)), rows=rows)
+
+
+def notify_gap_cache(change: Optional[OrderChange]):
+    """Tell the shared GAP result cache about a committed production write"""
+    if change is None or not change.product_ids:
+        return
+    try:
+        from utils.supply_chain_gap.result_cache import get_result_cache
+        get_result_cache().notify_changes(change.product_ids, rows=change.rows)
+    except Exception as e:
+        logger.warning(f"Could not notify GAP result cache: {e}")
@@ -3,8 +3,13 @@
 Issue Manager - Business logic for Material Issues
 Issue materials using FEFO with alternative substitution
 
-Version: 1.0.0
+Version: 1.2.0
 Based on: materials.py v8.2
+
+Changes:
+- v1.2.0: Issues notify the Supply Chain GAP result cache (gap_notify)
+- v1.1.0: Bulk FEFO allocation (FEFOAllocationEngine) — one lock query,
+          in-memory batch split, bulk detail/inventory/order-material writes
 """
 
 import logging
@@ -16,7 +21,10 @@ import pandas as pd
 from sqlalchemy import text
 
 from utils.db import get_db_engine
+from utils.doc_sequence import next_document_number
+from utils.production.gap_notify import collect_order_changes, notify_gap_cache
 from .common import get_vietnam_now
+from .fefo_allocation import FEFOAllocationEngine
 
 logger = logging.getLogger(__name__)
 
@@ -104,6 +112,20 @@ class IssueManager:
                 issue_details = []
                 substitutions = []
                 
+                # BOM details + alternatives for all materials (2 queries)
+                bom_infos = self._get_bom_detail_infos(conn, order_id)
+                alternatives_by_detail = {}
+                if alternative_quantities:
+                    alternatives_by_detail = self._get_alternatives_for_details(
+                        conn, [info['bom_detail_id'] for info in bom_infos.values()]
+                    )
+                
+                # Lock every batch this issue can touch in one ordered query
+                allocator = FEFOAllocationEngine(conn, order['warehouse_id'])
+                allocator.lock_batches(self._materials_to_lock(
+                    materials, bom_infos, alternatives_by_detail, alternative_quantities
+                ))
+                
                 # Issue each material
                 for _, mat in materials.iterrows():
                     material_id = int(mat['material_id'])
@@ -131,9 +153,7 @@ class IssueManager:
                         
                         # Validate stock only for primary if issuing primary
                         if qty_to_issue > 0:
-                            available = self._get_available_stock(
-                                conn, material_id, order['warehouse_id']
-                            )
+                            available = allocator.available(material_id)
                             if qty_to_issue > available and not should_use_alternatives:
                                 raise ValueError(
                                     f"Cannot issue {qty_to_issue} of {mat['material_name']} - "
@@ -141,11 +161,10 @@ class IssueManager:
                                 )
                         
                         try:
+                            bom_info = bom_infos.get(int(mat['order_material_id']))
                             issued = self._issue_material_with_alternatives(
-                                conn, issue_id, order_id, mat,
-                                qty_to_issue, order['warehouse_id'],
-                                group_id, user_id, keycloak_id,
-                                order.get('entity_id', 1),
+                                allocator, mat, qty_to_issue, bom_info,
+                                alternatives_by_detail.get(bom_info['bom_detail_id'], []) if bom_info else [],
                                 alternative_quantities=alternative_quantities
                             )
                             issue_details.extend(issued['details'])
@@ -155,6 +174,9 @@ class IssueManager:
                             logger.error(f"Failed to issue {mat['material_name']}: {e}")
                             raise
                 
+                # Write details, inventory and order materials in bulk
+                allocator.flush(issue_id, group_id, keycloak_id)
+                
                 # Update order status
                 status_query = text("""
                     UPDATE manufacturing_orders
@@ -164,19 +186,21 @@ class IssueManager:
                     WHERE id = :order_id
                 """)
                 conn.execute(status_query, {'order_id': order_id, 'user_id': user_id})
+                change = collect_order_changes(conn, order_id, group_id=group_id)
                 
                 logger.info(f"✅ Issued materials for order {order_id}, issue no: {issue_no}")
                 
-                return {
-                    'issue_no': issue_no,
-                    'issue_id': issue_id,
-                    'details': issue_details,
-                    'substitutions': substitutions
-                }
-                
             except Exception as e:
                 logger.error(f"❌ Error issuing materials: {e}")
                 raise
+        
+        notify_gap_cache(change)
+        return {
+            'issue_no': issue_no,
+            'issue_id': issue_id,
+            'details': issue_details,
+            'substitutions': substitutions
+        }
     
     # ==================== Private Helper Methods ====================
     
@@ -220,85 +244,55 @@ class IssueManager:
         
         return pd.read_sql(query, conn, params=(order_id,))
     
-    def _get_available_stock(self, conn, material_id: int, warehouse_id: int) -> float:
-        """Get available stock for a material"""
-        query = text("""
-            SELECT COALESCE(SUM(remain), 0) as available
-            FROM inventory_histories
-            WHERE product_id = :material_id
-                AND warehouse_id = :warehouse_id
-                AND remain > 0
-                AND delete_flag = 0
-        """)
-        
-        result = conn.execute(query, {
-            'material_id': material_id,
-            'warehouse_id': warehouse_id
-        })
-        row = result.fetchone()
-        return float(row[0]) if row else 0.0
-    
     def _generate_issue_number(self, conn) -> str:
         """Generate unique issue number MI-YYYYMMDD-XXX"""
         timestamp = get_vietnam_now().strftime('%Y%m%d')
-        prefix = f"MI-{timestamp}-"
-        
-        query = text("""
-            SELECT COALESCE(
-                MAX(CAST(SUBSTRING_INDEX(issue_no, '-', -1) AS UNSIGNED)), 0
-            ) + 1 as next_num
-            FROM material_issues
-            WHERE issue_no LIKE :pattern
-            FOR UPDATE
-        """)
-        
-        result = conn.execute(query, {'pattern': f'{prefix}%'})
-        row = result.fetchone()
-        next_num = int(row[0]) if row and row[0] else 1
-        
-        return f"{prefix}{next_num:03d}"
+        return next_document_number(
+            f"MI-{timestamp}-", 'material_issues', 'issue_no', conn=conn
+        )
+    
+    def _materials_to_lock(self, materials: pd.DataFrame, bom_infos: Dict[int, Dict],
+                           alternatives_by_detail: Dict[int, List[Dict]],
+                           alternative_quantities: Dict[str, float] = None) -> List[int]:
+        """Primary materials + alternatives with a requested quantity"""
+        material_ids = [int(m) for m in materials['material_id']]
+        if alternative_quantities:
+            for _, mat in materials.iterrows():
+                bom_info = bom_infos.get(int(mat['order_material_id']))
+                if not bom_info:
+                    continue
+                for alt in alternatives_by_detail.get(bom_info['bom_detail_id'], []):
+                    if alternative_quantities.get(f"{int(mat['material_id'])}_{alt['id']}", 0) > 0:
+                        material_ids.append(int(alt['alternative_material_id']))
+        return material_ids
     
-    def _issue_material_with_alternatives(self, conn, issue_id: int, order_id: int,
+    def _issue_material_with_alternatives(self, allocator: FEFOAllocationEngine,
                                          material: pd.Series, required_qty: float,
-                                         warehouse_id: int, group_id: str,
-                                         user_id: int, keycloak_id: str,
-                                         entity_id: int,
+                                         bom_info: Optional[Dict],
+                                         alternatives: List[Dict],
                                          alternative_quantities: Dict[str, float] = None) -> Dict[str, Any]:
         """Issue material with FEFO and alternative substitution"""
         issued_details = []
         substitutions = []
         
         material_id = int(material['material_id'])
-        
-        # Get BOM detail info
-        bom_info = self._get_bom_detail_info(conn, material['order_material_id'])
         primary_bom_qty = float(bom_info['quantity']) if bom_info else 1.0
         
         # Issue primary material (quantity from custom_quantities, passed as required_qty)
-        primary_issued = 0.0
         if required_qty > 0:
             try:
-                primary_details = self._issue_single_material_fefo(
-                    conn, issue_id, order_id, material,
-                    required_qty, warehouse_id, group_id,
-                    user_id, keycloak_id, entity_id,
+                primary_details = allocator.allocate(
+                    material['order_material_id'], material_id,
+                    material['material_name'], material['uom'], required_qty,
                     is_alternative=False, original_material_id=None,
                     conversion_ratio=1.0
                 )
                 issued_details.extend(primary_details)
-                
-                for detail in primary_details:
-                    primary_issued += float(detail['quantity'])
-                    
             except ValueError as e:
                 logger.warning(f"⚠️ Insufficient primary {material['material_name']}: {e}")
         
         # Issue alternatives based on specified quantities
         if alternative_quantities and bom_info:
-            alternatives = self._get_alternatives_for_material(
-                conn, bom_info['bom_detail_id']
-            )
-            
             for alt in alternatives:
                 # Use alt['id'] (bom_material_alternatives.id) to match key format from forms.py
                 alt_key = f"{material_id}_{alt['id']}"
@@ -310,17 +304,9 @@ class IssueManager:
                 try:
                     conversion_ratio = float(alt['quantity']) / primary_bom_qty
                     
-                    alt_material = pd.Series({
-                        'order_material_id': material['order_material_id'],
-                        'material_id': alt['alternative_material_id'],
-                        'material_name': alt['alternative_material_name'],
-                        'uom': alt['uom']
-                    })
-                    
-                    alt_details = self._issue_single_material_fefo(
-                        conn, issue_id, order_id, alt_material,
-                        alt_qty_to_issue, warehouse_id, group_id,
-                        user_id, keycloak_id, entity_id,
+                    alt_details = allocator.allocate(
+                        material['order_material_id'], alt['alternative_material_id'],
+                        alt['alternative_material_name'], alt['uom'], alt_qty_to_issue,
                         is_alternative=True,
                         original_material_id=material['material_id'],
                         conversion_ratio=conversion_ratio
@@ -349,174 +335,11 @@ class IssueManager:
         
         return {'details': issued_details, 'substitutions': substitutions}
     
-    def _issue_single_material_fefo(self, conn, issue_id: int, order_id: int,
-                                   material: pd.Series, required_qty: float,
-                                   warehouse_id: int, group_id: str,
-                                   user_id: int, keycloak_id: str, entity_id: int,
-                                   is_alternative: bool = False,
-                                   original_material_id: Optional[int] = None,
-                                   conversion_ratio: float = 1.0) -> List[Dict]:
-        """Issue single material using FEFO"""
-        # Get batches
-        batch_query = text("""
-            SELECT 
-                id as inventory_history_id,
-                batch_no, expired_date, remain as available_qty
-            FROM inventory_histories
-            WHERE product_id = :material_id
-                AND warehouse_id = :warehouse_id
-                AND remain > 0 AND delete_flag = 0
-            ORDER BY COALESCE(expired_date, '2099-12-31') ASC, created_date ASC
-            FOR UPDATE
-        """)
-        
-        batch_result = conn.execute(batch_query, {
-            'material_id': material['material_id'],
-            'warehouse_id': warehouse_id
-        })
-        
-        batches = [dict(zip(batch_result.keys(), row)) for row in batch_result]
-        
-        if not batches:
-            raise ValueError(f"No stock for {material['material_name']}")
-        
-        issued_details = []
-        total_actual_issued = 0.0
-        total_equivalent_issued = 0.0
-        
-        for batch in batches:
-            if total_actual_issued >= required_qty:
-                break
-            
-            batch_available = float(batch['available_qty'])
-            required_remaining = float(required_qty) - float(total_actual_issued)
-            issue_qty = min(batch_available, required_remaining)
-            
-            # Insert issue detail
-            detail_id = self._insert_issue_detail(
-                conn, issue_id, material['order_material_id'],
-                material['material_id'], batch, issue_qty, material['uom'],
-                is_alternative, original_material_id
-            )
-            
-            # Update inventory
-            self._update_inventory_for_issue(
-                conn, batch['inventory_history_id'], material['material_id'],
-                warehouse_id, issue_qty, batch['batch_no'], batch['expired_date'],
-                group_id, keycloak_id, detail_id
-            )
-            
-            issued_details.append({
-                'detail_id': detail_id,
-                'material_id': material['material_id'],
-                'material_name': material['material_name'],
-                'batch_no': batch['batch_no'],
-                'quantity': issue_qty,
-                'uom': material['uom'],
-                'expired_date': batch['expired_date'],
-                'is_alternative': is_alternative,
-                'original_material_id': original_material_id,
-                'conversion_ratio': conversion_ratio
-            })
-            
-            total_actual_issued += issue_qty
-            total_equivalent_issued += issue_qty / conversion_ratio
-        
-        if total_actual_issued < required_qty:
-            raise ValueError(f"Insufficient stock: need {required_qty}, have {total_actual_issued}")
-        
-        # Update order materials with equivalent qty
-        update_query = text("""
-            UPDATE manufacturing_order_materials
-            SET issued_qty = COALESCE(issued_qty, 0) + :equivalent_issued,
-                status = CASE 
-                    WHEN COALESCE(issued_qty, 0) + :equivalent_issued >= required_qty THEN 'ISSUED'
-                    WHEN COALESCE(issued_qty, 0) + :equivalent_issued > 0 THEN 'PARTIAL'
-                    ELSE 'PENDING'
-                END
-            WHERE id = :order_material_id
-        """)
-        
-        conn.execute(update_query, {
-            'equivalent_issued': total_equivalent_issued,
-            'order_material_id': material['order_material_id']
-        })
-        
-        return issued_details
-    
-    def _insert_issue_detail(self, conn, issue_id: int, order_material_id: int,
-                            material_id: int, batch: Dict, quantity: float,
-                            uom: str, is_alternative: bool,
-                            original_material_id: Optional[int]) -> int:
-        """Insert issue detail record with full tracking"""
-        query = text("""
-            INSERT INTO material_issue_details (
-                material_issue_id, manufacturing_order_material_id,
-                material_id, inventory_history_id, batch_no, quantity, uom, expired_date,
-                is_alternative, original_material_id
-            ) VALUES (
-                :issue_id, :order_material_id,
-                :material_id, :inventory_history_id, :batch_no, :quantity, :uom, :expired_date,
-                :is_alternative, :original_material_id
-            )
-        """)
-        
-        result = conn.execute(query, {
-            'issue_id': issue_id,
-            'order_material_id': order_material_id,
-            'material_id': material_id,
-            'inventory_history_id': batch.get('inventory_history_id'),
-            'batch_no': batch['batch_no'],
-            'quantity': quantity,
-            'uom': uom,
-            'expired_date': batch['expired_date'],
-            'is_alternative': 1 if is_alternative else 0,
-            'original_material_id': original_material_id
-        })
-        
-        return result.lastrowid
-    
-    def _update_inventory_for_issue(self, conn, inventory_id: int, material_id: int,
-                                   warehouse_id: int, quantity: float,
-                                   batch_no: str, expired_date, group_id: str,
-                                   keycloak_id: str, detail_id: int):
-        """Update inventory for issue"""
-        # Reduce remain
-        update_query = text("""
-            UPDATE inventory_histories
-            SET remain = remain - :quantity
-            WHERE id = :inventory_id
-        """)
-        conn.execute(update_query, {'quantity': quantity, 'inventory_id': inventory_id})
-        
-        # Create OUT record
-        out_query = text("""
-            INSERT INTO inventory_histories (
-                product_id, warehouse_id, type,
-                quantity, remain, batch_no, expired_date,
-                group_id, action_detail_id, created_by, created_date
-            ) VALUES (
-                :material_id, :warehouse_id, 'stockOutProduction',
-                :quantity, 0, :batch_no, :expired_date,
-                :group_id, :detail_id, :created_by, NOW()
-            )
-        """)
-        
-        conn.execute(out_query, {
-            'material_id': material_id,
-            'warehouse_id': warehouse_id,
-            'quantity': quantity,
-            'batch_no': batch_no,
-            'expired_date': expired_date,
-            'group_id': group_id,
-            'detail_id': detail_id,
-            'created_by': keycloak_id
-        })
-    
-    def _get_bom_detail_info(self, conn, order_material_id: int) -> Optional[Dict]:
-        """Get BOM detail info for material"""
+    def _get_bom_detail_infos(self, conn, order_id: int) -> Dict[int, Dict]:
+        """BOM detail info per order material (first match, as LIMIT 1 before)"""
         query = text("""
             SELECT 
+                mom.id as order_material_id,
                 bd.id as bom_detail_id,
                 bd.quantity,
                 bd.scrap_rate
@@ -524,29 +347,36 @@ class IssueManager:
             JOIN manufacturing_orders mo ON mom.manufacturing_order_id = mo.id
             JOIN bom_details bd ON bd.bom_header_id = mo.bom_header_id
                 AND bd.material_id = mom.material_id
-            WHERE mom.id = :order_material_id
-            LIMIT 1
+            WHERE mom.manufacturing_order_id = :order_id
+            ORDER BY mom.id, bd.id
         """)
         
-        result = conn.execute(query, {'order_material_id': order_material_id})
-        row = result.fetchone()
-        
-        if row:
-            return dict(zip(result.keys(), row))
-        return None
+        infos: Dict[int, Dict] = {}
+        for row in conn.execute(query, {'order_id': order_id}).mappings():
+            infos.setdefault(int(row['order_material_id']), dict(row))
+        return infos
     
-    def _get_alternatives_for_material(self, conn, bom_detail_id: int) -> List[Dict]:
-        """Get alternatives ordered by priority"""
-        query = text("""
+    def _get_alternatives_for_details(self, conn, bom_detail_ids: List[int]) -> Dict[int, List[Dict]]:
+        """Active alternatives per BOM detail, ordered by priority"""
+        bom_detail_ids = sorted({int(d) for d in bom_detail_ids})
+        if not bom_detail_ids:
+            return {}
+        
+        params = {f'd_{i}': d for i, d in enumerate(bom_detail_ids)}
+        query = text(f"""
             SELECT 
+                alt.bom_detail_id,
                 alt.id, alt.alternative_material_id,
                 p.name as alternative_material_name,
                 alt.quantity, alt.uom, alt.priority
             FROM bom_material_alternatives alt
             JOIN products p ON alt.alternative_material_id = p.id
-            WHERE alt.bom_detail_id = :bom_detail_id AND alt.is_active = 1
-            ORDER BY alt.priority ASC
+            WHERE alt.bom_detail_id IN ({', '.join(f':{k}' for k in params)})
+                AND alt.is_active = 1
+            ORDER BY alt.bom_detail_id, alt.priority ASC
         """)
         
-        result = conn.execute(query, {'bom_detail_id': bom_detail_id})
-        return [dict(zip(result.keys(), row)) for row in result]
\ No newline at end of file
+        alternatives: Dict[int, List[Dict]] = {}
+        for row in conn.execute(query, params).mappings():
+            alternatives.setdefault(int(row['bom_detail_id']), []).append(dict(row))
+        return alternatives
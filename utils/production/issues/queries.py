@@ -3,8 +3,13 @@
 Database queries for Issues domain
 All SQL queries are centralized here for easy maintenance
 
-Version: 1.1.0
+Version: 1.4.0
 Changes:
+- get_issue_details_bulk() / get_issue_materials_bulk() for batch printing
+  (detail SQL shared with the single-issue queries)
+- get_all_issues() served from the delta-sync store
+- Material availability via MaterialAvailabilityService (set-based,
+  replaces one alternatives query per material)
 - Added connection check method
 - Better error handling to distinguish connection errors from no data
 """
@@ -19,15 +24,120 @@ from sqlalchemy import text
 from sqlalchemy.exc import OperationalError, DatabaseError
 
 from utils.db import get_db_engine
+from utils.production.delta_store import DeltaEntity, get_delta_store
+from utils.production.material_availability import MaterialAvailabilityService
 
 logger = logging.getLogger(__name__)
 
 
+# ==================== Delta-sync entity ====================
+
+_ISSUES_SELECT = """
+    SELECT 
+        mi.id,
+        mi.issue_no,
+        mi.issue_date,
+        mi.status,
+        mi.notes,
+        mi.created_date,
+        mo.order_no,
+        mo.id as order_id,
+        p.name as product_name,
+        p.pt_code,
+        p.legacy_pt_code,
+        p.package_size,
+        br.brand_name as brand_name,
+        w.name as warehouse_name,
+        CONCAT(e_issued.first_name, ' ', e_issued.last_name) as issued_by_name,
+        CONCAT(e_received.first_name, ' ', e_received.last_name) as received_by_name,
+        (SELECT COUNT(*) FROM material_issue_details WHERE material_issue_id = mi.id) as item_count
+    FROM material_issues mi
+    JOIN manufacturing_orders mo ON mi.manufacturing_order_id = mo.id
+    JOIN products p ON mo.product_id = p.id
+    LEFT JOIN brands br ON p.brand_id = br.id
+    JOIN warehouses w ON mi.warehouse_id = w.id
+    LEFT JOIN employees e_issued ON mi.issued_by = e_issued.id
+    LEFT JOIN employees e_received ON mi.received_by = e_received.id
+    WHERE 1=1
+"""
+
+ISSUES_DELTA_ENTITY = DeltaEntity(
+    name='issues',
+    select_sql=_ISSUES_SELECT,
+    key_sql='mi.id',
+    changed_sql=['mi.created_date'],
+    ids_sql="SELECT mi.id, mi.status FROM material_issues mi",
+    check_columns=['status'],
+)
+
+
+_ISSUE_DETAILS_SELECT = """
+    SELECT 
+        mi.id,
+        mi.issue_no,
+        mi.issue_date,
+        mi.status,
+        mi.notes,
+        mi.created_date,
+        mi.warehouse_id,
+        mo.order_no,
+        mo.id as order_id,
+        p.name as product_name,
+        p.pt_code,
+        p.legacy_pt_code,
+        p.package_size,
+        br.brand_name as brand_name,
+        mo.planned_qty,
+        mo.uom as product_uom,
+        w.name as warehouse_name,
+        mi.issued_by as issued_by_id,
+        CONCAT(e_issued.first_name, ' ', e_issued.last_name) as issued_by_name,
+        mi.received_by as received_by_id,
+        CONCAT(e_received.first_name, ' ', e_received.last_name) as received_by_name,
+        mi.created_by as created_by_id,
+        CONCAT(e_created.first_name, ' ', e_created.last_name) as created_by_name
+    FROM material_issues mi
+    JOIN manufacturing_orders mo ON mi.manufacturing_order_id = mo.id
+    JOIN products p ON mo.product_id = p.id
+    LEFT JOIN brands br ON p.brand_id = br.id
+    JOIN warehouses w ON mi.warehouse_id = w.id
+    LEFT JOIN employees e_issued ON mi.issued_by = e_issued.id
+    LEFT JOIN employees e_received ON mi.received_by = e_received.id
+    LEFT JOIN users u ON mi.created_by = u.id
+    LEFT JOIN employees e_created ON u.employee_id = e_created.id
+"""
+
+_ISSUE_MATERIALS_SELECT = """
+    SELECT 
+        mid.material_issue_id,
+        mid.id,
+        mid.material_id,
+        p.name as material_name,
+        p.pt_code,
+        p.legacy_pt_code,
+        p.package_size,
+        br.brand_name as brand_name,
+        mid.batch_no,
+        mid.quantity,
+        mid.uom,
+        mid.expired_date,
+        COALESCE(mid.is_alternative, 0) as is_alternative,
+        mid.original_material_id,
+        op.name as original_material_name,
+        op.legacy_pt_code as original_legacy_pt_code
+    FROM material_issue_details mid
+    JOIN products p ON mid.material_id = p.id
+    LEFT JOIN brands br ON p.brand_id = br.id
+    LEFT JOIN products op ON mid.original_material_id = op.id
+"""
+
+
 class IssueQueries:
     """Database queries for Material Issue management"""
     
     def __init__(self):
         self.engine = get_db_engine()
+        self._availability = MaterialAvailabilityService(self.engine)
         self._connection_error = None
     
     def check_connection(self) -> Tuple[bool, Optional[str]]:
@@ -197,42 +307,7 @@ class IssueQueries:
     
     def get_issue_details(self, issue_id: int) -> Optional[Dict[str, Any]]:
         """Get detailed information for a single issue"""
-        query = """
-            SELECT 
-                mi.id,
-                mi.issue_no,
-                mi.issue_date,
-                mi.status,
-                mi.notes,
-                mi.created_date,
-                mi.warehouse_id,
-                mo.order_no,
-                mo.id as order_id,
-                p.name as product_name,
-                p.pt_code,
-                p.legacy_pt_code,
-                p.package_size,
-                br.brand_name as brand_name,
-                mo.planned_qty,
-                mo.uom as product_uom,
-                w.name as warehouse_name,
-                mi.issued_by as issued_by_id,
-                CONCAT(e_issued.first_name, ' ', e_issued.last_name) as issued_by_name,
-                mi.received_by as received_by_id,
-                CONCAT(e_received.first_name, ' ', e_received.last_name) as received_by_name,
-                mi.created_by as created_by_id,
-                CONCAT(e_created.first_name, ' ', e_created.last_name) as created_by_name
-            FROM material_issues mi
-            JOIN manufacturing_orders mo ON mi.manufacturing_order_id = mo.id
-            JOIN products p ON mo.product_id = p.id
-            LEFT JOIN brands br ON p.brand_id = br.id
-            JOIN warehouses w ON mi.warehouse_id = w.id
-            LEFT JOIN employees e_issued ON mi.issued_by = e_issued.id
-            LEFT JOIN employees e_received ON mi.received_by = e_received.id
-            LEFT JOIN users u ON mi.created_by = u.id
-            LEFT JOIN employees e_created ON u.employee_id = e_created.id
-            WHERE mi.id = %s
-        """
+        query = _ISSUE_DETAILS_SELECT + " WHERE mi.id = %s"
         
         try:
             result = pd.read_sql(query, self.engine, params=(issue_id,))
@@ -241,32 +316,24 @@ class IssueQueries:
             logger.error(f"Error getting issue details for {issue_id}: {e}")
             return None
     
+    def get_issue_details_bulk(self, issue_ids: List[int]) -> pd.DataFrame:
+        """Details for several issues in one query (batch printing)"""
+        issue_ids = [int(i) for i in dict.fromkeys(issue_ids)]
+        if not issue_ids:
+            return pd.DataFrame()
+        
+        placeholders = ', '.join(['%s'] * len(issue_ids))
+        query = _ISSUE_DETAILS_SELECT + f" WHERE mi.id IN ({placeholders})"
+        
+        try:
+            return pd.read_sql(query, self.engine, params=tuple(issue_ids))
+        except Exception as e:
+            logger.error(f"Error getting issue details for {len(issue_ids)} issues: {e}")
+            return pd.DataFrame()
+    
     def get_issue_materials(self, issue_id: int) -> pd.DataFrame:
         """Get materials for an issue"""
-        query = """
-            SELECT 
-                mid.id,
-                mid.material_id,
-                p.name as material_name,
-                p.pt_code,
-                p.legacy_pt_code,
-                p.package_size,
-                br.brand_name as brand_name,
-                mid.batch_no,
-                mid.quantity,
-                mid.uom,
-                mid.expired_date,
-                COALESCE(mid.is_alternative, 0) as is_alternative,
-                mid.original_material_id,
-                op.name as original_material_name,
-                op.legacy_pt_code as original_legacy_pt_code
-            FROM material_issue_details mid
-            JOIN products p ON mid.material_id = p.id
-            LEFT JOIN brands br ON p.brand_id = br.id
-            LEFT JOIN products op ON mid.original_material_id = op.id
-            WHERE mid.material_issue_id = %s
-            ORDER BY p.name, mid.batch_no
-        """
+        query = _ISSUE_MATERIALS_SELECT + " WHERE mid.material_issue_id = %s ORDER BY p.name, mid.batch_no"
         
         try:
             return pd.read_sql(query, self.engine, params=(issue_id,))
@@ -274,6 +341,21 @@ class IssueQueries:
             logger.error(f"Error getting issue materials for {issue_id}: {e}")
             return pd.DataFrame()
     
+    def get_issue_materials_bulk(self, issue_ids: List[int]) -> pd.DataFrame:
+        """Materials of several issues in one query (keyed by material_issue_id)"""
+        issue_ids = [int(i) for i in dict.fromkeys(issue_ids)]
+        if not issue_ids:
+            return pd.DataFrame()
+        
+        placeholders = ', '.join(['%s'] * len(issue_ids))
+        query = _ISSUE_MATERIALS_SELECT + f" WHERE mid.material_issue_id IN ({placeholders}) ORDER BY mid.material_issue_id, p.name, mid.batch_no"
+        
+        try:
+            return pd.read_sql(query, self.engine, params=tuple(issue_ids))
+        except Exception as e:
+            logger.error(f"Error getting issue materials for {len(issue_ids)} issues: {e}")
+            return pd.DataFrame()
+    
     # ==================== Issuable Orders Queries ====================
     
     def get_issuable_orders(self) -> pd.DataFrame:
@@ -366,164 +448,23 @@ class IssueQueries:
         """
         Get material availability for an order including alternatives
         
+        Primaries, alternatives and stock come from MaterialAvailabilityService
+        in two queries (no per-material alternative lookup).
+        
         Returns DataFrame with:
         - material_id, material_name, required_qty, issued_qty, pending_qty
         - available_qty, availability_status
         - has_alternatives, alternative_total_qty, alternative_details
         """
-        # Main materials query
-        query = """
-            SELECT 
-                mom.id as order_material_id,
-                mom.material_id,
-                p.name as material_name,
-                p.pt_code,
-                p.legacy_pt_code,
-                p.package_size,
-                br.brand_name as brand_name,
-                mom.required_qty,
-                COALESCE(mom.issued_qty, 0) as issued_qty,
-                mom.required_qty - COALESCE(mom.issued_qty, 0) as pending_qty,
-                mom.uom,
-                mom.status as material_status,
-                COALESCE(SUM(ih.remain), 0) as available_qty,
-                mo.warehouse_id,
-                bd.id as bom_detail_id,
-                bd.quantity as bom_qty
-            FROM manufacturing_order_materials mom
-            JOIN manufacturing_orders mo ON mom.manufacturing_order_id = mo.id
-            JOIN products p ON mom.material_id = p.id
-            LEFT JOIN brands br ON p.brand_id = br.id
-            LEFT JOIN bom_details bd ON bd.bom_header_id = mo.bom_header_id 
-                AND bd.material_id = mom.material_id
-            LEFT JOIN inventory_histories ih 
-                ON ih.product_id = mom.material_id 
-                AND ih.warehouse_id = mo.warehouse_id
-                AND ih.remain > 0
-                AND ih.delete_flag = 0
-            WHERE mom.manufacturing_order_id = %s
-            GROUP BY mom.id, mom.material_id, p.name, p.pt_code, p.legacy_pt_code, 
-                     p.package_size, br.brand_name, mom.required_qty, mom.issued_qty, 
-                     mom.uom, mom.status, mo.warehouse_id, bd.id, bd.quantity
-            ORDER BY p.name
-        """
-        
-        try:
-            materials = pd.read_sql(query, self.engine, params=(order_id,))
-            
-            if materials.empty:
-                return materials
-            
-            # Initialize new columns with proper types
-            materials['availability_status'] = 'INSUFFICIENT'
-            materials['has_alternatives'] = False
-            materials['alternative_total_qty'] = 0.0
-            # Use object dtype for list column
-            materials['alternative_details'] = None
-            materials['alternative_details'] = materials['alternative_details'].astype(object)
-            
-            # Calculate availability status and get alternatives
-            warehouse_id = int(materials['warehouse_id'].iloc[0])
-            
-            for idx in range(len(materials)):
-                row = materials.iloc[idx]
-                pending = float(row['pending_qty'])
-                available = float(row['available_qty'])
-                
-                # Availability status
-                if available >= pending:
-                    status = 'SUFFICIENT'
-                elif available > 0:
-                    status = 'PARTIAL'
-                else:
-                    status = 'INSUFFICIENT'
-                
-                materials.iloc[idx, materials.columns.get_loc('availability_status')] = status
-                
-                # Get alternatives if bom_detail_id exists
-                if pd.notna(row['bom_detail_id']):
-                    primary_bom_qty = float(row['bom_qty']) if pd.notna(row.get('bom_qty')) else 1.0
-                    alternatives = self._get_material_alternatives(
-                        int(row['bom_detail_id']), warehouse_id, primary_bom_qty
-                    )
-                    materials.iloc[idx, materials.columns.get_loc('has_alternatives')] = len(alternatives) > 0
-                    materials.iloc[idx, materials.columns.get_loc('alternative_total_qty')] = sum(
-                        alt['available'] for alt in alternatives
-                    )
-                    materials.at[idx, 'alternative_details'] = alternatives
-                else:
-                    materials.iloc[idx, materials.columns.get_loc('has_alternatives')] = False
-                    materials.iloc[idx, materials.columns.get_loc('alternative_total_qty')] = 0
-                    materials.at[idx, 'alternative_details'] = []
-            
-            return materials
-            
-        except Exception as e:
-            logger.error(f"Error getting material availability for order {order_id}: {e}")
-            return pd.DataFrame()
+        return self.get_materials_availability([order_id])
     
-    def _get_material_alternatives(self, bom_detail_id: int, 
-                                   warehouse_id: int,
-                                   primary_bom_qty: float = 1.0) -> List[Dict[str, Any]]:
-        """
-        Get alternative materials with availability and conversion ratio
-        
-        Args:
-            bom_detail_id: BOM detail ID for primary material
-            warehouse_id: Warehouse to check stock
-            primary_bom_qty: BOM quantity of primary material (for ratio calculation)
-        
-        Returns:
-            List of alternatives with conversion_ratio added
-        """
-        query = """
-            SELECT 
-                alt.id as alternative_id,
-                alt.alternative_material_id,
-                p.name,
-                p.pt_code,
-                p.legacy_pt_code,
-                p.package_size,
-                br.brand_name as brand_name,
-                alt.quantity,
-                alt.uom,
-                alt.priority,
-                COALESCE(SUM(ih.remain), 0) as available
-            FROM bom_material_alternatives alt
-            JOIN products p ON alt.alternative_material_id = p.id
-            LEFT JOIN brands br ON p.brand_id = br.id
-            LEFT JOIN inventory_histories ih 
-                ON ih.product_id = alt.alternative_material_id
-                AND ih.warehouse_id = %s
-                AND ih.remain > 0
-                AND ih.delete_flag = 0
-            WHERE alt.bom_detail_id = %s
-                AND alt.is_active = 1
-            GROUP BY alt.id, alt.alternative_material_id, p.name, p.pt_code,
-                     p.legacy_pt_code, p.package_size, br.brand_name, alt.quantity, 
-                     alt.uom, alt.priority
-            ORDER BY alt.priority ASC
-        """
-        
+    def get_materials_availability(self, order_ids: List[int]) -> pd.DataFrame:
+        """Material availability for several orders at once (see get_material_availability)"""
         try:
-            result = pd.read_sql(query, self.engine, params=(warehouse_id, bom_detail_id))
-            alternatives = result.to_dict('records')
-            
-            # Calculate conversion_ratio for each alternative
-            # conversion_ratio = alt_bom_qty / primary_bom_qty
-            # Example: primary needs 1.0, alternative needs 1.2 → ratio = 1.2
-            # To cover 0.2049 shortage in primary units, need 0.2049 * 1.2 = 0.2459 alt units
-            for alt in alternatives:
-                alt_bom_qty = float(alt.get('quantity', 1.0))
-                if primary_bom_qty > 0:
-                    alt['conversion_ratio'] = alt_bom_qty / primary_bom_qty
-                else:
-                    alt['conversion_ratio'] = 1.0
-            
-            return alternatives
+            return self._availability.get_order_availability(order_ids)
         except Exception as e:
-            logger.error(f"Error getting alternatives for {bom_detail_id}: {e}")
-            return []
+            logger.error(f"Error getting material availability for orders {order_ids}: {e}")
+            return pd.DataFrame()
     
     # ==================== Employee Queries ====================
     
@@ -638,38 +579,9 @@ class IssueQueries:
         Load ALL issues in one query — no pagination, no filters.
         Filtering, pagination done client-side with pandas.
         """
-        query = """
-            SELECT 
-                mi.id,
-                mi.issue_no,
-                mi.issue_date,
-                mi.status,
-                mi.notes,
-                mi.created_date,
-                mo.order_no,
-                mo.id as order_id,
-                p.name as product_name,
-                p.pt_code,
-                p.legacy_pt_code,
-                p.package_size,
-                br.brand_name as brand_name,
-                w.name as warehouse_name,
-                CONCAT(e_issued.first_name, ' ', e_issued.last_name) as issued_by_name,
-                CONCAT(e_received.first_name, ' ', e_received.last_name) as received_by_name,
-                (SELECT COUNT(*) FROM material_issue_details WHERE material_issue_id = mi.id) as item_count
-            FROM material_issues mi
-            JOIN manufacturing_orders mo ON mi.manufacturing_order_id = mo.id
-            JOIN products p ON mo.product_id = p.id
-            LEFT JOIN brands br ON p.brand_id = br.id
-            JOIN warehouses w ON mi.warehouse_id = w.id
-            LEFT JOIN employees e_issued ON mi.issued_by = e_issued.id
-            LEFT JOIN employees e_received ON mi.received_by = e_received.id
-            ORDER BY mi.created_date DESC
-        """
-        
         try:
             _t0 = _time.perf_counter()
-            result = pd.read_sql(query, self.engine)
+            result = get_delta_store(ISSUES_DELTA_ENTITY).get()
             _ms = (_time.perf_counter() - _t0) * 1000
             logger.info(f"[PERF] get_all_issues: {_ms:.0f}ms ({len(result)} rows)")
             self._connection_error = None
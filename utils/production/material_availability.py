@@ -0,0 +1,376 @@
+# utils/production/material_availability.py
+"""
+Set-based material availability (primary + alternatives + on-hand stock)
+
+Shared by Issues, Orders and Returns. Every lookup is one query per
+material kind — never one query per material:
+
+- get_order_availability(order_ids): order materials of one or many MOs
+  (stock at each order's warehouse) + their BOM alternatives → 2 queries
+- get_bom_availability(bom_id, quantity, warehouse_id): BOM requirement
+  check for a planned order + alternatives of short materials → 2 queries
+- get_conversion_ratios(conn, pairs): alternative → primary BOM ratios for
+  many (order_material_id, alternative_material_id) pairs → 1 query
+
+Version: 1.0.0
+"""
+
+import logging
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+from utils.db import get_db_engine
+
+logger = logging.getLogger(__name__)
+
+
+def _availability_status(available: pd.Series, required: pd.Series) -> np.ndarray:
+    """SUFFICIENT / PARTIAL / INSUFFICIENT for aligned available/required series"""
+    available = available.astype(float).to_numpy()
+    required = required.astype(float).to_numpy()
+    return np.select(
+        [available >= required, available > 0],
+        ['SUFFICIENT', 'PARTIAL'],
+        default='INSUFFICIENT',
+    )
+
+
+def _in_placeholders(values: Sequence) -> str:
+    return ', '.join(['%s'] * len(values))
+
+
+class MaterialAvailabilityService:
+    """Batch availability lookups for production orders and BOMs"""
+
+    def __init__(self, engine=None):
+        self.engine = engine if engine is not None else get_db_engine()
+
+    # ==================== Order Materials ====================
+
+    def get_order_availability(self, order_ids: Iterable[int]) -> pd.DataFrame:
+        """
+        Material availability for one or many manufacturing orders
+
+        Stock is summed at each order's own warehouse (remain > 0).
+
+        Returns DataFrame (one row per order material) with:
+        - manufacturing_order_id, order_material_id, material_id, material_name, ...
+        - required_qty, issued_qty, pending_qty, available_qty, availability_status
+        - bom_detail_id, bom_qty
+        - has_alternatives, alternative_total_qty, alternative_details (list of dicts)
+        """
+        order_ids = [int(o) for o in dict.fromkeys(order_ids)]
+        if not order_ids:
+            return pd.DataFrame()
+
+        placeholders = _in_placeholders(order_ids)
+        query = f"""
+            SELECT
+                mom.manufacturing_order_id,
+                mom.id as order_material_id,
+                mom.material_id,
+                p.name as material_name,
+                p.pt_code,
+                p.legacy_pt_code,
+                p.package_size,
+                br.brand_name as brand_name,
+                mom.required_qty,
+                COALESCE(mom.issued_qty, 0) as issued_qty,
+                mom.required_qty - COALESCE(mom.issued_qty, 0) as pending_qty,
+                mom.uom,
+                mom.status as material_status,
+                COALESCE(SUM(ih.remain), 0) as available_qty,
+                mo.warehouse_id,
+                bd.id as bom_detail_id,
+                bd.quantity as bom_qty
+            FROM manufacturing_order_materials mom
+            JOIN manufacturing_orders mo ON mom.manufacturing_order_id = mo.id
+            JOIN products p ON mom.material_id = p.id
+            LEFT JOIN brands br ON p.brand_id = br.id
+            LEFT JOIN bom_details bd ON bd.bom_header_id = mo.bom_header_id
+                AND bd.material_id = mom.material_id
+            LEFT JOIN inventory_histories ih
+                ON ih.product_id = mom.material_id
+                AND ih.warehouse_id = mo.warehouse_id
+                AND ih.remain > 0
+                AND ih.delete_flag = 0
+            WHERE mom.manufacturing_order_id IN ({placeholders})
+            GROUP BY mom.manufacturing_order_id, mom.id, mom.material_id, p.name,
+                     p.pt_code, p.legacy_pt_code, p.package_size, br.brand_name,
+                     mom.required_qty, mom.issued_qty, mom.uom, mom.status,
+                     mo.warehouse_id, bd.id, bd.quantity
+            ORDER BY mom.manufacturing_order_id, p.name
+        """
+
+        materials = pd.read_sql(query, self.engine, params=tuple(order_ids))
+        if materials.empty:
+            return materials
+
+        materials['availability_status'] = _availability_status(
+            materials['available_qty'], materials['pending_qty']
+        )
+
+        alternatives = self._get_order_alternatives(order_ids)
+        return self._attach_alternatives(materials, alternatives)
+
+    def _get_order_alternatives(self, order_ids: List[int]) -> pd.DataFrame:
+        """Active alternatives of all order materials, stock at each order's warehouse"""
+        placeholders = _in_placeholders(order_ids)
+        query = f"""
+            SELECT
+                mom.id as order_material_id,
+                alt.id as alternative_id,
+                alt.alternative_material_id,
+                p.name,
+                p.pt_code,
+                p.legacy_pt_code,
+                p.package_size,
+                br.brand_name as brand_name,
+                alt.quantity,
+                alt.uom,
+                alt.priority,
+                COALESCE(SUM(ih.remain), 0) as available
+            FROM manufacturing_order_materials mom
+            JOIN manufacturing_orders mo ON mom.manufacturing_order_id = mo.id
+            JOIN bom_details bd ON bd.bom_header_id = mo.bom_header_id
+                AND bd.material_id = mom.material_id
+            JOIN bom_material_alternatives alt ON alt.bom_detail_id = bd.id
+                AND alt.is_active = 1
+            JOIN products p ON alt.alternative_material_id = p.id
+            LEFT JOIN brands br ON p.brand_id = br.id
+            LEFT JOIN inventory_histories ih
+                ON ih.product_id = alt.alternative_material_id
+                AND ih.warehouse_id = mo.warehouse_id
+                AND ih.remain > 0
+                AND ih.delete_flag = 0
+            WHERE mom.manufacturing_order_id IN ({placeholders})
+            GROUP BY mom.id, bd.id, alt.id, alt.alternative_material_id, p.name,
+                     p.pt_code, p.legacy_pt_code, p.package_size, br.brand_name,
+                     alt.quantity, alt.uom, alt.priority
+            ORDER BY mom.id, alt.priority ASC
+        """
+        return pd.read_sql(query, self.engine, params=tuple(order_ids))
+
+    @staticmethod
+    def _attach_alternatives(materials: pd.DataFrame,
+                             alternatives: pd.DataFrame) -> pd.DataFrame:
+        """Add has_alternatives / alternative_total_qty / alternative_details columns"""
+        materials['has_alternatives'] = False
+        materials['alternative_total_qty'] = 0.0
+
+        details: Dict[int, List[Dict[str, Any]]] = {}
+        if not alternatives.empty:
+            # conversion_ratio = alt_bom_qty / primary_bom_qty
+            # Example: primary needs 1.0, alternative needs 1.2 → ratio = 1.2
+            bom_qty = materials.drop_duplicates('order_material_id').set_index('order_material_id')['bom_qty']
+            primary_qty = alternatives['order_material_id'].map(bom_qty).astype(float).fillna(1.0)
+            safe_primary = primary_qty.where(primary_qty > 0, 1.0)
+            alternatives = alternatives.assign(
+                conversion_ratio=(alternatives['quantity'].astype(float) / safe_primary).where(primary_qty > 0, 1.0)
+            )
+
+            columns = [c for c in alternatives.columns if c != 'order_material_id']
+            for om_id, group in alternatives.groupby('order_material_id', sort=False):
+                details[int(om_id)] = group[columns].to_dict('records')
+
+            totals = alternatives.groupby('order_material_id')['available'].sum()
+            materials['alternative_total_qty'] = (
+                materials['order_material_id'].map(totals).fillna(0.0).astype(float)
+            )
+            materials['has_alternatives'] = materials['order_material_id'].isin(totals.index)
+
+        materials['alternative_details'] = pd.Series(
+            [details.get(int(om_id), []) for om_id in materials['order_material_id']],
+            index=materials.index, dtype=object,
+        )
+        return materials
+
+    # ==================== BOM Requirement Check ====================
+
+    def get_bom_availability(self, bom_id: int, quantity: float,
+                             warehouse_id: int) -> Dict[str, Any]:
+        """
+        Primary requirement check for a planned order + alternatives for
+        PARTIAL/INSUFFICIENT materials
+
+        Returns:
+            Dictionary containing:
+                - primary: DataFrame with primary materials
+                - alternatives: DataFrame with alternative materials (by bom_detail_id)
+                - summary: Dict with counts
+        """
+        primary_df = self.get_bom_primary(bom_id, quantity, warehouse_id)
+
+        alternatives_df = pd.DataFrame()
+        if not primary_df.empty:
+            short = primary_df.loc[
+                primary_df['availability_status'] != 'SUFFICIENT', 'bom_detail_id'
+            ]
+            if not short.empty:
+                alternatives_df = self.get_bom_alternatives(
+                    bom_id, quantity, warehouse_id, short.tolist()
+                )
+
+        return {
+            'primary': primary_df,
+            'alternatives': alternatives_df,
+            'summary': self.summarize_bom(primary_df, alternatives_df),
+        }
+
+    def get_bom_primary(self, bom_id: int, quantity: float,
+                        warehouse_id: int) -> pd.DataFrame:
+        """Primary BOM materials scaled to quantity, with stock at warehouse"""
+        query = """
+            SELECT
+                d.id as bom_detail_id,
+                d.material_id,
+                p.name as material_name,
+                p.pt_code,
+                p.package_size,
+                p.legacy_pt_code,
+                br.brand_name,
+                d.quantity * %s / h.output_qty * (1 + d.scrap_rate/100) as required_qty,
+                d.uom,
+                COALESCE(SUM(ih.remain), 0) as available_qty
+            FROM bom_details d
+            JOIN bom_headers h ON d.bom_header_id = h.id
+            JOIN products p ON d.material_id = p.id
+            JOIN brands br ON p.brand_id = br.id
+            LEFT JOIN inventory_histories ih
+                ON ih.product_id = d.material_id
+                AND ih.warehouse_id = %s
+                AND ih.remain > 0
+                AND ih.delete_flag = 0
+            WHERE h.id = %s
+            GROUP BY d.id, d.material_id, p.name, p.pt_code, p.package_size,
+                     p.legacy_pt_code, br.brand_name,
+                     d.quantity, d.uom, d.scrap_rate, h.output_qty
+            ORDER BY p.name
+        """
+        df = pd.read_sql(query, self.engine, params=(quantity, warehouse_id, bom_id))
+        df['availability_status'] = _availability_status(df['available_qty'], df['required_qty'])
+        return df
+
+    def get_bom_alternatives(self, bom_id: int, quantity: float,
+                             warehouse_id: int,
+                             bom_detail_ids: List[int]) -> pd.DataFrame:
+        """Active alternatives for the given BOM details, with stock at warehouse"""
+        if not bom_detail_ids:
+            return pd.DataFrame()
+
+        # Note: bom_material_alternatives has its own quantity, uom, scrap_rate
+        # Formula: (planned_qty / output_qty) * alt.quantity * (1 + alt.scrap_rate/100)
+        query = f"""
+            SELECT
+                alt.bom_detail_id,
+                alt.alternative_material_id as material_id,
+                alt.priority as alt_priority,
+                alt.quantity as alt_quantity,
+                alt.scrap_rate as alt_scrap_rate,
+                p.name as material_name,
+                p.pt_code,
+                p.package_size,
+                p.legacy_pt_code,
+                br.brand_name,
+                alt.quantity * %s / h.output_qty * (1 + COALESCE(alt.scrap_rate, 0)/100) as required_qty,
+                alt.uom,
+                COALESCE(SUM(ih.remain), 0) as available_qty
+            FROM bom_material_alternatives alt
+            JOIN bom_details d ON alt.bom_detail_id = d.id
+            JOIN bom_headers h ON d.bom_header_id = h.id
+            JOIN products p ON alt.alternative_material_id = p.id
+            JOIN brands br ON p.brand_id = br.id
+            LEFT JOIN inventory_histories ih
+                ON ih.product_id = alt.alternative_material_id
+                AND ih.warehouse_id = %s
+                AND ih.remain > 0
+                AND ih.delete_flag = 0
+            WHERE h.id = %s
+                AND alt.is_active = 1
+                AND d.id IN ({_in_placeholders(bom_detail_ids)})
+            GROUP BY alt.bom_detail_id, alt.alternative_material_id, alt.priority,
+                     alt.quantity, alt.scrap_rate, alt.uom,
+                     p.name, p.pt_code, p.package_size,
+                     p.legacy_pt_code, br.brand_name, h.output_qty
+            ORDER BY alt.bom_detail_id, alt.priority
+        """
+        params = [quantity, warehouse_id, bom_id] + [int(d) for d in bom_detail_ids]
+        df = pd.read_sql(query, self.engine, params=tuple(params))
+        df['availability_status'] = _availability_status(df['available_qty'], df['required_qty'])
+        df['material_type'] = 'ALTERNATIVE'
+        return df
+
+    @staticmethod
+    def summarize_bom(primary_df: pd.DataFrame,
+                     alternatives_df: pd.DataFrame) -> Dict[str, int]:
+        if primary_df.empty:
+            return {
+                'total': 0,
+                'sufficient': 0,
+                'partial': 0,
+                'insufficient': 0,
+                'has_alternatives': 0,
+                'has_sufficient_alternatives': 0
+            }
+
+        counts = primary_df['availability_status'].value_counts()
+        has_alternatives = 0
+        has_sufficient_alt = 0
+        if not alternatives_df.empty:
+            has_alternatives = int(alternatives_df['bom_detail_id'].nunique())
+            has_sufficient_alt = int(alternatives_df.loc[
+                alternatives_df['availability_status'] == 'SUFFICIENT', 'bom_detail_id'
+            ].nunique())
+
+        return {
+            'total': len(primary_df),
+            'sufficient': int(counts.get('SUFFICIENT', 0)),
+            'partial': int(counts.get('PARTIAL', 0)),
+            'insufficient': int(counts.get('INSUFFICIENT', 0)),
+            'has_alternatives': has_alternatives,
+            'has_sufficient_alternatives': has_sufficient_alt
+        }
+
+    # ==================== Alternative Conversion ====================
+
+    @staticmethod
+    def get_conversion_ratios(conn, pairs: Iterable[Tuple[int, int]]) -> Dict[Tuple[int, int], float]:
+        """
+        alt_bom_qty / primary_bom_qty for (order_material_id, alternative_material_id) pairs
+
+        Runs on the caller's connection so it can be used inside a transaction.
+        Pairs without a matching BOM alternative are omitted (caller defaults to 1.0).
+        """
+        pairs = list(dict.fromkeys((int(om), int(alt)) for om, alt in pairs))
+        if not pairs:
+            return {}
+
+        om_ids = sorted({om for om, _ in pairs})
+        params = {f'om_{i}': om for i, om in enumerate(om_ids)}
+        query = text(f"""
+            SELECT
+                mom.id as order_material_id,
+                alt.alternative_material_id,
+                bd.quantity as primary_qty,
+                alt.quantity as alt_qty
+            FROM manufacturing_order_materials mom
+            JOIN manufacturing_orders mo ON mom.manufacturing_order_id = mo.id
+            JOIN bom_details bd ON bd.bom_header_id = mo.bom_header_id
+                AND bd.material_id = mom.material_id
+            JOIN bom_material_alternatives alt ON alt.bom_detail_id = bd.id
+            WHERE mom.id IN ({', '.join(f':{k}' for k in params)})
+            ORDER BY mom.id, alt.id
+        """)
+
+        wanted = set(pairs)
+        ratios: Dict[Tuple[int, int], float] = {}
+        for row in conn.execute(query, params).mappings():
+            key = (int(row['order_material_id']), int(row['alternative_material_id']))
+            # First match per pair (same as the former LIMIT 1 lookup)
+            if key in wanted and key not in ratios:
+                ratios[key] = float(row['alt_qty']) / float(row['primary_qty'])
+        return ratios
+
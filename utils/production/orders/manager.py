@@ -3,8 +3,14 @@
 Order Manager - Business logic for Production Orders
 Create, Update, Confirm, Cancel operations with comprehensive validation
 
-Version: 2.0.0
+Version: 2.3.0
 Changes:
+- v2.3.0: Create/Update/Delete notify the GAP result cache too; notices carry
+          the order's marker-table row ids (utils.production.gap_notify)
+- v2.2.0: Material requirements created/recalculated with bulk statements
+          (one multi-row INSERT / one keyed UPDATE instead of one per BOM line)
+- v2.1.0: Confirm/Cancel notify the Supply Chain GAP result cache with the
+          touched product + material IDs (enables incremental GAP refresh)
 - v2.0.0: Integrated comprehensive validation module
           + All CRUD operations now use OrderValidators
           + Support for BLOCK (hard stop) and WARNING (soft) validations
@@ -18,7 +24,9 @@ from typing import Dict, Optional, Any, Tuple
 import pandas as pd
 from sqlalchemy import text
 
-from utils.db import get_db_engine
+from utils.db import get_db_engine, bulk_insert, bulk_update
+from utils.doc_sequence import next_document_number
+from utils.production.gap_notify import collect_order_changes, notify_gap_cache
 from .common import get_vietnam_now, OrderConstants
 from .validators import (
     OrderValidators, ValidationResults, ValidationLevel,
@@ -121,13 +129,16 @@ class OrderManager:
                 
                 # Create material requirements
                 self._create_material_requirements(conn, order_id, order_data)
+                change = collect_order_changes(conn, order_id)
                 
                 logger.info(f"✅ Created production order {order_no} (ID: {order_id})")
-                return order_no, results
                 
             except Exception as e:
                 logger.error(f"❌ Error creating order: {e}")
                 raise ValueError(f"Failed to create production order: {str(e)}")
+        
+        notify_gap_cache(change)
+        return order_no, results
     
     # ==================== Update Order ====================
     
@@ -239,13 +250,16 @@ class OrderManager:
                 if 'planned_qty' in update_data:
                     self._recalculate_materials(conn, order_id, bom_header_id, 
                                                update_data['planned_qty'])
+                change = collect_order_changes(conn, order_id)
                 
                 logger.info(f"✅ Updated order {order_id}: {list(update_data.keys())}")
-                return True, results
                 
             except Exception as e:
                 logger.error(f"❌ Error updating order {order_id}: {e}")
                 raise
+        
+        notify_gap_cache(change)
+        return True, results
     
     # ==================== Confirm Order ====================
     
@@ -314,12 +328,16 @@ class OrderManager:
                     'user_id': user_id
                 })
                 
+                change = collect_order_changes(conn, order_id)
+                
                 logger.info(f"✅ Confirmed order {order_no} (ID: {order_id})")
-                return True, results
                 
             except Exception as e:
                 logger.error(f"❌ Error confirming order {order_id}: {e}")
                 raise
+        
+        notify_gap_cache(change)
+        return True, results
     
     # ==================== Cancel Order ====================
     
@@ -402,12 +420,16 @@ class OrderManager:
                     'user_id': user_id
                 })
                 
+                change = collect_order_changes(conn, order_id)
+                
                 logger.info(f"✅ Cancelled order {order_no} (ID: {order_id})")
-                return True, results
                 
             except Exception as e:
                 logger.error(f"❌ Error cancelling order {order_id}: {e}")
                 raise
+        
+        notify_gap_cache(change)
+        return True, results
     
     # ==================== Delete Order ====================
     
@@ -476,33 +498,25 @@ class OrderManager:
                     'user_id': user_id
                 })
                 
+                change = collect_order_changes(conn, order_id)
+                
                 logger.info(f"✅ Deleted order {order_no} (ID: {order_id})")
-                return True, results
                 
             except Exception as e:
                 logger.error(f"❌ Error deleting order {order_id}: {e}")
                 raise
+        
+        notify_gap_cache(change)
+        return True, results
     
     # ==================== Private Helper Methods ====================
     
     def _generate_order_number(self, conn) -> str:
-        """Generate unique order number (Vietnam timezone)"""
+        """Generate unique order number MO-YYYYMMDD-XXXX (Vietnam timezone)"""
         timestamp = get_vietnam_now().strftime('%Y%m%d')
-        
-        query = text("""
-            SELECT COALESCE(
-                MAX(CAST(SUBSTRING_INDEX(order_no, '-', -1) AS UNSIGNED)), 0
-            ) + 1 as next_num
-            FROM manufacturing_orders
-            WHERE order_no LIKE :pattern
-            FOR UPDATE
-        """)
-        
-        result = conn.execute(query, {'pattern': f'MO-{timestamp}-%'})
-        row = result.fetchone()
-        next_num = int(row[0]) if row and row[0] else 1
-        
-        return f"MO-{timestamp}-{next_num:04d}"
+        return next_document_number(
+            f"MO-{timestamp}-", 'manufacturing_orders', 'order_no', width=4, conn=conn
+        )
     
     def _get_entity_id(self, conn, warehouse_id: int) -> Optional[int]:
         """Get entity ID from warehouse"""
@@ -531,6 +545,7 @@ class OrderManager:
         
         planned_qty = float(order_data['planned_qty'])
         
+        rows = []
         for mat in materials:
             material_id = mat[0]
             quantity = float(mat[1])
@@ -543,24 +558,20 @@ class OrderManager:
             base_qty = production_cycles * quantity
             required_qty = round(base_qty * (1 + scrap_rate / 100), 4)
             
-            # Insert material requirement
-            insert_query = text("""
-                INSERT INTO manufacturing_order_materials (
-                    manufacturing_order_id, material_id, required_qty,
-                    issued_qty, uom, warehouse_id, status, created_date
-                ) VALUES (
-                    :order_id, :material_id, :required_qty,
-                    0, :uom, :warehouse_id, 'PENDING', NOW()
-                )
-            """)
-            
-            conn.execute(insert_query, {
-                'order_id': order_id,
+            rows.append({
+                'manufacturing_order_id': order_id,
                 'material_id': material_id,
                 'required_qty': required_qty,
                 'uom': uom,
                 'warehouse_id': order_data['warehouse_id']
             })
+        
+        # Insert material requirements (one multi-row INSERT)
+        bulk_insert(conn, 'manufacturing_order_materials', rows, sql_values={
+            'issued_qty': '0',
+            'status': "'PENDING'",
+            'created_date': 'NOW()'
+        })
     
     def _recalculate_materials(self, conn, order_id: int, bom_header_id: int, 
                               new_qty: float):
@@ -575,6 +586,7 @@ class OrderManager:
         
         materials = conn.execute(bom_query, {'bom_id': bom_header_id}).fetchall()
         
+        rows = []
         for mat in materials:
             material_id = mat[0]
             quantity = float(mat[1])
@@ -586,18 +598,12 @@ class OrderManager:
             base_qty = production_cycles * quantity
             required_qty = round(base_qty * (1 + scrap_rate / 100), 4)
             
-            # Update
-            update_query = text("""
-                UPDATE manufacturing_order_materials
-                SET required_qty = :required_qty
-                WHERE manufacturing_order_id = :order_id 
-                AND material_id = :material_id
-            """)
-            
-            conn.execute(update_query, {
-                'required_qty': required_qty,
-                'order_id': order_id,
-                'material_id': material_id
-            })
+            rows.append({'material_id': material_id, 'required_qty': required_qty})
+        
+        # Update all lines in one statement
+        bulk_update(
+            conn, 'manufacturing_order_materials', 'material_id', rows, ['required_qty'],
+            where='manufacturing_order_id = :order_id', where_params={'order_id': order_id}
+        )
         
         logger.info(f"Recalculated materials for order {order_id} with qty {new_qty}")
\ No newline at end of file
@@ -23,10 +23,8 @@ from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import mm
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
 from reportlab.platypus import (
-    SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image
+    SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
 )
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
 
 # Import database and S3 utilities
 try:
@@ -52,6 +50,11 @@ except ImportError:
             def get_company_logo_from_s3_enhanced(company_id, logo_path):
                 return None
 
+try:
+    from utils.pdf_assets import get_pdf_assets
+except ImportError:
+    from ...pdf_assets import get_pdf_assets
+
 from .queries import OrderQueries
 from .common import format_number, get_vietnam_now, format_datetime_vn, format_product_display_html
 
@@ -64,7 +67,6 @@ class OrderPDFGenerator:
     def __init__(self):
         self.engine = get_db_engine()
         self.queries = OrderQueries()
-        self._registered_fonts = set()
         self.font_available = self._setup_fonts()
     
     def _get_project_root(self) -> Path:
@@ -75,50 +77,28 @@ class OrderPDFGenerator:
         return project_root
     
     def _setup_fonts(self) -> bool:
-        """Setup DejaVu fonts for Vietnamese text support"""
-        try:
-            project_root = self._get_project_root()
-            fonts_dir = project_root / 'fonts'
-            
-            if not fonts_dir.exists():
-                logger.warning(f"⚠️ Fonts directory not found: {fonts_dir}")
-                return False
-            
-            dejavu_regular = fonts_dir / 'DejaVuSans.ttf'
-            dejavu_bold = fonts_dir / 'DejaVuSans-Bold.ttf'
-            
-            if not dejavu_regular.exists():
-                logger.warning(f"⚠️ DejaVuSans.ttf not found")
-                return False
-            
-            # Register fonts
-            try:
-                if 'DejaVuSans' not in self._registered_fonts:
-                    pdfmetrics.registerFont(TTFont('DejaVuSans', str(dejavu_regular)))
-                    self._registered_fonts.add('DejaVuSans')
-            except Exception as e:
-                if 'already registered' not in str(e).lower():
-                    raise
-                self._registered_fonts.add('DejaVuSans')
-            
-            try:
-                if dejavu_bold.exists() and 'DejaVuSans-Bold' not in self._registered_fonts:
-                    pdfmetrics.registerFont(TTFont('DejaVuSans-Bold', str(dejavu_bold)))
-                    self._registered_fonts.add('DejaVuSans-Bold')
-            except Exception as e:
-                if 'already registered' not in str(e).lower():
-                    raise
-                self._registered_fonts.add('DejaVuSans-Bold')
-            
-            logger.info("✅ DejaVu fonts registered successfully")
-            return True
-            
-        except Exception as e:
-            logger.error(f"❌ Font setup error: {e}")
-            return False
+        """Setup DejaVu fonts for Vietnamese text support (registered once per process)"""
+        return get_pdf_assets().register_fonts(self._get_project_root() / 'fonts')
     
     def get_company_info(self, warehouse_id: int) -> Dict[str, Any]:
-        """Get company information from warehouse"""
+        """Get company information from warehouse (cached across documents)"""
+        company = get_pdf_assets().get_company(
+            ('warehouse', warehouse_id), lambda: self._load_company_info(warehouse_id)
+        )
+        if company:
+            return company
+        
+        return {
+            'id': 0,
+            'english_name': 'PROSTECH VIETNAM',
+            'local_name': 'CÔNG TY TNHH PROSTECH VIỆT NAM',
+            'address': 'Vietnam',
+            'registration_code': '',
+            'logo_path': None
+        }
+    
+    def _load_company_info(self, warehouse_id: int) -> Optional[Dict[str, Any]]:
+        """Query the company row for a warehouse (None if missing or failed)"""
         query = """
             SELECT 
                 c.id,
@@ -141,17 +121,13 @@ class OrderPDFGenerator:
                 return df.iloc[0].to_dict()
         except Exception as e:
             logger.error(f"Error getting company info: {e}")
-        
-        return {
-            'id': 0,
-            'english_name': 'PROSTECH VIETNAM',
-            'local_name': 'CÔNG TY TNHH PROSTECH VIỆT NAM',
-            'address': 'Vietnam',
-            'registration_code': '',
-            'logo_path': None
-        }
+        return None
     
     def get_custom_styles(self) -> Dict[str, Any]:
+        """Custom paragraph styles (built once per font setup, shared read-only)"""
+        return get_pdf_assets().get_styles(('order', self.font_available), self._build_custom_styles)
+    
+    def _build_custom_styles(self) -> Dict[str, Any]:
         """Create custom paragraph styles with DejaVu fonts"""
         styles = getSampleStyleSheet()
         
@@ -255,14 +231,10 @@ class OrderPDFGenerator:
         logo_img = None
         if S3_AVAILABLE:
             try:
-                logo_bytes = get_company_logo_from_s3_enhanced(
-                    company_info['id'],
-                    company_info.get('logo_path')
-                )
-                if logo_bytes:
-                    logo_buffer = BytesIO(logo_bytes)
+                logo = get_pdf_assets().get_logo(company_info['id'], company_info.get('logo_path'))
+                if logo:
                     try:
-                        logo_img = Image(logo_buffer, width=50*mm, height=15*mm, kind='proportional')
+                        logo_img = logo.flowable(width=50*mm, height=15*mm)
                     except Exception as img_error:
                         logger.error(f"Error creating image: {img_error}")
             except Exception as e:
@@ -598,68 +570,12 @@ class OrderPDFGenerator:
             logger.info(f"🔧 Generating PDF for order {order_id}")
             
             # Get order data
-            order = self.queries.get_order_details(order_id)
-            if not order:
+            data = self.load_data(order_id, include_materials)
+            if not data:
                 logger.error(f"Order {order_id} not found")
                 return None
             
-            # Get materials
-            materials = self.queries.get_order_materials(order_id) if include_materials else pd.DataFrame()
-            
-            data = {
-                'order': order,
-                'materials': materials
-            }
-            
-            # Set page size
-            if layout == 'landscape':
-                page_size = landscape(A4)
-            else:
-                page_size = A4
-            
-            # Create PDF
-            buffer = BytesIO()
-            doc = SimpleDocTemplate(
-                buffer,
-                pagesize=page_size,
-                rightMargin=10*mm,
-                leftMargin=10*mm,
-                topMargin=10*mm,
-                bottomMargin=10*mm
-            )
-            
-            story = []
-            styles = self.get_custom_styles()
-            
-            # Build content
-            self.create_header(story, data, styles, language, layout)
-            self.create_order_info(story, data, styles, language, layout)
-            
-            if include_materials and not materials.empty:
-                self.create_materials_table(story, data, styles, language, layout)
-            
-            # Notes
-            if order.get('notes'):
-                story.append(Spacer(1, 5*mm))
-                if language == 'vi':
-                    notes_label = "Ghi chú:"
-                else:
-                    notes_label = "Notes:"
-                story.append(Paragraph(f"<b>{notes_label}</b> {order['notes']}", styles['NormalViet']))
-            
-            # Signature section
-            self.create_signature_section(story, data, styles, language, layout)
-            
-            # Footer with timestamp
-            story.append(Spacer(1, 10*mm))
-            timestamp = get_vietnam_now().strftime('%d/%m/%Y %H:%M:%S')
-            story.append(Paragraph(f"Generated: {timestamp}", styles['Footer']))
-            
-            # Build PDF
-            doc.build(story)
-            
-            pdf_content = buffer.getvalue()
-            buffer.close()
+            pdf_content = self.render_pdf(data, language, layout, include_materials)
             
             logger.info(f"✅ PDF generated for order {order_id}, size: {len(pdf_content)} bytes")
             return pdf_content
@@ -667,6 +583,98 @@ class OrderPDFGenerator:
         except Exception as e:
             logger.error(f"❌ Failed to generate PDF for order {order_id}: {e}", exc_info=True)
             return None
+    
+    def load_data(self, order_id: int, include_materials: bool = True) -> Optional[Dict[str, Any]]:
+        """Load order details + materials in the shape render_pdf() expects"""
+        order = self.queries.get_order_details(order_id)
+        if not order:
+            return None
+        
+        # Get materials
+        materials = self.queries.get_order_materials(order_id) if include_materials else pd.DataFrame()
+        
+        return {
+            'order': order,
+            'materials': materials
+        }
+    
+    def load_data_bulk(self, order_ids: List[int],
+                       include_materials: bool = True) -> Dict[int, Dict[str, Any]]:
+        """load_data() for many orders with two queries in total (missing ids are skipped)"""
+        headers = self.queries.get_order_details_bulk(order_ids)
+        if headers.empty:
+            return {}
+        
+        materials = {}
+        if include_materials:
+            all_materials = self.queries.get_order_materials_bulk(order_ids)
+            if not all_materials.empty:
+                materials = {
+                    int(key): group.reset_index(drop=True)
+                    for key, group in all_materials.groupby('manufacturing_order_id', sort=False)
+                }
+        
+        return {
+            int(order['id']): {'order': order, 'materials': materials.get(int(order['id']), pd.DataFrame())}
+            for order in headers.to_dict('records')
+        }
+    
+    def render_pdf(self, data: Dict[str, Any], language: str = 'vi',
+                  layout: str = 'landscape', include_materials: bool = True) -> bytes:
+        """Build the PDF from pre-loaded data (no document queries)"""
+        order = data['order']
+        materials = data['materials']
+        
+        # Set page size
+        if layout == 'landscape':
+            page_size = landscape(A4)
+        else:
+            page_size = A4
+        
+        # Create PDF
+        buffer = BytesIO()
+        doc = SimpleDocTemplate(
+            buffer,
+            pagesize=page_size,
+            rightMargin=10*mm,
+            leftMargin=10*mm,
+            topMargin=10*mm,
+            bottomMargin=10*mm
+        )
+        
+        story = []
+        styles = self.get_custom_styles()
+        
+        # Build content
+        self.create_header(story, data, styles, language, layout)
+        self.create_order_info(story, data, styles, language, layout)
+        
+        if include_materials and not materials.empty:
+            self.create_materials_table(story, data, styles, language, layout)
+        
+        # Notes
+        if order.get('notes'):
+            story.append(Spacer(1, 5*mm))
+            if language == 'vi':
+                notes_label = "Ghi chú:"
+            else:
+                notes_label = "Notes:"
+            story.append(Paragraph(f"<b>{notes_label}</b> {order['notes']}", styles['NormalViet']))
+        
+        # Signature section
+        self.create_signature_section(story, data, styles, language, layout)
+        
+        # Footer with timestamp
+        story.append(Spacer(1, 10*mm))
+        timestamp = get_vietnam_now().strftime('%d/%m/%Y %H:%M:%S')
+        story.append(Paragraph(f"Generated: {timestamp}", styles['Footer']))
+        
+        # Build PDF
+        doc.build(story)
+        
+        pdf_content = buffer.getvalue()
+        buffer.close()
+        return pdf_content
 
 
 # Singleton instance
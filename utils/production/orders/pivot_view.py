@@ -3,8 +3,10 @@
 Pivot View component for Production Orders
 Allows analyzing orders by Product × Time Period with configurable grouping
 
-Version: 1.1.0
+Version: 1.2.0
 Changes:
+- v1.2.0: Vectorized pivot build (pivot_engine: searchsorted buckets + one groupby)
+          + get_pivot_data filters the bulk order load (no 10000-row cap)
 - v1.1.0: Applied Fragment pattern for performance
           + Config panel uses st.form (no rerun on each change)
           + Pivot table wrapped in @st.fragment
@@ -29,6 +31,7 @@ import pandas as pd
 import numpy as np
 
 from .queries import OrderQueries
+from .pivot_engine import build_pivot
 from .common import (
     format_number, get_vietnam_today, get_vietnam_now,
     format_date, OrderConstants
@@ -138,22 +141,24 @@ class OrderPivotView:
                        to_date: date,
                        status_filter: Optional[List[str]] = None,
                        date_type: str = 'scheduled') -> pd.DataFrame:
-        """Get orders data for pivot analysis"""
-        orders = self.queries.get_orders(
-            status=status_filter,
-            from_date=from_date,
-            to_date=to_date,
-            date_type=date_type,
-            page=1,
-            page_size=10000
-        )
+        """Get orders data for pivot analysis (all matching orders, filtered client-side)"""
+        orders = self.queries.get_all_orders()
         
         if orders is None or orders.empty:
             return pd.DataFrame()
         
-        orders['pending_qty'] = orders['planned_qty'] - orders['produced_qty']
-        
         date_col = 'scheduled_date' if date_type == 'scheduled' else 'order_date'
+        order_days = pd.to_datetime(orders[date_col]).dt.normalize()
+        
+        mask = (order_days >= pd.Timestamp(from_date)) & (order_days <= pd.Timestamp(to_date))
+        if status_filter:
+            mask &= orders['status'].isin(status_filter)
+        
+        orders = orders[mask].copy()
+        if orders.empty:
+            return pd.DataFrame()
+        
+        orders['pending_qty'] = orders['planned_qty'] - orders['produced_qty']
         orders[date_col] = pd.to_datetime(orders[date_col])
         
         return orders
@@ -336,58 +341,14 @@ class OrderPivotView:
         dim_column = self.get_dimension_column(row_dimension)
         date_column = 'scheduled_date' if date_type == 'scheduled' else 'order_date'
         
-        pivot_data = []
-        cell_data_map = {}
-        
-        for row_idx, row in row_values.iterrows():
-            row_id = row['id']
-            row_label = row['display_label']
-            
-            row_data = {'Row': row_label, '_row_id': row_id}
-            row_orders = orders[orders[dim_column] == row_id]
-            row_total = 0
-            
-            for col_idx, period in enumerate(periods):
-                period_start = pd.Timestamp(period['start'])
-                period_end = pd.Timestamp(period['end']) + pd.Timedelta(days=1) - pd.Timedelta(seconds=1)
-                
-                period_orders = row_orders[
-                    (row_orders[date_column] >= period_start) & 
-                    (row_orders[date_column] <= period_end)
-                ]
-                
-                if metric == 'order_count':
-                    value = len(period_orders)
-                elif metric == 'planned_qty':
-                    value = period_orders['planned_qty'].sum()
-                elif metric == 'produced_qty':
-                    value = period_orders['produced_qty'].sum()
-                elif metric == 'pending_qty':
-                    value = period_orders['pending_qty'].sum()
-                else:
-                    value = 0
-                
-                row_data[period['label']] = value
-                row_total += value
-                
-                if not period_orders.empty:
-                    cell_key = f"{row_idx}_{col_idx}"
-                    cell_data_map[cell_key] = period_orders['id'].tolist()
-            
-            row_data['Total'] = row_total
-            pivot_data.append(row_data)
-        
-        pivot_df = pd.DataFrame(pivot_data)
-        
-        if not pivot_df.empty:
-            totals_row = {'Row': '**TOTAL**', '_row_id': None}
-            for period in periods:
-                totals_row[period['label']] = pivot_df[period['label']].sum()
-            totals_row['Total'] = pivot_df['Total'].sum()
-            
-            pivot_df = pd.concat([pivot_df, pd.DataFrame([totals_row])], ignore_index=True)
-        
-        return pivot_df, cell_data_map
+        return build_pivot(
+            orders=orders,
+            periods=periods,
+            row_values=row_values,
+            dim_column=dim_column,
+            date_column=date_column,
+            metric=metric
+        )
     
     # ==================== UI Rendering with Fragments ====================
     
@@ -662,7 +623,7 @@ class OrderPivotView:
                 
                 st.markdown(f"**📦 {len(order_ids)} order(s) found:**")
                 
-                orders_df = self.queries.get_orders(page=1, page_size=10000)
+                orders_df = self.queries.get_all_orders()
                 
                 if orders_df is not None and not orders_df.empty:
                     cell_orders = orders_df[orders_df['id'].isin(order_ids)]
@@ -3,8 +3,14 @@
 Database queries for Orders domain
 All SQL queries are centralized here for easy maintenance
 
-Version: 1.5.0
+Version: 1.8.0
 Changes:
+- v1.8.0: get_order_details_bulk() / get_order_materials_bulk() for batch printing
+          (detail SQL shared with the single-order queries)
+- v1.7.0: get_all_orders() served from the delta-sync store
+          (full load once, then changed rows + id check per sync)
+- v1.6.0: Material availability delegated to MaterialAvailabilityService
+          (shared with Issues/Returns)
 - v1.5.0: Advanced multiselect filter support
           + get_orders() and get_orders_count() accept list parameters
           + Added product_ids, bom_ids, brand_ids, warehouse_ids filters
@@ -35,15 +41,125 @@ from sqlalchemy import text
 from sqlalchemy.exc import OperationalError, DatabaseError
 
 from utils.db import get_db_engine
+from utils.production.delta_store import DeltaEntity, get_delta_store
+from utils.production.material_availability import MaterialAvailabilityService
 
 logger = logging.getLogger(__name__)
 
 
+# ==================== Delta-sync entity ====================
+
+_ORDERS_SELECT = """
+    SELECT 
+        o.id,
+        o.order_no,
+        o.order_date,
+        o.scheduled_date,
+        o.completion_date,
+        o.status,
+        o.priority,
+        o.planned_qty,
+        o.produced_qty,
+        o.uom,
+        o.product_id,
+        o.bom_header_id,
+        o.warehouse_id,
+        o.target_warehouse_id,
+        o.notes,
+        p.pt_code,
+        p.name as product_name,
+        p.package_size,
+        p.legacy_pt_code,
+        b.bom_type,
+        b.bom_name,
+        b.bom_code,
+        b.status as bom_status,
+        br.id as brand_id,
+        br.brand_name,
+        w1.name as warehouse_name,
+        w2.name as target_warehouse_name,
+        o.created_date,
+        o.created_by,
+        CONCAT(e.first_name, ' ', e.last_name) as created_by_name
+    FROM manufacturing_orders o
+    JOIN products p ON o.product_id = p.id
+    JOIN bom_headers b ON o.bom_header_id = b.id
+    JOIN brands br ON p.brand_id = br.id
+    JOIN warehouses w1 ON o.warehouse_id = w1.id
+    JOIN warehouses w2 ON o.target_warehouse_id = w2.id
+    LEFT JOIN users u ON o.created_by = u.id
+    LEFT JOIN employees e ON u.employee_id = e.id
+    WHERE o.delete_flag = 0
+"""
+
+ORDERS_DELTA_ENTITY = DeltaEntity(
+    name='orders',
+    select_sql=_ORDERS_SELECT,
+    key_sql='o.id',
+    changed_sql=['o.created_date', 'o.updated_date'],
+    # BOM status changes do not touch the order row
+    ids_sql="""
+        SELECT o.id, b.status as bom_status
+        FROM manufacturing_orders o
+        JOIN bom_headers b ON o.bom_header_id = b.id
+        WHERE o.delete_flag = 0
+    """,
+    check_columns=['bom_status'],
+)
+
+
+_ORDER_DETAILS_SELECT = """
+    SELECT 
+        o.*,
+        p.name as product_name,
+        p.pt_code,
+        p.package_size,
+        p.legacy_pt_code,
+        p.description as product_description,
+        br.brand_name,
+        b.bom_name,
+        b.bom_type,
+        b.output_qty as bom_output_qty,
+        w1.name as warehouse_name,
+        w2.name as target_warehouse_name,
+        CONCAT(e.first_name, ' ', e.last_name) as created_by_name
+    FROM manufacturing_orders o
+    JOIN products p ON o.product_id = p.id
+    JOIN bom_headers b ON o.bom_header_id = b.id
+    JOIN brands br ON p.brand_id = br.id
+    JOIN warehouses w1 ON o.warehouse_id = w1.id
+    JOIN warehouses w2 ON o.target_warehouse_id = w2.id
+    LEFT JOIN users u ON o.created_by = u.id
+    LEFT JOIN employees e ON u.employee_id = e.id
+"""
+
+_ORDER_MATERIALS_SELECT = """
+    SELECT 
+        m.manufacturing_order_id,
+        m.id,
+        m.material_id,
+        p.name as material_name,
+        p.pt_code,
+        p.package_size,
+        p.legacy_pt_code,
+        br.brand_name,
+        m.required_qty,
+        COALESCE(m.issued_qty, 0) as issued_qty,
+        m.uom,
+        m.status,
+        (m.required_qty - COALESCE(m.issued_qty, 0)) as pending_qty
+    FROM manufacturing_order_materials m
+    JOIN products p ON m.material_id = p.id
+    JOIN brands br ON p.brand_id = br.id
+"""
+
+
 class OrderQueries:
     """Database queries for Order management"""
     
     def __init__(self):
         self.engine = get_db_engine()
+        self._availability = MaterialAvailabilityService(self.engine)
         self._connection_error = None
     
     def check_connection(self) -> Tuple[bool, Optional[str]]:
@@ -407,31 +523,7 @@ class OrderQueries:
     
     def get_order_details(self, order_id: int) -> Optional[Dict[str, Any]]:
         """Get detailed information for a single order"""
-        query = """
-            SELECT 
-                o.*,
-                p.name as product_name,
-                p.pt_code,
-                p.package_size,
-                p.legacy_pt_code,
-                p.description as product_description,
-                br.brand_name,
-                b.bom_name,
-                b.bom_type,
-                b.output_qty as bom_output_qty,
-                w1.name as warehouse_name,
-                w2.name as target_warehouse_name,
-                CONCAT(e.first_name, ' ', e.last_name) as created_by_name
-            FROM manufacturing_orders o
-            JOIN products p ON o.product_id = p.id
-            JOIN bom_headers b ON o.bom_header_id = b.id
-            JOIN brands br ON p.brand_id = br.id
-            JOIN warehouses w1 ON o.warehouse_id = w1.id
-            JOIN warehouses w2 ON o.target_warehouse_id = w2.id
-            LEFT JOIN users u ON o.created_by = u.id
-            LEFT JOIN employees e ON u.employee_id = e.id
-            WHERE o.id = %s AND o.delete_flag = 0
-        """
+        query = _ORDER_DETAILS_SELECT + " WHERE o.id = %s AND o.delete_flag = 0"
         
         try:
             result = pd.read_sql(query, self.engine, params=(order_id,))
@@ -440,28 +532,24 @@ class OrderQueries:
             logger.error(f"Error getting order details for {order_id}: {e}")
             return None
     
+    def get_order_details_bulk(self, order_ids: List[int]) -> pd.DataFrame:
+        """Details for several orders in one query (batch printing)"""
+        order_ids = [int(i) for i in dict.fromkeys(order_ids)]
+        if not order_ids:
+            return pd.DataFrame()
+        
+        placeholders = ', '.join(['%s'] * len(order_ids))
+        query = _ORDER_DETAILS_SELECT + f" WHERE o.id IN ({placeholders}) AND o.delete_flag = 0"
+        
+        try:
+            return pd.read_sql(query, self.engine, params=tuple(order_ids))
+        except Exception as e:
+            logger.error(f"Error getting order details for {len(order_ids)} orders: {e}")
+            return pd.DataFrame()
+    
     def get_order_materials(self, order_id: int) -> pd.DataFrame:
         """Get materials required for an order"""
-        query = """
-            SELECT 
-                m.id,
-                m.material_id,
-                p.name as material_name,
-                p.pt_code,
-                p.package_size,
-                p.legacy_pt_code,
-                br.brand_name,
-                m.required_qty,
-                COALESCE(m.issued_qty, 0) as issued_qty,
-                m.uom,
-                m.status,
-                (m.required_qty - COALESCE(m.issued_qty, 0)) as pending_qty
-            FROM manufacturing_order_materials m
-            JOIN products p ON m.material_id = p.id
-            JOIN brands br ON p.brand_id = br.id
-            WHERE m.manufacturing_order_id = %s
-            ORDER BY p.name
-        """
+        query = _ORDER_MATERIALS_SELECT + " WHERE m.manufacturing_order_id = %s ORDER BY p.name"
         
         try:
             return pd.read_sql(query, self.engine, params=(order_id,))
@@ -469,6 +557,21 @@ class OrderQueries:
             logger.error(f"Error getting order materials for {order_id}: {e}")
             return pd.DataFrame()
     
+    def get_order_materials_bulk(self, order_ids: List[int]) -> pd.DataFrame:
+        """Materials of several orders in one query (keyed by manufacturing_order_id)"""
+        order_ids = [int(i) for i in dict.fromkeys(order_ids)]
+        if not order_ids:
+            return pd.DataFrame()
+        
+        placeholders = ', '.join(['%s'] * len(order_ids))
+        query = _ORDER_MATERIALS_SELECT + f" WHERE m.manufacturing_order_id IN ({placeholders}) ORDER BY m.manufacturing_order_id, p.name"
+        
+        try:
+            return pd.read_sql(query, self.engine, params=tuple(order_ids))
+        except Exception as e:
+            logger.error(f"Error getting order materials for {len(order_ids)} orders: {e}")
+            return pd.DataFrame()
+    
     # ==================== BOM Queries ====================
     
     def get_active_boms(self) -> pd.DataFrame:
@@ -976,45 +1079,8 @@ class OrderQueries:
         Returns:
             DataFrame with material availability status
         """
-        query = """
-            SELECT 
-                d.id as bom_detail_id,
-                d.material_id,
-                p.name as material_name,
-                p.pt_code,
-                p.package_size,
-                p.legacy_pt_code,
-                br.brand_name,
-                d.quantity * %s / h.output_qty * (1 + d.scrap_rate/100) as required_qty,
-                d.uom,
-                COALESCE(SUM(ih.remain), 0) as available_qty,
-                CASE 
-                    WHEN COALESCE(SUM(ih.remain), 0) >= 
-                         d.quantity * %s / h.output_qty * (1 + d.scrap_rate/100)
-                    THEN 'SUFFICIENT'
-                    WHEN COALESCE(SUM(ih.remain), 0) > 0
-                    THEN 'PARTIAL'
-                    ELSE 'INSUFFICIENT'
-                END as availability_status
-            FROM bom_details d
-            JOIN bom_headers h ON d.bom_header_id = h.id
-            JOIN products p ON d.material_id = p.id
-            JOIN brands br ON p.brand_id = br.id
-            LEFT JOIN inventory_histories ih 
-                ON ih.product_id = d.material_id 
-                AND ih.warehouse_id = %s
-                AND ih.remain > 0
-                AND ih.delete_flag = 0
-            WHERE h.id = %s
-            GROUP BY d.id, d.material_id, p.name, p.pt_code, p.package_size, 
-                     p.legacy_pt_code, br.brand_name,
-                     d.quantity, d.uom, d.scrap_rate, h.output_qty
-            ORDER BY p.name
-        """
-        
         try:
-            return pd.read_sql(query, self.engine, 
-                             params=(quantity, quantity, warehouse_id, bom_id))
+            return self._availability.get_bom_primary(bom_id, quantity, warehouse_id)
         except Exception as e:
             logger.error(f"Error checking material availability: {e}")
             return pd.DataFrame()
@@ -1035,61 +1101,10 @@ class OrderQueries:
         Returns:
             DataFrame with alternative materials and their availability
         """
-        if not bom_detail_ids:
-            return pd.DataFrame()
-        
-        # Build query with proper parameter handling
-        placeholders = ', '.join(['%s'] * len(bom_detail_ids))
-        
-        # Note: bom_material_alternatives has its own quantity, uom, scrap_rate
-        # Formula: (planned_qty / output_qty) * alt.quantity * (1 + alt.scrap_rate/100)
-        query = f"""
-            SELECT 
-                alt.bom_detail_id,
-                alt.alternative_material_id as material_id,
-                alt.priority as alt_priority,
-                alt.quantity as alt_quantity,
-                alt.scrap_rate as alt_scrap_rate,
-                p.name as material_name,
-                p.pt_code,
-                p.package_size,
-                p.legacy_pt_code,
-                br.brand_name,
-                alt.quantity * %s / h.output_qty * (1 + COALESCE(alt.scrap_rate, 0)/100) as required_qty,
-                alt.uom,
-                COALESCE(SUM(ih.remain), 0) as available_qty,
-                CASE 
-                    WHEN COALESCE(SUM(ih.remain), 0) >= 
-                         alt.quantity * %s / h.output_qty * (1 + COALESCE(alt.scrap_rate, 0)/100)
-                    THEN 'SUFFICIENT'
-                    WHEN COALESCE(SUM(ih.remain), 0) > 0
-                    THEN 'PARTIAL'
-                    ELSE 'INSUFFICIENT'
-                END as availability_status,
-                'ALTERNATIVE' as material_type
-            FROM bom_material_alternatives alt
-            JOIN bom_details d ON alt.bom_detail_id = d.id
-            JOIN bom_headers h ON d.bom_header_id = h.id
-            JOIN products p ON alt.alternative_material_id = p.id
-            JOIN brands br ON p.brand_id = br.id
-            LEFT JOIN inventory_histories ih 
-                ON ih.product_id = alt.alternative_material_id 
-                AND ih.warehouse_id = %s
-                AND ih.remain > 0
-                AND ih.delete_flag = 0
-            WHERE h.id = %s
-                AND alt.is_active = 1
-                AND d.id IN ({placeholders})
-            GROUP BY alt.bom_detail_id, alt.alternative_material_id, alt.priority, 
-                     alt.quantity, alt.scrap_rate, alt.uom,
-                     p.name, p.pt_code, p.package_size, 
-                     p.legacy_pt_code, br.brand_name, h.output_qty
-            ORDER BY alt.bom_detail_id, alt.priority
-        """
-        
         try:
-            params = [quantity, quantity, warehouse_id, bom_id] + list(bom_detail_ids)
-            return pd.read_sql(query, self.engine, params=tuple(params))
+            return self._availability.get_bom_alternatives(
+                bom_id, quantity, warehouse_id, bom_detail_ids
+            )
         except Exception as e:
             logger.error(f"Error getting alternative materials: {e}")
             return pd.DataFrame()
@@ -1111,60 +1126,15 @@ class OrderQueries:
                 - alternatives: DataFrame with alternative materials (grouped by bom_detail_id)
                 - summary: Dict with counts
         """
-        # Step 1: Get primary materials
-        primary_df = self.check_material_availability(bom_id, quantity, warehouse_id)
-        
-        if primary_df.empty:
+        try:
+            return self._availability.get_bom_availability(bom_id, quantity, warehouse_id)
+        except Exception as e:
+            logger.error(f"Error checking material availability: {e}")
             return {
-                'primary': primary_df,
+                'primary': pd.DataFrame(),
                 'alternatives': pd.DataFrame(),
-                'summary': {
-                    'total': 0,
-                    'sufficient': 0,
-                    'partial': 0,
-                    'insufficient': 0,
-                    'has_alternatives': 0,
-                    'has_sufficient_alternatives': 0
-                }
-            }
-        
-        # Step 2: Find materials that need alternatives (PARTIAL or INSUFFICIENT)
-        needs_alternatives = primary_df[
-            primary_df['availability_status'].isin(['PARTIAL', 'INSUFFICIENT'])
-        ]
-        
-        alternatives_df = pd.DataFrame()
-        
-        if not needs_alternatives.empty:
-            bom_detail_ids = needs_alternatives['bom_detail_id'].tolist()
-            alternatives_df = self.get_alternative_materials(
-                bom_id, quantity, warehouse_id, bom_detail_ids
-            )
-        
-        # Step 3: Calculate summary
-        total = len(primary_df)
-        sufficient = len(primary_df[primary_df['availability_status'] == 'SUFFICIENT'])
-        partial = len(primary_df[primary_df['availability_status'] == 'PARTIAL'])
-        insufficient = len(primary_df[primary_df['availability_status'] == 'INSUFFICIENT'])
-        
-        # Count how many items have sufficient alternatives
-        has_sufficient_alt = 0
-        if not alternatives_df.empty:
-            sufficient_alts = alternatives_df[alternatives_df['availability_status'] == 'SUFFICIENT']
-            has_sufficient_alt = sufficient_alts['bom_detail_id'].nunique()
-        
-        return {
-            'primary': primary_df,
-            'alternatives': alternatives_df,
-            'summary': {
-                'total': total,
-                'sufficient': sufficient,
-                'partial': partial,
-                'insufficient': insufficient,
-                'has_alternatives': len(alternatives_df['bom_detail_id'].unique()) if not alternatives_df.empty else 0,
-                'has_sufficient_alternatives': has_sufficient_alt
+                'summary': self._availability.summarize_bom(pd.DataFrame(), pd.DataFrame())
             }
-        }
     
     # ==================== Dashboard Metrics ====================
     
@@ -1247,54 +1217,13 @@ class OrderQueries:
         
         Replaces per-render: get_orders() + get_orders_count() + get_search_filter_options()
         + get_filter_options() + get_bom_conflict_summary()
-        """
-        query = """
-            SELECT 
-                o.id,
-                o.order_no,
-                o.order_date,
-                o.scheduled_date,
-                o.completion_date,
-                o.status,
-                o.priority,
-                o.planned_qty,
-                o.produced_qty,
-                o.uom,
-                o.product_id,
-                o.bom_header_id,
-                o.warehouse_id,
-                o.target_warehouse_id,
-                o.notes,
-                p.pt_code,
-                p.name as product_name,
-                p.package_size,
-                p.legacy_pt_code,
-                b.bom_type,
-                b.bom_name,
-                b.bom_code,
-                b.status as bom_status,
-                br.id as brand_id,
-                br.brand_name,
-                w1.name as warehouse_name,
-                w2.name as target_warehouse_name,
-                o.created_date,
-                o.created_by,
-                CONCAT(e.first_name, ' ', e.last_name) as created_by_name
-            FROM manufacturing_orders o
-            JOIN products p ON o.product_id = p.id
-            JOIN bom_headers b ON o.bom_header_id = b.id
-            JOIN brands br ON p.brand_id = br.id
-            JOIN warehouses w1 ON o.warehouse_id = w1.id
-            JOIN warehouses w2 ON o.target_warehouse_id = w2.id
-            LEFT JOIN users u ON o.created_by = u.id
-            LEFT JOIN employees e ON u.employee_id = e.id
-            WHERE o.delete_flag = 0
-            ORDER BY o.created_date DESC
-        """
         
+        Served from the process-wide delta store: full load once, then only
+        rows created/updated since the last sync.
+        """
         try:
             _t0 = _time.perf_counter()
-            result = pd.read_sql(query, self.engine)
+            result = get_delta_store(ORDERS_DELTA_ENTITY).get()
             _ms = (_time.perf_counter() - _t0) * 1000
             logger.info(f"[PERF] get_all_orders: {_ms:.0f}ms ({len(result)} rows)")
             self._connection_error = None
@@ -0,0 +1,560 @@
+# utils/production/overview/pivot_rollups.py
+"""
+Daily rollup tables for the Production Overview pivot
+
+The pivot used to aggregate manufacturing_orders / production_receipts
+live (DATE_FORMAT period keys, CONCAT dimension keys, 6 joins) on every
+filter change. It now reads small pre-aggregated daily tables and
+re-groups days into weeks/months in pandas.
+
+Tables (created on first refresh):
+    production_pivot_mo_daily       (date_type, day, status, priority, product_id,
+                                     bom_type, warehouse_id, target_warehouse_id,
+                                     entity_id) → mo_count, planned_qty, produced_qty
+                                    date_type = order_date | scheduled_date | completion_date
+    production_pivot_mo_days        mo_id, date_type → day the MO is counted on
+                                    (to find the old day when a date changes)
+    production_pivot_receipt_daily  (day, mo_id, quality_status) + MO dimensions
+                                    → receipt_qty. Keeps mo_id so MO counts stay
+                                    distinct when days are merged into weeks/months
+    production_pivot_dirty          MO ids queued by writers that do not bump a
+                                    timestamp (receipt QC edits)
+    production_pivot_rollup_state   refresh watermark
+
+Labels (product, brand, warehouse, entity) are joined at read time, so
+renames need no rebuild.
+
+Incremental refresh (at most every REFRESH_INTERVAL_SECONDS per process,
+serialized across processes with GET_LOCK):
+    dirty MOs = created/updated since watermark
+              ∪ MOs with receipts created since watermark
+              ∪ production_pivot_dirty
+    per chunk: recompute the MO's old + new day slices and its receipt rows
+
+MO-level pivot by MO number has one row per MO — no rollup can shrink it,
+so it stays on the live query (see OverviewQueries.get_pivot_data).
+
+Version: 1.0.0
+"""
+
+import logging
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import pandas as pd
+from sqlalchemy import text
+
+from utils.db import get_db_engine
+
+logger = logging.getLogger(__name__)
+
+MO_DAILY_TABLE = 'production_pivot_mo_daily'
+MO_DAYS_TABLE = 'production_pivot_mo_days'
+RECEIPT_DAILY_TABLE = 'production_pivot_receipt_daily'
+DIRTY_TABLE = 'production_pivot_dirty'
+STATE_TABLE = 'production_pivot_rollup_state'
+
+STATE_NAME = 'production_overview_pivot'
+LOCK_NAME = 'production_pivot_rollups'
+
+REFRESH_INTERVAL_SECONDS = 10
+WATERMARK_OVERLAP_SECONDS = 5
+CHUNK_SIZE = 500
+
+MO_DATE_COLUMNS = {
+    'order_date': 'mo.order_date',
+    'scheduled_date': 'mo.scheduled_date',
+    'completion_date': 'mo.completion_date',
+}
+
+_CREATE_TABLES = [
+    f"""
+    CREATE TABLE IF NOT EXISTS {MO_DAILY_TABLE} (
+        date_type VARCHAR(20) NOT NULL,
+        day DATE NOT NULL,
+        status VARCHAR(20) NOT NULL,
+        priority VARCHAR(20) NOT NULL DEFAULT '',
+        product_id BIGINT NOT NULL,
+        bom_type VARCHAR(50) NOT NULL DEFAULT '',
+        warehouse_id BIGINT NOT NULL,
+        target_warehouse_id BIGINT NOT NULL,
+        entity_id BIGINT NOT NULL DEFAULT 0,
+        mo_count INT NOT NULL,
+        planned_qty DECIMAL(24, 5) NOT NULL,
+        produced_qty DECIMAL(24, 5) NOT NULL,
+        PRIMARY KEY (date_type, day, status, priority, product_id, bom_type,
+                     warehouse_id, target_warehouse_id, entity_id)
+    )
+    """,
+    f"""
+    CREATE TABLE IF NOT EXISTS {MO_DAYS_TABLE} (
+        mo_id BIGINT NOT NULL,
+        date_type VARCHAR(20) NOT NULL,
+        day DATE NOT NULL,
+        PRIMARY KEY (mo_id, date_type)
+    )
+    """,
+    f"""
+    CREATE TABLE IF NOT EXISTS {RECEIPT_DAILY_TABLE} (
+        day DATE NOT NULL,
+        mo_id BIGINT NOT NULL,
+        quality_status VARCHAR(20) NOT NULL DEFAULT '',
+        status VARCHAR(20) NOT NULL,
+        priority VARCHAR(20) NOT NULL DEFAULT '',
+        product_id BIGINT NOT NULL,
+        bom_type VARCHAR(50) NOT NULL DEFAULT '',
+        warehouse_id BIGINT NOT NULL,
+        target_warehouse_id BIGINT NOT NULL,
+        entity_id BIGINT NOT NULL DEFAULT 0,
+        receipt_qty DECIMAL(24, 5) NOT NULL,
+        PRIMARY KEY (day, mo_id, quality_status),
+        KEY idx_pprd_mo (mo_id)
+    )
+    """,
+    f"""
+    CREATE TABLE IF NOT EXISTS {DIRTY_TABLE} (
+        mo_id BIGINT NOT NULL PRIMARY KEY,
+        queued_date DATETIME(6) NOT NULL
+    )
+    """,
+    f"""
+    CREATE TABLE IF NOT EXISTS {STATE_TABLE} (
+        name VARCHAR(64) NOT NULL PRIMARY KEY,
+        watermark DATETIME NOT NULL,
+        rebuilt_date DATETIME NOT NULL
+    )
+    """,
+]
+
+# Same joins as the live pivot → same MOs counted
+_SOURCE_JOINS = """
+    JOIN products p ON mo.product_id = p.id
+    JOIN brands br ON p.brand_id = br.id
+    JOIN bom_headers bh ON mo.bom_header_id = bh.id
+    JOIN warehouses w1 ON mo.warehouse_id = w1.id
+    JOIN warehouses w2 ON mo.target_warehouse_id = w2.id
+"""
+
+_MO_DIMENSIONS = """
+    mo.status, COALESCE(mo.priority, ''), mo.product_id, COALESCE(bh.bom_type, ''),
+    mo.warehouse_id, mo.target_warehouse_id, COALESCE(mo.entity_id, 0)
+"""
+
+_INSERT_MO_DAILY = """
+    INSERT INTO {table} (
+        date_type, day, status, priority, product_id, bom_type,
+        warehouse_id, target_warehouse_id, entity_id,
+        mo_count, planned_qty, produced_qty
+    )
+    SELECT
+        :date_type, DATE({col}), {dims},
+        COUNT(*), COALESCE(SUM(mo.planned_qty), 0), COALESCE(SUM(mo.produced_qty), 0)
+    FROM manufacturing_orders mo
+    {joins}
+    WHERE mo.delete_flag = 0 AND {col} IS NOT NULL {filter}
+    GROUP BY DATE({col}), {dims}
+"""
+
+_INSERT_MO_DAYS = """
+    INSERT INTO {table} (mo_id, date_type, day)
+    SELECT mo.id, :date_type, DATE({col})
+    FROM manufacturing_orders mo
+    {joins}
+    WHERE mo.delete_flag = 0 AND {col} IS NOT NULL {filter}
+"""
+
+_INSERT_RECEIPT_DAILY = """
+    INSERT INTO {table} (
+        day, mo_id, quality_status, status, priority, product_id, bom_type,
+        warehouse_id, target_warehouse_id, entity_id, receipt_qty
+    )
+    SELECT
+        DATE(pr.receipt_date), mo.id, COALESCE(pr.quality_status, ''), {dims},
+        COALESCE(SUM(pr.quantity), 0)
+    FROM production_receipts pr
+    JOIN manufacturing_orders mo ON pr.manufacturing_order_id = mo.id
+    {joins}
+    WHERE mo.delete_flag = 0 AND pr.receipt_date IS NOT NULL {filter}
+    GROUP BY DATE(pr.receipt_date), mo.id, COALESCE(pr.quality_status, ''), {dims}
+"""
+
+# Dimension label expressions over a rollup row r
+_DIMENSION_EXPRS = {
+    'output_product': "CONCAT(p.pt_code, ' | ', p.name)",
+    'brand': "br.brand_name",
+    'bom_type': "NULLIF(r.bom_type, '')",
+    'source_warehouse': "w1.name",
+    'target_warehouse': "w2.name",
+    'order_status': "r.status",
+    'priority': "NULLIF(r.priority, '')",
+    'entity': "COALESCE(c.english_name, 'N/A')",
+}
+
+_READ_JOINS = """
+    JOIN products p ON r.product_id = p.id
+    JOIN brands br ON p.brand_id = br.id
+    JOIN warehouses w1 ON r.warehouse_id = w1.id
+    JOIN warehouses w2 ON r.target_warehouse_id = w2.id
+    LEFT JOIN companies c ON r.entity_id = c.id
+"""
+
+
+def _in_params(prefix: str, values: List) -> Tuple[str, Dict[str, Any]]:
+    params = {f'{prefix}_{i}': v for i, v in enumerate(values)}
+    return ', '.join(f':{k}' for k in params), params
+
+
+def _chunks(values: List, size: int = CHUNK_SIZE):
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def period_keys(days: pd.Series, period: str) -> pd.Series:
+    """Period key from day: 'YYYY-MM-DD' (day / week Monday) or 'YYYY-MM'"""
+    days = pd.to_datetime(days)
+    if period == 'day':
+        return days.dt.strftime('%Y-%m-%d')
+    if period == 'week':
+        return (days - pd.to_timedelta(days.dt.weekday, unit='D')).dt.strftime('%Y-%m-%d')
+    return days.dt.strftime('%Y-%m')
+
+
+def queue_pivot_refresh(conn, order_ids: Iterable[int]):
+    """
+    Queue MOs for rollup refresh inside the caller's transaction.
+
+    For writes that change pivot measures without bumping a timestamp
+    (receipt QC edits). Never fails the caller: runs in a savepoint and
+    logs if the queue table is not there yet (a first refresh rebuilds
+    everything anyway).
+    """
+    ids = sorted({int(i) for i in order_ids if i is not None})
+    if not ids:
+        return
+    try:
+        with conn.begin_nested():
+            conn.execute(text(f"""
+                INSERT INTO {DIRTY_TABLE} (mo_id, queued_date)
+                VALUES (:mo_id, NOW(6))
+                ON DUPLICATE KEY UPDATE queued_date = NOW(6)
+            """), [{'mo_id': i} for i in ids])
+    except Exception as e:
+        logger.warning(f"Pivot rollup refresh not queued for MOs {ids}: {e}")
+
+
+class PivotRollupStore:
+    """Maintains and reads the overview pivot rollups"""
+
+    def __init__(self, engine=None):
+        self._engine = engine
+        self._tables_ready = False
+        self._last_refresh = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            self._engine = get_db_engine()
+        return self._engine
+
+    # ==================== Maintenance ====================
+
+    def ensure_tables(self):
+        if self._tables_ready:
+            return
+        with self.engine.begin() as conn:
+            for ddl in _CREATE_TABLES:
+                conn.execute(text(ddl))
+        self._tables_ready = True
+
+    def refresh(self, force: bool = False, rebuild: bool = False) -> Dict[str, Any]:
+        """
+        Bring rollups up to date (throttled per process unless force/rebuild).
+
+        Returns {'skipped': bool, 'rebuilt': bool, 'orders_refreshed': int}
+        """
+        with self._lock:
+            if not (force or rebuild) and time.monotonic() - self._last_refresh < REFRESH_INTERVAL_SECONDS:
+                return {'skipped': True, 'rebuilt': False, 'orders_refreshed': 0}
+
+            # Throttle failures too — callers fall back to the live query meanwhile
+            self._last_refresh = time.monotonic()
+
+            self.ensure_tables()
+            with self.engine.connect() as lock_conn:
+                got = lock_conn.execute(text("SELECT GET_LOCK(:name, 0)"), {'name': LOCK_NAME}).scalar()
+                if not got:
+                    # Another process is refreshing; read what is there
+                    return {'skipped': True, 'rebuilt': False, 'orders_refreshed': 0}
+                try:
+                    return self._refresh_locked(rebuild)
+                finally:
+                    lock_conn.execute(text("SELECT RELEASE_LOCK(:name)"), {'name': LOCK_NAME})
+
+    def _refresh_locked(self, rebuild: bool) -> Dict[str, Any]:
+        _t0 = time.perf_counter()
+        with self.engine.connect() as conn:
+            now = conn.execute(text("SELECT NOW()")).scalar()
+            state = conn.execute(
+                text(f"SELECT watermark FROM {STATE_TABLE} WHERE name = :name"),
+                {'name': STATE_NAME}
+            ).fetchone()
+        new_watermark = now - timedelta(seconds=WATERMARK_OVERLAP_SECONDS)
+
+        if rebuild or state is None:
+            self._rebuild(new_watermark)
+            logger.info(f"[PERF] pivot rollups rebuilt: {(time.perf_counter() - _t0) * 1000:.0f}ms")
+            return {'skipped': False, 'rebuilt': True, 'orders_refreshed': 0}
+
+        since = state[0]
+        with self.engine.connect() as conn:
+            dirty = self._dirty_orders(conn, since)
+            queued_at = conn.execute(text("SELECT NOW(6)")).scalar()
+
+        for chunk in _chunks(sorted(dirty)):
+            with self.engine.begin() as conn:
+                self._refresh_orders(conn, chunk)
+                ids_sql, params = _in_params('mo', chunk)
+                params['queued_at'] = queued_at
+                conn.execute(text(f"""
+                    DELETE FROM {DIRTY_TABLE}
+                    WHERE mo_id IN ({ids_sql}) AND queued_date <= :queued_at
+                """), params)
+
+        with self.engine.begin() as conn:
+            conn.execute(
+                text(f"UPDATE {STATE_TABLE} SET watermark = :watermark WHERE name = :name"),
+                {'watermark': new_watermark, 'name': STATE_NAME}
+            )
+
+        if dirty:
+            logger.info(
+                f"[PERF] pivot rollups refreshed {len(dirty)} MO(s): "
+                f"{(time.perf_counter() - _t0) * 1000:.0f}ms"
+            )
+        return {'skipped': False, 'rebuilt': False, 'orders_refreshed': len(dirty)}
+
+    def _rebuild(self, watermark: datetime):
+        with self.engine.begin() as conn:
+            for table in (MO_DAILY_TABLE, MO_DAYS_TABLE, RECEIPT_DAILY_TABLE, DIRTY_TABLE):
+                conn.execute(text(f"DELETE FROM {table}"))
+
+            for date_type, col in MO_DATE_COLUMNS.items():
+                fmt = dict(col=col, dims=_MO_DIMENSIONS, joins=_SOURCE_JOINS, filter='')
+                conn.execute(text(_INSERT_MO_DAILY.format(table=MO_DAILY_TABLE, **fmt)),
+                             {'date_type': date_type})
+                conn.execute(text(_INSERT_MO_DAYS.format(table=MO_DAYS_TABLE, **fmt)),
+                             {'date_type': date_type})
+
+            conn.execute(text(_INSERT_RECEIPT_DAILY.format(
+                table=RECEIPT_DAILY_TABLE, dims=_MO_DIMENSIONS, joins=_SOURCE_JOINS, filter=''
+            )))
+
+            conn.execute(text(f"""
+                INSERT INTO {STATE_TABLE} (name, watermark, rebuilt_date)
+                VALUES (:name, :watermark, NOW())
+                ON DUPLICATE KEY UPDATE watermark = :watermark, rebuilt_date = NOW()
+            """), {'name': STATE_NAME, 'watermark': watermark})
+
+    @staticmethod
+    def _dirty_orders(conn, since: datetime) -> Set[int]:
+        dirty: Set[int] = set()
+        queries = [
+            ("SELECT id FROM manufacturing_orders WHERE created_date >= :since", {'since': since}),
+            ("SELECT id FROM manufacturing_orders WHERE updated_date >= :since", {'since': since}),
+            ("SELECT DISTINCT manufacturing_order_id FROM production_receipts "
+             "WHERE created_date >= :since", {'since': since}),
+            (f"SELECT mo_id FROM {DIRTY_TABLE}", {}),
+        ]
+        for sql, params in queries:
+            dirty.update(int(row[0]) for row in conn.execute(text(sql), params) if row[0] is not None)
+        return dirty
+
+    @staticmethod
+    def _refresh_orders(conn, mo_ids: List[int]):
+        """Recompute every rollup row the given MOs contribute (or contributed) to"""
+        ids_sql, id_params = _in_params('mo', mo_ids)
+        mo_filter = f"AND mo.id IN ({ids_sql})"
+
+        old_days = conn.execute(
+            text(f"SELECT date_type, day FROM {MO_DAYS_TABLE} WHERE mo_id IN ({ids_sql})"), id_params
+        ).fetchall()
+
+        conn.execute(text(f"DELETE FROM {MO_DAYS_TABLE} WHERE mo_id IN ({ids_sql})"), id_params)
+        for date_type, col in MO_DATE_COLUMNS.items():
+            conn.execute(text(_INSERT_MO_DAYS.format(
+                table=MO_DAYS_TABLE, col=col, joins=_SOURCE_JOINS, filter=mo_filter
+            )), {**id_params, 'date_type': date_type})
+
+        new_days = conn.execute(
+            text(f"SELECT date_type, day FROM {MO_DAYS_TABLE} WHERE mo_id IN ({ids_sql})"), id_params
+        ).fetchall()
+
+        affected: Dict[str, Set[date]] = {}
+        for date_type, day in list(old_days) + list(new_days):
+            affected.setdefault(date_type, set()).add(day)
+
+        # Recompute whole day slices (other MOs on those days included)
+        for date_type, days in affected.items():
+            col = MO_DATE_COLUMNS.get(date_type)
+            if col is None:
+                continue
+            for day_chunk in _chunks(sorted(days)):
+                days_sql, day_params = _in_params('d', day_chunk)
+                params = {**day_params, 'date_type': date_type}
+                conn.execute(text(f"""
+                    DELETE FROM {MO_DAILY_TABLE}
+                    WHERE date_type = :date_type AND day IN ({days_sql})
+                """), params)
+                params.update({
+                    'd_min': datetime.combine(day_chunk[0], datetime.min.time()),
+                    'd_max': datetime.combine(day_chunk[-1] + timedelta(days=1), datetime.min.time()),
+                })
+                day_filter = f"AND {col} >= :d_min AND {col} < :d_max AND DATE({col}) IN ({days_sql})"
+                conn.execute(text(_INSERT_MO_DAILY.format(
+                    table=MO_DAILY_TABLE, col=col, dims=_MO_DIMENSIONS,
+                    joins=_SOURCE_JOINS, filter=day_filter
+                )), params)
+
+        # Receipt rows are keyed by MO → replace them outright
+        conn.execute(text(f"DELETE FROM {RECEIPT_DAILY_TABLE} WHERE mo_id IN ({ids_sql})"), id_params)
+        conn.execute(text(_INSERT_RECEIPT_DAILY.format(
+            table=RECEIPT_DAILY_TABLE, dims=_MO_DIMENSIONS, joins=_SOURCE_JOINS, filter=mo_filter
+        )), id_params)
+
+    # ==================== Read ====================
+
+    def get_pivot_data(self,
+                       date_type: str = 'order_date',
+                       from_date: Optional[date] = None,
+                       to_date: Optional[date] = None,
+                       status: Optional[str] = None,
+                       period: str = 'month',
+                       dimension: str = 'output_product') -> pd.DataFrame:
+        """
+        Pivot rows (period_key, dimension_key + measures) from the rollups.
+
+        Same columns as the live OverviewQueries pivot query. Raises on DB
+        errors (caller falls back to the live query).
+        """
+        self.refresh()
+
+        if date_type == 'receipt_date':
+            daily = self._read_receipts(from_date, to_date, status, dimension)
+            return regroup_receipts(daily, period)
+
+        daily = self._read_orders(date_type, from_date, to_date, status, dimension)
+        return regroup_orders(daily, period)
+
+    def _where(self, from_date, to_date, status) -> Tuple[str, Dict[str, Any]]:
+        clauses, params = [], {}
+        if from_date:
+            clauses.append("r.day >= :from_date")
+            params['from_date'] = from_date
+        if to_date:
+            clauses.append("r.day <= :to_date")
+            params['to_date'] = to_date
+        if status:
+            clauses.append("r.status = :status")
+            params['status'] = status
+        return ''.join(f" AND {c}" for c in clauses), params
+
+    def _read_orders(self, date_type, from_date, to_date, status, dimension) -> pd.DataFrame:
+        if date_type not in MO_DATE_COLUMNS:
+            date_type = 'order_date'
+        dim_expr = _DIMENSION_EXPRS.get(dimension, "r.status")
+        where, params = self._where(from_date, to_date, status)
+        params['date_type'] = date_type
+
+        return pd.read_sql(text(f"""
+            SELECT r.day, {dim_expr} as dimension_key,
+                   SUM(r.mo_count) as mo_count,
+                   SUM(r.planned_qty) as planned_qty,
+                   SUM(r.produced_qty) as produced_qty
+            FROM {MO_DAILY_TABLE} r
+            {_READ_JOINS}
+            WHERE r.date_type = :date_type {where}
+            GROUP BY r.day, dimension_key
+        """), self.engine, params=params)
+
+    def _read_receipts(self, from_date, to_date, status, dimension) -> pd.DataFrame:
+        dim_map = dict(_DIMENSION_EXPRS, mo_number="mo.order_no", qc_status="NULLIF(r.quality_status, '')")
+        dim_expr = dim_map.get(dimension, "r.status")
+        where, params = self._where(from_date, to_date, status)
+        mo_join = "JOIN manufacturing_orders mo ON r.mo_id = mo.id" if dimension == 'mo_number' else ''
+
+        return pd.read_sql(text(f"""
+            SELECT r.day, {dim_expr} as dimension_key, r.mo_id, r.quality_status,
+                   SUM(r.receipt_qty) as receipt_qty
+            FROM {RECEIPT_DAILY_TABLE} r
+            {_READ_JOINS}
+            {mo_join}
+            WHERE 1=1 {where}
+            GROUP BY r.day, dimension_key, r.mo_id, r.quality_status
+        """), self.engine, params=params)
+
+
+def regroup_orders(df: pd.DataFrame, period: str) -> pd.DataFrame:
+    """Daily MO rollup rows → period rows with the live query's columns"""
+    columns = ['period_key', 'dimension_key', 'mo_count', 'planned_qty', 'produced_qty', 'yield_pct']
+    if df.empty:
+        return pd.DataFrame(columns=columns)
+
+    df = df.assign(
+        period_key=period_keys(df['day'], period),
+        mo_count=pd.to_numeric(df['mo_count']),
+        planned_qty=pd.to_numeric(df['planned_qty']).astype(float),
+        produced_qty=pd.to_numeric(df['produced_qty']).astype(float),
+    )
+    out = (
+        df.groupby(['period_key', 'dimension_key'], as_index=False, dropna=False)
+        [['mo_count', 'planned_qty', 'produced_qty']].sum()
+    )
+    planned = out['planned_qty']
+    out['yield_pct'] = (out['produced_qty'] / planned.where(planned > 0) * 100).round(1).fillna(0)
+    return out[columns].sort_values(['period_key', 'dimension_key'], ignore_index=True)
+
+
+def regroup_receipts(df: pd.DataFrame, period: str) -> pd.DataFrame:
+    """Daily receipt rollup rows → period rows with the live query's columns"""
+    columns = ['period_key', 'dimension_key', 'mo_count', 'receipt_qty',
+               'qc_passed_qty', 'qc_failed_qty', 'qc_pending_qty', 'pass_rate_pct']
+    if df.empty:
+        return pd.DataFrame(columns=columns)
+
+    qty = pd.to_numeric(df['receipt_qty']).astype(float)
+    df = df.assign(
+        period_key=period_keys(df['day'], period),
+        receipt_qty=qty,
+        qc_passed_qty=qty.where(df['quality_status'] == 'PASSED', 0.0),
+        qc_failed_qty=qty.where(df['quality_status'] == 'FAILED', 0.0),
+        qc_pending_qty=qty.where(df['quality_status'] == 'PENDING', 0.0),
+    )
+    out = df.groupby(['period_key', 'dimension_key'], as_index=False, dropna=False).agg(
+        mo_count=('mo_id', 'nunique'),
+        receipt_qty=('receipt_qty', 'sum'),
+        qc_passed_qty=('qc_passed_qty', 'sum'),
+        qc_failed_qty=('qc_failed_qty', 'sum'),
+        qc_pending_qty=('qc_pending_qty', 'sum'),
+    )
+    total = out['receipt_qty']
+    out['pass_rate_pct'] = (out['qc_passed_qty'] / total.where(total > 0) * 100).round(1).fillna(0)
+    return out[columns].sort_values(['period_key', 'dimension_key'], ignore_index=True)
+
+
+# ==================== SINGLETON ====================
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_pivot_rollups() -> PivotRollupStore:
+    """Get process-wide PivotRollupStore"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = PivotRollupStore()
+    return _store
@@ -3,8 +3,10 @@
 Database queries for Production Overview domain
 Complex aggregation queries joining MO, materials, receipts
 
-Version: 5.0.0
+Version: 5.1.0
 Changes:
+- v5.1.0: get_pivot_data() answers from daily rollup tables (pivot_rollups),
+          live aggregation kept as fallback
 - v5.0.0: MAJOR CHANGE - Show actual issued materials (1 row = 1 issue detail)
           - get_materials_for_export() now returns 1 row per material_issue_detail
           - Shows PRIMARY and ALTERNATIVE materials separately
@@ -705,6 +707,45 @@ class OverviewQueries:
         """
         Get aggregated data for pivot table.
         
+        Served from the daily rollup tables (pivot_rollups) and re-grouped to
+        the requested period. Falls back to the live aggregation if the
+        rollups are unavailable, and for MO-level pivots by MO number (one
+        row per MO — nothing to pre-aggregate).
+        
+        Returns:
+            DataFrame with columns: period_key, dimension_key, + measure columns
+        """
+        if date_type == 'receipt_date' or dimension != 'mo_number':
+            try:
+                from .pivot_rollups import get_pivot_rollups
+                
+                _t0 = _time.perf_counter()
+                df = get_pivot_rollups().get_pivot_data(
+                    date_type=date_type, from_date=from_date, to_date=to_date,
+                    status=status, period=period, dimension=dimension
+                )
+                _ms = (_time.perf_counter() - _t0) * 1000
+                logger.info(f"[PERF] get_pivot_data (rollups): {_ms:.0f}ms ({len(df)} rows)")
+                self._connection_error = None
+                return df
+            except Exception as e:
+                logger.warning(f"Pivot rollups unavailable, using live query: {e}")
+        
+        return self._get_pivot_data_live(
+            date_type=date_type, from_date=from_date, to_date=to_date,
+            status=status, period=period, dimension=dimension
+        )
+    
+    def _get_pivot_data_live(self,
+                             date_type: str = 'order_date',
+                             from_date: Optional[date] = None,
+                             to_date: Optional[date] = None,
+                             status: Optional[str] = None,
+                             period: str = 'month',
+                             dimension: str = 'output_product') -> Optional[pd.DataFrame]:
+        """
+        Aggregate pivot data live from the source tables.
+        
         Builds different queries for MO-level vs receipt-level date types:
         - MO-level: aggregates from manufacturing_orders (planned/produced qty)
         - Receipt-level: aggregates from production_receipts (receipt/QC qty)
@@ -3,8 +3,11 @@
 Return Manager - Business logic for Material Returns
 Return unused materials with validation and inventory updates
 
-Version: 1.0.0
+Version: 1.1.0
 Based on: materials.py return_materials function
+
+Changes:
+- v1.1.0: Returns notify the Supply Chain GAP result cache (gap_notify)
 """
 
 import logging
@@ -16,6 +19,9 @@ import pandas as pd
 from sqlalchemy import text
 
 from utils.db import get_db_engine
+from utils.doc_sequence import next_document_number
+from utils.production.gap_notify import collect_order_changes, notify_gap_cache
+from utils.production.material_availability import MaterialAvailabilityService
 from .common import get_vietnam_now
 
 logger = logging.getLogger(__name__)
@@ -122,18 +128,20 @@ class ReturnManager:
                 
                 # Update manufacturing_order_materials issued quantities
                 self._update_order_materials_for_return(conn, return_details, order_id)
+                change = collect_order_changes(conn, order_id, group_id=group_id)
                 
                 logger.info(f"✅ Created return {return_no} for order {order_id}")
                 
-                return {
-                    'return_no': return_no,
-                    'return_id': return_id,
-                    'details': return_details
-                }
-                
             except Exception as e:
                 logger.error(f"❌ Error processing returns for order {order_id}: {e}")
                 raise
+        
+        notify_gap_cache(change)
+        return {
+            'return_no': return_no,
+            'return_id': return_id,
+            'details': return_details
+        }
     
     # ==================== Private Helper Methods ====================
     
@@ -189,22 +197,9 @@ class ReturnManager:
     def _generate_return_number(self, conn) -> str:
         """Generate unique return number MR-YYYYMMDD-XXX"""
         timestamp = get_vietnam_now().strftime('%Y%m%d')
-        prefix = f"MR-{timestamp}-"
-        
-        query = text("""
-            SELECT COALESCE(
-                MAX(CAST(SUBSTRING_INDEX(return_no, '-', -1) AS UNSIGNED)), 0
-            ) + 1 as next_num
-            FROM material_returns
-            WHERE return_no LIKE :pattern
-            FOR UPDATE
-        """)
-        
-        result = conn.execute(query, {'pattern': f'{prefix}%'})
-        row = result.fetchone()
-        next_num = int(row[0]) if row and row[0] else 1
-        
-        return f"{prefix}{next_num:03d}"
+        return next_document_number(
+            f"MR-{timestamp}-", 'material_returns', 'return_no', conn=conn
+        )
     
     def _process_return_item(self, conn, return_id: int, return_item: Dict,
                             warehouse_id: int, group_id: str,
@@ -302,6 +297,13 @@ class ReturnManager:
     def _update_order_materials_for_return(self, conn, return_details: List[Dict],
                                            order_id: int):
         """Update manufacturing_order_materials after return"""
+        # Conversion ratios for all returned alternatives in one query
+        ratios = MaterialAvailabilityService.get_conversion_ratios(conn, [
+            (d['manufacturing_order_material_id'], d['material_id'])
+            for d in return_details
+            if d.get('is_alternative') and d.get('manufacturing_order_material_id')
+        ])
+        
         for detail in return_details:
             # Get conversion info if alternative
             mom_id = detail.get('manufacturing_order_material_id')
@@ -312,9 +314,7 @@ class ReturnManager:
             
             # Calculate equivalent quantity
             if detail.get('is_alternative'):
-                conversion_ratio = self._get_conversion_ratio(
-                    conn, mom_id, detail['material_id']
-                )
+                conversion_ratio = ratios.get((int(mom_id), int(detail['material_id'])), 1.0)
                 equivalent_returned = return_qty / conversion_ratio
             else:
                 equivalent_returned = return_qty
@@ -340,32 +340,3 @@ class ReturnManager:
                 f"📦 Returned {return_qty} (equivalent: {equivalent_returned:.4f}) "
                 f"for material_id {detail['material_id']}"
             )
-    
-    def _get_conversion_ratio(self, conn, order_material_id: int,
-                              alternative_material_id: int) -> float:
-        """Get conversion ratio for alternative material"""
-        query = text("""
-            SELECT 
-                bd.quantity as primary_qty,
-                alt.quantity as alt_qty
-            FROM manufacturing_order_materials mom
-            JOIN manufacturing_orders mo ON mom.manufacturing_order_id = mo.id
-            JOIN bom_details bd ON bd.bom_header_id = mo.bom_header_id
-                AND bd.material_id = mom.material_id
-            JOIN bom_material_alternatives alt ON alt.bom_detail_id = bd.id
-                AND alt.alternative_material_id = :alt_material_id
-            WHERE mom.id = :order_material_id
-            LIMIT 1
-        """)
-        
-        result = conn.execute(query, {
-            'order_material_id': order_material_id,
-            'alt_material_id': alternative_material_id
-        })
-        row = result.fetchone()
-        
-        if row:
-            data = dict(zip(result.keys(), row))
-            return float(data['alt_qty']) / float(data['primary_qty'])
-        
-        return 1.0  # Default ratio if not found
@@ -8,7 +8,7 @@ Version: 1.0.0
 
 import logging
 from datetime import datetime
-from typing import Dict, Optional, Any
+from typing import Dict, List, Optional, Any
 from io import BytesIO
 from pathlib import Path
 from decimal import Decimal
@@ -22,10 +22,8 @@ from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import mm
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
 from reportlab.platypus import (
-    SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image
+    SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
 )
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
 
 # Import database and S3 utilities
 try:
@@ -42,6 +40,11 @@ except ImportError:
         def get_company_logo_from_s3_enhanced(company_id, logo_path):
             return None
 
+try:
+    from utils.pdf_assets import get_pdf_assets
+except ImportError:
+    from ...pdf_assets import get_pdf_assets
+
 from .queries import ReturnQueries
 from .common import (
     format_number, get_vietnam_now, create_reason_display, format_datetime_vn,
@@ -57,7 +60,6 @@ class ReturnPDFGenerator:
     def __init__(self):
         self.engine = get_db_engine()
         self.queries = ReturnQueries()
-        self._registered_fonts = set()
         self.font_available = self._setup_fonts()
     
     def _get_project_root(self) -> Path:
@@ -67,46 +69,28 @@ class ReturnPDFGenerator:
         return project_root
     
     def _setup_fonts(self) -> bool:
-        """Setup DejaVu fonts for Vietnamese text support"""
-        try:
-            project_root = self._get_project_root()
-            fonts_dir = project_root / 'fonts'
-            
-            if not fonts_dir.exists():
-                return False
-            
-            dejavu_regular = fonts_dir / 'DejaVuSans.ttf'
-            dejavu_bold = fonts_dir / 'DejaVuSans-Bold.ttf'
-            
-            if not dejavu_regular.exists():
-                return False
-            
-            try:
-                if 'DejaVuSans' not in self._registered_fonts:
-                    pdfmetrics.registerFont(TTFont('DejaVuSans', str(dejavu_regular)))
-                    self._registered_fonts.add('DejaVuSans')
-            except Exception as e:
-                if 'already registered' not in str(e).lower():
-                    raise
-                self._registered_fonts.add('DejaVuSans')
-            
-            try:
-                if dejavu_bold.exists() and 'DejaVuSans-Bold' not in self._registered_fonts:
-                    pdfmetrics.registerFont(TTFont('DejaVuSans-Bold', str(dejavu_bold)))
-                    self._registered_fonts.add('DejaVuSans-Bold')
-            except Exception as e:
-                if 'already registered' not in str(e).lower():
-                    raise
-                self._registered_fonts.add('DejaVuSans-Bold')
-            
-            return True
-            
-        except Exception as e:
-            logger.error(f"Font setup error: {e}")
-            return False
+        """Setup DejaVu fonts for Vietnamese text support (registered once per process)"""
+        return get_pdf_assets().register_fonts(self._get_project_root() / 'fonts')
     
     def get_company_info(self, warehouse_id: int) -> Dict[str, Any]:
-        """Get company information from warehouse"""
+        """Get company information from warehouse (cached across documents)"""
+        company = get_pdf_assets().get_company(
+            ('warehouse', warehouse_id), lambda: self._load_company_info(warehouse_id)
+        )
+        if company:
+            return company
+        
+        return {
+            'id': 0,
+            'english_name': 'PROSTECH VIETNAM',
+            'local_name': 'CÔNG TY TNHH PROSTECH VIỆT NAM',
+            'address': 'Vietnam',
+            'registration_code': '',
+            'logo_path': None
+        }
+    
+    def _load_company_info(self, warehouse_id: int) -> Optional[Dict[str, Any]]:
+        """Query the company row for a warehouse (None if missing or failed)"""
         query = """
             SELECT 
                 c.id, c.english_name, c.local_name,
@@ -124,17 +108,13 @@ class ReturnPDFGenerator:
                 return df.iloc[0].to_dict()
         except Exception as e:
             logger.error(f"Error getting company info: {e}")
-        
-        return {
-            'id': 0,
-            'english_name': 'PROSTECH VIETNAM',
-            'local_name': 'CÔNG TY TNHH PROSTECH VIỆT NAM',
-            'address': 'Vietnam',
-            'registration_code': '',
-            'logo_path': None
-        }
+        return None
     
     def get_custom_styles(self) -> Dict[str, Any]:
+        """Custom paragraph styles (built once per font setup, shared read-only)"""
+        return get_pdf_assets().get_styles(('return', self.font_available), self._build_custom_styles)
+    
+    def _build_custom_styles(self) -> Dict[str, Any]:
         """Create custom paragraph styles"""
         styles = getSampleStyleSheet()
         base_font = 'DejaVuSans' if self.font_available else 'Helvetica'
@@ -192,12 +172,9 @@ class ReturnPDFGenerator:
         logo_img = None
         if S3_AVAILABLE:
             try:
-                logo_bytes = get_company_logo_from_s3_enhanced(
-                    company_info['id'], company_info.get('logo_path')
-                )
-                if logo_bytes:
-                    logo_buffer = BytesIO(logo_bytes)
-                    logo_img = Image(logo_buffer, width=50*mm, height=15*mm, kind='proportional')
+                logo = get_pdf_assets().get_logo(company_info['id'], company_info.get('logo_path'))
+                if logo:
+                    logo_img = logo.flowable(width=50*mm, height=15*mm)
             except Exception as e:
                 logger.warning(f"Could not load logo: {e}")
         
@@ -460,43 +437,12 @@ class ReturnPDFGenerator:
                     layout: str = 'landscape') -> Optional[bytes]:
         """Generate PDF for material return"""
         try:
-            return_data = self.queries.get_return_details(return_id)
-            if not return_data:
+            data = self.load_data(return_id)
+            if not data:
                 logger.error(f"Return {return_id} not found")
                 return None
             
-            materials = self.queries.get_return_materials(return_id)
-            
-            data = {
-                'return': return_data,
-                'details': materials.to_dict('records')
-            }
-            
-            page_size = landscape(A4) if layout == 'landscape' else A4
-            
-            buffer = BytesIO()
-            doc = SimpleDocTemplate(
-                buffer, pagesize=page_size,
-                rightMargin=10*mm, leftMargin=10*mm,
-                topMargin=10*mm, bottomMargin=10*mm
-            )
-            
-            story = []
-            styles = self.get_custom_styles()
-            
-            self.create_header(story, data, styles, language, layout)
-            self.create_return_info(story, data, styles, language, layout)
-            self.create_materials_table(story, data, styles, language, layout)
-            self.create_signature_section(story, data, styles, language, layout)
-            
-            story.append(Spacer(1, 10*mm))
-            timestamp = get_vietnam_now().strftime('%d/%m/%Y %H:%M:%S')
-            story.append(Paragraph(f"Generated: {timestamp}", styles['Footer']))
-            
-            doc.build(story)
-            
-            pdf_content = buffer.getvalue()
-            buffer.close()
+            pdf_content = self.render_pdf(data, language, layout)
             
             logger.info(f"✅ PDF generated for return {return_id}")
             return pdf_content
@@ -504,6 +450,66 @@ class ReturnPDFGenerator:
         except Exception as e:
             logger.error(f"❌ PDF generation failed: {e}", exc_info=True)
             return None
+    
+    def load_data(self, return_id: int) -> Optional[Dict[str, Any]]:
+        """Load return header + materials in the shape render_pdf() expects"""
+        return_data = self.queries.get_return_details(return_id)
+        if not return_data:
+            return None
+        
+        materials = self.queries.get_return_materials(return_id)
+        
+        return {
+            'return': return_data,
+            'details': materials.to_dict('records')
+        }
+    
+    def load_data_bulk(self, return_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        """load_data() for many returns with two queries in total (missing ids are skipped)"""
+        headers = self.queries.get_return_details_bulk(return_ids)
+        if headers.empty:
+            return {}
+        
+        materials = self.queries.get_return_materials_bulk(return_ids)
+        details = {} if materials.empty else {
+            int(key): group.to_dict('records')
+            for key, group in materials.groupby('material_return_id', sort=False)
+        }
+        
+        return {
+            int(ret['id']): {'return': ret, 'details': details.get(int(ret['id']), [])}
+            for ret in headers.to_dict('records')
+        }
+    
+    def render_pdf(self, data: Dict[str, Any], language: str = 'vi',
+                  layout: str = 'landscape') -> bytes:
+        """Build the PDF from pre-loaded data (no document queries)"""
+        page_size = landscape(A4) if layout == 'landscape' else A4
+        
+        buffer = BytesIO()
+        doc = SimpleDocTemplate(
+            buffer, pagesize=page_size,
+            rightMargin=10*mm, leftMargin=10*mm,
+            topMargin=10*mm, bottomMargin=10*mm
+        )
+        
+        story = []
+        styles = self.get_custom_styles()
+        
+        self.create_header(story, data, styles, language, layout)
+        self.create_return_info(story, data, styles, language, layout)
+        self.create_materials_table(story, data, styles, language, layout)
+        self.create_signature_section(story, data, styles, language, layout)
+        
+        story.append(Spacer(1, 10*mm))
+        timestamp = get_vietnam_now().strftime('%d/%m/%Y %H:%M:%S')
+        story.append(Paragraph(f"Generated: {timestamp}", styles['Footer']))
+        
+        doc.build(story)
+        
+        pdf_content = buffer.getvalue()
+        buffer.close()
+        return pdf_content
 
 
 # Singleton
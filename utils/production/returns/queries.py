@@ -3,8 +3,11 @@
 Database queries for Returns domain
 All SQL queries are centralized here for easy maintenance
 
-Version: 1.1.0
+Version: 1.3.0
 Changes:
+- get_return_details_bulk() / get_return_materials_bulk() for batch printing
+  (detail SQL shared with the single-return queries)
+- get_all_returns() served from the delta-sync store
 - Added connection check method
 - Better error handling to distinguish connection errors from no data
 """
@@ -19,10 +22,115 @@ from sqlalchemy import text
 from sqlalchemy.exc import OperationalError, DatabaseError
 
 from utils.db import get_db_engine
+from utils.production.delta_store import DeltaEntity, get_delta_store
 
 logger = logging.getLogger(__name__)
 
 
+# ==================== Delta-sync entity ====================
+
+_RETURNS_SELECT = """
+    SELECT 
+        mr.id,
+        mr.return_no,
+        mr.return_date,
+        mr.status,
+        mr.reason,
+        mr.created_date,
+        mo.order_no,
+        mo.id as order_id,
+        p.name as product_name,
+        p.pt_code,
+        p.legacy_pt_code,
+        p.package_size,
+        b.brand_name,
+        w.name as warehouse_name,
+        CONCAT(e_returned.first_name, ' ', e_returned.last_name) as returned_by_name,
+        CONCAT(e_received.first_name, ' ', e_received.last_name) as received_by_name,
+        (SELECT COUNT(*) FROM material_return_details WHERE material_return_id = mr.id) as item_count,
+        (SELECT COALESCE(SUM(quantity), 0) FROM material_return_details WHERE material_return_id = mr.id) as total_qty
+    FROM material_returns mr
+    JOIN manufacturing_orders mo ON mr.manufacturing_order_id = mo.id
+    JOIN products p ON mo.product_id = p.id
+    LEFT JOIN brands b ON p.brand_id = b.id
+    JOIN warehouses w ON mr.warehouse_id = w.id
+    LEFT JOIN employees e_returned ON mr.returned_by = e_returned.id
+    LEFT JOIN employees e_received ON mr.received_by = e_received.id
+    WHERE 1=1
+"""
+
+RETURNS_DELTA_ENTITY = DeltaEntity(
+    name='returns',
+    select_sql=_RETURNS_SELECT,
+    key_sql='mr.id',
+    changed_sql=['mr.created_date'],
+    ids_sql="SELECT mr.id, mr.status FROM material_returns mr",
+    check_columns=['status'],
+)
+
+
+_RETURN_DETAILS_SELECT = """
+    SELECT 
+        mr.id,
+        mr.return_no,
+        mr.return_date,
+        mr.status,
+        mr.reason,
+        mr.created_date,
+        mr.warehouse_id,
+        mo.order_no,
+        mo.id as order_id,
+        p.name as product_name,
+        p.pt_code,
+        p.legacy_pt_code,
+        p.package_size,
+        b.brand_name,
+        w.name as warehouse_name,
+        mi.issue_no,
+        mr.returned_by as returned_by_id,
+        CONCAT(e_returned.first_name, ' ', e_returned.last_name) as returned_by_name,
+        mr.received_by as received_by_id,
+        CONCAT(e_received.first_name, ' ', e_received.last_name) as received_by_name,
+        mr.created_by as created_by_id,
+        CONCAT(e_created.first_name, ' ', e_created.last_name) as created_by_name
+    FROM material_returns mr
+    JOIN manufacturing_orders mo ON mr.manufacturing_order_id = mo.id
+    JOIN products p ON mo.product_id = p.id
+    LEFT JOIN brands b ON p.brand_id = b.id
+    JOIN warehouses w ON mr.warehouse_id = w.id
+    LEFT JOIN material_issues mi ON mr.material_issue_id = mi.id
+    LEFT JOIN employees e_returned ON mr.returned_by = e_returned.id
+    LEFT JOIN employees e_received ON mr.received_by = e_received.id
+    LEFT JOIN users u ON mr.created_by = u.id
+    LEFT JOIN employees e_created ON u.employee_id = e_created.id
+"""
+
+_RETURN_MATERIALS_SELECT = """
+    SELECT 
+        mrd.material_return_id,
+        mrd.id,
+        mrd.material_id,
+        p.name as material_name,
+        p.pt_code,
+        p.legacy_pt_code,
+        p.package_size,
+        b.brand_name,
+        mrd.batch_no,
+        mrd.quantity,
+        mrd.uom,
+        mrd.`condition`,
+        mrd.expired_date,
+        COALESCE(mid.is_alternative, 0) as is_alternative,
+        mid.original_material_id,
+        op.name as original_material_name
+    FROM material_return_details mrd
+    JOIN products p ON mrd.material_id = p.id
+    LEFT JOIN brands b ON p.brand_id = b.id
+    LEFT JOIN material_issue_details mid ON mrd.original_issue_detail_id = mid.id
+    LEFT JOIN products op ON mid.original_material_id = op.id
+"""
+
+
 class ReturnQueries:
     """Database queries for Material Return management"""
     
@@ -185,42 +293,7 @@ class ReturnQueries:
     
     def get_return_details(self, return_id: int) -> Optional[Dict[str, Any]]:
         """Get detailed information for a single return"""
-        query = """
-            SELECT 
-                mr.id,
-                mr.return_no,
-                mr.return_date,
-                mr.status,
-                mr.reason,
-                mr.created_date,
-                mr.warehouse_id,
-                mo.order_no,
-                mo.id as order_id,
-                p.name as product_name,
-                p.pt_code,
-                p.legacy_pt_code,
-                p.package_size,
-                b.brand_name,
-                w.name as warehouse_name,
-                mi.issue_no,
-                mr.returned_by as returned_by_id,
-                CONCAT(e_returned.first_name, ' ', e_returned.last_name) as returned_by_name,
-                mr.received_by as received_by_id,
-                CONCAT(e_received.first_name, ' ', e_received.last_name) as received_by_name,
-                mr.created_by as created_by_id,
-                CONCAT(e_created.first_name, ' ', e_created.last_name) as created_by_name
-            FROM material_returns mr
-            JOIN manufacturing_orders mo ON mr.manufacturing_order_id = mo.id
-            JOIN products p ON mo.product_id = p.id
-            LEFT JOIN brands b ON p.brand_id = b.id
-            JOIN warehouses w ON mr.warehouse_id = w.id
-            LEFT JOIN material_issues mi ON mr.material_issue_id = mi.id
-            LEFT JOIN employees e_returned ON mr.returned_by = e_returned.id
-            LEFT JOIN employees e_received ON mr.received_by = e_received.id
-            LEFT JOIN users u ON mr.created_by = u.id
-            LEFT JOIN employees e_created ON u.employee_id = e_created.id
-            WHERE mr.id = %s
-        """
+        query = _RETURN_DETAILS_SELECT + " WHERE mr.id = %s"
         
         try:
             result = pd.read_sql(query, self.engine, params=(return_id,))
@@ -229,33 +302,24 @@ class ReturnQueries:
             logger.error(f"Error getting return details for {return_id}: {e}")
             return None
     
+    def get_return_details_bulk(self, return_ids: List[int]) -> pd.DataFrame:
+        """Details for several returns in one query (batch printing)"""
+        return_ids = [int(i) for i in dict.fromkeys(return_ids)]
+        if not return_ids:
+            return pd.DataFrame()
+        
+        placeholders = ', '.join(['%s'] * len(return_ids))
+        query = _RETURN_DETAILS_SELECT + f" WHERE mr.id IN ({placeholders})"
+        
+        try:
+            return pd.read_sql(query, self.engine, params=tuple(return_ids))
+        except Exception as e:
+            logger.error(f"Error getting return details for {len(return_ids)} returns: {e}")
+            return pd.DataFrame()
+    
     def get_return_materials(self, return_id: int) -> pd.DataFrame:
         """Get materials for a return"""
-        query = """
-            SELECT 
-                mrd.id,
-                mrd.material_id,
-                p.name as material_name,
-                p.pt_code,
-                p.legacy_pt_code,
-                p.package_size,
-                b.brand_name,
-                mrd.batch_no,
-                mrd.quantity,
-                mrd.uom,
-                mrd.`condition`,
-                mrd.expired_date,
-                COALESCE(mid.is_alternative, 0) as is_alternative,
-                mid.original_material_id,
-                op.name as original_material_name
-            FROM material_return_details mrd
-            JOIN products p ON mrd.material_id = p.id
-            LEFT JOIN brands b ON p.brand_id = b.id
-            LEFT JOIN material_issue_details mid ON mrd.original_issue_detail_id = mid.id
-            LEFT JOIN products op ON mid.original_material_id = op.id
-            WHERE mrd.material_return_id = %s
-            ORDER BY p.name, mrd.batch_no
-        """
+        query = _RETURN_MATERIALS_SELECT + " WHERE mrd.material_return_id = %s ORDER BY p.name, mrd.batch_no"
         
         try:
             return pd.read_sql(query, self.engine, params=(return_id,))
@@ -263,6 +327,21 @@ class ReturnQueries:
             logger.error(f"Error getting return materials for {return_id}: {e}")
             return pd.DataFrame()
     
+    def get_return_materials_bulk(self, return_ids: List[int]) -> pd.DataFrame:
+        """Materials of several returns in one query (keyed by material_return_id)"""
+        return_ids = [int(i) for i in dict.fromkeys(return_ids)]
+        if not return_ids:
+            return pd.DataFrame()
+        
+        placeholders = ', '.join(['%s'] * len(return_ids))
+        query = _RETURN_MATERIALS_SELECT + f" WHERE mrd.material_return_id IN ({placeholders}) ORDER BY mrd.material_return_id, p.name, mrd.batch_no"
+        
+        try:
+            return pd.read_sql(query, self.engine, params=tuple(return_ids))
+        except Exception as e:
+            logger.error(f"Error getting return materials for {len(return_ids)} returns: {e}")
+            return pd.DataFrame()
+    
     # ==================== Returnable Materials Queries ====================
     
     def get_returnable_orders(self) -> pd.DataFrame:
@@ -481,38 +560,9 @@ class ReturnQueries:
     
     def get_all_returns(self) -> Optional[pd.DataFrame]:
         """Load ALL returns in one query — no pagination, no filters."""
-        query = """
-            SELECT 
-                mr.id,
-                mr.return_no,
-                mr.return_date,
-                mr.status,
-                mr.reason,
-                mr.created_date,
-                mo.order_no,
-                mo.id as order_id,
-                p.name as product_name,
-                p.pt_code,
-                p.legacy_pt_code,
-                p.package_size,
-                b.brand_name,
-                w.name as warehouse_name,
-                CONCAT(e_returned.first_name, ' ', e_returned.last_name) as returned_by_name,
-                CONCAT(e_received.first_name, ' ', e_received.last_name) as received_by_name,
-                (SELECT COUNT(*) FROM material_return_details WHERE material_return_id = mr.id) as item_count,
-                (SELECT COALESCE(SUM(quantity), 0) FROM material_return_details WHERE material_return_id = mr.id) as total_qty
-            FROM material_returns mr
-            JOIN manufacturing_orders mo ON mr.manufacturing_order_id = mo.id
-            JOIN products p ON mo.product_id = p.id
-            LEFT JOIN brands b ON p.brand_id = b.id
-            JOIN warehouses w ON mr.warehouse_id = w.id
-            LEFT JOIN employees e_returned ON mr.returned_by = e_returned.id
-            LEFT JOIN employees e_received ON mr.received_by = e_received.id
-            ORDER BY mr.created_date DESC
-        """
         try:
             _t0 = _time.perf_counter()
-            result = pd.read_sql(query, self.engine)
+            result = get_delta_store(RETURNS_DELTA_ENTITY).get()
             _ms = (_time.perf_counter() - _t0) * 1000
             logger.info(f"[PERF] get_all_returns: {_ms:.0f}ms ({len(result)} rows)")
             self._connection_error = None
@@ -324,121 +324,152 @@ def get_company_logo_from_s3_enhanced(company_id: int, logo_path: Optional[str]
         logo_path: Path to logo in S3 (may be partial or incorrect)
         
     Returns:
-        Logo bytes or None if not found
+        Logo bytes or None if not found or S3 failed
     """
     try:
-        logger.info(f"Fetching logo for company {company_id}: {logo_path}")
-        
-        # Initialize S3 client
-        s3_manager = S3Manager()
-        
-        # Strategy 1: Try direct path if provided
-        if logo_path:
-            # Clean up path
-            if logo_path.startswith('/'):
-                logo_path = logo_path[1:]
-            
-            # Try different path formats
-            paths_to_try = [
-                logo_path,  # As provided
-                f"company-logo/{logo_path}" if not logo_path.startswith('company-logo/') else logo_path,
-                f"company-logo/{os.path.basename(logo_path)}",  # Just filename in company-logo folder
-            ]
-            
-            for path in paths_to_try:
-                try:
-                    if s3_manager.check_object_exists(path):
-                        response = s3_manager.s3_client.get_object(
-                            Bucket=s3_manager.bucket_name,
-                            Key=path
-                        )
-                        logo_bytes = response['Body'].read()
-                        logger.info(f"✅ Logo found at: {path} ({len(logo_bytes)} bytes)")
-                        return logo_bytes
-                except ClientError:
-                    continue
-        
-        # Strategy 2: Search by pattern matching
-        logger.info(f"Direct path failed, searching for company {company_id} logo by pattern")
-        
-        # List all files in company-logo folder
+        logo = fetch_company_logo(company_id, logo_path)
+    except Exception as e:
+        logger.error(f"Unexpected error fetching logo for company {company_id}: {e}")
+        return None
+    return logo['data'] if logo else None
+
+
+_NOT_FOUND_CODES = ('404', 'NoSuchKey', 'NotFound')
+
+
+def _is_not_found(error: ClientError) -> bool:
+    return error.response.get('Error', {}).get('Code') in _NOT_FOUND_CODES
+
+
+def fetch_company_logo(company_id: int, logo_path: Optional[str] = None,
+                       s3_manager: Optional[S3Manager] = None) -> Optional[Dict[str, Any]]:
+    """
+    Find and download a company logo (same strategies as before: direct path
+    variants, then filename patterns in company-logo/, then legacy prefixes).
+    
+    Uses the shared S3Manager (no connection test per call) and one GET per
+    candidate key instead of HEAD + GET.
+    
+    Returns:
+        {'data': bytes, 'key': s3_key, 'etag': ETag} or None if not found
+    
+    Raises:
+        ClientError / other errors when S3 could not be searched (network,
+        credentials, throttling) — callers can tell "no logo" from "S3 down"
+    """
+    logger.info(f"Fetching logo for company {company_id}: {logo_path}")
+    
+    s3_manager = s3_manager or get_s3_manager()
+    
+    def _get(key: str) -> Optional[Dict[str, Any]]:
         try:
-            response = s3_manager.s3_client.list_objects_v2(
+            response = s3_manager.s3_client.get_object(
                 Bucket=s3_manager.bucket_name,
-                Prefix="company-logo/",
-                MaxKeys=1000
+                Key=key
             )
-            
-            if 'Contents' in response:
-                # Try to find logo by company_id in filename
-                for obj in response['Contents']:
-                    key = obj['Key']
-                    filename = os.path.basename(key).lower()
-                    
-                    # Check various patterns
-                    patterns = [
-                        str(company_id),  # Company ID in filename
-                        f"company_{company_id}",
-                        f"logo_{company_id}",
-                        f"{company_id}_",
-                    ]
-                    
-                    for pattern in patterns:
-                        if pattern in filename:
-                            logger.info(f"Found potential logo by pattern: {key}")
-                            try:
-                                logo_response = s3_manager.s3_client.get_object(
-                                    Bucket=s3_manager.bucket_name,
-                                    Key=key
-                                )
-                                logo_bytes = logo_response['Body'].read()
-                                logger.info(f"✅ Logo retrieved by pattern: {key} ({len(logo_bytes)} bytes)")
-                                return logo_bytes
-                            except ClientError as e:
-                                logger.warning(f"Failed to get logo {key}: {e}")
-                                continue
-        
+            return {'data': response['Body'].read(), 'key': key, 'etag': response.get('ETag')}
         except ClientError as e:
-            logger.error(f"Failed to list company logos: {e}")
-        
-        # Strategy 3: Try legacy naming conventions based on screenshot
-        legacy_patterns = [
-            f"company-logo/{company_id}*",  # Any file starting with company ID
-            f"company-logo/*{company_id}*",  # Any file containing company ID
+            if _is_not_found(e):
+                return None
+            raise
+    
+    # Strategy 1: Try direct path if provided
+    if logo_path:
+        # Clean up path
+        if logo_path.startswith('/'):
+            logo_path = logo_path[1:]
+        
+        # Try different path formats
+        paths_to_try = [
+            logo_path,  # As provided
+            f"company-logo/{logo_path}" if not logo_path.startswith('company-logo/') else logo_path,
+            f"company-logo/{os.path.basename(logo_path)}",  # Just filename in company-logo folder
         ]
         
-        for pattern in legacy_patterns:
-            try:
-                # Use prefix and then filter
-                prefix = pattern.split('*')[0]
-                response = s3_manager.s3_client.list_objects_v2(
-                    Bucket=s3_manager.bucket_name,
-                    Prefix=prefix,
-                    MaxKeys=100
-                )
-                
-                if 'Contents' in response:
-                    for obj in response['Contents']:
-                        if str(company_id) in obj['Key']:
-                            try:
-                                logo_response = s3_manager.s3_client.get_object(
-                                    Bucket=s3_manager.bucket_name,
-                                    Key=obj['Key']
-                                )
-                                logo_bytes = logo_response['Body'].read()
-                                logger.info(f"✅ Logo found with legacy pattern: {obj['Key']}")
-                                return logo_bytes
-                            except ClientError:
-                                continue
-            except Exception as e:
-                logger.warning(f"Legacy pattern search failed: {e}")
-        
-        logger.warning(f"No logo found for company {company_id} after trying all strategies")
-        return None
+        for path in dict.fromkeys(paths_to_try):
+            logo = _get(path)
+            if logo:
+                logger.info(f"✅ Logo found at: {path} ({len(logo['data'])} bytes)")
+                return logo
+    
+    # Strategy 2: Search by pattern matching
+    logger.info(f"Direct path failed, searching for company {company_id} logo by pattern")
+    
+    # List all files in company-logo folder
+    response = s3_manager.s3_client.list_objects_v2(
+        Bucket=s3_manager.bucket_name,
+        Prefix="company-logo/",
+        MaxKeys=1000
+    )
+    
+    if 'Contents' in response:
+        # Try to find logo by company_id in filename
+        for obj in response['Contents']:
+            key = obj['Key']
+            filename = os.path.basename(key).lower()
+            
+            # Check various patterns
+            patterns = [
+                str(company_id),  # Company ID in filename
+                f"company_{company_id}",
+                f"logo_{company_id}",
+                f"{company_id}_",
+            ]
+            
+            for pattern in patterns:
+                if pattern in filename:
+                    logger.info(f"Found potential logo by pattern: {key}")
+                    logo = _get(key)
+                    if logo:
+                        logger.info(f"✅ Logo retrieved by pattern: {key} ({len(logo['data'])} bytes)")
+                        return logo
+                    logger.warning(f"Failed to get logo {key}")
+    
+    # Strategy 3: Try legacy naming conventions based on screenshot
+    legacy_patterns = [
+        f"company-logo/{company_id}*",  # Any file starting with company ID
+        f"company-logo/*{company_id}*",  # Any file containing company ID
+    ]
+    
+    for pattern in legacy_patterns:
+        # Use prefix and then filter
+        prefix = pattern.split('*')[0]
+        response = s3_manager.s3_client.list_objects_v2(
+            Bucket=s3_manager.bucket_name,
+            Prefix=prefix,
+            MaxKeys=100
+        )
         
-    except Exception as e:
-        logger.error(f"Unexpected error fetching logo for company {company_id}: {e}")
-        return None
+        if 'Contents' in response:
+            for obj in response['Contents']:
+                if str(company_id) in obj['Key']:
+                    logo = _get(obj['Key'])
+                    if logo:
+                        logger.info(f"✅ Logo found with legacy pattern: {obj['Key']}")
+                        return logo
+    
+    logger.warning(f"No logo found for company {company_id} after trying all strategies")
+    return None
+
+
+def get_object_etag(s3_key: str, s3_manager: Optional[S3Manager] = None) -> Optional[str]:
+    """
+    ETag of an object via HEAD (logo revalidation)
+    
+    Returns:
+        ETag, or None if the object no longer exists
+    
+    Raises:
+        ClientError / other errors when S3 could not be reached
+    """
+    s3_manager = s3_manager or get_s3_manager()
+    try:
+        response = s3_manager.s3_client.head_object(Bucket=s3_manager.bucket_name, Key=s3_key)
+    except ClientError as e:
+        if _is_not_found(e):
+            return None
+        raise
+    return response.get('ETag')
 
 
 def get_company_logo_from_s3(company_id: int, logo_path: str) -> Optional[bytes]:
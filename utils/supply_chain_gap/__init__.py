@@ -9,12 +9,18 @@ from .constants import (
     MATERIAL_TYPES, MATERIAL_CATEGORIES, MAX_BOM_LEVELS,
     ACTION_TYPES, RAW_MATERIAL_STATUS, UI_CONFIG,
     FIELD_TOOLTIPS, FORMULA_HELP, EXPORT_CONFIG,
-    PERIOD_TYPES, PERIOD_CONFIG
+    PERIOD_TYPES, PERIOD_CONFIG, LOAD_PIPELINE_CONFIG,
+    RESULT_CACHE_CONFIG
 )
 from .state import SupplyChainStateManager, get_state
 from .data_loader import SupplyChainDataLoader, get_data_loader
+from .load_pipeline import SupplyChainLoadPipeline, LoadTask, LoadResult, load_gap_inputs
 from .result import SupplyChainGAPResult, CustomerImpact, ActionRecommendation
+from .production_status import compute_production_statuses
+from .result_cache import GAPResultCache, get_result_cache, make_cache_key
+from .bom_graph import BOMGraph, get_bom_graph
 from .calculator import SupplyChainGAPCalculator, get_calculator
+from .incremental import IncrementalGAPCalculator, IncrementalUpdate, recalculate_gap
 from .filters import SupplyChainFilters, get_filters
 from .components import (
     render_kpi_cards, render_status_summary, render_data_freshness,
@@ -39,7 +45,7 @@ from .help import (
 )
 from .charts import SupplyChainCharts, get_charts
 from .formatters import SupplyChainFormatter, get_formatter
-from .export import export_to_excel, get_export_filename
+from .export import export_to_excel, export_to_excel_file, get_export_filename
 from .period_calculator import (
     PeriodGAPCalculator, convert_to_period, format_period_display,
     get_period_sort_key, is_past_period, classify_product_type,
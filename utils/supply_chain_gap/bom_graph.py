@@ -0,0 +1,551 @@
+# utils/supply_chain_gap/bom_graph.py
+
+"""
+Precompiled BOM Graph Index
+
+The multi-level GAP re-filtered the whole bom_explosion_df with isin() on every
+level and merged it again per level; the period explosion, readiness checker
+and where-used lookups each did their own full-table filters. BOMGraph compiles
+a BOM snapshot ONCE into integer-indexed arrays and answers all of those as
+sparse passes over the active edges only:
+
+- Nodes: every output product / material id, sorted → node index (searchsorted)
+- Edges: one per BOM line (primary + alternatives), CSR-ordered by parent,
+  stable (original row order kept within a parent). Per edge: parent, child,
+  bom_output_quantity, quantity_per_output, scrap factor, source row.
+- Reverse CSR (child → parents) for where-used walks.
+- Topological level (longest path from a root) + has_bom (semi-finished) flag.
+
+Explosion = sparse mat-vec: gather the CSR slices of the parents with demand,
+multiply per edge, np.bincount into children. Arithmetic order per edge is the
+same as the DataFrame path: (parent_qty / bom_out) × qty_per × (1 + scrap/100).
+
+shortage_levels() runs the multi-level netting recurrence on numbers only: it
+drives the multi-level material GAP and lets incremental recalculation find
+which nodes' demand actually moved. With peg=True the same loop carries the
+root product on every driver and attributes leaf demand to each FG (the raw
+material pegging table, see pegging_frame).
+
+VERSION: 1.3.0
+"""
+
+import logging
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Descriptive columns carried to exploded demand ('first' per material, like the
+# groupby aggregation of the DataFrame path)
+LEVEL_ATTR_COLS = [
+    'material_pt_code', 'material_name', 'material_brand',
+    'material_package_size', 'material_uom',
+    'material_type', 'is_primary', 'alternative_priority', 'primary_material_id',
+]
+PERIOD_ATTR_COLS = [
+    'material_pt_code', 'material_name', 'material_brand',
+    'material_package_size', 'material_uom', 'material_type', 'is_primary',
+]
+
+
+def detect_parent_column(bom_df: pd.DataFrame) -> str:
+    """Output product id column of a BOM explosion frame"""
+    return 'output_product_id' if 'output_product_id' in bom_df.columns else 'fg_product_id'
+
+
+def _segment_positions(starts: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    """Concatenate ranges [start, start+length) without a Python loop"""
+    total = int(lengths.sum())
+    if total == 0:
+        return np.empty(0, dtype=np.int64)
+    offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+    return offsets + np.arange(total, dtype=np.int64)
+
+
+class BOMGraph:
+    """
+    Integer-indexed BOM adjacency compiled from a BOM explosion frame.
+
+    Usage:
+        graph = BOMGraph(bom_explosion_df)
+        demand = graph.level_demand(parent_ids, shortage_qty)   # one level
+        lines = graph.bom_lines(product_id)                      # BOM rows
+        parents = graph.where_used(material_id)                  # all ancestors
+    """
+
+    def __init__(self, bom_df: pd.DataFrame, id_col: Optional[str] = None):
+        self.bom_df = bom_df if bom_df is not None else pd.DataFrame()
+        self.id_col = id_col or detect_parent_column(self.bom_df)
+
+        if self.bom_df.empty or self.id_col not in self.bom_df.columns \
+                or 'material_id' not in self.bom_df.columns:
+            self._build_empty()
+            return
+
+        parents = self.bom_df[self.id_col]
+        children = self.bom_df['material_id']
+        valid = (parents.notna() & children.notna()).to_numpy()
+        rows = np.flatnonzero(valid)
+        parent_vals = parents.to_numpy()[valid]
+        child_vals = children.to_numpy()[valid]
+
+        self.node_ids = np.unique(np.concatenate([parent_vals, child_vals]))
+        self.n_nodes = len(self.node_ids)
+        p_idx = np.searchsorted(self.node_ids, parent_vals)
+        c_idx = np.searchsorted(self.node_ids, child_vals)
+
+        # Per-line factors (same defaults as the DataFrame explosion)
+        bom_out = self._column(
+            'bom_output_quantity', 1.0, zero_as=1.0
+        )[valid]
+        qty_per = self._column('quantity_per_output', 1.0)[valid]
+        scrap = self._column('scrap_rate', 0.0)[valid]
+
+        order = np.argsort(p_idx, kind='stable')
+        self.edge_parent = p_idx[order]
+        self.edge_child = c_idx[order]
+        self.edge_row = rows[order]
+        self.edge_bom_out = bom_out[order]
+        self.edge_qty_per = qty_per[order]
+        self.edge_scrap_factor = 1 + scrap[order] / 100
+        self.n_edges = len(order)
+
+        self.indptr = np.concatenate(
+            [[0], np.cumsum(np.bincount(self.edge_parent, minlength=self.n_nodes))]
+        ).astype(np.int64)
+        self.has_bom = np.diff(self.indptr) > 0
+
+        # Reverse adjacency (child → edges) for where-used
+        self.rev_edges = np.argsort(self.edge_child, kind='stable')
+        self.rev_indptr = np.concatenate(
+            [[0], np.cumsum(np.bincount(self.edge_child, minlength=self.n_nodes))]
+        ).astype(np.int64)
+
+        self.level, self.topo_order = self._topological_levels()
+        self.max_depth = int(self.level.max()) if self.n_nodes else 0
+
+        logger.info(
+            f"BOM graph: {self.n_nodes} nodes, {self.n_edges} edges, "
+            f"{int(self.has_bom.sum())} with BOM, depth {self.max_depth}"
+        )
+
+    def _build_empty(self):
+        self.node_ids = np.empty(0, dtype=np.int64)
+        self.n_nodes = 0
+        self.edge_parent = self.edge_child = self.edge_row = np.empty(0, dtype=np.int64)
+        self.edge_bom_out = self.edge_qty_per = self.edge_scrap_factor = np.empty(0)
+        self.n_edges = 0
+        self.indptr = self.rev_indptr = np.zeros(1, dtype=np.int64)
+        self.rev_edges = np.empty(0, dtype=np.int64)
+        self.has_bom = np.empty(0, dtype=bool)
+        self.level = np.empty(0, dtype=np.int64)
+        self.topo_order = np.empty(0, dtype=np.int64)
+        self.max_depth = 0
+
+    def _column(self, col: str, default: float, zero_as: Optional[float] = None) -> np.ndarray:
+        if col not in self.bom_df.columns:
+            return np.full(len(self.bom_df), default, dtype=float)
+        values = pd.to_numeric(self.bom_df[col], errors='coerce').fillna(default).to_numpy(dtype=float)
+        if zero_as is not None:
+            values = np.where(values == 0, zero_as, values)
+        return values
+
+    def _topological_levels(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Kahn's algorithm, one vectorized step per level.
+        level = longest path from a root (root = never used as a material).
+        Nodes on a cycle keep level -1 and are excluded from topo_order.
+        """
+        level = np.full(self.n_nodes, -1, dtype=np.int64)
+        indegree = np.bincount(self.edge_child, minlength=self.n_nodes)
+        frontier = np.flatnonzero(indegree == 0)
+        order_parts = []
+        depth = 0
+        while len(frontier):
+            level[frontier] = depth
+            order_parts.append(frontier)
+            edges = self._edges_of(frontier)
+            if not len(edges):
+                break
+            children = self.edge_child[edges]
+            np.subtract.at(indegree, children, 1)
+            candidates = np.unique(children)
+            frontier = candidates[indegree[candidates] == 0]
+            depth += 1
+
+        cyclic = int((level < 0).sum())
+        if cyclic:
+            logger.warning(f"BOM graph: {cyclic} node(s) on a BOM cycle — excluded from levels")
+        topo = np.concatenate(order_parts) if order_parts else np.empty(0, dtype=np.int64)
+        return level, topo
+
+    # =========================================================================
+    # INDEXING
+    # =========================================================================
+
+    def index_of(self, ids) -> np.ndarray:
+        """Node index per id (-1 for ids not in the graph)"""
+        ids = np.asarray(ids)
+        if not self.n_nodes or not len(ids):
+            return np.full(len(ids), -1, dtype=np.int64)
+        pos = np.searchsorted(self.node_ids, ids)
+        pos_clipped = np.minimum(pos, self.n_nodes - 1)
+        found = self.node_ids[pos_clipped] == ids
+        return np.where(found, pos_clipped, -1).astype(np.int64)
+
+    def has_bom_ids(self, ids) -> np.ndarray:
+        """True where the id is an output product of some BOM (semi-finished/FG)"""
+        idx = self.index_of(ids)
+        out = np.zeros(len(idx), dtype=bool)
+        known = idx >= 0
+        out[known] = self.has_bom[idx[known]]
+        return out
+
+    def is_leaf_ids(self, ids) -> np.ndarray:
+        """True where the id has no BOM of its own (raw material)"""
+        return ~self.has_bom_ids(ids)
+
+    def level_of(self, ids) -> np.ndarray:
+        """Topological level per id (-1 if unknown or cyclic)"""
+        idx = self.index_of(ids)
+        out = np.full(len(idx), -1, dtype=np.int64)
+        known = idx >= 0
+        out[known] = self.level[idx[known]]
+        return out
+
+    def _edges_of(self, node_idx: np.ndarray) -> np.ndarray:
+        """CSR gather: edge positions of the given parent nodes (in given order)"""
+        starts = self.indptr[node_idx]
+        return _segment_positions(starts, self.indptr[node_idx + 1] - starts)
+
+    def _parent_edges_of(self, node_idx: np.ndarray) -> np.ndarray:
+        """Reverse CSR gather: edge positions where the given nodes are the child"""
+        starts = self.rev_indptr[node_idx]
+        return self.rev_edges[_segment_positions(starts, self.rev_indptr[node_idx + 1] - starts)]
+
+    # =========================================================================
+    # EXPLOSION (sparse mat-vec)
+    # =========================================================================
+
+    def _edge_requirement(self, edges: np.ndarray, parent_qty: np.ndarray) -> np.ndarray:
+        return (parent_qty / self.edge_bom_out[edges]) * self.edge_qty_per[edges] \
+            * self.edge_scrap_factor[edges]
+
+    def _gather_parents(self, parent_ids, parent_qty) -> Tuple[np.ndarray, np.ndarray]:
+        """Driver rows → (edge positions, per-edge parent qty, per-edge driver row)"""
+        p_idx = self.index_of(parent_ids)
+        qty = np.asarray(parent_qty, dtype=float)
+        keep = np.flatnonzero(p_idx >= 0)
+        p_idx, qty = p_idx[keep], qty[keep]
+        counts = self.indptr[p_idx + 1] - self.indptr[p_idx]
+        edges = _segment_positions(self.indptr[p_idx], counts)
+        driver = np.repeat(keep, counts)
+        return edges, np.repeat(qty, counts), driver
+
+    def level_demand(
+        self,
+        parent_ids,
+        parent_qty,
+        qty_col: str = 'required_qty',
+        count_col: str = 'parent_product_count',
+        material_ids=None
+    ) -> pd.DataFrame:
+        """
+        Material demand for one explosion level, aggregated by material_id.
+
+        Output matches the DataFrame path (merge parent shortage × BOM, then
+        groupby material_id): [material_id, qty_col, count_col, *LEVEL_ATTR_COLS]
+        material_ids: only return these materials (rows are identical to the
+        unrestricted call)
+        """
+        edges, qty, driver = self._gather_parents(parent_ids, parent_qty)
+        if material_ids is not None and len(edges):
+            keep = np.isin(self.edge_child[edges], self.index_of(material_ids))
+            edges, qty, driver = edges[keep], qty[keep], driver[keep]
+        if not len(edges):
+            return pd.DataFrame()
+
+        # Merge order: BOM row order, then driver order within a row
+        order = np.lexsort((driver, self.edge_row[edges]))
+        edges, qty = edges[order], qty[order]
+
+        req = self._edge_requirement(edges, qty)
+        children = self.edge_child[edges]
+        groups, inverse = np.unique(children, return_inverse=True)
+
+        demand = pd.DataFrame({
+            'material_id': self.bom_df['material_id'].to_numpy()[
+                self.edge_row[edges][self._first_of_groups(inverse, len(groups))]
+            ],
+            qty_col: np.bincount(inverse, weights=req, minlength=len(groups)),
+            count_col: self._distinct_count(inverse, self.edge_parent[edges], len(groups)),
+        })
+        return self._attach_attrs(demand, edges, inverse, LEVEL_ATTR_COLS)
+
+    def explode_by_period(
+        self,
+        parent_ids,
+        periods,
+        parent_qty,
+        qty_col: str = 'demand_qty',
+        count_col: str = 'fg_product_count'
+    ) -> pd.DataFrame:
+        """
+        Explosion of per-period parent shortage, aggregated by (material_id, period).
+        Output matches the DataFrame merge + groupby(['material_id', 'period']).
+        """
+        edges, qty, driver = self._gather_parents(parent_ids, parent_qty)
+        if not len(edges):
+            return pd.DataFrame()
+
+        order = np.lexsort((driver, self.edge_row[edges]))
+        edges, qty, driver = edges[order], qty[order], driver[order]
+
+        period_values, period_codes = np.unique(
+            np.asarray(periods, dtype=object)[driver].astype(str), return_inverse=True
+        )
+        keys = self.edge_child[edges].astype(np.int64) * len(period_values) + period_codes
+        groups, inverse = np.unique(keys, return_inverse=True)
+        first = self._first_of_groups(inverse, len(groups))
+
+        req = self._edge_requirement(edges, qty)
+        result = pd.DataFrame({
+            'material_id': self.bom_df['material_id'].to_numpy()[self.edge_row[edges][first]],
+            'period': period_values[period_codes[first]],
+            qty_col: np.bincount(inverse, weights=req, minlength=len(groups)),
+            count_col: self._distinct_count(inverse, self.edge_parent[edges], len(groups)),
+        })
+        return self._attach_attrs(result, edges, inverse, PERIOD_ATTR_COLS)
+
+    @staticmethod
+    def _first_of_groups(inverse: np.ndarray, n_groups: int) -> np.ndarray:
+        first = np.full(n_groups, len(inverse), dtype=np.int64)
+        np.minimum.at(first, inverse, np.arange(len(inverse)))
+        return first
+
+    def _distinct_count(self, inverse: np.ndarray, members: np.ndarray, n_groups: int) -> np.ndarray:
+        pairs = np.unique(inverse.astype(np.int64) * max(self.n_nodes, 1) + members)
+        return np.bincount(pairs // max(self.n_nodes, 1), minlength=n_groups)
+
+    def _attach_attrs(
+        self,
+        result: pd.DataFrame,
+        edges: np.ndarray,
+        inverse: np.ndarray,
+        attr_cols: List[str]
+    ) -> pd.DataFrame:
+        """'first' non-null descriptive value per group, over the active lines only"""
+        cols = [c for c in attr_cols if c in self.bom_df.columns]
+        if not cols:
+            return result
+        attrs = self.bom_df[cols].take(self.edge_row[edges]).reset_index(drop=True)
+        firsts = attrs.groupby(inverse, sort=True).first().reset_index(drop=True)
+        return pd.concat([result, firsts], axis=1)
+
+    def shortage_levels(
+        self,
+        root_ids,
+        root_qty,
+        available: Dict[Any, float],
+        max_levels: int,
+        peg: bool = False
+    ) -> List[Dict[str, Any]]:
+        """
+        Numeric-only multi-level explosion with supply netting at semi-finished
+        nodes — the same recurrence as the multi-level material GAP:
+
+            level demand  = Σ edges (parent_qty / bom_out) × qty_per × scrap
+            semi net      = available − level demand
+            next parents  = semi nodes with net < 0, qty = |net|
+
+        Edges are summed in level_demand() order, so required / parent_qty
+        are bit-identical to the DataFrame rows built from the same drivers.
+
+        With peg=True the root product is carried on every driver in the same
+        loop: a semi-finished node's net shortage is shared among the roots in
+        proportion to their demand on it at that level, so per material and
+        level the pegged quantities sum to the unpegged leaf demand.
+
+        Args:
+            root_ids / root_qty: level-1 parents (positive shortage qty)
+            available: node id → usable supply (supply − safety, clipped at 0)
+            max_levels: MAX_BOM_LEVELS
+            peg: also return the leaf demand per root (see pegging_frame)
+
+        Returns:
+            One dict per level reached: parents/parent_qty (node index + qty
+            driving the level), children/required/parent_count (aggregated
+            demand per child node index); with peg, 'pegging' = leaf rows
+            [material_id, fg_product_id, pegged_qty, bom_level]
+        """
+        levels = []
+        p_idx = self.index_of(root_ids)
+        qty = np.asarray(root_qty, dtype=float)
+        keep = p_idx >= 0
+        parents, parent_qty = p_idx[keep], qty[keep]
+        avail_vec = np.zeros(self.n_nodes)
+        if available:
+            idx = self.index_of(np.array(list(available.keys())))
+            vals = np.array(list(available.values()), dtype=float)
+            avail_vec[idx[idx >= 0]] = vals[idx >= 0]
+
+        # Per-root drivers: (node, root, qty) — one per root on a parent
+        peg_nodes, peg_roots, peg_qty = parents, parents.copy(), parent_qty
+        n = max(self.n_nodes, 1)
+
+        for level in range(1, max_levels + 1):
+            if not len(parents):
+                break
+            counts = self.indptr[parents + 1] - self.indptr[parents]
+            edges = _segment_positions(self.indptr[parents], counts)
+            if not len(edges):
+                break
+            edge_qty = np.repeat(parent_qty, counts)
+            order = np.lexsort((np.repeat(np.arange(len(parents)), counts), self.edge_row[edges]))
+            edges, edge_qty = edges[order], edge_qty[order]
+            req = self._edge_requirement(edges, edge_qty)
+            children, inverse = np.unique(self.edge_child[edges], return_inverse=True)
+            required = np.bincount(inverse, weights=req, minlength=len(children))
+            lvl = {
+                'parents': parents,
+                'parent_qty': parent_qty,
+                'children': children,
+                'required': required,
+                'parent_count': self._distinct_count(inverse, self.edge_parent[edges], len(children)),
+            }
+            levels.append(lvl)
+
+            semi = self.has_bom[children]
+            net = avail_vec[children[semi]] - required[semi]
+            short = net < 0
+
+            if peg:
+                # Split of this level's demand per (child, root)
+                counts = self.indptr[peg_nodes + 1] - self.indptr[peg_nodes]
+                peg_edges = _segment_positions(self.indptr[peg_nodes], counts)
+                peg_req = self._edge_requirement(peg_edges, np.repeat(peg_qty, counts))
+                child = self.edge_child[peg_edges]
+                keys, key_inverse = np.unique(
+                    child.astype(np.int64) * n + np.repeat(peg_roots, counts), return_inverse=True
+                )
+                pegged = np.bincount(key_inverse, weights=peg_req, minlength=len(keys))
+                key_child, key_root = keys // n, keys % n
+
+                leaf = ~self.has_bom[key_child]
+                lvl['pegging'] = pd.DataFrame({
+                    'material_id': self.node_ids[key_child[leaf]],
+                    'fg_product_id': self.node_ids[key_root[leaf]],
+                    'pegged_qty': pegged[leaf],
+                    'bom_level': level,
+                })
+
+                # Short semi-finished: each root keeps its share of |net|
+                share = np.zeros(self.n_nodes)
+                share[children[semi][short]] = np.abs(net[short]) / required[semi][short]
+                carry = ~leaf & (share[key_child] > 0)
+                peg_nodes, peg_roots = key_child[carry], key_root[carry]
+                peg_qty = pegged[carry] * share[peg_nodes]
+
+            parents = children[semi][short]
+            parent_qty = np.abs(net[short])
+        return levels
+
+    @staticmethod
+    def pegging_frame(levels: List[Dict[str, Any]]) -> pd.DataFrame:
+        """
+        Raw material pegging table from shortage_levels(..., peg=True):
+        leaf demand pegged back to the FG whose shortage caused it.
+
+        Returns:
+            DataFrame [material_id, fg_product_id, pegged_qty, bom_level],
+            one row per (leaf material, root, level)
+        """
+        parts = [lvl['pegging'] for lvl in levels if not lvl['pegging'].empty]
+        if not parts:
+            return pd.DataFrame(columns=['material_id', 'fg_product_id', 'pegged_qty', 'bom_level'])
+        return pd.concat(parts, ignore_index=True)
+
+    def children(self, ids) -> np.ndarray:
+        """Ids of the direct BOM components of the given ids"""
+        idx = self.index_of(np.asarray(list(ids)))
+        return self.node_ids[np.unique(self.edge_child[self._edges_of(idx[idx >= 0])])]
+
+    def parents(self, ids) -> np.ndarray:
+        """Ids of the BOM output products that use the given ids directly"""
+        idx = self.index_of(np.asarray(list(ids)))
+        return self.node_ids[np.unique(self.edge_parent[self._parent_edges_of(idx[idx >= 0])])]
+
+    # =========================================================================
+    # LOOKUPS
+    # =========================================================================
+
+    def bom_lines(self, product_id) -> pd.DataFrame:
+        """BOM explosion rows of one output product (original row order)"""
+        idx = self.index_of([product_id])[0]
+        if idx < 0:
+            return self.bom_df.iloc[0:0]
+        rows = np.sort(self.edge_row[self.indptr[idx]:self.indptr[idx + 1]])
+        return self.bom_df.iloc[rows]
+
+    def where_used(self, material_id, max_levels: Optional[int] = None) -> pd.DataFrame:
+        """
+        All ancestors of a material, walking child → parent edges.
+
+        Returns DataFrame [product_id, depth, qty_per_unit, is_top_level]:
+        depth 1 = direct parent BOM; qty_per_unit = material needed per one unit
+        of that ancestor, summed over every path (incl. scrap); is_top_level =
+        ancestor is not itself used in another BOM.
+        """
+        start = self.index_of([material_id])[0]
+        if start < 0:
+            return pd.DataFrame(columns=['product_id', 'depth', 'qty_per_unit', 'is_top_level'])
+
+        # Walk upward: per node, how much of the material one unit of it consumes
+        per_unit = np.zeros(self.n_nodes)
+        depth_of = np.full(self.n_nodes, -1, dtype=np.int64)
+        current = np.zeros(self.n_nodes)
+        current[start] = 1.0
+        depth = 0
+        while current.any() and (max_levels is None or depth < max_levels):
+            depth += 1
+            nodes = np.flatnonzero(current)
+            edges = self._parent_edges_of(nodes)
+            if not len(edges):
+                break
+            contrib = current[self.edge_child[edges]] * self.edge_qty_per[edges] \
+                * self.edge_scrap_factor[edges] / self.edge_bom_out[edges]
+            current = np.bincount(self.edge_parent[edges], weights=contrib, minlength=self.n_nodes)
+            per_unit += current
+            reached = np.flatnonzero(current)
+            fresh = reached[depth_of[reached] < 0]
+            depth_of[fresh] = depth
+            if depth > self.n_nodes:  # cycle guard
+                logger.warning(f"BOM graph: cycle while walking where-used of {material_id}")
+                break
+
+        hit = np.flatnonzero(depth_of > 0)
+        no_parents = (self.rev_indptr[hit + 1] - self.rev_indptr[hit]) == 0
+        return pd.DataFrame({
+            'product_id': self.node_ids[hit],
+            'depth': depth_of[hit],
+            'qty_per_unit': per_unit[hit],
+            'is_top_level': no_parents,
+        }).sort_values(['depth', 'product_id']).reset_index(drop=True)
+
+    def get_summary(self) -> Dict[str, Any]:
+        return {
+            'nodes': self.n_nodes,
+            'edges': self.n_edges,
+            'products_with_bom': int(self.has_bom.sum()),
+            'max_depth': self.max_depth,
+            'cyclic_nodes': int((self.level < 0).sum()),
+        }
+
+
+def get_bom_graph(bom_df: Optional[pd.DataFrame], graph: Optional[BOMGraph] = None) -> BOMGraph:
+    """Reuse graph when it was compiled from this exact frame, else compile one"""
+    if graph is not None and graph.bom_df is bom_df:
+        return graph
+    return BOMGraph(bom_df)
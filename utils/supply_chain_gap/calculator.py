@@ -4,8 +4,19 @@
 Calculator for Supply Chain GAP Analysis
 Performs full multi-level GAP calculation: FG + Raw Materials
 
-VERSION: 2.0.0
+VERSION: 2.5.0
 CHANGELOG:
+- v2.5: Material levels and the raw pegging table come from one
+        BOMGraph.shortage_levels pass (no second explosion for pegging)
+- v2.4: Join-based alternative analysis; 'combined' alternative mode
+        allocates several alternatives in priority order to one shortage
+- v2.3: Column-wise status classification (np.select over THRESHOLDS);
+        material rows now classified against total_required_qty; actions
+        produced as a columnar table, objects built lazily by the result
+- v2.2: Keeps the inputs needed by IncrementalGAPCalculator on the result;
+        leaf/semi helpers split out for reuse; faster action generation
+- v2.1: Multi-level explosion runs on a precompiled BOMGraph (built once per
+        BOM snapshot, shared with period GAP / readiness checker via result)
 - v2.0: Multi-level BOM support with supply netting at intermediate levels
 - v1.1: Fixed At Risk Value, is_primary comparison, avg_unit_price_usd
 """
@@ -17,10 +28,14 @@ from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime
 
 from .constants import THRESHOLDS, STATUS_CONFIG, ACTION_TYPES, MAX_BOM_LEVELS
-from .result import SupplyChainGAPResult, CustomerImpact, ActionRecommendation
+from .result import SupplyChainGAPResult, CustomerImpact, ACTION_COLUMNS, ACTION_GROUPS
+from .bom_graph import BOMGraph, get_bom_graph
 
 logger = logging.getLogger(__name__)
 
+# gap_status → priority (column-wise lookup)
+_STATUS_PRIORITY = {status: cfg.get('priority', 99) for status, cfg in STATUS_CONFIG.items()}
+
 
 class SupplyChainGAPCalculator:
     """
@@ -62,6 +77,7 @@ class SupplyChainGAPCalculator:
         include_alternatives: bool = True,
         include_existing_mo: bool = True,
         include_draft_mo: bool = False,
+        alternative_mode: str = 'single',
         
         # Period Analysis (v2.2)
         period_type: str = 'Weekly',
@@ -83,15 +99,7 @@ class SupplyChainGAPCalculator:
         # Filter DRAFT MO from FG supply if not included
         # unified_supply_view returns DRAFT+CONFIRMED+IN_PROGRESS for MO_EXPECTED;
         # availability_status column holds the MO status.
-        if not include_draft_mo and not fg_supply_df.empty and 'availability_status' in fg_supply_df.columns:
-            before = len(fg_supply_df)
-            fg_supply_df = fg_supply_df[
-                ~((fg_supply_df['supply_source'] == 'MO_EXPECTED') & 
-                  (fg_supply_df['availability_status'] == 'DRAFT'))
-            ].copy()
-            filtered = before - len(fg_supply_df)
-            if filtered > 0:
-                logger.info(f"Excluded {filtered} DRAFT MO rows from FG supply")
+        fg_supply_df = self._exclude_draft_mo_supply(fg_supply_df, include_draft_mo)
         
         # Double-count detection: MO output NOT in FG supply but MO raw demand IS included
         if not include_mo_expected and include_existing_mo:
@@ -109,6 +117,8 @@ class SupplyChainGAPCalculator:
                 'demand_sources': selected_demand_sources,
                 'include_fg_safety': include_fg_safety,
                 'include_raw_safety': include_raw_safety,
+                'include_alternatives': include_alternatives,
+                'alternative_mode': alternative_mode,
                 'include_mo_expected': include_mo_expected,
                 'include_existing_mo': include_existing_mo,
                 'include_draft_mo': include_draft_mo,
@@ -174,8 +184,12 @@ class SupplyChainGAPCalculator:
             if not mfg_shortage.empty:
                 result.bom_explosion_df = bom_explosion_df
                 result.raw_supply_df = raw_supply_df
+                result.raw_supply_detail_df = raw_supply_detail_df
+                result.raw_safety_stock_df = raw_safety_stock_df if include_raw_safety else None
+                result.existing_mo_demand_df = existing_mo_demand_df if include_existing_mo else None
+                result.bom_graph = BOMGraph(bom_explosion_df)
                 
-                raw_gap_df, semi_gap_df, raw_metrics, alt_analysis, max_depth = \
+                raw_gap_df, semi_gap_df, raw_metrics, alt_analysis, max_depth, pegging_df = \
                     self._calculate_multilevel_material_gap(
                         mfg_shortage_df=mfg_shortage,
                         bom_explosion_df=bom_explosion_df,
@@ -183,7 +197,9 @@ class SupplyChainGAPCalculator:
                         raw_supply_df=raw_supply_df,
                         raw_safety_stock_df=raw_safety_stock_df if include_raw_safety else None,
                         include_alternatives=include_alternatives,
-                        selected_supply_sources=selected_supply_sources
+                        selected_supply_sources=selected_supply_sources,
+                        alternative_mode=alternative_mode,
+                        bom_graph=result.bom_graph
                     )
                 
                 result.raw_gap_df = raw_gap_df
@@ -191,6 +207,7 @@ class SupplyChainGAPCalculator:
                 result.raw_metrics = raw_metrics
                 result.alternative_analysis_df = alt_analysis
                 result.max_bom_depth = max_depth
+                result.raw_pegging_df = pegging_df
                 
                 logger.info(
                     f"Material GAP: {len(raw_gap_df)} raw materials, "
@@ -204,13 +221,13 @@ class SupplyChainGAPCalculator:
         # =====================================================================
         logger.info("Generating action recommendations...")
         
-        mo_suggestions, po_fg_suggestions, po_raw_suggestions = self._generate_actions(result)
-        
-        result.mo_suggestions = mo_suggestions
-        result.po_fg_suggestions = po_fg_suggestions
-        result.po_raw_suggestions = po_raw_suggestions
+        result.build_production_statuses()
+        result.set_actions_table(self._generate_actions(result))
         
-        logger.info(f"Actions: {len(mo_suggestions)} MO, {len(po_fg_suggestions)} PO-FG, {len(po_raw_suggestions)} PO-Raw")
+        logger.info(
+            f"Actions: {result.get_action_count('mo')} MO, {result.get_action_count('po_fg')} PO-FG, "
+            f"{result.get_action_count('po_raw')} PO-Raw"
+        )
         
         # =====================================================================
         # PERIOD-BASED GAP ANALYSIS (v2.2)
@@ -265,7 +282,8 @@ class SupplyChainGAPCalculator:
                         raw_supply_detail_df=raw_supply_detail_df,
                         existing_mo_demand_df=existing_mo_demand_df if include_existing_mo else None,
                         include_existing_mo=include_existing_mo,
-                        include_draft_mo=include_draft_mo
+                        include_draft_mo=include_draft_mo,
+                        bom_graph=result.bom_graph
                     )
                     result.raw_period_gap_df = raw_period_gap_df
                     result.raw_period_metrics = raw_period_metrics
@@ -278,6 +296,20 @@ class SupplyChainGAPCalculator:
         
         return result
     
+    def _exclude_draft_mo_supply(self, fg_supply_df: pd.DataFrame, include_draft_mo: bool) -> pd.DataFrame:
+        """Drop DRAFT MO_EXPECTED rows from FG supply unless DRAFT MOs are included"""
+        if include_draft_mo or fg_supply_df.empty or 'availability_status' not in fg_supply_df.columns:
+            return fg_supply_df
+        before = len(fg_supply_df)
+        fg_supply_df = fg_supply_df[
+            ~((fg_supply_df['supply_source'] == 'MO_EXPECTED') & 
+              (fg_supply_df['availability_status'] == 'DRAFT'))
+        ].copy()
+        filtered = before - len(fg_supply_df)
+        if filtered > 0:
+            logger.info(f"Excluded {filtered} DRAFT MO rows from FG supply")
+        return fg_supply_df
+    
     # =========================================================================
     # LEVEL 1: FG GAP CALCULATION
     # =========================================================================
@@ -421,9 +453,7 @@ class SupplyChainGAPCalculator:
         )
         
         # Classify status
-        gap_df['gap_status'] = gap_df.apply(self._classify_gap_status, axis=1)
-        gap_df['gap_group'] = gap_df['gap_status'].apply(self._get_gap_group)
-        gap_df['priority'] = gap_df['gap_status'].apply(lambda x: STATUS_CONFIG.get(x, {}).get('priority', 99))
+        self._assign_gap_status(gap_df, demand_col='total_demand', with_group=True)
         
         # FIXED: At risk value - Use avg_unit_price_usd (already in USD)
         # OLD (WRONG): selling_price = gap_df['selling_unit_price'].fillna(0) - This is original currency (VND)!
@@ -445,45 +475,52 @@ class SupplyChainGAPCalculator:
         
         return gap_df, metrics, customer_impact
     
-    def _classify_gap_status(self, row) -> str:
-        """Classify GAP status based on net_gap sign and coverage"""
-        net_gap = row.get('net_gap', 0)
-        total_demand = row.get('total_demand', 0)
-        total_supply = row.get('total_supply', 0)
-        coverage = row.get('coverage_ratio', 0)
-        
-        # No activity cases
-        if total_demand == 0 and total_supply == 0:
-            return 'NO_ACTIVITY'
-        if total_demand == 0:
-            return 'NO_DEMAND'
-        
-        # Shortage
-        if net_gap < 0:
-            if coverage < THRESHOLDS['shortage']['critical']:
-                return 'CRITICAL_SHORTAGE'
-            elif coverage < THRESHOLDS['shortage']['severe']:
-                return 'SEVERE_SHORTAGE'
-            elif coverage < THRESHOLDS['shortage']['high']:
-                return 'HIGH_SHORTAGE'
-            elif coverage < THRESHOLDS['shortage']['moderate']:
-                return 'MODERATE_SHORTAGE'
-            else:
-                return 'LIGHT_SHORTAGE'
-        
-        # Balanced
-        if net_gap == 0:
-            return 'BALANCED'
-        
-        # Surplus
-        if coverage <= THRESHOLDS['surplus']['light']:
-            return 'LIGHT_SURPLUS'
-        elif coverage <= THRESHOLDS['surplus']['moderate']:
-            return 'MODERATE_SURPLUS'
-        elif coverage <= THRESHOLDS['surplus']['high']:
-            return 'HIGH_SURPLUS'
-        else:
-            return 'SEVERE_SURPLUS'
+    def _classify_gap_status(self, df: pd.DataFrame, demand_col: str = 'total_demand') -> np.ndarray:
+        """
+        Classify GAP status based on net_gap sign and coverage.
+        Column-wise: rules are evaluated in order and the first match wins.
+        """
+        net_gap = df['net_gap'].to_numpy(dtype=float)
+        demand = df[demand_col].to_numpy(dtype=float)
+        supply = df['total_supply'].to_numpy(dtype=float)
+        coverage = df['coverage_ratio'].to_numpy(dtype=float)
+        
+        shortage = THRESHOLDS['shortage']
+        surplus = THRESHOLDS['surplus']
+        is_shortage = net_gap < 0
+        no_demand = demand == 0
+        
+        rules = [
+            # No activity cases
+            (no_demand & (supply == 0), 'NO_ACTIVITY'),
+            (no_demand, 'NO_DEMAND'),
+            # Shortage
+            (is_shortage & (coverage < shortage['critical']), 'CRITICAL_SHORTAGE'),
+            (is_shortage & (coverage < shortage['severe']), 'SEVERE_SHORTAGE'),
+            (is_shortage & (coverage < shortage['high']), 'HIGH_SHORTAGE'),
+            (is_shortage & (coverage < shortage['moderate']), 'MODERATE_SHORTAGE'),
+            (is_shortage, 'LIGHT_SHORTAGE'),
+            # Balanced
+            (net_gap == 0, 'BALANCED'),
+            # Surplus
+            (coverage <= surplus['light'], 'LIGHT_SURPLUS'),
+            (coverage <= surplus['moderate'], 'MODERATE_SURPLUS'),
+            (coverage <= surplus['high'], 'HIGH_SURPLUS'),
+        ]
+        return np.select(
+            [cond for cond, _ in rules],
+            [status for _, status in rules],
+            default='SEVERE_SURPLUS'
+        ).astype(object)
+    
+    def _assign_gap_status(self, df: pd.DataFrame, demand_col: str, with_group: bool = False):
+        """Add gap_status + priority (and gap_group) columns in place"""
+        df['gap_status'] = self._classify_gap_status(df, demand_col)
+        if with_group:
+            df['gap_group'] = df['gap_status'].map(
+                {status: self._get_gap_group(status) for status in pd.unique(df['gap_status'])}
+            )
+        df['priority'] = df['gap_status'].map(_STATUS_PRIORITY).fillna(99).astype(int)
     
     def _get_gap_group(self, status: str) -> str:
         """Get GAP group from status"""
@@ -784,8 +821,7 @@ class SupplyChainGAPCalculator:
         )
         
         # Classify status
-        raw_gap['gap_status'] = raw_gap.apply(self._classify_gap_status, axis=1)
-        raw_gap['priority'] = raw_gap['gap_status'].apply(lambda x: STATUS_CONFIG.get(x, {}).get('priority', 99))
+        self._assign_gap_status(raw_gap, demand_col='total_required_qty')
         
         # Sort
         raw_gap = raw_gap.sort_values(['priority', 'net_gap']).reset_index(drop=True)
@@ -808,56 +844,91 @@ class SupplyChainGAPCalculator:
         
         return raw_gap, metrics, alt_analysis
     
-    def _analyze_alternatives(self, raw_gap_df: pd.DataFrame) -> pd.DataFrame:
-        """Analyze alternative materials for shortage primaries"""
+    def _analyze_alternatives(self, raw_gap_df: pd.DataFrame, mode: str = 'single') -> pd.DataFrame:
+        """
+        Analyze alternative materials for shortage primaries (one join for all primaries).
+        
+        mode 'single': an alternative can cover when its own net_gap covers the
+            whole primary shortage.
+        mode 'combined': alternatives' surpluses are allocated in
+            alternative_priority order until the primary shortage is covered;
+            if the combination covers it, every alternative that received an
+            allocation is marked can_cover_shortage (adds allocated_qty and
+            combined_coverage).
+        
+        Rows are ordered like raw_gap_df: primaries, then their alternatives.
+        """
         
         if raw_gap_df.empty or 'is_primary' not in raw_gap_df.columns:
             return pd.DataFrame()
         
+        # Alternative materials have primary_material_id pointing to their primary
+        if 'primary_material_id' not in raw_gap_df.columns:
+            return pd.DataFrame()
+        
+        def column(name, default=None):
+            return raw_gap_df[name] if name in raw_gap_df.columns else pd.Series(default, index=raw_gap_df.index)
+        
+        position = pd.Series(np.arange(len(raw_gap_df)), index=raw_gap_df.index)
+        
         # FIXED: Use 1/0 comparison instead of True/False for SQL compatibility
         # SQL returns is_primary as 1 or 0, not Python True/False
-        primary_shortage = raw_gap_df[
-            (raw_gap_df['is_primary'].isin([1, True])) & 
-            (raw_gap_df['net_gap'] < 0)
-        ]
+        is_primary = raw_gap_df['is_primary'].isin([1, True])
+        is_alternative = raw_gap_df['is_primary'].isin([0, False])
+        primary_mask = is_primary & (raw_gap_df['net_gap'] < 0) & raw_gap_df['material_id'].notna()
         
-        if primary_shortage.empty:
+        if not primary_mask.any() or not is_alternative.any():
             return pd.DataFrame()
         
-        # Get alternative materials
-        alternatives = raw_gap_df[raw_gap_df['is_primary'].isin([0, False])].copy()
-        
-        if alternatives.empty:
+        primaries = pd.DataFrame({
+            'primary_material_id': raw_gap_df['material_id'],
+            'primary_pt_code': column('material_pt_code'),
+            'primary_net_gap': raw_gap_df['net_gap'],
+            '_primary_pos': position,
+        })[primary_mask]
+        
+        alternatives = pd.DataFrame({
+            '_primary_ref': raw_gap_df['primary_material_id'],
+            'alternative_material_id': raw_gap_df['material_id'],
+            'material_pt_code': column('material_pt_code'),
+            'material_name': column('material_name'),
+            'net_gap': raw_gap_df['net_gap'],
+            'alternative_priority': column('alternative_priority', 99),
+            '_alt_pos': position,
+        })[is_alternative]
+        
+        analysis = primaries.merge(
+            alternatives, left_on='primary_material_id', right_on='_primary_ref', how='inner'
+        )
+        if analysis.empty:
             return pd.DataFrame()
         
-        # Match alternatives to primaries by primary_material_id
-        # (alternative materials have primary_material_id pointing to their primary)
-        if 'primary_material_id' not in alternatives.columns:
-            return pd.DataFrame()
+        shortage = analysis['primary_net_gap'].abs()
         
-        results = []
-        for _, primary in primary_shortage.iterrows():
-            primary_id = primary.get('material_id')
-            if pd.isna(primary_id):
-                continue
-            
-            # Find alternatives that reference this primary
-            group_alts = alternatives[alternatives['primary_material_id'] == primary_id]
-            for _, alt in group_alts.iterrows():
-                can_cover = alt.get('net_gap', 0) >= abs(primary.get('net_gap', 0))
-                results.append({
-                    'primary_material_id': primary_id,
-                    'primary_pt_code': primary.get('material_pt_code'),
-                    'primary_net_gap': primary.get('net_gap'),
-                    'alternative_material_id': alt['material_id'],
-                    'material_pt_code': alt.get('material_pt_code'),
-                    'material_name': alt.get('material_name'),
-                    'net_gap': alt.get('net_gap'),
-                    'alternative_priority': alt.get('alternative_priority', 99),
-                    'can_cover_shortage': can_cover
-                })
-        
-        return pd.DataFrame(results) if results else pd.DataFrame()
+        if mode == 'combined':
+            # Allocate surpluses in priority order within each primary
+            analysis = analysis.sort_values(
+                ['_primary_pos', 'alternative_priority', '_alt_pos'], kind='mergesort'
+            )
+            shortage = analysis['primary_net_gap'].abs()
+            surplus = analysis['net_gap'].clip(lower=0).fillna(0)
+            allocated_before = surplus.groupby(analysis['_primary_pos']).cumsum() - surplus
+            analysis['allocated_qty'] = np.minimum(surplus, (shortage - allocated_before).clip(lower=0))
+            total_surplus = surplus.groupby(analysis['_primary_pos']).transform('sum')
+            analysis['combined_coverage'] = np.minimum(total_surplus / shortage, 1.0)
+            analysis['can_cover_shortage'] = (total_surplus >= shortage) & (analysis['allocated_qty'] > 0)
+        else:
+            analysis['can_cover_shortage'] = analysis['net_gap'] >= shortage
+        
+        analysis = analysis.sort_values(['_primary_pos', '_alt_pos'], kind='mergesort')
+        columns = [
+            'primary_material_id', 'primary_pt_code', 'primary_net_gap',
+            'alternative_material_id', 'material_pt_code', 'material_name',
+            'net_gap', 'alternative_priority', 'can_cover_shortage'
+        ]
+        if mode == 'combined':
+            columns[-1:-1] = ['allocated_qty', 'combined_coverage']
+        return analysis[columns].reset_index(drop=True)
     
     # =========================================================================
     # MULTI-LEVEL MATERIAL GAP (iterative BOM explosion with supply netting)
@@ -871,8 +942,10 @@ class SupplyChainGAPCalculator:
         raw_supply_df: pd.DataFrame,
         raw_safety_stock_df: Optional[pd.DataFrame],
         include_alternatives: bool,
-        selected_supply_sources: Optional[List[str]]
-    ) -> Tuple[pd.DataFrame, pd.DataFrame, Dict[str, Any], pd.DataFrame, int]:
+        selected_supply_sources: Optional[List[str]],
+        bom_graph: Optional[BOMGraph] = None,
+        alternative_mode: str = 'single'
+    ) -> Tuple[pd.DataFrame, pd.DataFrame, Dict[str, Any], pd.DataFrame, int, pd.DataFrame]:
         """
         Multi-level material GAP with supply netting at intermediate levels.
         
@@ -888,14 +961,18 @@ class SupplyChainGAPCalculator:
         3. After all levels: calculate final raw material GAP (aggregated leaf demand)
         4. Return combined results
         
+        Explosion runs on bom_graph (compiled from bom_explosion_df if not given):
+        bom_graph.shortage_levels runs the recurrence once (per FG as well, for
+        the raw pegging table) and each level's rows are built from its drivers.
+        
         Returns:
-            (raw_gap_df, semi_finished_gap_df, raw_metrics, alt_analysis, max_depth)
+            (raw_gap_df, semi_finished_gap_df, raw_metrics, alt_analysis, max_depth, pegging_df)
         """
         
         id_col = 'output_product_id' if 'output_product_id' in bom_explosion_df.columns else 'fg_product_id'
         
-        # Determine which materials have their own BOM (semi-finished)
-        products_with_bom = set(bom_explosion_df[id_col].unique())
+        # Compiled BOM index: adjacency + semi-finished (has own BOM) flag
+        bom_graph = get_bom_graph(bom_explosion_df, bom_graph)
         
         # Pre-process supply data for quick lookup
         supply_by_material = self._prepare_supply_lookup(
@@ -903,54 +980,33 @@ class SupplyChainGAPCalculator:
         )
         
         # Pre-process safety stock for quick lookup
-        safety_by_material = {}
-        if raw_safety_stock_df is not None and not raw_safety_stock_df.empty:
-            safety_id = 'material_id' if 'material_id' in raw_safety_stock_df.columns else 'product_id'
-            for _, row in raw_safety_stock_df.iterrows():
-                safety_by_material[row[safety_id]] = row.get('safety_stock_qty', 0) or 0
+        safety_by_material = self._prepare_safety_lookup(raw_safety_stock_df)
+        
+        # One numeric pass of the netting recurrence drives every level (and
+        # carries the per-FG split for the pegging table)
+        levels = bom_graph.shortage_levels(
+            mfg_shortage_df['product_id'].to_numpy(),
+            mfg_shortage_df['net_gap'].abs().to_numpy(dtype=float),
+            self._available_lookup(supply_by_material, safety_by_material),
+            MAX_BOM_LEVELS, peg=True
+        )
         
         # Iteration state
         leaf_demand_parts = []       # Raw material demand accumulated across all levels
         semi_finished_gaps = []      # GAP results for semi-finished materials
-        max_depth = 0
-        
-        current_shortage = mfg_shortage_df[['product_id', 'net_gap']].copy()
-        current_shortage['net_gap'] = current_shortage['net_gap'].abs()  # work with positive qty
+        max_depth = max(len(levels), 1)
         
-        for level in range(1, MAX_BOM_LEVELS + 1):
-            if current_shortage.empty:
-                break
+        for level, drivers in enumerate(levels, start=1):
+            logger.info(f"  Level {level}: {len(drivers['parents'])} parent products with shortage")
             
-            max_depth = level
-            logger.info(f"  Level {level}: {len(current_shortage)} parent products with shortage")
-            
-            # --- Step A: Explode BOM for current shortage products ---
-            shortage_ids = current_shortage['product_id'].tolist()
-            level_bom = bom_explosion_df[bom_explosion_df[id_col].isin(shortage_ids)].copy()
-            
-            if level_bom.empty:
-                logger.info(f"  Level {level}: No BOM found for shortage products")
-                break
-            
-            # --- Step B: Calculate demand per material ---
-            level_demand = self._calculate_level_demand(
-                parent_shortage_df=current_shortage,
-                bom_df=level_bom,
-                id_col=id_col
+            # --- Step A+B: Explode BOM for current shortage products ---
+            level_demand = bom_graph.level_demand(
+                bom_graph.node_ids[drivers['parents']], drivers['parent_qty'],
+                qty_col='required_qty', count_col='parent_product_count'
             )
             
-            if level_demand.empty:
-                break
-            
             # --- Step C: Tag leaf vs semi-finished ---
-            level_demand['is_leaf'] = ~level_demand['material_id'].isin(products_with_bom)
-            level_demand['bom_level'] = level
-            level_demand['material_category'] = np.where(
-                level_demand['is_leaf'], 'RAW_MATERIAL', 'SEMI_FINISHED'
-            )
-            
-            leaf_materials = level_demand[level_demand['is_leaf']].copy()
-            semi_materials = level_demand[~level_demand['is_leaf']].copy()
+            leaf_materials, semi_materials = self._split_level_demand(level_demand, level, bom_graph)
             
             # --- Step D: Accumulate leaf demand ---
             if not leaf_materials.empty:
@@ -958,32 +1014,17 @@ class SupplyChainGAPCalculator:
                 logger.info(f"  Level {level}: {len(leaf_materials)} leaf (raw) materials")
             
             # --- Step E: Semi-finished → immediate GAP with supply netting ---
-            next_shortage_rows = []
-            
+            # (net shortages are the next level's drivers in `levels`)
             if not semi_materials.empty:
                 logger.info(f"  Level {level}: {len(semi_materials)} semi-finished materials")
                 
-                semi_gap = self._calculate_material_gap_core(
+                semi_finished_gaps.append(self._calculate_material_gap_core(
                     demand_df=semi_materials,
                     supply_lookup=supply_by_material,
                     safety_lookup=safety_by_material,
                     bom_level=level,
                     material_category='SEMI_FINISHED'
-                )
-                semi_finished_gaps.append(semi_gap)
-                
-                # Propagate: semi-finished with net shortage → next level
-                semi_with_shortage = semi_gap[semi_gap['net_gap'] < 0].copy()
-                if not semi_with_shortage.empty:
-                    next_shortage = semi_with_shortage[['material_id', 'net_gap']].copy()
-                    next_shortage.rename(columns={'material_id': 'product_id'}, inplace=True)
-                    next_shortage['net_gap'] = next_shortage['net_gap'].abs()
-                    next_shortage_rows.append(next_shortage)
-            
-            if not next_shortage_rows:
-                break
-            
-            current_shortage = pd.concat(next_shortage_rows, ignore_index=True)
+                ))
         
         # =====================================================================
         # FINAL: Calculate raw material GAP (all leaf demand aggregated)
@@ -992,37 +1033,87 @@ class SupplyChainGAPCalculator:
         alt_analysis = pd.DataFrame()
         
         if leaf_demand_parts:
-            all_leaf_demand = pd.concat(leaf_demand_parts, ignore_index=True)
-            
-            # Aggregate by material_id (same raw material from multiple BOM paths/levels)
-            raw_demand_agg = self._aggregate_leaf_demand(all_leaf_demand, id_col)
-            
-            # Add existing MO demand (once, for all raw materials)
-            raw_demand_agg = self._add_existing_mo_demand(raw_demand_agg, existing_mo_demand_df)
-            
-            # Calculate final GAP
-            raw_gap_df = self._calculate_material_gap_core(
-                demand_df=raw_demand_agg,
-                supply_lookup=supply_by_material,
-                safety_lookup=safety_by_material,
-                bom_level=0,  # 0 = aggregated across levels
-                material_category='RAW_MATERIAL'
+            raw_gap_df = self._calculate_leaf_gap(
+                pd.concat(leaf_demand_parts, ignore_index=True), id_col,
+                existing_mo_demand_df, supply_by_material, safety_by_material
             )
-            # Restore actual min bom_level from accumulated demand
-            if 'min_bom_level' in raw_demand_agg.columns:
-                level_map = raw_demand_agg.set_index('material_id')['min_bom_level']
-                raw_gap_df['bom_level'] = raw_gap_df['material_id'].map(level_map).fillna(1).astype(int)
             
             # Alternative analysis
             if include_alternatives and 'is_primary' in raw_gap_df.columns:
-                alt_analysis = self._analyze_alternatives(raw_gap_df)
+                alt_analysis = self._analyze_alternatives(raw_gap_df, alternative_mode)
         
         # Build semi-finished combined df
         semi_gap_df = pd.DataFrame()
         if semi_finished_gaps:
             semi_gap_df = pd.concat(semi_finished_gaps, ignore_index=True)
         
-        # Metrics
+        raw_metrics = self._calculate_raw_metrics(raw_gap_df, semi_gap_df, alt_analysis, max_depth)
+        
+        pegging_df = BOMGraph.pegging_frame(levels) if leaf_demand_parts else pd.DataFrame()
+        
+        logger.info(
+            f"  Multi-level complete: {max_depth} levels, "
+            f"{raw_metrics['total_materials']} raw, "
+            f"{raw_metrics['semi_finished_count']} semi-finished"
+        )
+        
+        return raw_gap_df, semi_gap_df, raw_metrics, alt_analysis, max_depth, pegging_df
+    
+    def _available_lookup(
+        self,
+        supply_lookup: Dict[int, float],
+        safety_lookup: Dict[int, float]
+    ) -> Dict[int, float]:
+        """
+        material_id → usable supply for semi-finished netting: the same value
+        as the GAP core's available_supply (supply − safety, clipped at 0).
+        """
+        available = {}
+        for material_id in set(supply_lookup) | set(safety_lookup):
+            supply = supply_lookup.get(material_id)
+            safety = safety_lookup.get(material_id)
+            supply = 0.0 if pd.isna(supply) else float(supply)
+            safety = 0.0 if pd.isna(safety) else float(safety)
+            available[material_id] = max(supply - safety, 0.0)
+        return available
+    
+    def _calculate_leaf_gap(
+        self,
+        all_leaf_demand: pd.DataFrame,
+        id_col: str,
+        existing_mo_demand_df: Optional[pd.DataFrame],
+        supply_lookup: Dict[int, float],
+        safety_lookup: Dict[int, float]
+    ) -> pd.DataFrame:
+        """Raw material GAP from leaf demand accumulated over all BOM levels"""
+        # Aggregate by material_id (same raw material from multiple BOM paths/levels)
+        raw_demand_agg = self._aggregate_leaf_demand(all_leaf_demand, id_col)
+        
+        # Add existing MO demand (once, for all raw materials)
+        raw_demand_agg = self._add_existing_mo_demand(raw_demand_agg, existing_mo_demand_df)
+        
+        # Calculate final GAP
+        raw_gap_df = self._calculate_material_gap_core(
+            demand_df=raw_demand_agg,
+            supply_lookup=supply_lookup,
+            safety_lookup=safety_lookup,
+            bom_level=0,  # 0 = aggregated across levels
+            material_category='RAW_MATERIAL'
+        )
+        # Restore actual min bom_level from accumulated demand
+        if 'min_bom_level' in raw_demand_agg.columns:
+            level_map = raw_demand_agg.set_index('material_id')['min_bom_level']
+            raw_gap_df['bom_level'] = raw_gap_df['material_id'].map(level_map).fillna(1).astype(int)
+        return raw_gap_df
+    
+    def _calculate_raw_metrics(
+        self,
+        raw_gap_df: pd.DataFrame,
+        semi_gap_df: pd.DataFrame,
+        alt_analysis: pd.DataFrame,
+        max_depth: int
+    ) -> Dict[str, Any]:
+        """Material GAP metrics (raw + semi-finished + alternatives)"""
         raw_metrics = {
             'total_materials': len(raw_gap_df),
             'shortage_count': len(raw_gap_df[raw_gap_df['net_gap'] < 0]) if not raw_gap_df.empty else 0,
@@ -1035,14 +1126,7 @@ class SupplyChainGAPCalculator:
             raw_metrics['alternative_available'] = len(alt_analysis[alt_analysis['can_cover_shortage'] == True])
         else:
             raw_metrics['alternative_available'] = 0
-        
-        logger.info(
-            f"  Multi-level complete: {max_depth} levels, "
-            f"{raw_metrics['total_materials']} raw, "
-            f"{raw_metrics['semi_finished_count']} semi-finished"
-        )
-        
-        return raw_gap_df, semi_gap_df, raw_metrics, alt_analysis, max_depth
+        return raw_metrics
     
     def _prepare_supply_lookup(
         self,
@@ -1083,71 +1167,35 @@ class SupplyChainGAPCalculator:
         
         return lookup
     
-    def _calculate_level_demand(
+    def _prepare_safety_lookup(
         self,
-        parent_shortage_df: pd.DataFrame,
-        bom_df: pd.DataFrame,
-        id_col: str
-    ) -> pd.DataFrame:
-        """
-        Calculate material demand from parent shortage × BOM.
-        
-        Args:
-            parent_shortage_df: columns [product_id, net_gap] (net_gap = positive shortage qty)
-            bom_df: BOM explosion for these products
-            id_col: column name for output product ID in bom_df
-        
-        Returns:
-            DataFrame with required_qty per material (not yet aggregated by material_id
-            to allow leaf/semi classification before aggregation)
-        """
-        if parent_shortage_df.empty or bom_df.empty:
-            return pd.DataFrame()
-        
-        # Merge: parent shortage × BOM
-        merged = bom_df.merge(
-            parent_shortage_df[['product_id', 'net_gap']].rename(
-                columns={'product_id': id_col, 'net_gap': 'parent_shortage_qty'}
-            ),
-            on=id_col,
-            how='inner'
-        )
-        
-        if merged.empty:
-            return pd.DataFrame()
-        
-        # Calculate required_qty per material per BOM line
-        bom_out = merged['bom_output_quantity'].fillna(1).replace(0, 1) \
-            if 'bom_output_quantity' in merged.columns else 1
-        qty_per = merged['quantity_per_output'].fillna(1) \
-            if 'quantity_per_output' in merged.columns else 1
-        scrap = merged['scrap_rate'].fillna(0) \
-            if 'scrap_rate' in merged.columns else 0
-        
-        merged['required_qty'] = (
-            (merged['parent_shortage_qty'] / bom_out) * qty_per * (1 + scrap / 100)
-        )
-        
-        # Aggregate by material_id (same material may appear in multiple parent BOMs)
-        agg_cols = {
-            'required_qty': 'sum',
-            id_col: 'nunique'
-        }
-        optional = {
-            'material_pt_code': 'first', 'material_name': 'first',
-            'material_brand': 'first', 'material_package_size': 'first',
-            'material_uom': 'first',
-            'material_type': 'first', 'is_primary': 'first',
-            'alternative_priority': 'first', 'primary_material_id': 'first'
+        raw_safety_stock_df: Optional[pd.DataFrame]
+    ) -> Dict[int, float]:
+        """material_id → safety_stock_qty"""
+        if raw_safety_stock_df is None or raw_safety_stock_df.empty:
+            return {}
+        safety_id = 'material_id' if 'material_id' in raw_safety_stock_df.columns else 'product_id'
+        if 'safety_stock_qty' not in raw_safety_stock_df.columns:
+            return dict.fromkeys(raw_safety_stock_df[safety_id].tolist(), 0)
+        return {
+            mid: qty or 0
+            for mid, qty in zip(raw_safety_stock_df[safety_id].tolist(),
+                                raw_safety_stock_df['safety_stock_qty'].tolist())
         }
-        for col, func in optional.items():
-            if col in merged.columns:
-                agg_cols[col] = func
-        
-        demand = merged.groupby('material_id').agg(agg_cols).reset_index()
-        demand.rename(columns={id_col: 'parent_product_count'}, inplace=True)
-        
-        return demand
+    
+    def _split_level_demand(
+        self,
+        level_demand: pd.DataFrame,
+        level: int,
+        bom_graph: BOMGraph
+    ) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """Tag one level's demand with bom_level / leaf flag → (leaf, semi-finished)"""
+        level_demand['is_leaf'] = bom_graph.is_leaf_ids(level_demand['material_id'].to_numpy())
+        level_demand['bom_level'] = level
+        level_demand['material_category'] = np.where(
+            level_demand['is_leaf'], 'RAW_MATERIAL', 'SEMI_FINISHED'
+        )
+        return level_demand[level_demand['is_leaf']].copy(), level_demand[~level_demand['is_leaf']].copy()
     
     def _aggregate_leaf_demand(
         self,
@@ -1255,10 +1303,7 @@ class SupplyChainGAPCalculator:
         )
         
         # Status classification
-        gap['gap_status'] = gap.apply(self._classify_gap_status, axis=1)
-        gap['priority'] = gap['gap_status'].apply(
-            lambda x: STATUS_CONFIG.get(x, {}).get('priority', 99)
-        )
+        self._assign_gap_status(gap, demand_col='total_required_qty')
         
         # Tags
         gap['bom_level'] = bom_level
@@ -1273,109 +1318,128 @@ class SupplyChainGAPCalculator:
     # ACTION RECOMMENDATIONS
     # =========================================================================
     
-    def _generate_actions(
-        self,
-        result: SupplyChainGAPResult
-    ) -> Tuple[List[ActionRecommendation], List[ActionRecommendation], List[ActionRecommendation]]:
-        """Generate action recommendations"""
-        
-        mo_suggestions = []
-        po_fg_suggestions = []
-        po_raw_suggestions = []
+    def _generate_actions(self, result: SupplyChainGAPResult) -> pd.DataFrame:
+        """
+        Generate action recommendations as one columnar table (ACTION_COLUMNS).
+        ActionRecommendation objects are only built when the UI / planners
+        read result.mo_suggestions etc.
+        """
+        frames = []
         
         # MO suggestions for manufacturing products
         mfg_shortage = result.get_manufacturing_shortage()
-        # Pre-compute all statuses at once (also populates cache for UI/export later)
-        all_statuses = result.get_all_production_statuses()
-        
-        for _, row in mfg_shortage.iterrows():
-            product_id = row['product_id']
-            status = all_statuses.get(product_id, result.get_production_status(product_id))
+        if not mfg_shortage.empty:
+            # Pre-compute all statuses at once (also populates cache for UI/export later)
+            all_statuses = result.get_all_production_statuses()
+            statuses = [
+                all_statuses.get(product_id) or result.get_production_status(product_id)
+                for product_id in mfg_shortage['product_id'].tolist()
+            ]
+            can_produce = np.array([bool(s.get('can_produce', False)) for s in statuses], dtype=bool)
+            use_alternative = np.array([s.get('status') == 'USE_ALTERNATIVE' for s in statuses], dtype=bool)
             
-            if status.get('can_produce', False):
-                action_type = 'USE_ALTERNATIVE' if status.get('status') == 'USE_ALTERNATIVE' else 'CREATE_MO'
-                reason = status.get('reason', 'Raw materials available')
-            else:
-                action_type = 'WAIT_RAW'
-                reason = status.get('reason', 'Raw materials insufficient')
-            
-            mo_suggestions.append(ActionRecommendation(
-                action_type=action_type,
-                product_id=product_id,
-                pt_code=row.get('pt_code', ''),
-                product_name=row.get('product_name', ''),
-                quantity=abs(row.get('net_gap', 0)),
-                uom=row.get('standard_uom', ''),
-                priority=row.get('priority', 99),
-                reason=reason,
-                brand=row.get('brand', ''),
-                package_size=str(row.get('package_size', '')) if pd.notna(row.get('package_size')) else '',
-                related_materials=status.get('limiting_materials', [])
+            frames.append(self._action_frame(
+                mfg_shortage, 'mo',
+                action_type=np.where(
+                    can_produce,
+                    np.where(use_alternative, 'USE_ALTERNATIVE', 'CREATE_MO'),
+                    'WAIT_RAW'
+                ),
+                reason=[
+                    s.get('reason', 'Raw materials available' if ok else 'Raw materials insufficient')
+                    for s, ok in zip(statuses, can_produce)
+                ],
+                related_materials=[s.get('limiting_materials', []) for s in statuses]
+            ))
+        
+        # MO suggestions for semi-finished products with shortage
+        semi_shortage = result.get_semi_finished_shortage()
+        if not semi_shortage.empty:
+            levels = (
+                semi_shortage['bom_level'].astype(str).to_numpy(dtype=object)
+                if 'bom_level' in semi_shortage.columns else '?'
+            )
+            frames.append(self._action_frame(
+                semi_shortage, 'mo', material=True,
+                action_type='CREATE_MO_SEMI',
+                reason='Semi-finished shortage at BOM level ' + levels
             ))
         
         # PO-FG suggestions for trading products
         trading_shortage = result.get_trading_shortage()
-        for _, row in trading_shortage.iterrows():
-            po_fg_suggestions.append(ActionRecommendation(
+        if not trading_shortage.empty:
+            frames.append(self._action_frame(
+                trading_shortage, 'po_fg',
                 action_type='CREATE_PO_FG',
-                product_id=row['product_id'],
-                pt_code=row.get('pt_code', ''),
-                product_name=row.get('product_name', ''),
-                quantity=abs(row.get('net_gap', 0)),
-                uom=row.get('standard_uom', ''),
-                priority=row.get('priority', 99),
-                reason='Trading product - no BOM',
-                brand=row.get('brand', ''),
-                package_size=str(row.get('package_size', '')) if pd.notna(row.get('package_size')) else ''
+                reason='Trading product - no BOM'
             ))
         
-        # PO-Raw suggestions for raw material shortage
+        # PO-Raw suggestions for primary raw materials no alternative can cover
         raw_shortage = result.get_raw_shortage()
-        for _, row in raw_shortage.iterrows():
-            # Check if alternative can cover
-            has_alternative = False
-            if not result.alternative_analysis_df.empty:
-                mat_id = row.get('material_id')
-                if 'primary_material_id' in result.alternative_analysis_df.columns:
-                    alts = result.alternative_analysis_df[
-                        result.alternative_analysis_df['primary_material_id'] == mat_id
-                    ]
-                    if not alts.empty and 'can_cover_shortage' in alts.columns:
-                        has_alternative = alts['can_cover_shortage'].any()
+        if not raw_shortage.empty:
+            alt_df = result.alternative_analysis_df
+            covered_primaries = set()
+            if not alt_df.empty and {'primary_material_id', 'can_cover_shortage'} <= set(alt_df.columns):
+                can_cover = alt_df['can_cover_shortage'].fillna(False).astype(bool)
+                covered_primaries = set(alt_df.loc[can_cover, 'primary_material_id'].tolist())
             
             # FIXED: Use 1/0 comparison for is_primary
-            is_primary = row.get('is_primary', 1)
-            if not has_alternative and is_primary in [1, True]:
-                po_raw_suggestions.append(ActionRecommendation(
+            is_primary = (
+                raw_shortage['is_primary'].isin([1, True])
+                if 'is_primary' in raw_shortage.columns else True
+            )
+            needs_po = raw_shortage[~raw_shortage['material_id'].isin(covered_primaries) & is_primary]
+            if not needs_po.empty:
+                frames.append(self._action_frame(
+                    needs_po, 'po_raw', material=True,
                     action_type='CREATE_PO_RAW',
-                    product_id=row.get('material_id', 0),
-                    pt_code=row.get('material_pt_code', ''),
-                    product_name=row.get('material_name', ''),
-                    quantity=abs(row.get('net_gap', 0)),
-                    uom=row.get('material_uom', ''),
-                    priority=row.get('priority', 99),
-                    reason='Raw material shortage',
-                    brand=row.get('material_brand', '') if pd.notna(row.get('material_brand')) else '',
-                    package_size=str(row.get('material_package_size', '')) if pd.notna(row.get('material_package_size')) else ''
+                    reason='Raw material shortage'
                 ))
         
-        # MO suggestions for semi-finished products with shortage
-        semi_shortage = result.get_semi_finished_shortage()
-        for _, row in semi_shortage.iterrows():
-            mo_suggestions.append(ActionRecommendation(
-                action_type='CREATE_MO_SEMI',
-                product_id=row.get('material_id', 0),
-                pt_code=row.get('material_pt_code', ''),
-                product_name=row.get('material_name', ''),
-                quantity=abs(row.get('net_gap', 0)),
-                uom=row.get('material_uom', ''),
-                priority=row.get('priority', 99),
-                reason=f"Semi-finished shortage at BOM level {row.get('bom_level', '?')}",
-                brand=row.get('material_brand', '') if pd.notna(row.get('material_brand')) else '',
-                package_size=str(row.get('material_package_size', '')) if pd.notna(row.get('material_package_size')) else ''
-            ))
+        if not frames:
+            return pd.DataFrame(columns=ACTION_COLUMNS)
         
-        return mo_suggestions, po_fg_suggestions, po_raw_suggestions
+        # Group order kept stable: MO (FG, then semi), PO-FG, PO-Raw
+        order = {group: i for i, group in enumerate(ACTION_GROUPS)}
+        frames.sort(key=lambda f: order[f['action_group'].iat[0]])
+        return pd.concat(frames, ignore_index=True)
+    
+    def _action_frame(
+        self,
+        df: pd.DataFrame,
+        group: str,
+        action_type,
+        reason,
+        material: bool = False,
+        related_materials: Optional[List[List[str]]] = None
+    ) -> pd.DataFrame:
+        """Build action rows for a shortage frame (FG or material columns)"""
+        prefix = 'material_' if material else ''
+        
+        def column(name, default=''):
+            return df[name].to_numpy() if name in df.columns else np.full(len(df), default, dtype=object)
+        
+        brand = column(f'{prefix}brand')
+        if material:
+            brand = np.where(pd.notna(brand), brand, '')
+        package_size = column(f'{prefix}package_size', None).astype(object)
+        package_size = np.where(pd.notna(package_size), package_size.astype(str), '')
+        
+        return pd.DataFrame({
+            'action_group': group,
+            'action_type': action_type,
+            'product_id': column('material_id' if material else 'product_id', 0),
+            'pt_code': column(f'{prefix}pt_code'),
+            'product_name': column('material_name' if material else 'product_name'),
+            'quantity': np.abs(column('net_gap', 0).astype(float)),
+            'uom': column('material_uom' if material else 'standard_uom'),
+            'priority': column('priority', 99),
+            'reason': reason,
+            'brand': brand,
+            'package_size': package_size,
+            'related_materials': related_materials if related_materials is not None
+                                 else [[] for _ in range(len(df))],
+        }, columns=ACTION_COLUMNS)
 
 
 # Singleton
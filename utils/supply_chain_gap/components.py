@@ -1516,6 +1516,49 @@ def raw_materials_fragment(result: SupplyChainGAPResult, charts):
         if new_page != page_info['page']:
             state.set_page(new_page, 'raw', page_info['total_pages'])
             st.rerun(scope="fragment")
+    
+    # --- Pegging drill-down: which FG a raw shortage is for ---
+    _render_raw_pegging(result)
+
+
+def _render_raw_pegging(result: SupplyChainGAPResult):
+    """FG products a shortage raw material's demand is pegged to (all BOM levels)"""
+    if result.raw_pegging_df.empty:
+        return
+    shortage = result.get_raw_shortage()
+    if shortage.empty or 'material_pt_code' not in shortage.columns:
+        return
+    
+    with st.expander("🔗 Which FG needs this material?"):
+        labels = dict(zip(
+            shortage['material_id'].tolist(),
+            (shortage['material_pt_code'].astype(str) + ' — ' +
+             shortage.get('material_name', pd.Series('', index=shortage.index)).astype(str)).tolist()
+        ))
+        material_id = st.selectbox(
+            "Shortage material", list(labels), format_func=labels.get, key="raw_pegging_material"
+        )
+        pegging = result.get_material_pegging(material_id)
+        if pegging.empty:
+            st.info("No FG demand pegged to this material (existing MO demand only)")
+            return
+        
+        pegging['pegged_qty'] = pegging['pegged_qty'].round(0)
+        pegging['share_pct'] = (pegging['share'] * 100).round(1)
+        display_cols = [c for c in ['pt_code', 'product_name', 'brand', 'pegged_qty', 'share_pct', 'min_bom_level']
+                        if c in pegging.columns]
+        st.dataframe(
+            pegging[display_cols],
+            column_config={
+                'pt_code': st.column_config.TextColumn('FG Code', width='small'),
+                'product_name': st.column_config.TextColumn('Product', width='medium'),
+                'brand': st.column_config.TextColumn('Brand', width='small'),
+                'pegged_qty': st.column_config.NumberColumn('Pegged Qty'),
+                'share_pct': st.column_config.NumberColumn('Share', format="%.1f%%"),
+                'min_bom_level': st.column_config.NumberColumn('Level', format="%d", width='small'),
+            },
+            width='stretch', hide_index=True, height=min(400, 35 * len(pegging) + 38)
+        )
 
 
 # =============================================================================
@@ -384,5 +384,67 @@ EXPORT_CONFIG = {
         'Actions',
         'Period GAP'
     ],
-    'max_rows': 10000
-}
\ No newline at end of file
+    'max_rows': 10000,
+    'streaming': True,          # xlsxwriter constant_memory: rows flushed to disk as written
+    'chunk_rows': 5000,         # DataFrame rows converted per step
+    'spill_to_file': True       # Page keeps a temp-file path in session state, not the bytes
+}
+# =============================================================================
+# DATA LOAD PIPELINE CONFIGURATION
+# =============================================================================
+LOAD_PIPELINE_CONFIG = {
+    'max_workers': 3,            # Pooled connections per calculation (shared 5+10 pool:
+                                 # several concurrent GAP users must fit without pool_timeout)
+    'snapshot_mode': 'none',     # 'none' | 'parallel' | 'serial' (see load_pipeline.py)
+}
+
+# =============================================================================
+# RESULT CACHE CONFIGURATION
+# =============================================================================
+RESULT_CACHE_CONFIG = {
+    'max_entries': 8,            # LRU bound (each entry holds a full GAP result)
+    'max_age_seconds': 1800,     # Safety net for changes not covered by markers
+    'persist_dir_env': 'SCG_RESULT_CACHE_DIR',  # Optional on-disk persistence
+    'schema_version': 3,         # Bump when SupplyChainGAPResult layout changes (skips old persisted entries)
+    # Patch a stale entry for the notified products only (notify_changes) instead
+    # of recomputing everything; falls back to a full compute unless the notified
+    # rows explain every marker change
+    'incremental_on_notify': True,
+    # Source tables behind the GAP views → timestamp columns used as change markers.
+    # Every table is also probed with MAX(id); small tables also with COUNT(*).
+    'marker_tables': {
+        'inventory_histories': ('created_date',),
+        'manufacturing_orders': ('updated_date', 'created_date'),
+        'manufacturing_order_materials': (),
+        'bom_headers': ('updated_date', 'created_date'),
+        'bom_details': (),
+        'bom_material_alternatives': (),
+        'purchase_orders': ('updated_date', 'created_date'),
+        'product_purchase_orders': (),
+        'arrivals': ('updated_date', 'created_date'),
+        'arrival_details': (),
+        'stock_out_warehouse_transfer': ('updated_date', 'created_date'),
+        'material_issues': ('updated_date', 'created_date'),
+        'material_returns': ('updated_date', 'created_date'),
+        'production_receipts': ('updated_date', 'created_date'),
+        'products': ('updated_date',),
+    },
+    # Views whose base tables are resolved at runtime (information_schema) and
+    # probed too: FG demand (OC / forecast) and safety stock rules
+    'marker_views': (
+        'unified_demand_view',
+        'safety_stock_current_view',
+        'raw_material_safety_stock_view',
+    ),
+    # Timestamp columns tried on the resolved view tables (used when indexed)
+    'view_marker_columns': ('updated_date', 'created_date'),
+    # Large tables: no COUNT(*) (full index scan); MAX(id) plus timestamp
+    # columns that lead an index only. View tables are always uncounted.
+    'uncounted_tables': (
+        'inventory_histories',
+        'manufacturing_order_materials',
+        'product_purchase_orders',
+        'arrival_details',
+        'stock_out_warehouse_transfer',
+    ),
+}
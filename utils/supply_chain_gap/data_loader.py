@@ -7,7 +7,9 @@ Loads all data: FG supply/demand, BOM, raw materials, safety stock
 
 import pandas as pd
 import logging
-from typing import Optional, List, Tuple, Dict, Any
+import threading
+from contextlib import contextmanager
+from typing import Optional, List, Tuple, Dict, Any, Iterable
 from datetime import datetime
 from functools import lru_cache
 
@@ -22,6 +24,7 @@ class SupplyChainDataLoader:
     
     def __init__(self):
         self._engine = None
+        self._local = threading.local()  # per-thread bound connection (load pipeline)
         self._init_connection()
     
     def _init_connection(self):
@@ -51,6 +54,25 @@ class SupplyChainDataLoader:
                 pass
             self._init_connection()
     
+    @contextmanager
+    def bind_connection(self, conn):
+        """
+        Route this thread's queries through an explicit connection.
+        Used by the load pipeline to run each query on its own pooled
+        connection (optionally inside a snapshot transaction).
+        """
+        previous = getattr(self._local, 'conn', None)
+        self._local.conn = conn
+        try:
+            yield conn
+        finally:
+            self._local.conn = previous
+    
+    def _read_sql(self, query: str, params: Optional[Dict[str, Any]] = None) -> pd.DataFrame:
+        """pd.read_sql on the thread-bound connection, else on the pooled engine"""
+        conn = getattr(self._local, 'conn', None)
+        return pd.read_sql(query, conn if conn is not None else self._engine, params=params)
+    
     # =========================================================================
     # FG SUPPLY DATA
     # =========================================================================
@@ -103,7 +125,7 @@ class SupplyChainDataLoader:
         if exclude_expired:
             query += " AND (expiry_date IS NULL OR expiry_date > CURDATE())"
         
-        df = pd.read_sql(query, self._engine, params=params)
+        df = self._read_sql(query, params)
         logger.info(f"Loaded {len(df)} FG supply records")
         return df
     
@@ -154,7 +176,7 @@ class SupplyChainDataLoader:
             query += " AND brand IN %(brands)s"
             params['brands'] = brands
         
-        df = pd.read_sql(query, self._engine, params=params)
+        df = self._read_sql(query, params)
         logger.info(f"Loaded {len(df)} FG demand records")
         return df
     
@@ -194,7 +216,7 @@ class SupplyChainDataLoader:
             params['product_ids'] = product_ids
         
         try:
-            df = pd.read_sql(query, self._engine, params=params)
+            df = self._read_sql(query, params)
             logger.info(f"Loaded {len(df)} FG safety stock records")
             return df
         except Exception as e:
@@ -245,7 +267,7 @@ class SupplyChainDataLoader:
             params['product_ids'] = product_ids
         
         try:
-            df = pd.read_sql(query, self._engine, params=params)
+            df = self._read_sql(query, params)
             # Rename for consistency
             if 'bom_output_qty' in df.columns:
                 df.rename(columns={'bom_output_qty': 'bom_output_quantity'}, inplace=True)
@@ -268,7 +290,7 @@ class SupplyChainDataLoader:
                     query_no_entity += " AND product_id IN %(product_ids)s"
                     params_no_entity['product_ids'] = product_ids
                 try:
-                    df = pd.read_sql(query_no_entity, self._engine, params=params_no_entity)
+                    df = self._read_sql(query_no_entity, params_no_entity)
                     if 'bom_output_qty' in df.columns:
                         df.rename(columns={'bom_output_qty': 'bom_output_quantity'}, inplace=True)
                     logger.info(f"Loaded {len(df)} product classifications (without entity filter)")
@@ -330,7 +352,7 @@ class SupplyChainDataLoader:
             query += " AND is_primary = 1"
         
         try:
-            df = pd.read_sql(query, self._engine, params=params)
+            df = self._read_sql(query, params)
             # Rename for consistency
             if 'output_qty' in df.columns:
                 df.rename(columns={'output_qty': 'bom_output_quantity'}, inplace=True)
@@ -398,7 +420,7 @@ class SupplyChainDataLoader:
             params['root_product_ids'] = root_product_ids
         
         try:
-            df = pd.read_sql(query, self._engine, params=params)
+            df = self._read_sql(query, params)
             # Rename for consistency with existing code
             if 'output_qty' in df.columns:
                 df.rename(columns={'output_qty': 'bom_output_quantity'}, inplace=True)
@@ -474,7 +496,7 @@ class SupplyChainDataLoader:
             params['material_ids'] = material_ids
         
         try:
-            df = pd.read_sql(query, self._engine, params=params)
+            df = self._read_sql(query, params)
             # Rename for consistency
             if 'order_no' in df.columns:
                 df.rename(columns={'order_no': 'mo_number'}, inplace=True)
@@ -538,7 +560,7 @@ class SupplyChainDataLoader:
             query += " AND (expiry_date IS NULL OR expiry_date > CURDATE())"
         
         try:
-            df = pd.read_sql(query, self._engine, params=params)
+            df = self._read_sql(query, params)
             # Rename for consistency
             df.rename(columns={
                 'product_id': 'material_id',
@@ -595,7 +617,7 @@ class SupplyChainDataLoader:
             params['material_ids'] = material_ids
         
         try:
-            df = pd.read_sql(query, self._engine, params=params)
+            df = self._read_sql(query, params)
             # Rename for consistency
             df.rename(columns={
                 'product_id': 'material_id',
@@ -654,7 +676,7 @@ class SupplyChainDataLoader:
             params['material_ids'] = material_ids
         
         try:
-            df = pd.read_sql(query, self._engine, params=params)
+            df = self._read_sql(query, params)
             # Rename for consistency
             df.rename(columns={
                 'product_id': 'material_id',
@@ -667,6 +689,186 @@ class SupplyChainDataLoader:
             logger.warning(f"Could not load raw material safety stock (view may not exist): {e}")
             return pd.DataFrame()
     
+    # =========================================================================
+    # CHANGE MARKERS (result cache invalidation)
+    # =========================================================================
+    
+    def load_change_markers(
+        self,
+        tables: Dict[str, Tuple[str, ...]],
+        uncounted: Iterable[str] = ()
+    ) -> Dict[str, Optional[Tuple]]:
+        """
+        Cheap per-table change markers: labeled (probe, value) pairs, e.g.
+        (('count', 120), ('max_id', 5531), ('updated_date', '2026-...')).
+        
+        Args:
+            tables: table name → timestamp columns to watch (e.g. updated_date)
+            uncounted: large tables probed without COUNT(*) (full index scan);
+                only MAX(id) and the given (indexed) timestamp columns
+        
+        Returns:
+            table → marker tuple, or None when the table could not be probed.
+            Tables whose timestamp columns are missing fall back to count / max id.
+        """
+        from sqlalchemy import text
+        
+        uncounted = set(uncounted)
+        markers = {}
+        conn = getattr(self._local, 'conn', None)
+        own_conn = conn is None
+        if own_conn:
+            conn = self._engine.connect()
+        try:
+            for table, ts_cols in tables.items():
+                base = [] if table in uncounted else [('count', 'COUNT(*)')]
+                base.append(('max_id', 'MAX(id)'))
+                ts_probes = [(c, f"MAX({c})") for c in ts_cols]
+                attempts = [base + ts_probes, base, base[:1]]
+                markers[table] = None
+                for probes in attempts:
+                    try:
+                        select_list = ", ".join(expr for _, expr in probes)
+                        row = conn.execute(text(f"SELECT {select_list} FROM {table}")).fetchone()
+                        markers[table] = tuple(
+                            (label, v.isoformat() if hasattr(v, 'isoformat') else v)
+                            for (label, _), v in zip(probes, row)
+                        )
+                        break
+                    except Exception as e:
+                        if own_conn:
+                            conn.rollback()
+                        logger.debug(f"Change marker '{select_list}' failed on {table}: {e}")
+                if markers[table] is None:
+                    logger.warning(f"Could not probe change marker for table {table}")
+        finally:
+            if own_conn:
+                conn.close()
+        return markers
+    
+    def resolve_view_tables(self, views: Iterable[str]) -> List[str]:
+        """
+        Base tables behind views (recursively through nested views), from
+        information_schema.VIEW_TABLE_USAGE (MySQL 8.0.13+).
+        """
+        pending = list(dict.fromkeys(views))
+        seen_views = set()
+        tables = []
+        while pending:
+            batch = [v for v in pending if v not in seen_views]
+            pending = []
+            if not batch:
+                break
+            seen_views.update(batch)
+            df = self._read_sql("""
+                SELECT u.TABLE_NAME AS table_name,
+                       (v.TABLE_NAME IS NOT NULL) AS is_view
+                FROM information_schema.VIEW_TABLE_USAGE u
+                LEFT JOIN information_schema.VIEWS v
+                    ON v.TABLE_SCHEMA = u.TABLE_SCHEMA AND v.TABLE_NAME = u.TABLE_NAME
+                WHERE u.VIEW_SCHEMA = DATABASE()
+                  AND u.TABLE_SCHEMA = DATABASE()
+                  AND u.VIEW_NAME IN %(views)s
+            """, {'views': tuple(batch)})
+            for row in df.itertuples(index=False):
+                if row.is_view:
+                    pending.append(row.table_name)
+                elif row.table_name not in tables:
+                    tables.append(row.table_name)
+        return tables
+    
+    def describe_marker_columns(
+        self,
+        tables: Iterable[str],
+        columns: Iterable[str]
+    ) -> Dict[str, Dict[str, bool]]:
+        """
+        Which of `columns` exist per table, and whether each leads an index
+        (MAX() on a leading index column is a single index lookup).
+        
+        Returns:
+            table → {column: is_indexed} for existing columns only
+        """
+        tables, columns = list(dict.fromkeys(tables)), list(dict.fromkeys(columns))
+        if not tables or not columns:
+            return {}
+        df = self._read_sql("""
+            SELECT c.TABLE_NAME AS table_name, c.COLUMN_NAME AS column_name,
+                   MAX(s.INDEX_NAME IS NOT NULL) AS is_indexed
+            FROM information_schema.COLUMNS c
+            LEFT JOIN information_schema.STATISTICS s
+                ON s.TABLE_SCHEMA = c.TABLE_SCHEMA AND s.TABLE_NAME = c.TABLE_NAME
+                AND s.COLUMN_NAME = c.COLUMN_NAME AND s.SEQ_IN_INDEX = 1
+            WHERE c.TABLE_SCHEMA = DATABASE()
+              AND c.TABLE_NAME IN %(tables)s
+              AND c.COLUMN_NAME IN %(columns)s
+            GROUP BY c.TABLE_NAME, c.COLUMN_NAME
+        """, {'tables': tuple(tables), 'columns': tuple(columns)})
+        described: Dict[str, Dict[str, bool]] = {}
+        for row in df.itertuples(index=False):
+            described.setdefault(row.table_name, {})[row.column_name] = bool(row.is_indexed)
+        return described
+    
+    def count_changes_since(
+        self,
+        table: str,
+        since: Dict[str, Any],
+        row_ids: Iterable[int]
+    ) -> Optional[Tuple[int, int]]:
+        """
+        Rows of `table` changed after a change marker (id above its max_id,
+        or a timestamp column above its previous max).
+        
+        Args:
+            table: Marker table
+            since: previous marker as {probe: value} (count entry ignored)
+            row_ids: ids of rows known to be written (notified)
+        
+        Returns:
+            (changed rows NOT in row_ids, rows inserted after max_id), or
+            None when the check could not run
+        """
+        from sqlalchemy import text
+        
+        if 'max_id' not in since:
+            return None
+        conditions, params = [], {}
+        for i, (probe, value) in enumerate(since.items()):
+            if probe == 'count':
+                continue
+            column = 'id' if probe == 'max_id' else probe
+            if value is None:
+                conditions.append(f"{column} IS NOT NULL")
+            else:
+                conditions.append(f"{column} > :m{i}")
+                params[f"m{i}"] = value
+        inserted = "id IS NOT NULL" if since['max_id'] is None else "id > :max_id"
+        params['max_id'] = since['max_id']
+        
+        row_ids = sorted({int(r) for r in row_ids})
+        unexplained = "1"
+        if row_ids:
+            params.update({f"r{i}": r for i, r in enumerate(row_ids)})
+            unexplained = "id NOT IN (" + ", ".join(f":r{i}" for i in range(len(row_ids))) + ")"
+        query = f"""
+            SELECT COALESCE(SUM(CASE WHEN {unexplained} THEN 1 ELSE 0 END), 0),
+                   COALESCE(SUM(CASE WHEN {inserted} THEN 1 ELSE 0 END), 0)
+            FROM {table}
+            WHERE {' OR '.join(conditions)}
+        """
+        
+        conn = getattr(self._local, 'conn', None)
+        try:
+            if conn is not None:
+                row = conn.execute(text(query), params).fetchone()
+            else:
+                with self._engine.connect() as own_conn:
+                    row = own_conn.execute(text(query), params).fetchone()
+            return int(row[0]), int(row[1])
+        except Exception as e:
+            logger.warning(f"Change verification failed on {table}: {e}")
+            return None
+    
     # =========================================================================
     # HELPER METHODS
     # =========================================================================
@@ -685,7 +887,7 @@ class SupplyChainDataLoader:
         ORDER BY entity_name
         """
         try:
-            df = pd.read_sql(query, self._engine)
+            df = self._read_sql(query)
             return df['entity_name'].tolist()
         except Exception as e:
             logger.warning(f"Could not load entities: {e}")
@@ -713,7 +915,7 @@ class SupplyChainDataLoader:
         query += " ORDER BY brand"
         
         try:
-            df = pd.read_sql(query, self._engine, params=params)
+            df = self._read_sql(query, params)
             return df['brand'].tolist()
         except Exception as e:
             logger.warning(f"Could not load brands: {e}")
@@ -755,7 +957,7 @@ class SupplyChainDataLoader:
         query += " ORDER BY pt_code, product_name"
         
         try:
-            return pd.read_sql(query, self._engine, params=params)
+            return self._read_sql(query, params)
         except Exception as e:
             logger.warning(f"Could not load products: {e}")
             return pd.DataFrame(columns=['product_id', 'pt_code', 'product_name', 'brand'])
@@ -3,6 +3,12 @@
 """
 Export Module for Supply Chain GAP Analysis
 Multi-sheet Excel export
+
+Sheets are streamed through utils.excel_stream (xlsxwriter constant_memory):
+rows go to disk as they are written, so period sheets for thousands of
+products × weeks no longer hold the whole workbook in memory.
+export_to_excel_file() spills the workbook to a temp file and returns an
+ExcelArtifact, so the page can keep a path in session state, not the bytes.
 """
 
 import pandas as pd
@@ -11,6 +17,9 @@ from typing import Dict, Any, Optional
 from datetime import datetime
 import logging
 
+from utils.excel_stream import ExcelStreamWriter, ExcelArtifact
+
+from .constants import EXPORT_CONFIG
 from .result import SupplyChainGAPResult
 
 logger = logging.getLogger(__name__)
@@ -20,7 +29,8 @@ def export_to_excel(
     result: SupplyChainGAPResult,
     filter_values: Optional[Dict[str, Any]] = None,
     include_raw_materials: bool = True,
-    include_actions: bool = True
+    include_actions: bool = True,
+    streaming: Optional[bool] = None
 ) -> BytesIO:
     """
     Export Supply Chain GAP results to Excel.
@@ -33,55 +43,90 @@ def export_to_excel(
     - Raw Material GAP (optional)
     - Actions (optional)
     
+    Args:
+        streaming: constant-memory row streaming (default EXPORT_CONFIG['streaming'])
+    
     Returns:
         BytesIO buffer containing Excel file
     """
+    return ExcelStreamWriter.to_buffer(
+        lambda writer: _write_workbook(writer, result, filter_values, include_raw_materials, include_actions),
+        **_writer_options(streaming)
+    )
+
+
+def export_to_excel_file(
+    result: SupplyChainGAPResult,
+    filter_values: Optional[Dict[str, Any]] = None,
+    include_raw_materials: bool = True,
+    include_actions: bool = True,
+    streaming: Optional[bool] = None
+) -> ExcelArtifact:
+    """
+    Same workbook as export_to_excel(), written to a temp file.
+    The caller owns the artifact and should cleanup() it when replaced.
+    """
+    return ExcelStreamWriter.to_tempfile(
+        lambda writer: _write_workbook(writer, result, filter_values, include_raw_materials, include_actions),
+        **_writer_options(streaming)
+    )
+
+
+def _writer_options(streaming: Optional[bool]) -> Dict[str, Any]:
+    return {
+        'constant_memory': EXPORT_CONFIG.get('streaming', True) if streaming is None else streaming,
+        'chunk_rows': EXPORT_CONFIG.get('chunk_rows', 5000),
+        'styled': False,
+    }
+
+
+def _write_workbook(
+    writer: ExcelStreamWriter,
+    result: SupplyChainGAPResult,
+    filter_values: Optional[Dict[str, Any]],
+    include_raw_materials: bool,
+    include_actions: bool
+):
+    """All sheets, in workbook order"""
     
-    buffer = BytesIO()
+    # Sheet 1: Summary
+    _write_summary_sheet(writer, result, filter_values)
     
-    with pd.ExcelWriter(buffer, engine='openpyxl') as writer:
-        
-        # Sheet 1: Summary
-        _write_summary_sheet(writer, result, filter_values)
-        
-        # Sheet 2: FG GAP
-        if not result.get_fg_gap_filtered().empty:
-            _write_fg_gap_sheet(writer, result)
-        
-        # Sheet 3: Manufacturing
-        if not result.get_manufacturing_filtered().empty:
-            _write_manufacturing_sheet(writer, result)
-        
-        # Sheet 4: Trading
-        if not result.get_trading_filtered().empty:
-            _write_trading_sheet(writer, result)
-        
-        # Sheet 5: Semi-Finished Materials (if multi-level)
-        if include_raw_materials and not result.semi_finished_gap_df.empty:
-            _write_semi_finished_sheet(writer, result)
-        
-        # Sheet 6: Raw Material GAP
-        if include_raw_materials and not result.raw_gap_df.empty:
-            _write_raw_gap_sheet(writer, result)
-        
-        # Sheet 6: Actions
-        if include_actions and result.has_actions():
-            _write_actions_sheet(writer, result)
-        
-        # Sheet 7: Period GAP (v2.2)
-        if result.has_period_data():
-            _write_period_gap_sheet(writer, result)
-        
-        # Sheet 8: Raw Material Period GAP (v2.3)
-        if result.has_raw_period_data():
-            _write_raw_period_gap_sheet(writer, result)
+    # Sheet 2: FG GAP
+    if not result.get_fg_gap_filtered().empty:
+        _write_fg_gap_sheet(writer, result)
+    
+    # Sheet 3: Manufacturing
+    if not result.get_manufacturing_filtered().empty:
+        _write_manufacturing_sheet(writer, result)
+    
+    # Sheet 4: Trading
+    if not result.get_trading_filtered().empty:
+        _write_trading_sheet(writer, result)
+    
+    # Sheet 5: Semi-Finished Materials (if multi-level)
+    if include_raw_materials and not result.semi_finished_gap_df.empty:
+        _write_semi_finished_sheet(writer, result)
+    
+    # Sheet 6: Raw Material GAP
+    if include_raw_materials and not result.raw_gap_df.empty:
+        _write_raw_gap_sheet(writer, result)
     
-    buffer.seek(0)
-    return buffer
+    # Sheet 6: Actions
+    if include_actions and result.has_actions():
+        _write_actions_sheet(writer, result)
+    
+    # Sheet 7: Period GAP (v2.2)
+    if result.has_period_data():
+        _write_period_gap_sheet(writer, result)
+    
+    # Sheet 8: Raw Material Period GAP (v2.3)
+    if result.has_raw_period_data():
+        _write_raw_period_gap_sheet(writer, result)
 
 
 def _write_summary_sheet(
-    writer: pd.ExcelWriter,
+    writer: ExcelStreamWriter,
     result: SupplyChainGAPResult,
     filter_values: Optional[Dict[str, Any]]
 ):
@@ -161,13 +206,13 @@ def _write_summary_sheet(
             data.append(['⚠️ WARNING', 'Double-count risk: MO Expected OFF + Existing MO ON'])
     
     df = pd.DataFrame(data, columns=['Metric', 'Value'])
-    df.to_excel(writer, sheet_name='Summary', index=False)
+    writer.write_sheet(df, 'Summary')
 
 
-def _write_fg_gap_sheet(writer: pd.ExcelWriter, result: SupplyChainGAPResult):
+def _write_fg_gap_sheet(writer: ExcelStreamWriter, result: SupplyChainGAPResult):
     """Write FG GAP sheet (filtered by brand/product if active)"""
     
-    df = result.get_fg_gap_filtered().copy()
+    df = result.get_fg_gap_filtered()
     
     # Select columns
     columns = [
@@ -201,18 +246,16 @@ def _write_fg_gap_sheet(writer: pd.ExcelWriter, result: SupplyChainGAPResult):
     }
     export_df.rename(columns=rename_map, inplace=True)
     
-    export_df.to_excel(writer, sheet_name='FG GAP', index=False)
+    writer.write_sheet(export_df, 'FG GAP')
 
 
-def _write_manufacturing_sheet(writer: pd.ExcelWriter, result: SupplyChainGAPResult):
+def _write_manufacturing_sheet(writer: ExcelStreamWriter, result: SupplyChainGAPResult):
     """Write manufacturing products sheet"""
     
     mfg_shortage = result.get_manufacturing_shortage_filtered()
     
     if mfg_shortage.empty:
-        pd.DataFrame({'Note': ['No manufacturing products with shortage']}).to_excel(
-            writer, sheet_name='Manufacturing', index=False
-        )
+        writer.write_sheet(pd.DataFrame({'Note': ['No manufacturing products with shortage']}), 'Manufacturing')
         return
     
     # Add production status (use batch method for performance)
@@ -235,18 +278,16 @@ def _write_manufacturing_sheet(writer: pd.ExcelWriter, result: SupplyChainGAPRes
             'Limiting Materials': ', '.join(status.get('limiting_materials', [])[:3])
         })
     
-    pd.DataFrame(data).to_excel(writer, sheet_name='Manufacturing', index=False)
+    writer.write_sheet(pd.DataFrame(data), 'Manufacturing')
 
 
-def _write_trading_sheet(writer: pd.ExcelWriter, result: SupplyChainGAPResult):
+def _write_trading_sheet(writer: ExcelStreamWriter, result: SupplyChainGAPResult):
     """Write trading products sheet"""
     
     trading_shortage = result.get_trading_shortage_filtered()
     
     if trading_shortage.empty:
-        pd.DataFrame({'Note': ['No trading products with shortage']}).to_excel(
-            writer, sheet_name='Trading', index=False
-        )
+        writer.write_sheet(pd.DataFrame({'Note': ['No trading products with shortage']}), 'Trading')
         return
     
     columns = ['pt_code', 'product_name', 'package_size', 'brand', 'standard_uom', 'net_gap', 'gap_status', 'at_risk_value']
@@ -266,18 +307,16 @@ def _write_trading_sheet(writer: pd.ExcelWriter, result: SupplyChainGAPResult):
         'at_risk_value': 'At Risk Value'
     }, inplace=True)
     
-    export_df.to_excel(writer, sheet_name='Trading', index=False)
+    writer.write_sheet(export_df, 'Trading')
 
 
-def _write_semi_finished_sheet(writer: pd.ExcelWriter, result: SupplyChainGAPResult):
+def _write_semi_finished_sheet(writer: ExcelStreamWriter, result: SupplyChainGAPResult):
     """Write semi-finished material GAP sheet (multi-level BOM intermediates)"""
     
-    df = result.semi_finished_gap_df.copy()
+    df = result.semi_finished_gap_df
     
     if df.empty:
-        pd.DataFrame({'Note': ['No semi-finished materials']}).to_excel(
-            writer, sheet_name='Semi-Finished', index=False
-        )
+        writer.write_sheet(pd.DataFrame({'Note': ['No semi-finished materials']}), 'Semi-Finished')
         return
     
     columns = [
@@ -309,18 +348,16 @@ def _write_semi_finished_sheet(writer: pd.ExcelWriter, result: SupplyChainGAPRes
         'gap_status': 'Status'
     }, inplace=True)
     
-    export_df.to_excel(writer, sheet_name='Semi-Finished', index=False)
+    writer.write_sheet(export_df, 'Semi-Finished')
 
 
-def _write_raw_gap_sheet(writer: pd.ExcelWriter, result: SupplyChainGAPResult):
+def _write_raw_gap_sheet(writer: ExcelStreamWriter, result: SupplyChainGAPResult):
     """Write raw material GAP sheet"""
     
-    df = result.raw_gap_df.copy()
+    df = result.raw_gap_df
     
     if df.empty:
-        pd.DataFrame({'Note': ['No raw material data']}).to_excel(
-            writer, sheet_name='Raw Materials', index=False
-        )
+        writer.write_sheet(pd.DataFrame({'Note': ['No raw material data']}), 'Raw Materials')
         return
     
     columns = [
@@ -360,18 +397,16 @@ def _write_raw_gap_sheet(writer: pd.ExcelWriter, result: SupplyChainGAPResult):
         'gap_status': 'Status'
     }, inplace=True)
     
-    export_df.to_excel(writer, sheet_name='Raw Materials', index=False)
+    writer.write_sheet(export_df, 'Raw Materials')
 
 
-def _write_actions_sheet(writer: pd.ExcelWriter, result: SupplyChainGAPResult):
+def _write_actions_sheet(writer: ExcelStreamWriter, result: SupplyChainGAPResult):
     """Write actions sheet"""
     
     actions = result.get_all_actions()
     
     if not actions:
-        pd.DataFrame({'Note': ['No actions required']}).to_excel(
-            writer, sheet_name='Actions', index=False
-        )
+        writer.write_sheet(pd.DataFrame({'Note': ['No actions required']}), 'Actions')
         return
     
     df = pd.DataFrame(actions)
@@ -395,18 +430,16 @@ def _write_actions_sheet(writer: pd.ExcelWriter, result: SupplyChainGAPResult):
         'reason': 'Reason'
     }, inplace=True)
     
-    export_df.to_excel(writer, sheet_name='Actions', index=False)
+    writer.write_sheet(export_df, 'Actions')
 
 
-def _write_period_gap_sheet(writer: pd.ExcelWriter, result: SupplyChainGAPResult):
+def _write_period_gap_sheet(writer: ExcelStreamWriter, result: SupplyChainGAPResult):
     """Write period GAP sheet (v2.2) — filtered by brand/product"""
     
-    df = result.get_fg_period_gap_filtered().copy()
+    df = result.get_fg_period_gap_filtered()
     
     if df.empty:
-        pd.DataFrame({'Note': ['No period GAP data']}).to_excel(
-            writer, sheet_name='Period GAP', index=False
-        )
+        writer.write_sheet(pd.DataFrame({'Note': ['No period GAP data']}), 'Period GAP')
         return
     
     columns = [
@@ -435,18 +468,16 @@ def _write_period_gap_sheet(writer: pd.ExcelWriter, result: SupplyChainGAPResult
     }
     export_df.rename(columns=rename_map, inplace=True)
     
-    export_df.to_excel(writer, sheet_name='Period GAP', index=False)
+    writer.write_sheet(export_df, 'Period GAP')
 
 
-def _write_raw_period_gap_sheet(writer: pd.ExcelWriter, result: SupplyChainGAPResult):
+def _write_raw_period_gap_sheet(writer: ExcelStreamWriter, result: SupplyChainGAPResult):
     """Write raw material period GAP sheet (v2.3)"""
     
-    df = result.raw_period_gap_df.copy()
+    df = result.raw_period_gap_df
     
     if df.empty:
-        pd.DataFrame({'Note': ['No raw material period data']}).to_excel(
-            writer, sheet_name='Raw Period GAP', index=False
-        )
+        writer.write_sheet(pd.DataFrame({'Note': ['No raw material period data']}), 'Raw Period GAP')
         return
     
     columns = [
@@ -472,7 +503,7 @@ def _write_raw_period_gap_sheet(writer: pd.ExcelWriter, result: SupplyChainGAPRe
         'fulfillment_status': 'Status', 'backlog_to_next': 'Backlog Out',
     }
     export_df.rename(columns=rename_map, inplace=True)
-    export_df.to_excel(writer, sheet_name='Raw Period GAP', index=False)
+    writer.write_sheet(export_df, 'Raw Period GAP')
 
 
 def get_export_filename(prefix: str = "supply_chain_gap") -> str:
@@ -85,6 +85,15 @@ class SupplyChainFilters:
                 key="scg_alternatives",
                 help="Analyze alternative materials for BOM"
             )
+            combine_alternatives = st.checkbox(
+                "Combine Alternatives",
+                value=False,
+                key="scg_combine_alternatives",
+                disabled=not include_alternatives,
+                help="Cover one primary shortage with several alternatives, "
+                     "allocated in alternative priority order. "
+                     "OFF: one alternative must cover the whole shortage."
+            )
         
         with col5:
             include_existing_mo = st.checkbox(
@@ -194,6 +203,7 @@ class SupplyChainFilters:
             'include_raw_safety': include_raw_safety,
             'exclude_expired': exclude_expired,
             'include_alternatives': include_alternatives,
+            'alternative_mode': 'combined' if include_alternatives and combine_alternatives else 'single',
             'include_existing_mo': include_existing_mo,
             'include_mo_expected': include_mo_expected,
             'include_draft_mo': include_draft_mo,
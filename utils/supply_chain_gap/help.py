@@ -1309,6 +1309,10 @@ def _render_faq():
         - NVL chính bị shortage (net_gap < 0)
         - Có NVL thay thế với net_gap ≥ |shortage NVL chính|
         - Tùy chọn "Alternatives" được bật
+        
+        **Tùy chọn "Combine Alternatives":** nhiều NVL thay thế được cộng dồn
+        theo **alternative_priority** để bù một shortage. Nếu tổng surplus đủ,
+        các NVL được phân bổ (**allocated_qty** > 0) có can_cover_shortage = True.
         """)
     
     with st.expander("**Q15: Kết quả phân tích khác với thực tế kho — nguyên nhân là gì?**"):
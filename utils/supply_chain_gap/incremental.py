@@ -0,0 +1,637 @@
+# utils/supply_chain_gap/incremental.py
+
+"""
+Incremental Recalculation for Supply Chain GAP Analysis
+
+After an MO is confirmed or a PO arrives only a handful of products change, but
+the full calculation reloads and recomputes every product of the entity. This
+module patches a previous SupplyChainGAPResult instead:
+
+1. Scoped reload: FG supply/demand/safety/classification and raw supply/safety/
+   existing MO rows of the changed IDs only (see load_pipeline product_ids).
+2. FG rows of the changed products are recomputed and replaced; FG metrics and
+   customer impact are rebuilt from the patched frames.
+3. Materials: the multi-level netting recurrence is replayed numerically on the
+   BOMGraph (BOMGraph.shortage_levels) for the old and the new inputs. Only the
+   nodes whose level drivers moved — plus the changed materials themselves —
+   get their semi-finished / raw GAP rows rebuilt, with the same helpers as the
+   full calculation. Alternatives are re-analysed for the touched primaries.
+   The raw pegging table comes from the same pass over the new drivers.
+4. Production statuses are recomputed (one batched pass) for FG products whose
+   BOM lines touch a rebuilt material; action lists are regenerated from the patched frames.
+5. Period GAP: FG rows of the changed products, raw rows of their direct
+   components and of the changed materials.
+
+The previous result is never mutated (it is shared through the result cache):
+the patched result is a shallow copy with new frames.
+
+Falls back (returns None) when the previous result lacks the retained inputs
+or the multi-level stage would switch on/off — the caller then runs the full
+calculation. The BOM itself is not reloaded; BOM edits invalidate the cache
+through their change markers.
+
+VERSION: 1.0.0
+"""
+
+import copy
+import time
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple, Iterable, Set
+
+import numpy as np
+import pandas as pd
+
+from .constants import MAX_BOM_LEVELS
+from .result import SupplyChainGAPResult, CustomerImpact
+from .calculator import SupplyChainGAPCalculator, get_calculator
+from .bom_graph import detect_parent_column
+from .load_pipeline import load_gap_inputs
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class IncrementalUpdate:
+    """What an incremental recalculation touched"""
+    changed_ids: Tuple[int, ...] = ()
+    fg_products: int = 0                    # FG rows recomputed
+    materials: int = 0                      # Material nodes whose GAP rows were rebuilt
+    production_statuses: int = 0            # FG production statuses recomputed
+    fallback_reason: Optional[str] = None   # Set when a full calculation is required
+    elapsed: float = 0.0
+
+    def get_summary(self) -> Dict[str, Any]:
+        return {
+            'changed_ids': len(self.changed_ids),
+            'fg_products': self.fg_products,
+            'materials': self.materials,
+            'production_statuses': self.production_statuses,
+            'fallback_reason': self.fallback_reason,
+            'elapsed_s': round(self.elapsed, 3),
+        }
+
+
+def _material_col(df: pd.DataFrame) -> str:
+    return 'material_id' if 'material_id' in df.columns else 'product_id'
+
+
+def _replace_rows(
+    df: Optional[pd.DataFrame],
+    new_rows: Optional[pd.DataFrame],
+    id_col: str,
+    ids: Iterable,
+    sort_cols: Optional[List[str]] = None,
+    ascending=True
+) -> pd.DataFrame:
+    """Drop rows of ids from df, append new_rows, optionally re-sort (stable)"""
+    parts = []
+    if df is not None and not df.empty:
+        parts.append(df[~df[id_col].isin(ids)] if id_col in df.columns else df)
+    if new_rows is not None and not new_rows.empty:
+        parts.append(new_rows)
+    if not parts:
+        return df.iloc[0:0] if df is not None else pd.DataFrame()
+    out = pd.concat(parts, ignore_index=True) if len(parts) > 1 else parts[0].reset_index(drop=True)
+    if sort_cols:
+        cols = [c for c in sort_cols if c in out.columns]
+        asc = ascending if isinstance(ascending, bool) else \
+            [a for c, a in zip(sort_cols, ascending) if c in out.columns]
+        out = out.sort_values(cols, ascending=asc, kind='mergesort').reset_index(drop=True)
+    return out
+
+
+def _shortage_flag(raw_gap_df: pd.DataFrame, material_id) -> Optional[str]:
+    """Per-material state production status depends on: absent / no GAP / short / ok"""
+    if raw_gap_df.empty:
+        return None
+    net_gap = raw_gap_df.loc[raw_gap_df['material_id'] == material_id, 'net_gap']
+    if net_gap.empty:
+        return None
+    if net_gap.isna().iloc[0]:
+        return 'nan'
+    return 'short' if net_gap.iloc[0] < 0 else 'ok'
+
+
+def _covered_primaries(alt_df: pd.DataFrame, primaries: Set) -> Set:
+    """Primaries (of the given set) with at least one alternative that covers"""
+    if alt_df.empty or not {'primary_material_id', 'can_cover_shortage'} <= set(alt_df.columns):
+        return set()
+    rows = alt_df[alt_df['primary_material_id'].isin(primaries)]
+    return set(rows.loc[rows['can_cover_shortage'].fillna(False).astype(bool), 'primary_material_id'].tolist())
+
+
+class IncrementalGAPCalculator:
+    """
+    Patches a previous SupplyChainGAPResult for a set of changed product /
+    material IDs.
+
+    Usage:
+        result, update = IncrementalGAPCalculator().recalculate(
+            previous, changed_ids, load.frames
+        )
+        if result is None:   # update.fallback_reason says why
+            result = calculator.calculate(...)
+    """
+
+    def __init__(self, calculator: Optional[SupplyChainGAPCalculator] = None):
+        self.calculator = calculator or get_calculator()
+
+    # =========================================================================
+    # PUBLIC API
+    # =========================================================================
+
+    def recalculate(
+        self,
+        previous: SupplyChainGAPResult,
+        changed_ids: Iterable[int],
+        frames: Dict[str, Optional[pd.DataFrame]]
+    ) -> Tuple[Optional[SupplyChainGAPResult], IncrementalUpdate]:
+        """
+        Args:
+            previous: result of a full (or earlier incremental) calculation
+            changed_ids: product / material IDs whose source rows changed
+            frames: scoped loads keyed like LoadResult.frames (fg_supply,
+                fg_demand, fg_safety, classification, raw_supply,
+                raw_supply_detail, raw_safety, existing_mo)
+
+        Returns:
+            (patched result or None if a full calculation is required, update)
+        """
+        t0 = time.perf_counter()
+        ids = set(changed_ids)
+        update = IncrementalUpdate(changed_ids=tuple(sorted(ids)))
+
+        update.fallback_reason = self._unsupported_reason(previous, ids)
+        if update.fallback_reason is None:
+            result = copy.copy(previous)
+            result.timestamp = datetime.now()
+            update.fallback_reason = self._patch(previous, result, ids, frames, update)
+        update.elapsed = time.perf_counter() - t0
+
+        if update.fallback_reason:
+            logger.info(f"Incremental GAP not applicable ({update.fallback_reason})")
+            return None, update
+        logger.info(f"Incremental GAP: {update.get_summary()}")
+        return result, update
+
+    # =========================================================================
+    # PRECONDITIONS
+    # =========================================================================
+
+    def _unsupported_reason(self, previous: SupplyChainGAPResult, ids: Set) -> Optional[str]:
+        opts = previous.filters_used
+        if not ids:
+            return 'no changed IDs'
+        if previous.bom_graph is None or previous.bom_explosion_df.empty:
+            return 'previous result has no multi-level material GAP'
+        if 'include_alternatives' not in opts or previous.raw_supply_detail_df is None:
+            return 'previous result does not retain its inputs'
+        if opts.get('include_raw_safety', True) and previous.raw_safety_stock_df is None:
+            return 'previous result does not retain raw safety stock'
+        if opts.get('include_existing_mo', True) and previous.existing_mo_demand_df is None:
+            return 'previous result does not retain existing MO demand'
+        return None
+
+    # =========================================================================
+    # PATCHING
+    # =========================================================================
+
+    def _patch(
+        self,
+        previous: SupplyChainGAPResult,
+        result: SupplyChainGAPResult,
+        ids: Set,
+        frames: Dict[str, Optional[pd.DataFrame]],
+        update: IncrementalUpdate
+    ) -> Optional[str]:
+        """Patch result in place (fresh frames only); returns a fallback reason or None"""
+        calc = self.calculator
+        opts = previous.filters_used
+        empty = pd.DataFrame()
+
+        def _frame(key: str) -> pd.DataFrame:
+            df = frames.get(key)
+            return df if df is not None else empty
+
+        # --- FG rows ---------------------------------------------------------
+        fg_supply = calc._exclude_draft_mo_supply(_frame('fg_supply'), opts.get('include_draft_mo', False))
+        fg_demand = _frame('fg_demand')
+        fg_safety = frames.get('fg_safety')
+        fg_rows, _, impact = calc._calculate_fg_gap(
+            supply_df=fg_supply,
+            demand_df=fg_demand,
+            safety_stock_df=fg_safety,
+            selected_supply_sources=opts.get('supply_sources'),
+            selected_demand_sources=opts.get('demand_sources'),
+            include_safety=opts.get('include_fg_safety', True)
+        )
+        result.fg_gap_df = _replace_rows(
+            previous.fg_gap_df, fg_rows, 'product_id', ids, sort_cols=['priority', 'net_gap']
+        )
+        result.fg_metrics = calc._calculate_fg_metrics(result.fg_gap_df)
+        result.customer_impact = self._patch_customer_impact(
+            previous.customer_impact, impact, ids, result.fg_gap_df
+        )
+        update.fg_products = len(fg_rows)
+
+        # --- Classification --------------------------------------------------
+        classification = _frame('classification')
+        if not classification.empty and not result.fg_gap_df.empty:
+            classification = classification[
+                classification['product_id'].isin(result.fg_gap_df['product_id'])
+            ]
+        if not previous.classification_df.empty or not classification.empty:
+            result.classification_df = _replace_rows(
+                previous.classification_df, classification, 'product_id', ids
+            )
+            result.manufacturing_df = result.classification_df[result.classification_df['has_bom'] == 1].copy()
+            result.trading_df = result.classification_df[result.classification_df['has_bom'] == 0].copy()
+
+        # --- Retained material inputs -----------------------------------------
+        result.raw_supply_df = self._replace_material_rows(previous.raw_supply_df, _frame('raw_supply'), ids)
+        result.raw_supply_detail_df = self._replace_material_rows(
+            previous.raw_supply_detail_df, _frame('raw_supply_detail'), ids
+        )
+        if opts.get('include_raw_safety', True):
+            result.raw_safety_stock_df = self._replace_material_rows(
+                previous.raw_safety_stock_df, _frame('raw_safety'), ids
+            )
+        if opts.get('include_existing_mo', True):
+            result.existing_mo_demand_df = self._replace_material_rows(
+                previous.existing_mo_demand_df, _frame('existing_mo'), ids
+            )
+
+        mfg_shortage = result.get_manufacturing_shortage()
+        if mfg_shortage.empty or result.raw_supply_df.empty:
+            return 'multi-level material GAP no longer applies'
+
+        # --- Multi-level material GAP ----------------------------------------
+        touched_fg = self._patch_materials(previous, result, ids, frames, update)
+
+        # --- Production statuses + actions -----------------------------------
+        partial = (
+            previous.production_status_df is not None
+            and previous.raw_gap_df.empty == result.raw_gap_df.empty
+        )
+        if partial:
+            # Changed products and ones new to manufacturing have no valid row yet
+            mfg_ids = result.manufacturing_df['product_id']
+            known = previous.production_status_df['product_id']
+            rebuild = set(touched_fg) | set(ids) | set(mfg_ids[~mfg_ids.isin(known)])
+            result.build_production_statuses(rebuild)
+            update.production_statuses = int(mfg_ids.isin(rebuild).sum())
+        else:
+            update.production_statuses = len(result.build_production_statuses())
+
+        result.set_actions_table(calc._generate_actions(result))
+
+        # --- Period GAP -------------------------------------------------------
+        try:
+            self._patch_period_gap(previous, result, ids, fg_supply, fg_demand, fg_safety)
+        except Exception as e:
+            logger.error(f"Incremental period GAP failed (non-fatal): {e}", exc_info=True)
+        return None
+
+    def _patch_customer_impact(
+        self,
+        previous: Optional[CustomerImpact],
+        impact: CustomerImpact,
+        ids: Set,
+        fg_gap_df: pd.DataFrame
+    ) -> CustomerImpact:
+        """Replace customer × product lines of the changed products"""
+        prev_details = previous.details if previous is not None else pd.DataFrame()
+        details = _replace_rows(
+            prev_details, impact.details, 'product_id', ids,
+            sort_cols=['at_risk_value_usd', 'customer', 'product_id'],
+            ascending=[False, True, True]
+        )
+        if details.empty or 'customer' not in details.columns:
+            return CustomerImpact()
+
+        customers = details['customer'].dropna().unique().tolist()
+        shortage = fg_gap_df[fg_gap_df['net_gap'] < 0]
+        return CustomerImpact(
+            affected_count=len(customers),
+            affected_customers=customers,
+            at_risk_value=shortage['at_risk_value'].sum(),
+            details=details
+        )
+
+    @staticmethod
+    def _replace_material_rows(
+        df: Optional[pd.DataFrame],
+        new_rows: pd.DataFrame,
+        ids: Set
+    ) -> pd.DataFrame:
+        if df is None or df.empty:
+            return new_rows.copy()
+        return _replace_rows(df, new_rows, _material_col(df), ids)
+
+    # -------------------------------------------------------------------------
+    # Materials
+    # -------------------------------------------------------------------------
+
+    def _patch_materials(
+        self,
+        previous: SupplyChainGAPResult,
+        result: SupplyChainGAPResult,
+        ids: Set,
+        frames: Dict[str, Optional[pd.DataFrame]],
+        update: IncrementalUpdate
+    ) -> Set:
+        """
+        Rebuild semi-finished / raw GAP rows whose inputs moved.
+        Returns the FG products whose production status must be recomputed.
+        """
+        calc = self.calculator
+        opts = previous.filters_used
+        graph = previous.bom_graph
+        id_col = detect_parent_column(previous.bom_explosion_df)
+
+        # Lookups: previous inputs, then the changed materials re-mapped
+        sources = opts.get('supply_sources')
+        supply_old = calc._prepare_supply_lookup(previous.raw_supply_df, sources)
+        supply_new = {k: v for k, v in supply_old.items() if k not in ids}
+        raw_supply = frames.get('raw_supply')
+        if raw_supply is not None and not raw_supply.empty:
+            supply_new.update(calc._prepare_supply_lookup(raw_supply, sources))
+
+        include_raw_safety = opts.get('include_raw_safety', True)
+        safety_old = calc._prepare_safety_lookup(previous.raw_safety_stock_df if include_raw_safety else None)
+        safety_new = {k: v for k, v in safety_old.items() if k not in ids}
+        if include_raw_safety:
+            safety_new.update(calc._prepare_safety_lookup(frames.get('raw_safety')))
+
+        def _levels(mfg_shortage, supply, safety, peg=False):
+            return graph.shortage_levels(
+                mfg_shortage['product_id'].to_numpy(),
+                mfg_shortage['net_gap'].abs().to_numpy(dtype=float),
+                calc._available_lookup(supply, safety), MAX_BOM_LEVELS, peg=peg
+            )
+
+        levels_old = _levels(previous.get_manufacturing_shortage(), supply_old, safety_old)
+        levels_new = _levels(result.get_manufacturing_shortage(), supply_new, safety_new, peg=True)
+
+        # Nodes whose level rows change: children of parents whose driving
+        # shortage moved, plus changed materials present at that level.
+        node_ids = graph.node_ids
+        affected_by_level = []
+        for k in range(max(len(levels_old), len(levels_new))):
+            old = levels_old[k] if k < len(levels_old) else None
+            new = levels_new[k] if k < len(levels_new) else None
+            drivers_old = dict(zip(node_ids[old['parents']].tolist(), old['parent_qty'].tolist())) if old else {}
+            drivers_new = dict(zip(node_ids[new['parents']].tolist(), new['parent_qty'].tolist())) if new else {}
+            dirty = [p for p in set(drivers_old) | set(drivers_new) if drivers_old.get(p) != drivers_new.get(p)]
+
+            present = set()
+            for lvl in (old, new):
+                if lvl:
+                    present.update(node_ids[lvl['children']].tolist())
+            affected_by_level.append(set(graph.children(dirty).tolist()) | (ids & present))
+
+        all_affected = set().union(*affected_by_level) if affected_by_level else set()
+        is_leaf = dict(zip(all_affected, graph.is_leaf_ids(np.array(list(all_affected))).tolist())) \
+            if all_affected else {}
+        leaves = {m for m in all_affected if is_leaf[m]}
+        update.materials = len(all_affected)
+
+        # Rebuild rows from the new level drivers
+        semi_parts, leaf_parts = [], []
+        for k, lvl in enumerate(levels_new):
+            children = set(node_ids[lvl['children']].tolist())
+            wanted = {m for m in affected_by_level[k] & children if not is_leaf[m]} | (leaves & children)
+            if not wanted:
+                continue
+            level_demand = graph.level_demand(
+                node_ids[lvl['parents']], lvl['parent_qty'],
+                qty_col='required_qty', count_col='parent_product_count',
+                material_ids=np.array(sorted(wanted))
+            )
+            if level_demand.empty:
+                continue
+            leaf_materials, semi_materials = calc._split_level_demand(level_demand, k + 1, graph)
+            if not leaf_materials.empty:
+                leaf_parts.append(leaf_materials)
+            if not semi_materials.empty:
+                semi_parts.append(calc._calculate_material_gap_core(
+                    demand_df=semi_materials,
+                    supply_lookup=supply_new,
+                    safety_lookup=safety_new,
+                    bom_level=k + 1,
+                    material_category='SEMI_FINISHED'
+                ))
+
+        # Semi-finished rows are per (material, level)
+        semi_gap_df = previous.semi_finished_gap_df
+        if not semi_gap_df.empty:
+            drop = np.zeros(len(semi_gap_df), dtype=bool)
+            for k, affected in enumerate(affected_by_level):
+                semi_affected = [m for m in affected if not is_leaf[m]]
+                if semi_affected:
+                    drop |= ((semi_gap_df['bom_level'] == k + 1) &
+                             semi_gap_df['material_id'].isin(semi_affected)).to_numpy()
+            semi_gap_df = semi_gap_df[~drop]
+        result.semi_finished_gap_df = _replace_rows(
+            semi_gap_df, pd.concat(semi_parts, ignore_index=True) if semi_parts else None,
+            'material_id', (), sort_cols=['bom_level', 'priority', 'net_gap', 'material_id']
+        )
+
+        # Raw rows aggregate a leaf over all levels
+        new_raw = None
+        if leaf_parts:
+            new_raw = calc._calculate_leaf_gap(
+                pd.concat(leaf_parts, ignore_index=True), id_col,
+                result.existing_mo_demand_df if opts.get('include_existing_mo', True) else None,
+                supply_new, safety_new
+            )
+        result.raw_gap_df = _replace_rows(
+            previous.raw_gap_df, new_raw, 'material_id', leaves,
+            sort_cols=['priority', 'net_gap', 'material_id']
+        )
+
+        # Alternatives of the touched primaries
+        primaries = set(leaves)
+        for df in (previous.raw_gap_df, result.raw_gap_df):
+            if not df.empty and 'primary_material_id' in df.columns:
+                primaries.update(
+                    df.loc[df['material_id'].isin(leaves), 'primary_material_id'].dropna().tolist()
+                )
+        if opts.get('include_alternatives', True) and 'is_primary' in result.raw_gap_df.columns:
+            result.alternative_analysis_df = self._patch_alternatives(
+                previous.alternative_analysis_df, result.raw_gap_df, primaries,
+                opts.get('alternative_mode', 'single')
+            )
+
+        result.max_bom_depth = max(len(levels_new), 1)
+        result.raw_pegging_df = graph.pegging_frame(levels_new)
+        result.raw_metrics = calc._calculate_raw_metrics(
+            result.raw_gap_df, result.semi_finished_gap_df,
+            result.alternative_analysis_df, result.max_bom_depth
+        )
+
+        # Production status only reads each BOM line's shortage flag and whether
+        # a shortage primary has a covering alternative
+        status_materials = {
+            m for m in leaves
+            if _shortage_flag(previous.raw_gap_df, m) != _shortage_flag(result.raw_gap_df, m)
+        }
+        covered_old = _covered_primaries(previous.alternative_analysis_df, primaries)
+        covered_new = _covered_primaries(result.alternative_analysis_df, primaries)
+        status_materials |= covered_old ^ covered_new
+        return ids | set(graph.parents(status_materials).tolist())
+
+    def _patch_alternatives(
+        self,
+        previous_alt: pd.DataFrame,
+        raw_gap_df: pd.DataFrame,
+        primaries: Set,
+        mode: str = 'single'
+    ) -> pd.DataFrame:
+        """Re-analyse alternatives of the touched primaries, keep the rest"""
+        if not primaries:
+            return previous_alt
+        subset = raw_gap_df[raw_gap_df['material_id'].isin(primaries)]
+        if 'primary_material_id' in raw_gap_df.columns:
+            subset = raw_gap_df[
+                raw_gap_df['material_id'].isin(primaries) |
+                raw_gap_df['primary_material_id'].isin(primaries)
+            ]
+        new_alt = self.calculator._analyze_alternatives(subset, mode)
+        if not new_alt.empty:
+            new_alt = new_alt[new_alt['primary_material_id'].isin(primaries)]
+
+        alt = _replace_rows(previous_alt, new_alt, 'primary_material_id', primaries)
+        if alt.empty:
+            return pd.DataFrame()
+
+        # Full-calculation order: primaries, then their alternatives, in raw GAP order
+        position = pd.Series(np.arange(len(raw_gap_df)), index=raw_gap_df['material_id'].to_numpy())
+        position = position[~position.index.duplicated()]
+        alt = alt.assign(
+            _pp=alt['primary_material_id'].map(position),
+            _ap=alt['alternative_material_id'].map(position)
+        )
+        return alt.sort_values(['_pp', '_ap'], kind='mergesort') \
+            .drop(columns=['_pp', '_ap']).reset_index(drop=True)
+
+    # -------------------------------------------------------------------------
+    # Period GAP
+    # -------------------------------------------------------------------------
+
+    def _patch_period_gap(
+        self,
+        previous: SupplyChainGAPResult,
+        result: SupplyChainGAPResult,
+        ids: Set,
+        fg_supply: pd.DataFrame,
+        fg_demand: pd.DataFrame,
+        fg_safety: Optional[pd.DataFrame]
+    ):
+        from .period_calculator import PeriodGAPCalculator
+
+        opts = previous.filters_used
+        track_backlog = opts.get('track_backlog', True)
+        include_existing_mo = opts.get('include_existing_mo', True)
+        include_raw_safety = opts.get('include_raw_safety', True)
+        period_calc = PeriodGAPCalculator(period_type=previous.period_type)
+
+        # FG: per product, so the changed products' rows are independent
+        fg_rows, _ = period_calc.calculate_fg_period_gap(
+            fg_supply_df=fg_supply,
+            fg_demand_df=fg_demand,
+            fg_safety_stock_df=fg_safety,
+            selected_supply_sources=opts.get('supply_sources'),
+            selected_demand_sources=opts.get('demand_sources'),
+            include_safety=opts.get('include_fg_safety', True),
+            track_backlog=track_backlog,
+            include_draft_mo=opts.get('include_draft_mo', False)
+        )
+        fg_period = _replace_rows(previous.fg_period_gap_df, fg_rows, 'product_id', ids)
+        if not fg_period.empty:
+            fg_period = period_calc._sort_final(fg_period, 'pt_code')
+        result.fg_period_gap_df = fg_period
+        result.fg_period_metrics = period_calc._compute_metrics(fg_period, track_backlog, id_col='product_id')
+
+        # Raw: single-level explosion of FG period shortage
+        has_raw_supply = not result.raw_supply_df.empty or not result.raw_supply_detail_df.empty
+        if fg_period.empty or result.manufacturing_df.empty or not has_raw_supply:
+            result.raw_period_gap_df = pd.DataFrame()
+            result.raw_period_metrics = {}
+            return
+
+        graph = result.bom_graph
+        mfg_ids = result.manufacturing_df['product_id'].tolist()
+        detail = result.raw_supply_detail_df
+        existing_mo = result.existing_mo_demand_df if include_existing_mo else None
+        kwargs = dict(
+            manufacturing_product_ids=mfg_ids,
+            bom_explosion_df=result.bom_explosion_df,
+            raw_supply_summary_df=result.raw_supply_df,
+            raw_safety_stock_df=result.raw_safety_stock_df if include_raw_safety else None,
+            include_safety=include_raw_safety,
+            track_backlog=track_backlog,
+            selected_supply_sources=opts.get('supply_sources'),
+            include_existing_mo=include_existing_mo,
+            include_draft_mo=opts.get('include_draft_mo', False),
+            bom_graph=graph
+        )
+
+        if detail.empty:
+            # Summary supply is placed in the earliest demand period of ALL
+            # materials, so a subset cannot be computed in isolation.
+            raw_period, raw_metrics = period_calc.calculate_raw_period_gap(
+                fg_period_gap_df=fg_period,
+                raw_supply_detail_df=detail,
+                existing_mo_demand_df=existing_mo,
+                **kwargs
+            )
+            result.raw_period_gap_df = raw_period
+            result.raw_period_metrics = raw_metrics
+            return
+
+        materials = ids | set(graph.children(ids).tolist())
+        drivers = fg_period[fg_period['product_id'].isin(graph.parents(materials))]
+        detail_col = _material_col(detail)
+        raw_rows, _ = period_calc.calculate_raw_period_gap(
+            fg_period_gap_df=drivers,
+            raw_supply_detail_df=detail[detail[detail_col].isin(materials)],
+            existing_mo_demand_df=(
+                existing_mo[existing_mo['material_id'].isin(materials)]
+                if existing_mo is not None and not existing_mo.empty else existing_mo
+            ),
+            **kwargs
+        )
+        if not raw_rows.empty:
+            raw_rows = raw_rows[raw_rows['material_id'].isin(materials)]
+        raw_period = _replace_rows(previous.raw_period_gap_df, raw_rows, 'material_id', materials)
+        if not raw_period.empty:
+            raw_period = period_calc._sort_final(raw_period, 'material_pt_code')
+        result.raw_period_gap_df = raw_period
+        result.raw_period_metrics = period_calc._compute_metrics(raw_period, track_backlog, id_col='material_id')
+
+
+def recalculate_gap(
+    previous: SupplyChainGAPResult,
+    changed_ids: Iterable[int],
+    data_loader,
+    filter_values: Dict[str, Any],
+    calculator: Optional[SupplyChainGAPCalculator] = None
+) -> Optional[SupplyChainGAPResult]:
+    """
+    Scoped reload of the changed products + incremental patch of previous.
+    Returns None when a full calculation is required.
+    """
+    ids = tuple(sorted({int(i) for i in changed_ids if i is not None and not pd.isna(i)}))
+    if not ids:
+        return None
+
+    load = load_gap_inputs(data_loader, filter_values, product_ids=ids)
+    result, update = IncrementalGAPCalculator(calculator).recalculate(previous, ids, load.frames)
+    if result is None:
+        return None
+
+    result.load_stats = {**load.get_summary(), 'incremental': update.get_summary()}
+    return result
@@ -0,0 +1,315 @@
+# utils/supply_chain_gap/load_pipeline.py
+
+"""
+Parallel Data Loading Stage for Supply Chain GAP Analysis
+
+The GAP page needs up to nine independent reads (FG supply/demand/safety,
+classification, BOM explosion, existing MO demand, raw supply summary/detail,
+raw safety). Each is a heavy view, so running them one after another makes the
+page wait for the SUM of all queries. This pipeline runs them concurrently on
+a few pooled connections (LOAD_PIPELINE_CONFIG['max_workers'], capped below the
+engine's pool_size) so concurrent GAP users do not starve the shared pool.
+
+Snapshot modes:
+- 'none'     : each query runs on its own connection in autocommit-style reads
+- 'parallel' : every worker's connection opens START TRANSACTION WITH CONSISTENT
+               SNAPSHOT before ANY query is dispatched. Each query is internally
+               consistent and all snapshots are taken within a few ms of each other.
+- 'serial'   : one connection, one snapshot, queries run sequentially — fully
+               consistent across all views, but not parallel.
+
+Scoped loads (product_ids) fetch only the rows of a few changed products for
+incremental GAP recalculation.
+
+VERSION: 1.2.1
+"""
+
+import time
+import queue
+import logging
+import threading
+from dataclasses import dataclass, field
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
+
+import pandas as pd
+
+from .constants import LOAD_PIPELINE_CONFIG
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_MODES = ('none', 'parallel', 'serial')
+
+
+@dataclass
+class LoadTask:
+    """One loader call: result key → SupplyChainDataLoader method + kwargs"""
+    key: str
+    method: str
+    kwargs: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class LoadResult:
+    """Frames keyed by task key + per-query timing report"""
+    frames: Dict[str, pd.DataFrame] = field(default_factory=dict)
+    timings: Dict[str, float] = field(default_factory=dict)      # seconds per query
+    row_counts: Dict[str, int] = field(default_factory=dict)
+    errors: Dict[str, Exception] = field(default_factory=dict)
+    wall_time: float = 0.0
+    snapshot_mode: str = 'none'
+
+    def get(self, key: str) -> Optional[pd.DataFrame]:
+        """Frame for key, or None if the task was not scheduled"""
+        return self.frames.get(key)
+
+    @property
+    def total_query_time(self) -> float:
+        """Sum of query times (what a sequential load would have cost)"""
+        return sum(self.timings.values())
+
+    @property
+    def slowest(self) -> Optional[str]:
+        return max(self.timings, key=self.timings.get) if self.timings else None
+
+    def get_summary(self) -> Dict[str, Any]:
+        return {
+            'wall_time_s': round(self.wall_time, 3),
+            'sum_query_time_s': round(self.total_query_time, 3),
+            'slowest': self.slowest,
+            'snapshot_mode': self.snapshot_mode,
+            'queries': {
+                k: {'seconds': round(t, 3), 'rows': self.row_counts.get(k, 0)}
+                for k, t in sorted(self.timings.items(), key=lambda kv: -kv[1])
+            },
+            'errors': {k: str(e) for k, e in self.errors.items()},
+        }
+
+
+class SupplyChainLoadPipeline:
+    """
+    Runs independent SupplyChainDataLoader reads concurrently.
+
+    Usage:
+        pipeline = SupplyChainLoadPipeline(data_loader)
+        load = pipeline.run(pipeline.build_tasks(filter_values))
+        fg_supply = load.get('fg_supply')
+    """
+
+    def __init__(
+        self,
+        data_loader,
+        max_workers: Optional[int] = None,
+        snapshot_mode: Optional[str] = None
+    ):
+        snapshot_mode = snapshot_mode or LOAD_PIPELINE_CONFIG['snapshot_mode']
+        if snapshot_mode not in SNAPSHOT_MODES:
+            raise ValueError(f"Unknown snapshot mode: {snapshot_mode}")
+        self.data_loader = data_loader
+        self.max_workers = max_workers or LOAD_PIPELINE_CONFIG['max_workers']
+        self.snapshot_mode = snapshot_mode
+
+    # =========================================================================
+    # TASK PLANNING
+    # =========================================================================
+
+    @staticmethod
+    def build_tasks(
+        filter_values: Dict[str, Any],
+        product_ids: Optional[Tuple[int, ...]] = None
+    ) -> List[LoadTask]:
+        """
+        Translate GAP page filters into loader tasks.
+        Mirrors the sequential loading in calculate_gap: entity-only filters,
+        optional tasks skipped when their feature flag is off.
+        
+        product_ids: incremental recalculation — load only these products
+        (FG side) / materials (raw side). The BOM is not reloaded.
+        """
+        entity = filter_values.get('entity')
+        exclude_expired = filter_values.get('exclude_expired', True)
+        fg_scope = {'product_ids': product_ids} if product_ids else {}
+        raw_scope = {'material_ids': product_ids} if product_ids else {}
+
+        tasks = [
+            LoadTask('fg_supply', 'load_fg_supply',
+                     {'entity_name': entity, 'exclude_expired': exclude_expired, **fg_scope}),
+            LoadTask('fg_demand', 'load_fg_demand', {'entity_name': entity, **fg_scope}),
+            LoadTask('classification', 'load_product_classification',
+                     {'entity_name': entity, **fg_scope}),
+            LoadTask('raw_supply', 'load_raw_material_supply_summary',
+                     {'entity_name': entity, **raw_scope}),
+            LoadTask('raw_supply_detail', 'load_raw_material_supply',
+                     {'entity_name': entity, 'exclude_expired': exclude_expired, **raw_scope}),
+        ]
+        if not product_ids:
+            tasks.insert(3, LoadTask('bom_explosion', 'load_bom_explosion',
+                                     {'entity_name': entity,
+                                      'include_alternatives': filter_values.get('include_alternatives', True)}))
+        if filter_values.get('include_fg_safety', True):
+            tasks.append(LoadTask('fg_safety', 'load_fg_safety_stock',
+                                  {'entity_name': entity, **fg_scope}))
+        if filter_values.get('include_existing_mo', True):
+            tasks.append(LoadTask('existing_mo', 'load_existing_mo_demand',
+                                  {'entity_name': entity,
+                                   'include_draft_mo': filter_values.get('include_draft_mo', False),
+                                   **raw_scope}))
+        if filter_values.get('include_raw_safety', True):
+            tasks.append(LoadTask('raw_safety', 'load_raw_material_safety_stock',
+                                  {'entity_name': entity, **raw_scope}))
+        return tasks
+
+    # =========================================================================
+    # EXECUTION
+    # =========================================================================
+
+    def run(self, tasks: List[LoadTask], raise_on_error: bool = True) -> LoadResult:
+        """
+        Execute tasks and collect frames + timings.
+
+        Args:
+            tasks: loader tasks (see build_tasks)
+            raise_on_error: re-raise the first task exception after all tasks
+                finish (loaders for optional views already return empty frames)
+        """
+        result = LoadResult(snapshot_mode=self.snapshot_mode)
+        if not tasks:
+            return result
+
+        t0 = time.perf_counter()
+        if self.snapshot_mode == 'serial':
+            self._run_serial_snapshot(tasks, result)
+        else:
+            self._run_parallel(tasks, result)
+        result.wall_time = time.perf_counter() - t0
+
+        summary = result.get_summary()
+        logger.info(
+            f"Load pipeline: {len(tasks)} queries in {summary['wall_time_s']}s wall "
+            f"(sum {summary['sum_query_time_s']}s, slowest={summary['slowest']}, "
+            f"snapshot={self.snapshot_mode})"
+        )
+        for key, info in summary['queries'].items():
+            logger.info(f"  {key}: {info['seconds']}s, {info['rows']} rows")
+
+        if raise_on_error and result.errors:
+            key, err = next(iter(result.errors.items()))
+            logger.error(f"Load pipeline task '{key}' failed: {err}")
+            raise err
+        return result
+
+    def _run_parallel(self, tasks: List[LoadTask], result: LoadResult):
+        engine = self.data_loader._engine
+        workers = self._worker_count(engine, len(tasks))
+        connections = []
+
+        # Every task is submitted on its own: whichever worker is idle takes
+        # the next one, so a slow view never holds back the tasks behind it.
+        # The executor never runs more than `workers` threads, so a calculation
+        # never holds more than `workers` pooled connections at once.
+        try:
+            # Snapshot mode: open one snapshot per worker up front so they are
+            # all taken before the first (slow) query starts.
+            if self.snapshot_mode == 'parallel':
+                for _ in range(workers):
+                    connections.append(self._open_snapshot(engine))
+            free = queue.SimpleQueue()
+            for conn in connections:
+                free.put(conn)
+            bound = threading.local()
+
+            def execute(task: LoadTask):
+                # Each worker thread binds one snapshot for all tasks it runs
+                conn = getattr(bound, 'conn', None)
+                if conn is None and connections:
+                    conn = bound.conn = free.get_nowait()
+                return self._execute(task, conn)
+
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='scg-load') as pool:
+                futures = [pool.submit(execute, task) for task in tasks]
+                for task, future in zip(tasks, futures):
+                    self._collect(task.key, future.result(), result)
+        finally:
+            for conn in connections:
+                self._close_snapshot(conn)
+
+    def _worker_count(self, engine, n_tasks: int) -> int:
+        """Workers for one run: max_workers, never more than the pool can spare"""
+        workers = min(self.max_workers, n_tasks)
+        pool_size = getattr(getattr(engine, 'pool', None), 'size', None)
+        if callable(pool_size):
+            try:
+                # Leave at least one pooled connection for the rest of the process
+                workers = min(workers, max(1, pool_size() - 1))
+            except Exception:
+                pass
+        return max(1, workers)
+
+    def _run_serial_snapshot(self, tasks: List[LoadTask], result: LoadResult):
+        conn = self._open_snapshot(self.data_loader._engine)
+        try:
+            for task in tasks:
+                self._collect(task.key, self._execute(task, conn), result)
+        finally:
+            self._close_snapshot(conn)
+
+    def _execute(self, task: LoadTask, conn=None):
+        """Run one loader method; returns (frame, seconds, error)"""
+        t0 = time.perf_counter()
+        try:
+            method = getattr(self.data_loader, task.method)
+            if conn is not None:
+                with self.data_loader.bind_connection(conn):
+                    df = method(**task.kwargs)
+            else:
+                with self.data_loader._engine.connect() as own_conn:
+                    with self.data_loader.bind_connection(own_conn):
+                        df = method(**task.kwargs)
+            return df, time.perf_counter() - t0, None
+        except Exception as e:
+            return None, time.perf_counter() - t0, e
+
+    @staticmethod
+    def _collect(key: str, outcome, result: LoadResult):
+        df, seconds, error = outcome
+        result.timings[key] = seconds
+        if error is not None:
+            result.errors[key] = error
+            result.frames[key] = pd.DataFrame()
+        else:
+            result.frames[key] = df if df is not None else pd.DataFrame()
+        result.row_counts[key] = len(result.frames[key])
+
+    # =========================================================================
+    # SNAPSHOT CONNECTIONS
+    # =========================================================================
+
+    @staticmethod
+    def _open_snapshot(engine):
+        """Pooled connection inside a read-only REPEATABLE READ snapshot"""
+        conn = engine.connect().execution_options(isolation_level='REPEATABLE READ')
+        conn.exec_driver_sql("START TRANSACTION WITH CONSISTENT SNAPSHOT, READ ONLY")
+        return conn
+
+    @staticmethod
+    def _close_snapshot(conn):
+        try:
+            conn.rollback()
+        except Exception as e:
+            logger.warning(f"Snapshot rollback failed: {e}")
+        finally:
+            conn.close()
+
+
+def load_gap_inputs(
+    data_loader,
+    filter_values: Dict[str, Any],
+    snapshot_mode: Optional[str] = None,
+    max_workers: Optional[int] = None,
+    product_ids: Optional[Tuple[int, ...]] = None
+) -> LoadResult:
+    """Convenience wrapper: plan + run the GAP input loads for filter_values"""
+    pipeline = SupplyChainLoadPipeline(
+        data_loader, max_workers=max_workers, snapshot_mode=snapshot_mode
+    )
+    return pipeline.run(pipeline.build_tasks(filter_values, product_ids=product_ids))
@@ -4,11 +4,13 @@
 Period-based GAP Calculator for Supply Chain GAP Analysis
 Calculates GAP by time period (Weekly/Monthly) with carry-forward & backlog tracking.
 
-VERSION: 2.3.0
+VERSION: 2.5.0
 
 Features:
 - FG Period GAP (carry-forward + backlog)
+- Grouped carry-forward engine: one vectorized pass over all items (v2.5)
 - Raw Material Period GAP via BOM explosion of FG shortage by period
+  (sparse pass over the shared BOMGraph)
 - Pivot data builder (products × periods matrix)
 - Filtering helpers for manufacturing/trading subsets
 """
@@ -19,6 +21,8 @@ import logging
 from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime, timedelta
 
+from .bom_graph import BOMGraph, get_bom_graph
+
 logger = logging.getLogger(__name__)
 
 
@@ -159,10 +163,20 @@ class PeriodGAPCalculator:
     """
     Period-based GAP calculator with carry-forward and backlog tracking.
     Handles both FG products and raw materials.
+
+    engine:
+        'grouped'  — all items stepped together on NumPy arrays (default, v2.5)
+        'per_item' — original per-item iterrows() loop (kept for benchmarking)
+    Both engines produce identical results.
     """
 
-    def __init__(self, period_type: str = 'Weekly'):
+    ENGINES = ('grouped', 'per_item')
+
+    def __init__(self, period_type: str = 'Weekly', engine: str = 'grouped'):
+        if engine not in self.ENGINES:
+            raise ValueError(f"Unknown carry-forward engine: {engine}")
         self.period_type = period_type
+        self.engine = engine
 
     # -----------------------------------------------------------------
     # PUBLIC: FG PERIOD GAP
@@ -216,34 +230,23 @@ class PeriodGAPCalculator:
         # Safety stock lookup
         safety = {}
         if include_safety and fg_safety_stock_df is not None and not fg_safety_stock_df.empty:
-            for _, r in fg_safety_stock_df.iterrows():
-                pid = r.get('product_id')
-                if pid is not None:
-                    safety[pid] = r.get('safety_stock_qty', 0) or 0
+            safety = self._build_safety_lookup(fg_safety_stock_df, 'product_id')
 
-        # Apply carry-forward per product
-        result_rows = []
-        for pid in matrix['product_id'].unique():
-            prod = matrix[matrix['product_id'] == pid].copy()
-            prod = self._sort_by_period(prod)
-            rows = self._apply_carry_forward(
-                prod, safety.get(pid, 0), track_backlog, id_col='product_id'
-            )
-            result_rows.extend(rows)
+        # Apply carry-forward (all products)
+        gap_df = self._run_carry_forward(matrix, safety, track_backlog, id_col='product_id')
 
-        if not result_rows:
+        if gap_df.empty:
             return pd.DataFrame(), {}
 
-        gap_df = pd.DataFrame(result_rows)
         gap_df = self._sort_final(gap_df, 'pt_code')
-        gap_df['period_display'] = gap_df['period'].apply(
-            lambda p: format_period_display(p, self.period_type)
+        gap_df['period_display'] = self._map_periods(
+            gap_df['period'], lambda p: format_period_display(p, self.period_type)
         )
 
         # Mark past periods
-        gap_df['is_past'] = gap_df['period'].apply(
-            lambda p: is_past_period(p, self.period_type)
-        )
+        gap_df['is_past'] = self._map_periods(
+            gap_df['period'], lambda p: is_past_period(p, self.period_type)
+        ).astype(bool)
 
         # Classify product type (Matched / Demand Only / Supply Only)
         gap_df['product_type'] = gap_df['product_id'].apply(
@@ -272,7 +275,8 @@ class PeriodGAPCalculator:
         raw_supply_detail_df: Optional[pd.DataFrame] = None,
         existing_mo_demand_df: Optional[pd.DataFrame] = None,
         include_existing_mo: bool = True,
-        include_draft_mo: bool = False
+        include_draft_mo: bool = False,
+        bom_graph: Optional[BOMGraph] = None
     ) -> Tuple[pd.DataFrame, Dict[str, Any]]:
         """
         Calculate raw material period GAP from BOM explosion of FG shortage by period.
@@ -303,8 +307,9 @@ class PeriodGAPCalculator:
             return pd.DataFrame(), {}
 
         # Step 2: BOM explode shortage → raw demand by (material, period)
-        id_col = 'output_product_id' if 'output_product_id' in bom_explosion_df.columns else 'fg_product_id'
-        raw_demand = self._bom_explode_by_period(mfg_shortage, bom_explosion_df, id_col)
+        raw_demand = self._bom_explode_by_period(
+            mfg_shortage, get_bom_graph(bom_explosion_df, bom_graph)
+        )
 
         if raw_demand.empty:
             return pd.DataFrame(), {}
@@ -354,36 +359,27 @@ class PeriodGAPCalculator:
         safety = {}
         if include_safety and raw_safety_stock_df is not None and not raw_safety_stock_df.empty:
             sid = 'material_id' if 'material_id' in raw_safety_stock_df.columns else 'product_id'
-            for _, r in raw_safety_stock_df.iterrows():
-                mid = r.get(sid)
-                if mid is not None:
-                    safety[mid] = r.get('safety_stock_qty', 0) or 0
-
-        # Apply carry-forward per material
-        result_rows = []
-        for mid in matrix['material_id'].unique():
-            mat = matrix[matrix['material_id'] == mid].copy()
-            mat = self._sort_by_period(mat)
-            rows = self._apply_carry_forward(
-                mat, safety.get(mid, 0), track_backlog,
-                id_col='material_id',
-                code_col='material_pt_code', name_col='material_name',
-                brand_col='material_brand', pkg_col='material_package_size',
-                uom_col='material_uom'
-            )
-            result_rows.extend(rows)
+            safety = self._build_safety_lookup(raw_safety_stock_df, sid)
+
+        # Apply carry-forward (all materials)
+        gap_df = self._run_carry_forward(
+            matrix, safety, track_backlog,
+            id_col='material_id',
+            code_col='material_pt_code', name_col='material_name',
+            brand_col='material_brand', pkg_col='material_package_size',
+            uom_col='material_uom'
+        )
 
-        if not result_rows:
+        if gap_df.empty:
             return pd.DataFrame(), {}
 
-        gap_df = pd.DataFrame(result_rows)
         gap_df = self._sort_final(gap_df, 'material_pt_code')
-        gap_df['period_display'] = gap_df['period'].apply(
-            lambda p: format_period_display(p, self.period_type)
-        )
-        gap_df['is_past'] = gap_df['period'].apply(
-            lambda p: is_past_period(p, self.period_type)
+        gap_df['period_display'] = self._map_periods(
+            gap_df['period'], lambda p: format_period_display(p, self.period_type)
         )
+        gap_df['is_past'] = self._map_periods(
+            gap_df['period'], lambda p: is_past_period(p, self.period_type)
+        ).astype(bool)
 
         metrics = self._compute_metrics(gap_df, track_backlog, id_col='material_id')
         logger.info(f"Period GAP (Raw): {len(gap_df)} rows, {metrics.get('total_products', 0)} materials")
@@ -396,40 +392,19 @@ class PeriodGAPCalculator:
     def _bom_explode_by_period(
         self,
         mfg_shortage_df: pd.DataFrame,
-        bom_df: pd.DataFrame,
-        fg_id_col: str
+        bom_graph: BOMGraph
     ) -> pd.DataFrame:
         """BOM explode FG shortage per period → raw demand by (material, period)."""
-
-        merged = bom_df.merge(
-            mfg_shortage_df[['product_id', 'period', 'gap_quantity']].rename(
-                columns={'product_id': fg_id_col, 'gap_quantity': 'fg_shortage'}
-            ),
-            on=fg_id_col, how='inner'
-        )
-        if merged.empty:
+        if mfg_shortage_df.empty:
             return pd.DataFrame()
 
-        merged['fg_shortage'] = merged['fg_shortage'].abs()
-        bom_out = merged['bom_output_quantity'].fillna(1).replace(0, 1) \
-            if 'bom_output_quantity' in merged.columns else 1
-        qty_per = merged['quantity_per_output'].fillna(1) \
-            if 'quantity_per_output' in merged.columns else 1
-        scrap = merged['scrap_rate'].fillna(0) \
-            if 'scrap_rate' in merged.columns else 0
-
-        merged['demand_qty'] = (merged['fg_shortage'] / bom_out) * qty_per * (1 + scrap / 100)
-
-        # Aggregate by (material_id, period)
-        agg = {'demand_qty': 'sum', fg_id_col: 'nunique'}
-        for c in ['material_pt_code', 'material_name', 'material_brand',
-                   'material_package_size', 'material_uom', 'material_type', 'is_primary']:
-            if c in merged.columns:
-                agg[c] = 'first'
-
-        result = merged.groupby(['material_id', 'period']).agg(agg).reset_index()
-        result.rename(columns={fg_id_col: 'fg_product_count'}, inplace=True)
-        return result
+        return bom_graph.explode_by_period(
+            mfg_shortage_df['product_id'].to_numpy(),
+            mfg_shortage_df['period'].to_numpy(),
+            mfg_shortage_df['gap_quantity'].abs().to_numpy(dtype=float),
+            qty_col='demand_qty',
+            count_col='fg_product_count'
+        )
 
     def _prepare_raw_supply_by_period(
         self,
@@ -750,14 +725,179 @@ class PeriodGAPCalculator:
 
     def _sort_final(self, df: pd.DataFrame, code_col: str) -> pd.DataFrame:
         df = df.copy()
-        df['_sp'] = df['period'].apply(lambda p: get_period_sort_key(p, self.period_type))
+        df['_sp'] = self._period_rank(df['period'])
         sort_cols = [code_col, '_sp'] if code_col in df.columns else ['_sp']
         return df.sort_values(sort_cols).drop(columns=['_sp']).reset_index(drop=True)
 
+    def _period_rank(self, periods: pd.Series) -> np.ndarray:
+        """
+        Dense integer rank of each period by its sort key.
+        Sort keys are parsed once per distinct period, not once per row.
+        """
+        uniq = pd.unique(periods)
+        keys = [get_period_sort_key(p, self.period_type) for p in uniq]
+        rank, prev, r = {}, None, -1
+        for i in sorted(range(len(uniq)), key=lambda j: keys[j]):
+            if r < 0 or keys[i] != prev:
+                r, prev = r + 1, keys[i]
+            rank[uniq[i]] = r
+        return periods.map(rank).to_numpy(dtype=np.int64)
+
+    @staticmethod
+    def _map_periods(periods: pd.Series, func) -> pd.Series:
+        """Apply func once per distinct period and broadcast back to rows."""
+        lookup = {p: func(p) for p in pd.unique(periods)}
+        return periods.map(lookup)
+
     # -----------------------------------------------------------------
     # CARRY-FORWARD ENGINE (generic)
     # -----------------------------------------------------------------
 
+    @staticmethod
+    def _build_safety_lookup(safety_df: pd.DataFrame, id_col: str) -> Dict[Any, float]:
+        """id → safety_stock_qty (last row wins, same as the old iterrows() loop)."""
+        if id_col not in safety_df.columns:
+            return {}
+        qty = safety_df['safety_stock_qty'] if 'safety_stock_qty' in safety_df.columns \
+            else pd.Series(0, index=safety_df.index)
+        return {
+            k: (v or 0)
+            for k, v in zip(safety_df[id_col].tolist(), qty.tolist())
+            if k is not None
+        }
+
+    def _run_carry_forward(
+        self, matrix: pd.DataFrame, safety: Dict[Any, float],
+        track_backlog: bool, id_col: str = 'product_id', **col_names
+    ) -> pd.DataFrame:
+        """Dispatch carry-forward for every item in matrix to the configured engine."""
+        if self.engine == 'grouped':
+            return self._apply_carry_forward_grouped(
+                matrix, safety, track_backlog, id_col=id_col, **col_names
+            )
+
+        result_rows = []
+        for item_id in matrix[id_col].unique():
+            item = matrix[matrix[id_col] == item_id].copy()
+            item = self._sort_by_period(item)
+            result_rows.extend(self._apply_carry_forward(
+                item, safety.get(item_id, 0), track_backlog, id_col=id_col, **col_names
+            ))
+        return pd.DataFrame(result_rows) if result_rows else pd.DataFrame()
+
+    def _apply_carry_forward_grouped(
+        self, matrix: pd.DataFrame,
+        safety: Dict[Any, float], track_backlog: bool,
+        id_col: str = 'product_id',
+        code_col: str = 'pt_code', name_col: str = 'product_name',
+        brand_col: str = 'brand', pkg_col: str = 'package_size',
+        uom_col: str = 'standard_uom'
+    ) -> pd.DataFrame:
+        """
+        Apply carry-forward for ALL items at once.
+
+        Rows are laid out on NumPy arrays sorted by (item, period sort key);
+        the recurrence is then stepped one period position at a time, each
+        step advancing every item that still has periods left. The per-step
+        arithmetic mirrors _apply_carry_forward exactly, so output (values,
+        row order and columns) is identical to the per-item engine.
+        """
+        if matrix.empty:
+            return pd.DataFrame()
+
+        # Item codes in first-appearance order (= per-item loop order)
+        codes, uniques = pd.factorize(matrix[id_col])
+        keep = codes >= 0
+        if not keep.any():
+            return pd.DataFrame()
+        ranks = self._period_rank(matrix['period'])
+        order = np.flatnonzero(keep)
+        order = order[np.lexsort((ranks[order], codes[order]))]
+        df = matrix.iloc[order]
+        codes = codes[order]
+        n = len(df)
+
+        supply = df['supply_qty'].to_numpy(dtype=float) if 'supply_qty' in df.columns else np.zeros(n)
+        demand = df['demand_qty'].to_numpy(dtype=float) if 'demand_qty' in df.columns else np.zeros(n)
+
+        # Group layout: contiguous block per item
+        starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+        lengths = np.diff(np.r_[starts, n])
+
+        carry = np.zeros(len(starts))
+        if track_backlog:
+            backlog = np.array(
+                [safety.get(uid, 0) for uid in uniques[codes[starts]]], dtype=float
+            )
+        else:
+            backlog = np.zeros(len(starts))
+
+        begin_inv = np.empty(n)
+        backlog_prev = np.empty(n)
+        total_avail = np.empty(n)
+        eff_demand = np.empty(n)
+        gap = np.empty(n)
+        backlog_next = np.empty(n)
+
+        for k in range(int(lengths.max())):
+            active = lengths > k
+            idx = starts[active] + k
+            c, b = carry[active], backlog[active]
+            avail = supply[idx] + c
+            if track_backlog:
+                eff = demand[idx] + b
+                g = avail - eff
+                carry[active] = np.where(g >= 0, g, 0.0)
+                backlog[active] = np.where(g >= 0, 0.0, np.abs(g))
+            else:
+                eff = demand[idx]
+                g = avail - eff
+                carry[active] = np.fmax(0.0, g)
+            begin_inv[idx] = c
+            backlog_prev[idx] = b
+            total_avail[idx] = avail
+            eff_demand[idx] = eff
+            gap[idx] = g
+            backlog_next[idx] = backlog[active]
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratio = np.fmin(100.0, total_avail / eff_demand * 100)
+        fill = np.where(
+            eff_demand > 0, ratio, np.where(total_avail > 0, 100.0, 0.0)
+        )
+
+        def _info(col):
+            return df[col].to_numpy() if col in df.columns else np.full(n, '', dtype=object)
+
+        def _round(arr):
+            return np.rint(arr).astype(np.int64)
+
+        customer_count = df['customer_count'].to_numpy() if 'customer_count' in df.columns \
+            else np.zeros(n)
+
+        out = {
+            id_col: df[id_col].to_numpy(),
+            code_col: _info(code_col),
+            name_col: _info(name_col),
+            brand_col: _info(brand_col),
+            pkg_col: _info(pkg_col),
+            uom_col: _info(uom_col),
+            'period': df['period'].to_numpy(),
+            'begin_inventory': _round(begin_inv),
+            'supply_in_period': _round(supply),
+            'total_available': _round(total_avail),
+            'demand_in_period': _round(demand),
+            'gap_quantity': _round(gap),
+            'fulfillment_rate': np.round(fill, 1),
+            'fulfillment_status': np.where(gap >= 0, "✅ Fulfilled", "❌ Shortage").astype(object),
+            'customer_count': customer_count.astype(np.int64),
+        }
+        if track_backlog:
+            out['backlog_from_prev'] = _round(backlog_prev)
+            out['effective_demand'] = _round(eff_demand)
+            out['backlog_to_next'] = _round(backlog_next)
+        return pd.DataFrame(out)
+
     def _apply_carry_forward(
         self, product_periods: pd.DataFrame,
         safety_stock_qty: float, track_backlog: bool,
@@ -840,9 +980,10 @@ class PeriodGAPCalculator:
             m['total_final_backlog'] = float(fb.sum())
             m['products_with_backlog'] = int((fb > 0).sum())
         if not shortage.empty:
-            s2 = shortage.copy()
-            s2['_sk'] = s2['period'].apply(lambda p: get_period_sort_key(p, self.period_type))
-            m['first_shortage_period'] = s2.sort_values('_sk').iloc[0]['period']
+            m['first_shortage_period'] = min(
+                pd.unique(shortage['period']),
+                key=lambda p: get_period_sort_key(p, self.period_type)
+            )
         return m
 
 
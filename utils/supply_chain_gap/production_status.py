@@ -0,0 +1,222 @@
+# utils/supply_chain_gap/production_status.py
+
+"""
+Batched Production Status
+
+get_production_status() used to answer one FG product at a time: a linear
+`in` over manufacturing ids, a full-table filter of bom_explosion_df, a merge
+with raw_gap_df and an iterrows() over shortages with one more filter of
+alternative_analysis_df per row. get_all_production_statuses() repeated that
+for every manufacturing shortage product.
+
+compute_production_statuses() builds the status of every manufacturing
+product in one pass:
+
+  1. BOM lines of all manufacturing products (one isin filter)
+  2. One left merge with the raw GAP columns (same merge as
+     get_raw_materials_for_fg)
+  3. groupby(output product) → has GAP data / has shortage / shortage
+     covered by an alternative / limiting material codes
+
+The result is one row per product; SupplyChainGAPResult indexes it by
+product_id so single-product lookups are dict reads.
+
+Decision order per product is unchanged:
+  no BOM lines → 'No BOM materials found'
+  no net_gap column → UNKNOWN (GAP data not available)
+  all net_gap NaN → UNKNOWN (No GAP data for materials)
+  no net_gap < 0 → SUFFICIENT
+  a primary shortage material with a covering alternative → USE_ALTERNATIVE
+  otherwise → SHORTAGE
+
+VERSION: 1.0.0
+"""
+
+import logging
+from typing import Any, Dict
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+PRODUCTION_STATUS_COLUMNS = [
+    'product_id', 'product_type', 'can_produce', 'status', 'reason',
+    'bom_code', 'limiting_materials'
+]
+
+RAW_GAP_MERGE_COLS = ['total_supply', 'net_gap', 'gap_status', 'coverage_ratio']
+
+
+def compute_production_statuses(
+    manufacturing_df: pd.DataFrame,
+    classification_df: pd.DataFrame,
+    bom_explosion_df: pd.DataFrame,
+    raw_gap_df: pd.DataFrame,
+    alternative_analysis_df: pd.DataFrame
+) -> pd.DataFrame:
+    """
+    Production status of every manufacturing product.
+
+    Returns:
+        DataFrame[PRODUCTION_STATUS_COLUMNS], one row per product_id.
+        status is None for products without BOM lines; limiting_materials is
+        None unless status is SHORTAGE / USE_ALTERNATIVE.
+    """
+    if manufacturing_df.empty or 'product_id' not in manufacturing_df.columns:
+        return pd.DataFrame(columns=PRODUCTION_STATUS_COLUMNS)
+
+    product_ids = manufacturing_df['product_id'].drop_duplicates().reset_index(drop=True)
+    n = len(product_ids)
+
+    status = np.full(n, None, dtype=object)
+    reason = np.full(n, 'No BOM materials found', dtype=object)
+    can_produce = np.zeros(n, dtype=bool)
+    limiting = np.full(n, None, dtype=object)
+
+    materials, id_col = _materials_with_gap(product_ids, bom_explosion_df, raw_gap_df)
+    if materials is not None and not materials.empty:
+        has_bom = product_ids.isin(materials[id_col]).to_numpy()
+
+        if 'net_gap' not in materials.columns:
+            status[has_bom] = 'UNKNOWN'
+            reason[has_bom] = 'GAP data not available'
+            can_produce[has_bom] = True
+        else:
+            _classify_with_gap(
+                product_ids, materials, id_col, alternative_analysis_df,
+                has_bom, status, reason, can_produce, limiting
+            )
+
+    return pd.DataFrame({
+        'product_id': product_ids,
+        'product_type': 'MANUFACTURING',
+        'can_produce': can_produce,
+        'status': status,
+        'reason': reason,
+        'bom_code': _bom_codes(product_ids, classification_df),
+        'limiting_materials': limiting,
+    }, columns=PRODUCTION_STATUS_COLUMNS)
+
+
+def status_record_to_dict(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Status table row → the dict shape get_production_status() returns"""
+    status = {
+        'product_type': record['product_type'],
+        'can_produce': bool(record['can_produce']),
+    }
+    # Missing values may come back as None or NaN depending on the column dtype
+    if isinstance(record['status'], str):
+        status['status'] = record['status']
+    status['reason'] = record['reason']
+    status['bom_code'] = record['bom_code']
+    if isinstance(record['limiting_materials'], list):
+        status['limiting_materials'] = list(record['limiting_materials'])
+    return status
+
+
+# =============================================================================
+# HELPERS
+# =============================================================================
+
+def _materials_with_gap(product_ids: pd.Series,
+                        bom_explosion_df: pd.DataFrame,
+                        raw_gap_df: pd.DataFrame):
+    """BOM lines of all products, merged with raw GAP columns → (frame, id column)"""
+    if bom_explosion_df.empty:
+        return None, None
+    id_col = 'output_product_id' if 'output_product_id' in bom_explosion_df.columns else 'fg_product_id'
+    if id_col not in bom_explosion_df.columns:
+        return None, None
+
+    materials = bom_explosion_df[bom_explosion_df[id_col].isin(product_ids)]
+    if materials.empty or raw_gap_df.empty:
+        return materials, id_col
+
+    if 'material_id' in materials.columns and 'material_id' in raw_gap_df.columns:
+        gap_cols = [c for c in RAW_GAP_MERGE_COLS if c in raw_gap_df.columns]
+        if gap_cols:
+            materials = materials.merge(
+                raw_gap_df[['material_id'] + gap_cols],
+                on='material_id',
+                how='left'
+            )
+    return materials, id_col
+
+
+def _classify_with_gap(product_ids, materials, id_col, alternative_analysis_df,
+                       has_bom, status, reason, can_produce, limiting):
+    """Fill status arrays in place for products whose BOM lines carry net_gap"""
+    net_gap = pd.to_numeric(materials['net_gap'], errors='coerce')
+    shortage_mask = (net_gap < 0).to_numpy()
+    owner = materials[id_col]
+
+    with_gap = set(owner[net_gap.notna().to_numpy()])
+    with_shortage = set(owner[shortage_mask])
+    covered = _covered_by_alternative(materials[shortage_mask], id_col, alternative_analysis_df)
+
+    ids = product_ids.to_numpy()
+    is_gap = product_ids.isin(with_gap).to_numpy() & has_bom
+    is_short = product_ids.isin(with_shortage).to_numpy() & is_gap
+    is_alt = product_ids.isin(covered).to_numpy() & is_short
+
+    no_gap = has_bom & ~is_gap
+    status[no_gap] = 'UNKNOWN'
+    reason[no_gap] = 'No GAP data for materials'
+    can_produce[no_gap] = True
+
+    sufficient = is_gap & ~is_short
+    status[sufficient] = 'SUFFICIENT'
+    reason[sufficient] = 'All materials available'
+    can_produce[sufficient] = True
+
+    status[is_alt] = 'USE_ALTERNATIVE'
+    reason[is_alt] = 'Alternative material available'
+    can_produce[is_alt] = True
+
+    shortage = is_short & ~is_alt
+    status[shortage] = 'SHORTAGE'
+    reason[shortage] = 'Raw materials insufficient'
+
+    # Limiting materials: shortage lines in BOM row order
+    if is_short.any():
+        shortage_rows = materials[shortage_mask]
+        if 'material_pt_code' in shortage_rows.columns:
+            codes = shortage_rows.groupby(id_col, sort=False)['material_pt_code'].agg(list)
+        else:
+            codes = pd.Series(dtype=object)
+        for pos in np.flatnonzero(is_short):
+            limiting[pos] = codes.get(ids[pos], [])
+
+
+def _covered_by_alternative(shortage_rows: pd.DataFrame, id_col: str,
+                            alternative_analysis_df: pd.DataFrame) -> set:
+    """Products with a primary shortage material that an alternative can cover"""
+    alt = alternative_analysis_df
+    if (shortage_rows.empty or alt.empty
+            or 'can_cover_shortage' not in alt.columns
+            or 'primary_material_id' not in alt.columns
+            or 'material_id' not in shortage_rows.columns):
+        return set()
+
+    can_cover = alt['can_cover_shortage'].fillna(False).astype(bool)
+    covered_materials = alt.loc[can_cover.to_numpy(), 'primary_material_id']
+
+    candidates = shortage_rows['material_id'].astype(bool)
+    if 'is_primary' in shortage_rows.columns:
+        candidates &= shortage_rows['is_primary'].astype(bool)
+    candidates &= shortage_rows['material_id'].isin(covered_materials)
+    return set(shortage_rows.loc[candidates.to_numpy(), id_col])
+
+
+def _bom_codes(product_ids: pd.Series, classification_df: pd.DataFrame) -> np.ndarray:
+    """First classification bom_code per product (None if unavailable)"""
+    if (classification_df.empty or 'product_id' not in classification_df.columns
+            or 'bom_code' not in classification_df.columns):
+        return np.full(len(product_ids), None, dtype=object)
+    first = classification_df.drop_duplicates('product_id', keep='first').set_index('product_id')['bom_code']
+    codes = first.reindex(product_ids).to_numpy(dtype=object)
+    # reindex turns missing products into NaN; the per-product lookup returned None
+    missing = ~product_ids.isin(first.index).to_numpy()
+    codes[missing] = None
+    return codes
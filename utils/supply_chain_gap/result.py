@@ -7,9 +7,11 @@ Holds all analysis results: FG GAP, Classification, Raw Material GAP, Actions
 
 import pandas as pd
 from dataclasses import dataclass, field
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Iterable, List, Optional
 from datetime import datetime
 
+from .production_status import compute_production_statuses, status_record_to_dict
+
 
 @dataclass
 class CustomerImpact:
@@ -51,6 +53,24 @@ class ActionRecommendation:
         }
 
 
+# Columnar action table: one row per recommendation, action_group selects
+# which list (mo_suggestions / po_fg_suggestions / po_raw_suggestions) it belongs to
+ACTION_GROUPS = {
+    'mo': 'Manufacturing Order',
+    'po_fg': 'PO for Finished Goods',
+    'po_raw': 'PO for Raw Material',
+}
+ACTION_COLUMNS = [
+    'action_group', 'action_type', 'product_id', 'pt_code', 'product_name',
+    'quantity', 'uom', 'priority', 'reason', 'brand', 'package_size',
+    'related_materials'
+]
+_ACTION_DICT_KEYS = [
+    'action_type', 'product_id', 'pt_code', 'product_name', 'package_size',
+    'brand', 'quantity', 'uom', 'priority', 'reason', 'related_materials'
+]
+
+
 @dataclass
 class SupplyChainGAPResult:
     """
@@ -80,19 +100,23 @@ class SupplyChainGAPResult:
     bom_explosion_df: pd.DataFrame = field(default_factory=pd.DataFrame)      # Single-level BOM (all BOMs)
     raw_demand_df: pd.DataFrame = field(default_factory=pd.DataFrame)
     raw_supply_df: pd.DataFrame = field(default_factory=pd.DataFrame)
+    raw_supply_detail_df: Optional[pd.DataFrame] = None                      # Inputs kept for incremental recalculation
+    raw_safety_stock_df: Optional[pd.DataFrame] = None
+    existing_mo_demand_df: Optional[pd.DataFrame] = None
     raw_gap_df: pd.DataFrame = field(default_factory=pd.DataFrame)            # Leaf (raw material) GAP
     semi_finished_gap_df: pd.DataFrame = field(default_factory=pd.DataFrame)  # Semi-finished GAP per level
     raw_metrics: Dict[str, Any] = field(default_factory=dict)
     alternative_analysis_df: pd.DataFrame = field(default_factory=pd.DataFrame)
     max_bom_depth: int = 0                                                    # Deepest BOM level reached
+    bom_graph: Optional[Any] = None                                           # BOMGraph compiled from bom_explosion_df
+    raw_pegging_df: pd.DataFrame = field(default_factory=pd.DataFrame)        # Leaf demand per (material, FG root, level)
     
-    # Actions
-    mo_suggestions: List[ActionRecommendation] = field(default_factory=list)
-    po_fg_suggestions: List[ActionRecommendation] = field(default_factory=list)
-    po_raw_suggestions: List[ActionRecommendation] = field(default_factory=list)
+    # Actions — columnar; ActionRecommendation lists are built on first access
+    actions_df: pd.DataFrame = field(default_factory=lambda: pd.DataFrame(columns=ACTION_COLUMNS))
     
     # Metadata
     filters_used: Dict[str, Any] = field(default_factory=dict)
+    load_stats: Dict[str, Any] = field(default_factory=dict)  # Load pipeline timings
     
     # Display filter (v2.3.1) — brand/product filter applied AFTER full calculation
     applied_display_filter: Dict[str, Any] = field(default_factory=dict)
@@ -106,6 +130,10 @@ class SupplyChainGAPResult:
     raw_period_gap_df: pd.DataFrame = field(default_factory=pd.DataFrame)
     raw_period_metrics: Dict[str, Any] = field(default_factory=dict)
     
+    # Production status per manufacturing product — see production_status.py
+    # (None = not built yet; built on first status lookup)
+    production_status_df: Optional[pd.DataFrame] = None
+    
     # =========================================================================
     # SUMMARY METHODS
     # =========================================================================
@@ -121,10 +149,10 @@ class SupplyChainGAPResult:
             'trading_count': len(self.trading_df),
             'raw_materials_count': len(self.raw_gap_df),
             'raw_shortage_count': len(self.get_raw_shortage()),
-            'mo_count': len(self.mo_suggestions),
-            'po_fg_count': len(self.po_fg_suggestions),
-            'po_raw_count': len(self.po_raw_suggestions),
-            'total_actions': len(self.mo_suggestions) + len(self.po_fg_suggestions) + len(self.po_raw_suggestions)
+            'mo_count': self.get_action_count('mo'),
+            'po_fg_count': self.get_action_count('po_fg'),
+            'po_raw_count': self.get_action_count('po_raw'),
+            'total_actions': len(self.actions_df)
         }
     
     def get_metrics(self) -> Dict[str, Any]:
@@ -155,9 +183,9 @@ class SupplyChainGAPResult:
             'affected_customers': self.customer_impact.affected_count if self.customer_impact else 0,
             
             # Action counts
-            'mo_count': len(self.mo_suggestions),
-            'po_fg_count': len(self.po_fg_suggestions),
-            'po_raw_count': len(self.po_raw_suggestions),
+            'mo_count': self.get_action_count('mo'),
+            'po_fg_count': self.get_action_count('po_fg'),
+            'po_raw_count': self.get_action_count('po_raw'),
             
             # Period analysis metrics (v2.2)
             'period_type': self.period_type,
@@ -299,9 +327,9 @@ class SupplyChainGAPResult:
             'affected_customers': self._count_filtered_customers(),
             
             # Action counts (filtered + total)
-            'mo_count': len(self.mo_suggestions),
-            'po_fg_count': len(self.po_fg_suggestions),
-            'po_raw_count': len(self.po_raw_suggestions),
+            'mo_count': self.get_action_count('mo'),
+            'po_fg_count': self.get_action_count('po_fg'),
+            'po_raw_count': self.get_action_count('po_raw'),
             
             # Period analysis
             'period_type': self.period_type,
@@ -436,9 +464,12 @@ class SupplyChainGAPResult:
         if id_col not in self.bom_explosion_df.columns:
             return pd.DataFrame()
         
-        materials = self.bom_explosion_df[
-            self.bom_explosion_df[id_col] == fg_product_id
-        ].copy()
+        if self.bom_graph is not None and self.bom_graph.bom_df is self.bom_explosion_df:
+            materials = self.bom_graph.bom_lines(fg_product_id).copy()
+        else:
+            materials = self.bom_explosion_df[
+                self.bom_explosion_df[id_col] == fg_product_id
+            ].copy()
         
         if materials.empty or self.raw_gap_df.empty:
             return materials
@@ -458,121 +489,115 @@ class SupplyChainGAPResult:
         
         return materials
     
+    def get_pegged_demand(self, fg_product_ids: Optional[Iterable] = None) -> pd.Series:
+        """
+        Raw material demand pegged to the given FG products (all FG if None),
+        summed over BOM levels → Series material_id → qty
+        """
+        peg = self.raw_pegging_df
+        if peg.empty:
+            return pd.Series(dtype=float)
+        if fg_product_ids is not None:
+            peg = peg[peg['fg_product_id'].isin(list(fg_product_ids))]
+        return peg.groupby('material_id')['pegged_qty'].sum()
+    
+    def get_material_pegging(self, material_id: int) -> pd.DataFrame:
+        """FG products a raw material's demand comes from, largest share first"""
+        peg = self.raw_pegging_df
+        if peg.empty:
+            return pd.DataFrame(columns=['fg_product_id', 'pegged_qty', 'min_bom_level', 'share'])
+        rows = peg[peg['material_id'] == material_id]
+        pegging = rows.groupby('fg_product_id', sort=False).agg(
+            pegged_qty=('pegged_qty', 'sum'),
+            min_bom_level=('bom_level', 'min')
+        ).reset_index()
+        total = pegging['pegged_qty'].sum()
+        pegging['share'] = pegging['pegged_qty'] / total if total > 0 else 0.0
+        
+        # FG descriptive columns
+        if not self.fg_gap_df.empty:
+            info_cols = [c for c in ['pt_code', 'product_name', 'brand', 'net_gap'] if c in self.fg_gap_df.columns]
+            if info_cols:
+                info = self.fg_gap_df.drop_duplicates('product_id').set_index('product_id')[info_cols]
+                pegging = pegging.join(info, on='fg_product_id')
+        return pegging.sort_values('pegged_qty', ascending=False, kind='mergesort').reset_index(drop=True)
+    
     def get_production_status(self, fg_product_id: int) -> Dict[str, Any]:
-        """Get production status for a specific FG product"""
+        """Get production status for a specific FG product (lookup in the status table)"""
         
         # Check if manufacturing product
         if self.manufacturing_df.empty:
             return {'product_type': 'UNKNOWN', 'can_produce': False, 'reason': 'No classification data'}
         
-        mfg_ids = self.manufacturing_df['product_id'].tolist()
-        if fg_product_id not in mfg_ids:
+        record = self._get_production_status_index().get(fg_product_id)
+        if record is None:
             return {'product_type': 'TRADING', 'can_produce': False, 'reason': 'Trading product - no BOM'}
-        
-        # Get raw materials
-        materials = self.get_raw_materials_for_fg(fg_product_id)
-        
-        if materials.empty:
-            return {
-                'product_type': 'MANUFACTURING',
-                'can_produce': False,
-                'reason': 'No BOM materials found',
-                'bom_code': self._get_bom_code(fg_product_id)
-            }
-        
-        # Check if net_gap exists
-        if 'net_gap' not in materials.columns:
-            return {
-                'product_type': 'MANUFACTURING',
-                'can_produce': True,
-                'status': 'UNKNOWN',
-                'reason': 'GAP data not available',
-                'bom_code': self._get_bom_code(fg_product_id)
-            }
-        
-        # Check for shortages
-        materials_with_gap = materials[materials['net_gap'].notna()]
-        if materials_with_gap.empty:
-            return {
-                'product_type': 'MANUFACTURING',
-                'can_produce': True,
-                'status': 'UNKNOWN',
-                'reason': 'No GAP data for materials',
-                'bom_code': self._get_bom_code(fg_product_id)
-            }
-        
-        shortage_materials = materials_with_gap[materials_with_gap['net_gap'] < 0]
-        
-        if shortage_materials.empty:
-            return {
-                'product_type': 'MANUFACTURING',
-                'can_produce': True,
-                'status': 'SUFFICIENT',
-                'reason': 'All materials available',
-                'bom_code': self._get_bom_code(fg_product_id)
-            }
-        
-        # Check alternatives
-        if not self.alternative_analysis_df.empty and 'can_cover_shortage' in self.alternative_analysis_df.columns:
-            for _, row in shortage_materials.iterrows():
-                if row.get('is_primary', True):
-                    mat_id = row.get('material_id')
-                    if mat_id and 'primary_material_id' in self.alternative_analysis_df.columns:
-                        alts = self.alternative_analysis_df[
-                            self.alternative_analysis_df['primary_material_id'] == mat_id
-                        ]
-                        if not alts.empty and alts['can_cover_shortage'].any():
-                            return {
-                                'product_type': 'MANUFACTURING',
-                                'can_produce': True,
-                                'status': 'USE_ALTERNATIVE',
-                                'reason': 'Alternative material available',
-                                'bom_code': self._get_bom_code(fg_product_id),
-                                'limiting_materials': self._get_material_codes(shortage_materials)
-                            }
-        
-        return {
-            'product_type': 'MANUFACTURING',
-            'can_produce': False,
-            'status': 'SHORTAGE',
-            'reason': 'Raw materials insufficient',
-            'bom_code': self._get_bom_code(fg_product_id),
-            'limiting_materials': self._get_material_codes(shortage_materials)
-        }
+        return status_record_to_dict(record)
     
-    def _get_bom_code(self, product_id: int) -> Optional[str]:
-        """Get BOM code for product"""
-        if self.classification_df.empty or 'product_id' not in self.classification_df.columns:
-            return None
-        match = self.classification_df[self.classification_df['product_id'] == product_id]
-        if not match.empty and 'bom_code' in match.columns:
-            return match.iloc[0].get('bom_code')
-        return None
-    
-    def _get_material_codes(self, materials_df: pd.DataFrame) -> List[str]:
-        """Get material codes from dataframe"""
-        if 'material_pt_code' in materials_df.columns:
-            return materials_df['material_pt_code'].tolist()
-        return []
+    def build_production_statuses(self, product_ids: Optional[Iterable] = None) -> pd.DataFrame:
+        """
+        (Re)build the production status table from the current BOM, raw GAP
+        and alternatives. Call after replacing any of those frames.
+        
+        Args:
+            product_ids: Recompute only these products and keep the other rows
+                of the existing table (full rebuild if None or no table yet)
+        """
+        inputs = dict(
+            classification_df=self.classification_df,
+            bom_explosion_df=self.bom_explosion_df,
+            raw_gap_df=self.raw_gap_df,
+            alternative_analysis_df=self.alternative_analysis_df
+        )
+        if product_ids is not None and self.production_status_df is not None:
+            ids = set(product_ids)
+            scope = self.manufacturing_df
+            if not scope.empty:
+                scope = scope[scope['product_id'].isin(ids)]
+            table = self.production_status_df
+            mfg_ids = self.manufacturing_df['product_id'] if 'product_id' in self.manufacturing_df.columns else []
+            keep = ~table['product_id'].isin(ids) & table['product_id'].isin(mfg_ids)
+            # New frame rather than in-place: shallow copies share the old one
+            table = pd.concat([
+                table[keep],
+                compute_production_statuses(manufacturing_df=scope, **inputs)
+            ], ignore_index=True)
+        else:
+            table = compute_production_statuses(manufacturing_df=self.manufacturing_df, **inputs)
+        
+        self.production_status_df = table
+        self._production_status_index = None
+        self._production_status_cache = None
+        return table
+    
+    def _get_production_status_index(self) -> Dict[Any, Dict[str, Any]]:
+        """product_id → status table row (built on first access)"""
+        index = self.__dict__.get('_production_status_index')
+        if index is None:
+            if self.production_status_df is None:
+                self.build_production_statuses()
+            table = self.production_status_df
+            index = dict(zip(table['product_id'].tolist(), table.to_dict('records')))
+            self._production_status_index = index
+        return index
     
     def get_all_production_statuses(self) -> Dict[int, Dict[str, Any]]:
         """
         Get production status for ALL manufacturing shortage products at once.
-        Caches result to avoid repeated per-row computation.
+        Read from the status table; the dict is cached.
         
         Returns:
             Dict mapping product_id → production status dict
         """
         # Return cached result if available
-        if hasattr(self, '_production_status_cache') and self._production_status_cache:
+        if getattr(self, '_production_status_cache', None):
             return self._production_status_cache
         
         cache = {}
         mfg_shortage = self.get_manufacturing_shortage()
-        
-        for _, row in mfg_shortage.iterrows():
-            product_id = row['product_id']
-            cache[product_id] = self.get_production_status(product_id)
+        if not mfg_shortage.empty:
+            for product_id in mfg_shortage['product_id'].tolist():
+                cache[product_id] = self.get_production_status(product_id)
         
         self._production_status_cache = cache
         return cache
@@ -581,35 +606,78 @@ class SupplyChainGAPResult:
     # ACTION ACCESSORS
     # =========================================================================
     
-    def get_all_actions(self) -> List[Dict[str, Any]]:
-        """Get all action recommendations as list of dicts"""
-        actions = []
-        
-        for mo in self.mo_suggestions:
-            d = mo.to_dict()
-            d['category'] = 'Manufacturing Order'
-            actions.append(d)
-        
-        for po in self.po_fg_suggestions:
-            d = po.to_dict()
-            d['category'] = 'PO for Finished Goods'
-            actions.append(d)
-        
-        for po in self.po_raw_suggestions:
-            d = po.to_dict()
-            d['category'] = 'PO for Raw Material'
-            actions.append(d)
-        
-        # Sort by priority
-        actions.sort(key=lambda x: x['priority'])
-        return actions
+    @property
+    def mo_suggestions(self) -> List[ActionRecommendation]:
+        return self._get_actions('mo')
+    
+    @mo_suggestions.setter
+    def mo_suggestions(self, actions: List[ActionRecommendation]):
+        self._set_actions('mo', actions)
+    
+    @property
+    def po_fg_suggestions(self) -> List[ActionRecommendation]:
+        return self._get_actions('po_fg')
+    
+    @po_fg_suggestions.setter
+    def po_fg_suggestions(self, actions: List[ActionRecommendation]):
+        self._set_actions('po_fg', actions)
+    
+    @property
+    def po_raw_suggestions(self) -> List[ActionRecommendation]:
+        return self._get_actions('po_raw')
+    
+    @po_raw_suggestions.setter
+    def po_raw_suggestions(self, actions: List[ActionRecommendation]):
+        self._set_actions('po_raw', actions)
+    
+    def set_actions_table(self, actions_df: pd.DataFrame):
+        """Replace the action table (drops ActionRecommendation objects built from the old one)"""
+        self.actions_df = actions_df
+        self._action_objects = {}
+    
+    def get_action_count(self, group: str) -> int:
+        """Number of actions in a group ('mo', 'po_fg', 'po_raw') without building objects"""
+        if self.actions_df.empty:
+            return 0
+        return int((self.actions_df['action_group'] == group).sum())
+    
+    def _get_actions(self, group: str) -> List[ActionRecommendation]:
+        cache = self.__dict__.setdefault('_action_objects', {})
+        if group not in cache:
+            rows = self.actions_df[self.actions_df['action_group'] == group]
+            cache[group] = [
+                ActionRecommendation(**{k: r[k] for k in _ACTION_DICT_KEYS})
+                for r in rows.to_dict('records')
+            ]
+        return cache[group]
+    
+    def _set_actions(self, group: str, actions: List[ActionRecommendation]):
+        # New dict/frame rather than in-place: shallow session copies share them
+        actions = list(actions)
+        frames = []
+        for g in ACTION_GROUPS:
+            if g == group:
+                frames.append(pd.DataFrame(
+                    [{'action_group': g, **a.to_dict()} for a in actions], columns=ACTION_COLUMNS
+                ))
+            else:
+                frames.append(self.actions_df[self.actions_df['action_group'] == g])
+        self.actions_df = pd.concat(frames, ignore_index=True)
+        self._action_objects = {**self.__dict__.get('_action_objects', {}), group: actions}
     
     def get_actions_dataframe(self) -> pd.DataFrame:
-        """Get all actions as DataFrame"""
-        actions = self.get_all_actions()
-        if not actions:
+        """Get all actions as DataFrame (sorted by priority)"""
+        if self.actions_df.empty:
             return pd.DataFrame()
-        return pd.DataFrame(actions)
+        actions = self.actions_df.sort_values('priority', kind='mergesort')
+        actions = actions[_ACTION_DICT_KEYS].assign(
+            category=actions['action_group'].map(ACTION_GROUPS)
+        )
+        return actions.reset_index(drop=True)
+    
+    def get_all_actions(self) -> List[Dict[str, Any]]:
+        """Get all action recommendations as list of dicts"""
+        return self.get_actions_dataframe().to_dict('records')
     
     # =========================================================================
     # FILTERED ACTION ACCESSORS (v2.3.1)
@@ -625,45 +693,38 @@ class SupplyChainGAPResult:
             mo_filtered, mo_total, po_fg_filtered, po_fg_total,
             po_raw_filtered, po_raw_total
         """
-        counts = {
-            'mo_filtered': len(self.mo_suggestions),
-            'mo_total': len(self.mo_suggestions),
-            'po_fg_filtered': len(self.po_fg_suggestions),
-            'po_fg_total': len(self.po_fg_suggestions),
-            'po_raw_filtered': len(self.po_raw_suggestions),
-            'po_raw_total': len(self.po_raw_suggestions),
-        }
+        counts = {}
+        for group in ACTION_GROUPS:
+            total = self.get_action_count(group)
+            counts[f'{group}_filtered'] = total
+            counts[f'{group}_total'] = total
         
-        if not self.has_display_filter():
+        if not self.has_display_filter() or self.actions_df.empty:
             return counts
         
+        groups = self.actions_df['action_group']
+        product_ids = self.actions_df['product_id']
+        
         # Get filtered FG product IDs
         filtered_fg_ids = set()
         if not self.fg_gap_df.empty and 'in_filter' in self.fg_gap_df.columns:
             filtered_fg_ids = set(
                 self.fg_gap_df[self.fg_gap_df['in_filter']]['product_id'].tolist()
             )
+        in_fg_scope = product_ids.isin(filtered_fg_ids)
         
-        # MO: filter by FG product_id
-        counts['mo_filtered'] = sum(
-            1 for mo in self.mo_suggestions if mo.product_id in filtered_fg_ids
-        )
-        
-        # PO-FG: filter by FG product_id
-        counts['po_fg_filtered'] = sum(
-            1 for po in self.po_fg_suggestions if po.product_id in filtered_fg_ids
-        )
+        # MO / PO-FG: filter by FG product_id
+        counts['mo_filtered'] = int(((groups == 'mo') & in_fg_scope).sum())
+        counts['po_fg_filtered'] = int(((groups == 'po_fg') & in_fg_scope).sum())
         
         # PO-Raw: filter by materials that have demand from selected brand/product
         if not self.raw_gap_df.empty and 'demand_from_selected' in self.raw_gap_df.columns:
             related_material_ids = set(
                 self.raw_gap_df[self.raw_gap_df['demand_from_selected'] > 0]['material_id'].tolist()
             )
-            counts['po_raw_filtered'] = sum(
-                1 for po in self.po_raw_suggestions if po.product_id in related_material_ids
+            counts['po_raw_filtered'] = int(
+                ((groups == 'po_raw') & product_ids.isin(related_material_ids)).sum()
             )
-        else:
-            counts['po_raw_filtered'] = counts['po_raw_total']
         
         return counts
     
@@ -684,7 +745,7 @@ class SupplyChainGAPResult:
         return not self.semi_finished_gap_df.empty
     
     def has_actions(self) -> bool:
-        return len(self.mo_suggestions) > 0 or len(self.po_fg_suggestions) > 0 or len(self.po_raw_suggestions) > 0
+        return not self.actions_df.empty
     
     def has_period_data(self) -> bool:
         return not self.fg_period_gap_df.empty
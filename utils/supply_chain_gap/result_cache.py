@@ -0,0 +1,479 @@
+# utils/supply_chain_gap/result_cache.py
+
+"""
+Shared Result Cache for Supply Chain GAP Analysis
+
+Pressing Analyze reloads every source view and recomputes the full multi-level
+GAP, even when nothing changed since the previous run. This cache keeps
+SupplyChainGAPResult objects process-wide (shared by all Streamlit sessions),
+keyed on the calculation filters, and re-validates each entry against cheap
+per-table change markers (max id, max updated/created date, row count on
+small tables).
+
+- Key: entity + supply/demand sources + safety/alternative/MO flags +
+  period type + backlog. Brand/product are display filters and NOT in the key.
+- Validation: markers are probed on every lookup (one small query per table);
+  any difference → entry dropped and recomputed. Besides marker_tables, the
+  base tables of marker_views (OC / forecast demand, safety stock) are
+  resolved once from information_schema. Large tables skip COUNT(*) and are
+  probed on MAX(id) and indexed timestamp columns only, so a hard delete
+  there is caught by max_age_seconds, the safety net for unmarked changes.
+- Single-flight: concurrent lookups for the same key wait for one computation.
+- Optional persistence: set SCG_RESULT_CACHE_DIR to spill entries to disk
+  (pickle) so they survive a Streamlit restart.
+- Incremental refresh: production writers (MO create/edit/confirm/cancel/
+  delete, issues, returns, receipts) call notify_changes() with the products
+  they touched and the marker-table rows they wrote. A stale entry is patched
+  through the caller's incremental callable only when the marker delta is
+  fully explained by those rows: per changed table, no row past the old
+  marker outside the notified ids, and the COUNT(*) delta equals the rows
+  inserted (no deletes). Anything else (PO/arrival writes, other processes,
+  un-notified edits) → full compute.
+
+VERSION: 1.3.0
+"""
+
+import os
+import copy
+import time
+import pickle
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, Any, Optional, Tuple, Callable, Iterable, List, Set
+
+from .constants import RESULT_CACHE_CONFIG
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CacheEntry:
+    """Cached result + the change markers it was computed against"""
+    result: Any
+    markers: Dict[str, Optional[Tuple]]
+    created_at: float = field(default_factory=time.time)
+    hits: int = 0
+    probed_at: Optional[float] = None     # When markers were probed (incremental refresh)
+
+
+@dataclass
+class ChangeNotice:
+    """Products touched by a committed write + the marker-table rows it wrote"""
+    product_ids: Tuple[int, ...]
+    rows: Dict[str, Tuple[int, ...]]
+    at: float = field(default_factory=time.time)
+
+
+def make_cache_key(filter_values: Dict[str, Any]) -> Tuple:
+    """Normalized, hashable key for the calculation-relevant filters"""
+    def _sorted(values):
+        return tuple(sorted(values)) if values else ()
+
+    return (
+        filter_values.get('entity'),
+        _sorted(filter_values.get('supply_sources')),
+        _sorted(filter_values.get('demand_sources')),
+        bool(filter_values.get('include_fg_safety', True)),
+        bool(filter_values.get('include_raw_safety', True)),
+        bool(filter_values.get('include_alternatives', True)),
+        filter_values.get('alternative_mode', 'single'),
+        bool(filter_values.get('include_existing_mo', True)),
+        bool(filter_values.get('include_draft_mo', False)),
+        bool(filter_values.get('exclude_expired', True)),
+        filter_values.get('period_type', 'Weekly'),
+        bool(filter_values.get('track_backlog', True)),
+    )
+
+
+def copy_for_session(result):
+    """
+    Per-session view of a shared result.
+    The page post-processes results in place (display filter columns on
+    fg_gap_df / raw_gap_df), so those frames are copied; everything else is
+    shared read-only.
+    """
+    session_result = copy.copy(result)
+    session_result.fg_gap_df = result.fg_gap_df.copy()
+    session_result.raw_gap_df = result.raw_gap_df.copy()
+    session_result.applied_display_filter = {}
+    return session_result
+
+
+class GAPResultCache:
+    """Process-wide LRU cache of SupplyChainGAPResult with marker invalidation"""
+
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        max_age_seconds: Optional[int] = None,
+        marker_tables: Optional[Dict[str, Tuple[str, ...]]] = None,
+        persist_dir: Optional[str] = None
+    ):
+        self.max_entries = max_entries or RESULT_CACHE_CONFIG['max_entries']
+        self.max_age_seconds = max_age_seconds or RESULT_CACHE_CONFIG['max_age_seconds']
+        self.marker_tables = marker_tables or RESULT_CACHE_CONFIG['marker_tables']
+        self.marker_views = RESULT_CACHE_CONFIG.get('marker_views', ())
+        self.uncounted_tables = set(RESULT_CACHE_CONFIG.get('uncounted_tables', ()))
+        self._marker_spec: Optional[Dict[str, Tuple[str, ...]]] = None
+        self.persist_dir = persist_dir
+        if self.persist_dir:
+            os.makedirs(self.persist_dir, exist_ok=True)
+
+        self._entries: 'OrderedDict[Tuple, CacheEntry]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._key_locks: Dict[Tuple, threading.Lock] = {}
+        self._notices: List[ChangeNotice] = []
+        self._stats = {'hits': 0, 'misses': 0, 'invalidations': 0, 'incremental': 0}
+
+    # =========================================================================
+    # PUBLIC API
+    # =========================================================================
+
+    def get_or_compute(
+        self,
+        filter_values: Dict[str, Any],
+        data_loader,
+        compute: Callable[[], Any],
+        force_refresh: bool = False,
+        incremental: Optional[Callable[[Any, Tuple[int, ...]], Any]] = None
+    ) -> Tuple[Any, bool]:
+        """
+        Return (session copy of result, from_cache).
+
+        Args:
+            filter_values: GAP page filters
+            data_loader: SupplyChainDataLoader (used to probe change markers)
+            compute: zero-arg callable producing a fresh SupplyChainGAPResult
+                (may return None, which is not cached)
+            force_refresh: skip lookup and replace the entry (Refresh button)
+            incremental: (previous result, changed product IDs) → patched
+                result or None; used when the marker changes are fully
+                explained by notify_changes() notices
+        """
+        key = make_cache_key(filter_values)
+
+        with self._get_key_lock(key):
+            # Markers probed BEFORE loading: a change during the load makes the
+            # next lookup miss, never serves stale data.
+            probed_at = time.time()
+            markers = self._probe_markers(data_loader)
+
+            if not force_refresh:
+                entry, stale = self._lookup(key, markers)
+                if entry is not None:
+                    return copy_for_session(entry.result), True
+
+                if stale is not None and incremental is not None:
+                    result = self._recalculate(stale, markers, incremental, data_loader)
+                    if result is not None:
+                        # created_at kept: max age still bounds unmarked changes
+                        self._store(key, CacheEntry(
+                            result=result, markers=markers,
+                            created_at=stale.created_at, probed_at=probed_at
+                        ))
+                        return copy_for_session(result), False
+
+            result = compute()
+            if result is None:
+                return None, False
+            self._store(key, CacheEntry(result=result, markers=markers, probed_at=probed_at))
+            return copy_for_session(result), False
+
+    def notify_changes(self, product_ids: Iterable[int], rows: Dict[str, Iterable[int]]):
+        """
+        Record a committed write: the products it touched and, per marker
+        table, the ids of the rows it inserted or updated. Call AFTER the
+        transaction commits.
+        """
+        ids = tuple(sorted({int(i) for i in product_ids if i is not None}))
+        rows = {
+            table: tuple(sorted({int(r) for r in row_ids if r is not None}))
+            for table, row_ids in rows.items()
+        }
+        if not ids or not rows:
+            return
+        now = time.time()
+        with self._lock:
+            self._notices = [n for n in self._notices if now - n.at <= self.max_age_seconds]
+            self._notices.append(ChangeNotice(product_ids=ids, rows=rows, at=now))
+
+    def invalidate(self, filter_values: Optional[Dict[str, Any]] = None):
+        """Drop one entry (by filters) or everything"""
+        with self._lock:
+            if filter_values is None:
+                keys = list(self._entries)
+                self._entries.clear()
+            else:
+                key = make_cache_key(filter_values)
+                keys = [key]
+                self._entries.pop(key, None)
+        for key in keys:
+            self._delete_persisted(key)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self._stats,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+            }
+
+    # =========================================================================
+    # INTERNALS
+    # =========================================================================
+
+    def _get_key_lock(self, key: Tuple) -> threading.Lock:
+        with self._lock:
+            if key not in self._key_locks:
+                self._key_locks[key] = threading.Lock()
+            return self._key_locks[key]
+
+    def _probe_markers(self, data_loader) -> Dict[str, Optional[Tuple]]:
+        try:
+            spec = self._resolve_marker_spec(data_loader)
+            return data_loader.load_change_markers(spec, uncounted=self.uncounted_tables)
+        except Exception as e:
+            logger.warning(f"Change marker probe failed, cache bypassed: {e}")
+            return {}
+
+    def _resolve_marker_spec(self, data_loader) -> Dict[str, Tuple[str, ...]]:
+        """
+        Tables to probe → timestamp columns, resolved once per process:
+        marker_tables plus the base tables of marker_views; timestamp columns
+        on uncounted tables are kept only when they lead an index.
+        """
+        if self._marker_spec is not None:
+            return self._marker_spec
+
+        spec = dict(self.marker_tables)
+        view_columns = tuple(RESULT_CACHE_CONFIG.get('view_marker_columns', ()))
+        try:
+            view_tables = [
+                t for t in data_loader.resolve_view_tables(self.marker_views)
+                if t not in spec
+            ]
+        except Exception as e:
+            # Retried on the next lookup; max age covers demand/safety changes meanwhile
+            logger.warning(f"Could not resolve marker view tables: {e}")
+            return spec
+        for table in view_tables:
+            spec[table] = view_columns
+        self.uncounted_tables.update(view_tables)
+
+        uncounted = [t for t in spec if t in self.uncounted_tables]
+        columns = {c for t in uncounted for c in spec[t]}
+        try:
+            described = data_loader.describe_marker_columns(uncounted, columns)
+        except Exception as e:
+            logger.warning(f"Could not check marker column indexes, probing MAX(id) only: {e}")
+            described = {}
+        for table in uncounted:
+            indexed = described.get(table, {})
+            spec[table] = tuple(c for c in spec[table] if indexed.get(c))
+
+        if view_tables:
+            logger.info(f"GAP result cache also probes view tables: {', '.join(view_tables)}")
+        self._marker_spec = spec
+        return spec
+
+    def _lookup(
+        self,
+        key: Tuple,
+        markers: Dict[str, Optional[Tuple]]
+    ) -> Tuple[Optional[CacheEntry], Optional[CacheEntry]]:
+        """(valid entry, None) on hit; (None, dropped entry or None) on miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            entry = self._load_persisted(key)
+
+        if entry is None:
+            self._count('misses')
+            return None, None
+
+        reason = self._invalid_reason(entry, markers)
+        if reason:
+            logger.info(f"GAP result cache invalidated ({reason})")
+            self._count('invalidations')
+            self._count('misses')
+            with self._lock:
+                self._entries.pop(key, None)
+            self._delete_persisted(key)
+            return None, entry
+
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            entry.hits += 1
+            self._stats['hits'] += 1
+        logger.info(
+            f"GAP result cache hit (age {int(time.time() - entry.created_at)}s, "
+            f"{entry.hits} hits)"
+        )
+        return entry, None
+
+    def _invalid_reason(self, entry: CacheEntry, markers: Dict[str, Optional[Tuple]]) -> Optional[str]:
+        if time.time() - entry.created_at > self.max_age_seconds:
+            return 'max age exceeded'
+        if not markers:
+            return 'markers unavailable'
+        changed = self._changed_tables(entry, markers)
+        if changed:
+            return f"changed: {', '.join(changed)}"
+        return None
+
+    @staticmethod
+    def _changed_tables(entry: CacheEntry, markers: Dict[str, Optional[Tuple]]) -> List[str]:
+        return [t for t, m in markers.items() if m is None or entry.markers.get(t) != m]
+
+    def _recalculate(
+        self,
+        stale: CacheEntry,
+        markers: Dict[str, Optional[Tuple]],
+        incremental: Callable[[Any, Tuple[int, ...]], Any],
+        data_loader
+    ) -> Optional[Any]:
+        """Patch a stale entry if notify_changes() explains every marker change"""
+        if not RESULT_CACHE_CONFIG.get('incremental_on_notify', True):
+            return None
+        if not markers or time.time() - stale.created_at > self.max_age_seconds:
+            return None
+        probed_at = getattr(stale, 'probed_at', None)
+        if probed_at is None:
+            return None
+
+        changed = self._changed_tables(stale, markers)
+        ids, rows = self._notified_changes(since=probed_at)
+        if not ids or not changed:
+            return None
+        unexplained = self._unexplained_table(data_loader, stale.markers, markers, changed, rows)
+        if unexplained:
+            logger.info(f"GAP result cache: {unexplained} changed beyond notified rows, recomputing")
+            return None
+
+        try:
+            result = incremental(stale.result, ids)
+        except Exception as e:
+            logger.warning(f"Incremental GAP recalculation failed, recomputing: {e}", exc_info=True)
+            return None
+        if result is not None:
+            self._count('incremental')
+            logger.info(f"GAP result cache patched incrementally ({len(ids)} products, {', '.join(changed)})")
+        return result
+
+    def _notified_changes(self, since: float) -> Tuple[Tuple[int, ...], Dict[str, Set[int]]]:
+        """Product IDs and per-table row ids notified since `since`"""
+        with self._lock:
+            notices = [n for n in self._notices if n.at >= since]
+        ids: Set[int] = set()
+        rows: Dict[str, Set[int]] = {}
+        for notice in notices:
+            ids.update(notice.product_ids)
+            for table, row_ids in notice.rows.items():
+                rows.setdefault(table, set()).update(row_ids)
+        return tuple(sorted(ids)), rows
+
+    @staticmethod
+    def _unexplained_table(
+        data_loader,
+        old_markers: Dict[str, Optional[Tuple]],
+        new_markers: Dict[str, Optional[Tuple]],
+        changed: List[str],
+        rows: Dict[str, Set[int]]
+    ) -> Optional[str]:
+        """First changed table whose marker delta the notified rows don't explain"""
+        for table in changed:
+            old, new = old_markers.get(table), new_markers.get(table)
+            if old is None or new is None:
+                return table
+            old, new = dict(old), dict(new)
+            if old.keys() != new.keys():
+                return table  # probe fell back to fewer columns
+            counts = data_loader.count_changes_since(table, old, rows.get(table, ()))
+            if counts is None:
+                return table
+            outside, inserted = counts
+            if outside:
+                return table
+            if 'count' in old and new['count'] - old['count'] != inserted:
+                return table  # rows deleted
+        return None
+
+    def _store(self, key: Tuple, entry: CacheEntry):
+        if not entry.markers:
+            return  # cannot be validated later — don't cache
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            evicted = []
+            while len(self._entries) > self.max_entries:
+                evicted.append(self._entries.popitem(last=False)[0])
+        for old_key in evicted:
+            self._delete_persisted(old_key)
+        self._persist(key, entry)
+
+    def _count(self, stat: str):
+        with self._lock:
+            self._stats[stat] += 1
+
+    # -------------------------------------------------------------------------
+    # Optional disk persistence
+    # -------------------------------------------------------------------------
+
+    def _path(self, key: Tuple) -> Optional[str]:
+        if not self.persist_dir:
+            return None
+        schema = RESULT_CACHE_CONFIG.get('schema_version', 1)
+        digest = hashlib.sha1(repr((schema, key)).encode('utf-8')).hexdigest()
+        return os.path.join(self.persist_dir, f"scg_result_{digest}.pkl")
+
+    def _persist(self, key: Tuple, entry: CacheEntry):
+        path = self._path(key)
+        if not path:
+            return
+        try:
+            tmp = f"{path}.tmp"
+            with open(tmp, 'wb') as f:
+                pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, path)
+        except Exception as e:
+            logger.warning(f"Could not persist GAP result cache entry: {e}")
+
+    def _load_persisted(self, key: Tuple) -> Optional[CacheEntry]:
+        path = self._path(key)
+        if not path or not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'rb') as f:
+                return pickle.load(f)
+        except Exception as e:
+            logger.warning(f"Could not read persisted GAP result cache entry: {e}")
+            return None
+
+    def _delete_persisted(self, key: Tuple):
+        path = self._path(key)
+        if path and os.path.exists(path):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+# Singleton (process-wide, shared by all sessions)
+_result_cache_instance = None
+_result_cache_lock = threading.Lock()
+
+
+def get_result_cache() -> GAPResultCache:
+    """Get process-wide GAP result cache"""
+    global _result_cache_instance
+    if _result_cache_instance is None:
+        with _result_cache_lock:
+            if _result_cache_instance is None:
+                _result_cache_instance = GAPResultCache(
+                    persist_dir=os.environ.get(RESULT_CACHE_CONFIG['persist_dir_env']) or None
+                )
+    return _result_cache_instance
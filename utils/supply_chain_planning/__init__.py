@@ -8,9 +8,12 @@ from .planning_constants import (
     LEAD_TIME_DEFAULTS, LEAD_TIME_BUFFER_DAYS, LEAD_TIME_BUFFER_ADAPTIVE,
     VENDOR_RELIABILITY,
     MOQ_SPQ_CONFIG, PRICE_SOURCE, SHORTAGE_SOURCE,
-    PO_SUGGESTION_STATUS, PO_PLANNING_UI,
+    PO_SUGGESTION_STATUS, PO_PLANNING_UI, LAST_PO_SNAPSHOT_CONFIG,
 )
 from .planning_data_loader import PlanningDataLoader, get_planning_data_loader
+from .last_po_snapshot import (
+    LastPOPriceSnapshot, get_last_po_snapshot, refresh_last_po_snapshot,
+)
 from .po_pricing_resolver import POPricingResolver, VendorMatch, QuantitySuggestion
 from .po_lead_time_calculator import (
     POLeadTimeCalculator, LeadTimeResult, OrderTimingResult
@@ -0,0 +1,483 @@
+# utils/supply_chain_planning/last_po_snapshot.py
+
+"""
+Maintained "last PO price" snapshot — one row per vendor × product.
+
+load_last_po_prices used to rank ALL product_purchase_orders rows with
+ROW_NUMBER() on every planning run, so start-up grew with PO history.
+The snapshot lives in DB tables (created on first refresh), so a cold
+start reads it instead of re-ranking:
+
+    scp_last_po_prices       (vendor_id, product_id) → latest priced PO line
+                             (ids, prices, uom, currency id, PO date/number)
+    scp_last_po_line_buckets product_purchase_orders checksum per id bucket
+                             (id DIV line_bucket_size): line count + SUM(CRC32)
+                             of the columns the snapshot depends on
+    scp_last_po_state        refresh watermarks (PO header time, PO line
+                             high-water id), schema version, last sweep time
+
+Labels (vendor, product, uom, currency code) are joined at read time, so
+renames need no rebuild. The full ranked query runs only on the first
+refresh, on a schema_version change, or when asked (full=True).
+
+Delta refresh — the read path (at most every refresh_on_read_seconds across
+all processes, serialized with GET_LOCK); index lookups only:
+  1. Changed products = lines of POs created/updated since the watermark
+     (purchase_orders.created_date / updated_date)
+     ∪ products of lines above the high-water id (new lines, PK range)
+  2. The ranked query is re-run for THOSE products only and their snapshot
+     rows are replaced
+  3. Watermarks advance to the DB time / MAX(id) read before step 1
+     (time minus an overlap)
+
+Checksum sweep — line edits without a header update (unit_cost,
+delete_flag, ...) and deleted lines: product_purchase_orders checksummed per
+id bucket; products of changed buckets (and snapshot products whose line
+sits in one) are added to step 1. The sweep reads the whole line table, so
+the page never runs it: get() starts it on a background thread at most every
+sweep_interval_seconds (across processes), and the refresh job runs it:
+
+    from utils.supply_chain_planning.last_po_snapshot import refresh_last_po_snapshot
+    refresh_last_po_snapshot()          # e.g. from cron / scheduler
+"""
+
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import pandas as pd
+from sqlalchemy import text
+
+from .planning_constants import LAST_PO_SNAPSHOT_CONFIG
+
+logger = logging.getLogger(__name__)
+
+PRICES_TABLE = 'scp_last_po_prices'
+BUCKETS_TABLE = 'scp_last_po_line_buckets'
+STATE_TABLE = 'scp_last_po_state'
+
+STATE_NAME = 'last_po_prices'
+LOCK_NAME = 'scp_last_po_snapshot'
+CHUNK_SIZE = 500
+
+_CREATE_TABLES = [
+    f"""
+    CREATE TABLE IF NOT EXISTS {PRICES_TABLE} (
+        vendor_id BIGINT NOT NULL,
+        product_id BIGINT NOT NULL,
+        ppo_id BIGINT NOT NULL,
+        purchase_order_id BIGINT NOT NULL,
+        standard_unit_price DECIMAL(24, 8),
+        buying_unit_price DECIMAL(24, 8),
+        buying_uom VARCHAR(50),
+        uom_conversion VARCHAR(50),
+        currency_id BIGINT,
+        usd_exchange_rate DECIMAL(24, 8),
+        last_po_qty DECIMAL(24, 5),
+        po_date DATE,
+        po_number VARCHAR(100),
+        PRIMARY KEY (vendor_id, product_id),
+        KEY idx_slpp_product (product_id),
+        KEY idx_slpp_ppo (ppo_id)
+    )
+    """,
+    f"""
+    CREATE TABLE IF NOT EXISTS {BUCKETS_TABLE} (
+        bucket BIGINT NOT NULL PRIMARY KEY,
+        line_count BIGINT NOT NULL,
+        checksum DECIMAL(30, 0) NOT NULL
+    )
+    """,
+    f"""
+    CREATE TABLE IF NOT EXISTS {STATE_TABLE} (
+        name VARCHAR(64) NOT NULL PRIMARY KEY,
+        watermark DATETIME NOT NULL,
+        max_line_id BIGINT NOT NULL DEFAULT 0,
+        schema_version INT NOT NULL,
+        rebuilt_date DATETIME NOT NULL,
+        refreshed_date DATETIME NOT NULL,
+        swept_date DATETIME NOT NULL
+    )
+    """,
+]
+
+# Latest priced PO line per vendor × product
+_INSERT_RANKED = f"""
+INSERT INTO {PRICES_TABLE} (
+    vendor_id, product_id, ppo_id, purchase_order_id,
+    standard_unit_price, buying_unit_price, buying_uom, uom_conversion,
+    currency_id, usd_exchange_rate, last_po_qty, po_date, po_number
+)
+SELECT
+    vendor_id, product_id, ppo_id, purchase_order_id,
+    standard_unit_price, buying_unit_price, buying_uom, uom_conversion,
+    currency_id, usd_exchange_rate, last_po_qty, po_date, po_number
+FROM (
+    SELECT
+        po.seller_company_id AS vendor_id,
+        ppo.product_id,
+        ppo.id AS ppo_id,
+        po.id AS purchase_order_id,
+        ppo.unit_cost AS standard_unit_price,
+        ppo.purchase_unit_cost AS buying_unit_price,
+        ppo.purchaseuom AS buying_uom,
+        ppo.conversion AS uom_conversion,
+        po.currency_id,
+        po.usd_exchange_rate,
+        ppo.quantity AS last_po_qty,
+        CAST(po.po_date AS DATE) AS po_date,
+        po.po_number,
+        ROW_NUMBER() OVER (
+            PARTITION BY po.seller_company_id, ppo.product_id
+            ORDER BY po.po_date DESC, po.id DESC
+        ) AS recency_rank
+    FROM product_purchase_orders ppo
+    JOIN purchase_orders po ON ppo.purchase_order_id = po.id
+    WHERE ppo.delete_flag = 0
+      AND po.delete_flag = 0
+      AND ppo.unit_cost > 0
+      AND po.seller_company_id IS NOT NULL
+      AND ppo.product_id IS NOT NULL
+      {{product_filter}}
+) ranked
+WHERE recency_rank = 1
+"""
+
+# Same columns as the pre-snapshot ranked query; labels joined here
+_READ_QUERY = f"""
+SELECT
+    s.vendor_id,
+    v.english_name AS vendor_name,
+    s.product_id,
+    p.pt_code,
+    p.name AS product_name,
+    p.uom AS standard_uom,
+    s.standard_unit_price,
+    s.buying_unit_price,
+    s.buying_uom,
+    s.uom_conversion,
+    c.code AS currency_code,
+    s.usd_exchange_rate,
+    CASE
+        WHEN s.usd_exchange_rate > 0
+        THEN ROUND(s.standard_unit_price / s.usd_exchange_rate, 4)
+        ELSE NULL
+    END AS standard_unit_price_usd,
+    s.last_po_qty,
+    s.po_date,
+    s.po_number,
+    1 AS recency_rank
+FROM {PRICES_TABLE} s
+JOIN products p ON s.product_id = p.id
+JOIN companies v ON s.vendor_id = v.id
+LEFT JOIN currencies c ON s.currency_id = c.id
+"""
+
+# Products of POs whose header changed since the watermark
+_CHANGED_PO_PRODUCTS = """
+SELECT ppo.product_id
+FROM purchase_orders po
+JOIN product_purchase_orders ppo ON ppo.purchase_order_id = po.id
+WHERE po.updated_date >= :since
+UNION
+SELECT ppo.product_id
+FROM purchase_orders po
+JOIN product_purchase_orders ppo ON ppo.purchase_order_id = po.id
+WHERE po.created_date >= :since
+UNION
+SELECT product_id
+FROM product_purchase_orders
+WHERE id > :after_line_id
+"""
+
+# Line checksum per id bucket: new, edited and deleted lines all change it
+_BUCKET_PROBE = """
+SELECT
+    id DIV :bucket_size AS bucket,
+    COUNT(*) AS line_count,
+    SUM(CRC32(CONCAT_WS('|', id, product_id, purchase_order_id, delete_flag,
+                        unit_cost, purchase_unit_cost, purchaseuom, conversion,
+                        quantity))) AS checksum
+FROM product_purchase_orders
+GROUP BY id DIV :bucket_size
+"""
+
+
+def _in_params(prefix: str, values: List) -> Tuple[str, Dict[str, Any]]:
+    params = {f'{prefix}_{i}': v for i, v in enumerate(values)}
+    return ', '.join(f':{k}' for k in params), params
+
+
+def _chunks(values: List, size: int = CHUNK_SIZE):
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+class LastPOPriceSnapshot:
+    """Last-PO-price snapshot kept in DB tables, with an in-process copy"""
+
+    def __init__(self):
+        self._tables_ready = False
+        self._df: Optional[pd.DataFrame] = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+        self._sweep_started_at = 0.0
+        self._sweeping = False
+        self._stats = {'full_builds': 0, 'delta_refreshes': 0, 'sweeps': 0,
+                       'products_refreshed': 0}
+
+    # =========================================================================
+    # PUBLIC API
+    # =========================================================================
+
+    def get(self, engine, max_staleness_seconds: Optional[int] = None) -> pd.DataFrame:
+        """
+        Current snapshot (delta-refreshed and re-read first if the in-process
+        copy is older than max_staleness_seconds; a due checksum sweep is
+        started in the background, never waited on).
+        Returns a copy — callers may filter/sort freely.
+        """
+        if max_staleness_seconds is None:
+            max_staleness_seconds = LAST_PO_SNAPSHOT_CONFIG['refresh_on_read_seconds']
+
+        with self._lock:
+            if self._df is None or time.monotonic() - self._loaded_at > max_staleness_seconds:
+                self._refresh_locked(engine, full=False, min_interval=max_staleness_seconds)
+                self._df = pd.read_sql(_READ_QUERY, engine)
+                self._loaded_at = time.monotonic()
+                self._start_background_sweep(engine)
+            return self._df.copy()
+
+    def refresh(self, engine, full: bool = False, sweep: bool = True) -> Dict[str, Any]:
+        """Bring the snapshot tables up to date (delta + sweep, or full rebuild)."""
+        with self._lock:
+            result = self._refresh_locked(engine, full=full, min_interval=0, sweep=sweep)
+            self._df = None     # re-read on next get()
+            return result
+
+    def get_stats(self) -> Dict[str, Any]:
+        df = self._df
+        return {
+            **self._stats,
+            'rows': len(df) if df is not None else 0,
+        }
+
+    # =========================================================================
+    # BUILD / REFRESH
+    # =========================================================================
+
+    def _ensure_tables(self, engine):
+        if self._tables_ready:
+            return
+        with engine.begin() as conn:
+            # State table from an older layout → recreate (forces a full build)
+            current = conn.execute(text("""
+                SELECT COUNT(*) FROM information_schema.COLUMNS
+                WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table
+                  AND COLUMN_NAME = 'swept_date'
+            """), {'table': STATE_TABLE}).scalar()
+            if not current:
+                conn.execute(text(f"DROP TABLE IF EXISTS {STATE_TABLE}"))
+            for ddl in _CREATE_TABLES:
+                conn.execute(text(ddl))
+        self._tables_ready = True
+
+    def _start_background_sweep(self, engine):
+        """Start a checksum sweep thread if one is due in this process"""
+        interval = LAST_PO_SNAPSHOT_CONFIG['sweep_interval_seconds']
+        if self._sweeping or time.monotonic() - self._sweep_started_at < interval:
+            return
+        self._sweeping = True
+        self._sweep_started_at = time.monotonic()
+        threading.Thread(
+            target=self._background_sweep, args=(engine, interval),
+            name='last-po-snapshot-sweep', daemon=True,
+        ).start()
+
+    def _background_sweep(self, engine, interval: float):
+        # Tables only — the in-process copy is re-read on its normal schedule
+        try:
+            self._refresh_locked(engine, full=False, min_interval=interval, sweep=True)
+        except Exception as e:
+            logger.warning(f"Last PO snapshot: background sweep failed: {e}")
+        finally:
+            self._sweeping = False
+
+    def _refresh_locked(self, engine, full: bool, min_interval: float,
+                        sweep: bool = False) -> Dict[str, Any]:
+        """Refresh under a cross-process lock; skipped if another process is on it"""
+        self._ensure_tables(engine)
+        with engine.connect() as lock_conn:
+            got = lock_conn.execute(text("SELECT GET_LOCK(:name, 0)"), {'name': LOCK_NAME}).scalar()
+            if not got:
+                return {'skipped': True, 'rebuilt': False, 'products_refreshed': 0}
+            try:
+                return self._refresh_tables(engine, full, min_interval, sweep)
+            finally:
+                lock_conn.execute(text("SELECT RELEASE_LOCK(:name)"), {'name': LOCK_NAME})
+
+    def _refresh_tables(self, engine, full: bool, min_interval: float,
+                        sweep: bool) -> Dict[str, Any]:
+        with engine.connect() as conn:
+            now = conn.execute(text("SELECT NOW()")).scalar()
+            max_line_id = int(conn.execute(text(
+                "SELECT COALESCE(MAX(id), 0) FROM product_purchase_orders"
+            )).scalar())
+            state = conn.execute(text(f"""
+                SELECT watermark, max_line_id, schema_version, refreshed_date, swept_date
+                FROM {STATE_TABLE} WHERE name = :name
+            """), {'name': STATE_NAME}).fetchone()
+        overlap = timedelta(seconds=LAST_PO_SNAPSHOT_CONFIG['watermark_overlap_seconds'])
+        new_watermark = now - overlap
+
+        if full or state is None or state[2] != LAST_PO_SNAPSHOT_CONFIG['schema_version']:
+            self._full_build(engine, new_watermark, max_line_id)
+            return {'skipped': False, 'rebuilt': True, 'products_refreshed': 0}
+
+        # Another process refreshed (or swept) recently enough
+        last_run = state[4] if sweep else state[3]
+        if min_interval and (now - last_run).total_seconds() < min_interval:
+            return {'skipped': True, 'rebuilt': False, 'products_refreshed': 0}
+
+        product_ids = self._changed_products(engine, since=state[0], after_line_id=int(state[1]))
+        buckets = None
+        if sweep:
+            buckets = self._probe_buckets(engine)
+            product_ids |= self._changed_bucket_products(engine, buckets)
+
+        for chunk in _chunks(sorted(product_ids)):
+            ids_sql, params = _in_params('p', chunk)
+            with engine.begin() as conn:
+                conn.execute(text(f"DELETE FROM {PRICES_TABLE} WHERE product_id IN ({ids_sql})"), params)
+                conn.execute(text(_INSERT_RANKED.format(
+                    product_filter=f"AND ppo.product_id IN ({ids_sql})"
+                )), params)
+
+        with engine.begin() as conn:
+            if buckets is not None:
+                self._write_buckets(conn, buckets)
+            conn.execute(text(f"""
+                UPDATE {STATE_TABLE}
+                SET watermark = :watermark, max_line_id = :max_line_id, refreshed_date = :now
+                    {', swept_date = :now' if sweep else ''}
+                WHERE name = :name
+            """), {'watermark': new_watermark, 'max_line_id': max_line_id,
+                   'now': now, 'name': STATE_NAME})
+
+        self._stats['sweeps' if sweep else 'delta_refreshes'] += 1
+        self._stats['products_refreshed'] += len(product_ids)
+        logger.info(
+            f"Last PO snapshot: {'sweep' if sweep else 'delta refresh'}, "
+            f"{len(product_ids)} products changed since {state[0]:%Y-%m-%d %H:%M:%S}"
+        )
+        return {'skipped': False, 'rebuilt': False, 'products_refreshed': len(product_ids)}
+
+    def _full_build(self, engine, watermark: datetime, max_line_id: int):
+        buckets = self._probe_buckets(engine)
+        with engine.begin() as conn:
+            conn.execute(text(f"DELETE FROM {PRICES_TABLE}"))
+            conn.execute(text(_INSERT_RANKED.format(product_filter='')))
+            self._write_buckets(conn, buckets)
+            conn.execute(text(f"""
+                INSERT INTO {STATE_TABLE} (name, watermark, max_line_id, schema_version,
+                                           rebuilt_date, refreshed_date, swept_date)
+                VALUES (:name, :watermark, :max_line_id, :version, NOW(), NOW(), NOW())
+                ON DUPLICATE KEY UPDATE watermark = :watermark, max_line_id = :max_line_id,
+                                        schema_version = :version, rebuilt_date = NOW(),
+                                        refreshed_date = NOW(), swept_date = NOW()
+            """), {
+                'name': STATE_NAME, 'watermark': watermark, 'max_line_id': max_line_id,
+                'version': LAST_PO_SNAPSHOT_CONFIG['schema_version'],
+            })
+            rows = conn.execute(text(f"SELECT COUNT(*) FROM {PRICES_TABLE}")).scalar()
+        self._stats['full_builds'] += 1
+        logger.info(f"Last PO snapshot: full build, {rows} vendor×product pairs")
+
+    @staticmethod
+    def _changed_products(engine, since: datetime, after_line_id: int) -> Set[int]:
+        """Products of POs changed since the watermark and of lines above the high-water id"""
+        with engine.connect() as conn:
+            return {
+                int(r[0]) for r in conn.execute(
+                    text(_CHANGED_PO_PRODUCTS), {'since': since, 'after_line_id': after_line_id}
+                )
+                if r[0] is not None
+            }
+
+    @staticmethod
+    def _changed_bucket_products(engine, buckets: Dict[int, Tuple[int, int]]) -> Set[int]:
+        """Products with a line (or snapshot row) in a bucket whose checksum changed"""
+        bucket_size = LAST_PO_SNAPSHOT_CONFIG['line_bucket_size']
+        product_ids: Set[int] = set()
+
+        with engine.connect() as conn:
+            stored = {
+                int(r[0]): (int(r[1]), int(r[2]))
+                for r in conn.execute(text(f"SELECT bucket, line_count, checksum FROM {BUCKETS_TABLE}"))
+            }
+            changed_buckets = sorted(
+                b for b in set(buckets) | set(stored) if buckets.get(b) != stored.get(b)
+            )
+            for bucket in changed_buckets:
+                params = {'lo': bucket * bucket_size, 'hi': (bucket + 1) * bucket_size}
+                for sql in (
+                    "SELECT DISTINCT product_id FROM product_purchase_orders WHERE id >= :lo AND id < :hi",
+                    f"SELECT DISTINCT product_id FROM {PRICES_TABLE} WHERE ppo_id >= :lo AND ppo_id < :hi",
+                ):
+                    product_ids.update(int(r[0]) for r in conn.execute(text(sql), params) if r[0] is not None)
+
+        if changed_buckets:
+            logger.info(f"Last PO snapshot: {len(changed_buckets)} PO line bucket(s) changed")
+        return product_ids
+
+    @staticmethod
+    def _probe_buckets(engine) -> Dict[int, Tuple[int, int]]:
+        with engine.connect() as conn:
+            rows = conn.execute(
+                text(_BUCKET_PROBE), {'bucket_size': LAST_PO_SNAPSHOT_CONFIG['line_bucket_size']}
+            ).fetchall()
+        return {int(r[0]): (int(r[1]), int(r[2] or 0)) for r in rows}
+
+    @staticmethod
+    def _write_buckets(conn, buckets: Dict[int, Tuple[int, int]]):
+        """Replace the stored bucket checksums with the probed ones"""
+        conn.execute(text(f"DELETE FROM {BUCKETS_TABLE}"))
+        rows = [
+            {'bucket': b, 'line_count': count, 'checksum': checksum}
+            for b, (count, checksum) in sorted(buckets.items())
+        ]
+        for chunk in _chunks(rows):
+            conn.execute(text(f"""
+                INSERT INTO {BUCKETS_TABLE} (bucket, line_count, checksum)
+                VALUES (:bucket, :line_count, :checksum)
+            """), chunk)
+
+
+# Singleton (process-wide, shared by all sessions)
+_snapshot_instance = None
+_snapshot_lock = threading.Lock()
+
+
+def get_last_po_snapshot() -> LastPOPriceSnapshot:
+    """Get process-wide last PO price snapshot"""
+    global _snapshot_instance
+    if _snapshot_instance is None:
+        with _snapshot_lock:
+            if _snapshot_instance is None:
+                _snapshot_instance = LastPOPriceSnapshot()
+    return _snapshot_instance
+
+
+def refresh_last_po_snapshot(engine=None, full: bool = False) -> Dict[str, Any]:
+    """
+    Refresh job entry point (cron / scheduler): delta refresh + checksum
+    sweep, or a full rebuild. Returns the refresh result + stats.
+    """
+    if engine is None:
+        from utils.db import get_db_engine
+        engine = get_db_engine()
+    snapshot = get_last_po_snapshot()
+    result = snapshot.refresh(engine, full=full)
+    return {**result, **snapshot.get_stats()}
@@ -131,6 +131,17 @@ PRICE_SOURCE = {
     'NO_SOURCE': {'label': 'No Source', 'icon': '❌', 'priority': 99},
 }
 
+# =============================================================================
+# LAST PO PRICE SNAPSHOT (see last_po_snapshot.py)
+# =============================================================================
+LAST_PO_SNAPSHOT_CONFIG = {
+    'refresh_on_read_seconds': 300,    # load_last_po_prices refreshes if older than this
+    'watermark_overlap_seconds': 300,  # re-scan window for transactions in flight
+    'line_bucket_size': 10000,         # PO lines per checksum bucket (line edit detection)
+    'sweep_interval_seconds': 6 * 3600,  # background checksum sweep (never on the read path)
+    'schema_version': 3,               # bump when snapshot columns change (forces a rebuild)
+}
+
 # =============================================================================
 # SHORTAGE SOURCE (what triggered the PO need)
 # =============================================================================
@@ -20,7 +20,7 @@ class PlanningDataLoader:
       - vendor_delivery_performance_view (on-time rates)
       - quotation_leadtime_rules (transit + paperwork rules)
       - unified_supply_view (existing pending POs to avoid duplicates)
-      - product_purchase_orders (last PO price fallback)
+      - product_purchase_orders (last PO price fallback, via last_po_snapshot)
     """
 
     def __init__(self):
@@ -298,59 +298,17 @@ class PlanningDataLoader:
         Load most recent PO price per product (fallback when no costbook).
 
         Returns one row per (vendor, product) — most recent PO.
+        Served from the maintained snapshot (last_po_snapshot.py), refreshed
+        from its watermark instead of re-ranking the full PO history.
         """
         self._ensure_connection()
 
-        query = """
-        SELECT 
-            po.seller_company_id AS vendor_id,
-            v.english_name AS vendor_name,
-            ppo.product_id,
-            p.pt_code,
-            p.name AS product_name,
-            p.uom AS standard_uom,
-            ppo.unit_cost AS standard_unit_price,
-            ppo.purchase_unit_cost AS buying_unit_price,
-            ppo.purchaseuom AS buying_uom,
-            ppo.conversion AS uom_conversion,
-            c.code AS currency_code,
-            po.usd_exchange_rate,
-            CASE 
-                WHEN po.usd_exchange_rate > 0 
-                THEN ROUND(ppo.unit_cost / po.usd_exchange_rate, 4)
-                ELSE NULL 
-            END AS standard_unit_price_usd,
-            ppo.quantity AS last_po_qty,
-            CAST(po.po_date AS DATE) AS po_date,
-            po.po_number,
-            ROW_NUMBER() OVER (
-                PARTITION BY po.seller_company_id, ppo.product_id
-                ORDER BY po.po_date DESC, po.id DESC
-            ) AS recency_rank
-        FROM product_purchase_orders ppo
-        JOIN purchase_orders po ON ppo.purchase_order_id = po.id
-        JOIN products p ON ppo.product_id = p.id
-        JOIN companies v ON po.seller_company_id = v.id
-        LEFT JOIN currencies c ON po.currency_id = c.id
-        WHERE ppo.delete_flag = 0
-          AND po.delete_flag = 0
-          AND ppo.unit_cost > 0
-        """
-        params = {}
-
-        if product_ids:
-            query += " AND ppo.product_id IN %(product_ids)s"
-            params['product_ids'] = product_ids
-
-        # Wrap to get only most recent PO per vendor × product
-        full_query = f"""
-        SELECT * FROM ({query}) ranked
-        WHERE recency_rank = 1
-        ORDER BY vendor_name, pt_code
-        """
-
         try:
-            df = pd.read_sql(full_query, self._engine, params=params)
+            from .last_po_snapshot import get_last_po_snapshot
+            df = get_last_po_snapshot().get(self._engine)
+            if product_ids:
+                df = df[df['product_id'].isin(product_ids)]
+            df = df.sort_values(['vendor_name', 'pt_code']).reset_index(drop=True)
             logger.info(f"Loaded last PO prices for {len(df)} vendor×product pairs")
             return df
         except Exception as e:
@@ -12,6 +12,12 @@ Fallback chain:
     1. costbook_details.lead_time_max_days (99.1% coverage — from view)
     2. quotation_leadtime_rules (transit + paperwork by region/ship_mode)
     3. Default: 9 days (domestic) / 45 days (international) / 21 days (unknown)
+
+Leadtime rules are compiled once into dict indexes (one per specificity
+level, location-only averages precomputed) — every line resolves with O(1)
+lookups. calculate_batch() resolves a whole list / DataFrame of lines at once
+(lead time once per distinct vendor terms); the planner times every matched
+line through it.
 """
 
 import pandas as pd
@@ -29,6 +35,13 @@ from .planning_constants import (
 logger = logging.getLogger(__name__)
 
 
+def _whole_days(value) -> Optional[int]:
+    """Costbook lead time → whole days (rounded, not truncated); None stays None"""
+    if value is None:
+        return None
+    return int(round(float(value)))
+
+
 @dataclass
 class LeadTimeResult:
     """Calculated lead time for a single product × vendor"""
@@ -106,6 +119,13 @@ class POLeadTimeCalculator:
                         'total_arrival_count': int(row.get('total_arrival_count', 0) or 0),
                     }
 
+        # Compiled leadtime rule index (normalized keys per specificity level)
+        self._rule_exact: Dict[Tuple[str, str, str], int] = {}
+        self._rule_loc_mode: Dict[Tuple[str, str], int] = {}
+        self._rule_loc: Dict[str, int] = {}
+        if not self._rules.empty:
+            self._build_rule_index()
+
         logger.info(
             f"POLeadTimeCalculator: {len(self._rules)} rules, "
             f"{len(self._perf_by_vendor)} vendors with performance data"
@@ -187,6 +207,8 @@ class POLeadTimeCalculator:
         """
         Resolve total lead time with 3-level fallback.
         """
+        lead_time_max_days = _whole_days(lead_time_max_days)
+
         # Vendor reliability (affects buffer)
         reliability, on_time_pct, avg_delay = self._get_vendor_reliability(vendor_id)
         buffer = self._calculate_buffer(reliability, avg_delay)
@@ -256,11 +278,6 @@ class POLeadTimeCalculator:
         2. Partial: location_type + ship_mode
         3. Partial: location_type only
         """
-        if self._rules.empty:
-            return None
-
-        rules = self._rules.copy()
-
         # Normalize inputs
         loc_type = vendor_location_type.upper() if vendor_location_type else None
         tt_prefix = trade_term[:3].upper() if trade_term and len(trade_term) >= 3 else None
@@ -268,32 +285,56 @@ class POLeadTimeCalculator:
 
         # Try exact match
         if loc_type and tt_prefix and sm:
-            match = rules[
-                (rules['vendor_location_type'].str.upper() == loc_type) &
-                (rules['trade_term_prefix'].str.upper() == tt_prefix) &
-                (rules['ship_mode'].str.upper() == sm)
-            ]
-            if not match.empty:
-                return int(match.iloc[0]['total_days'])
+            days = self._rule_exact.get((loc_type, tt_prefix, sm))
+            if days is not None:
+                return days
 
         # Try location + ship mode
         if loc_type and sm:
-            match = rules[
-                (rules['vendor_location_type'].str.upper() == loc_type) &
-                (rules['ship_mode'].str.upper() == sm)
-            ]
-            if not match.empty:
-                return int(match.iloc[0]['total_days'])
-
-        # Try location only
+            days = self._rule_loc_mode.get((loc_type, sm))
+            if days is not None:
+                return days
+
+        # Try location only (average of all rules for this location type)
         if loc_type:
-            match = rules[rules['vendor_location_type'].str.upper() == loc_type]
-            if not match.empty:
-                # Average of all matching rules for this location type
-                return int(match['total_days'].mean())
+            return self._rule_loc.get(loc_type)
 
         return None
 
+    def _build_rule_index(self):
+        """
+        Compile leadtime rules into lookup dicts.
+
+        Exact and location+mode levels keep the FIRST matching rule (table
+        order), location-only keeps the mean — same as scanning the table.
+        """
+        def _upper(col: str) -> pd.Series:
+            if col not in self._rules.columns:
+                return pd.Series(None, index=self._rules.index, dtype=object)
+            return self._rules[col].map(lambda v: v.upper() if isinstance(v, str) else None)
+
+        keys = pd.DataFrame({
+            'loc': _upper('vendor_location_type'),
+            'tt': _upper('trade_term_prefix'),
+            'sm': _upper('ship_mode'),
+            'days': pd.to_numeric(self._rules['total_days'], errors='coerce'),
+        }).dropna(subset=['loc', 'days'])
+
+        exact = keys.dropna(subset=['tt', 'sm']).drop_duplicates(['loc', 'tt', 'sm'])
+        self._rule_exact = {
+            (l, t, m): int(d)
+            for l, t, m, d in zip(exact['loc'], exact['tt'], exact['sm'], exact['days'])
+        }
+
+        loc_mode = keys.dropna(subset=['sm']).drop_duplicates(['loc', 'sm'])
+        self._rule_loc_mode = {
+            (l, m): int(d) for l, m, d in zip(loc_mode['loc'], loc_mode['sm'], loc_mode['days'])
+        }
+
+        self._rule_loc = {
+            loc: int(mean) for loc, mean in keys.groupby('loc')['days'].mean().items()
+        }
+
     # =========================================================================
     # VENDOR RELIABILITY → BUFFER
     # =========================================================================
@@ -396,31 +437,76 @@ class POLeadTimeCalculator:
 
     def calculate_batch(
         self,
-        items: List[Dict[str, Any]],
+        items,
         reference_date: Optional[date] = None
     ) -> List[OrderTimingResult]:
         """
         Calculate timing for a batch of items.
 
-        Each item dict should have:
+        items: list of dicts or a DataFrame, each line with
             demand_date, lead_time_max_days (optional),
             vendor_location_type, vendor_id (optional),
             trade_term (optional), shipping_mode (optional)
+
+        Lead time is resolved once per distinct (costbook LT, location,
+        vendor, trade term, ship mode) combination.
         """
+        if isinstance(items, pd.DataFrame):
+            items = items.to_dict('records')
+        if reference_date is None:
+            reference_date = date.today()
+
+        lead_times: Dict[tuple, LeadTimeResult] = {}
         results = []
         for item in items:
-            timing = self.calculate_timing(
-                demand_date=item['demand_date'],
-                lead_time_max_days=item.get('lead_time_max_days'),
-                vendor_location_type=item.get('vendor_location_type', 'UNKNOWN'),
-                vendor_id=item.get('vendor_id'),
-                trade_term=item.get('trade_term'),
-                shipping_mode=item.get('shipping_mode'),
-                reference_date=reference_date,
-            )
-            results.append(timing)
+            key = self._lead_time_key(item)
+            lead_time = lead_times.get(key)
+            if lead_time is None:
+                lead_time = self._resolve_lead_time(*key)
+                lead_times[key] = lead_time
+
+            demand_date = self._to_date(item['demand_date'])
+            must_order_by = demand_date - timedelta(days=lead_time.total_lead_time_days)
+            expected_arrival = reference_date + timedelta(days=lead_time.total_lead_time_days)
+            days_until = (must_order_by - reference_date).days
+            urgency = self._classify_urgency(days_until)
+
+            results.append(OrderTimingResult(
+                demand_date=demand_date,
+                must_order_by=must_order_by,
+                expected_arrival=expected_arrival,
+                lead_time=lead_time,
+                days_until_must_order=days_until,
+                urgency_level=urgency,
+                urgency_priority=URGENCY_LEVELS.get(urgency, {}).get('priority', 5),
+                is_overdue=days_until < 0,
+                ordered_today_arrives_on_time=expected_arrival <= demand_date,
+            ))
         return results
 
+    @staticmethod
+    def _lead_time_key(item: Dict[str, Any]) -> tuple:
+        """Positional args for _resolve_lead_time (hashable, NaN → None)."""
+        def _clean(value):
+            if value is None:
+                return None
+            try:
+                if pd.isna(value):
+                    return None
+            except (TypeError, ValueError):
+                pass
+            return value
+
+        lt_max = _clean(item.get('lead_time_max_days'))
+        vendor_id = _clean(item.get('vendor_id'))
+        return (
+            _whole_days(lt_max),
+            _clean(item.get('vendor_location_type')) or 'UNKNOWN',
+            int(vendor_id) if vendor_id is not None else None,
+            _clean(item.get('trade_term')),
+            _clean(item.get('shipping_mode')),
+        )
+
     # =========================================================================
     # HELPERS
     # =========================================================================
@@ -31,7 +31,7 @@ from .planning_constants import (
     URGENCY_LEVELS, SHORTAGE_SOURCE, PRICE_SOURCE
 )
 from .po_pricing_resolver import POPricingResolver, VendorMatch
-from .po_lead_time_calculator import POLeadTimeCalculator
+from .po_lead_time_calculator import POLeadTimeCalculator, OrderTimingResult
 from .po_result import POLineItem, VendorPOGroup, POSuggestionResult
 from .validators import (
     extract_all_shortages, validate_gap_result, validate_gap_filters,
@@ -322,13 +322,24 @@ class POPlanner:
         skipped: List[Dict[str, Any]] = []
         processing_errors: List[str] = []
 
-        for item in shortages:
+        # Vendor matching for all products in one grouped pass
+        matches = self._resolver.resolve_batch(
+            [item.product_id for item in shortages if item.product_id is not None],
+            strategy=strategy,
+        ) if shortages else {}
+
+        # Order timing for all matched items in one batch
+        timings = self._batch_timings(shortages, matches, default_demand_date)
+
+        for index, item in enumerate(shortages):
             try:
                 line = self._process_shortage_item(
                     item=item,
                     strategy=strategy,
                     default_demand_date=default_demand_date,
                     deduct_pending_po=deduct_pending_po,
+                    match=matches.get(item.product_id),
+                    timing=timings.get(index),
                 )
 
                 if line is None:
@@ -430,6 +441,40 @@ class POPlanner:
 
         return result
 
+    def _batch_timings(
+        self,
+        shortages: List[ShortageItem],
+        matches: Dict[int, VendorMatch],
+        default_demand_date: date,
+    ) -> Dict[int, OrderTimingResult]:
+        """
+        Order timing per shortage index for every matched item, resolved
+        through calculate_batch (lead time once per distinct vendor terms).
+
+        Returns {} on failure — items are then timed one by one.
+        """
+        indexed = []
+        for index, item in enumerate(shortages):
+            match = matches.get(item.product_id)
+            if match is not None and match.matched:
+                indexed.append((index, {
+                    'demand_date': item.demand_date or default_demand_date,
+                    'lead_time_max_days': match.lead_time_max_days,
+                    'vendor_location_type': match.vendor_location_type,
+                    'vendor_id': match.vendor_id,
+                    'trade_term': match.trade_term,
+                    'shipping_mode': match.shipping_mode,
+                }))
+        if not indexed:
+            return {}
+
+        try:
+            results = self._timing_calc.calculate_batch([line for _, line in indexed])
+        except Exception as e:
+            logger.warning(f"POPlanner: batch timing failed, timing items one by one: {e}")
+            return {}
+        return {index: timing for (index, _), timing in zip(indexed, results)}
+
     # =========================================================================
     # PROCESS SINGLE SHORTAGE ITEM
     # =========================================================================
@@ -440,17 +485,24 @@ class POPlanner:
         strategy: str,
         default_demand_date: date,
         deduct_pending_po: bool,
+        match: Optional[VendorMatch] = None,
+        timing: Optional[OrderTimingResult] = None,
     ) -> Optional[POLineItem]:
         """
         Process one shortage item through the full pipeline.
 
+        match: pre-resolved vendor (from resolve_batch); resolved here if None.
+        timing: pre-computed timing for match (from _batch_timings);
+            calculated here if None.
+
         Returns POLineItem if vendor found, None if no vendor.
         """
         # Step 1: Vendor matching
-        match = self._resolver.resolve_product(
-            product_id=item.product_id,
-            strategy=strategy,
-        )
+        if match is None:
+            match = self._resolver.resolve_product(
+                product_id=item.product_id,
+                strategy=strategy,
+            )
 
         if not match.matched:
             return None
@@ -470,16 +522,15 @@ class POPlanner:
         )
 
         # Step 4: Calculate timing
-        demand_dt = item.demand_date or default_demand_date
-
-        timing = self._timing_calc.calculate_timing(
-            demand_date=demand_dt,
-            lead_time_max_days=match.lead_time_max_days,
-            vendor_location_type=match.vendor_location_type,
-            vendor_id=match.vendor_id,
-            trade_term=match.trade_term,
-            shipping_mode=match.shipping_mode,
-        )
+        if timing is None:
+            timing = self._timing_calc.calculate_timing(
+                demand_date=item.demand_date or default_demand_date,
+                lead_time_max_days=match.lead_time_max_days,
+                vendor_location_type=match.vendor_location_type,
+                vendor_id=match.vendor_id,
+                trade_term=match.trade_term,
+                shipping_mode=match.shipping_mode,
+            )
 
         # Step 5: Build line item — guard against None prices
         unit_price = match.standard_unit_price or 0.0
@@ -10,19 +10,21 @@ v1.1: Added openpyxl formatting:
 - Freeze panes (header row fixed when scrolling)
 - Auto-filter on all sheets
 - Header row styling (bold, blue background)
+
+v1.2: Written through utils.excel_stream (xlsxwriter, constant_memory) —
+same formatting, applied while rows stream instead of on a full workbook.
 """
 
 import pandas as pd
-from io import BytesIO
 from datetime import datetime
 import logging
 
+from utils.excel_stream import ExcelStreamWriter
+
 from .planning_constants import URGENCY_LEVELS
 
 logger = logging.getLogger(__name__)
 
-HEADER_FILL_HEX = '2E75B6'
-HEADER_FONT_COLOR = 'FFFFFF'
 URGENCY_COLORS = {
     'OVERDUE': 'F2DCDB', 'CRITICAL': 'F2DCDB',
     'URGENT': 'FDE9D9', 'THIS_WEEK': 'FFFFCC', 'PLANNED': 'D6EAFF',
@@ -46,70 +48,30 @@ DEFAULT_COL_WIDTHS = {
 }
 
 
-def _apply_sheet_formatting(ws, df, col_widths=None, currency_cols=None,
-                            number_cols=None, date_cols=None, urgency_col=None):
-    """Apply professional formatting to a worksheet."""
-    try:
-        from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-        from openpyxl.utils import get_column_letter
-    except ImportError:
-        return
+def _urgency_fills(df, urgency_col):
+    """Row fill color per row from the urgency label (substring match)."""
+    if urgency_col not in df.columns:
+        return None
+
+    def fill(val):
+        if not val:
+            return None
+        vu = str(val).upper()
+        for uk, hx in URGENCY_COLORS.items():
+            if uk in vu:
+                return hx
+        return None
 
-    thin = Border(
-        left=Side(style='thin', color='D9D9D9'), right=Side(style='thin', color='D9D9D9'),
-        top=Side(style='thin', color='D9D9D9'), bottom=Side(style='thin', color='D9D9D9'),
+    return df[urgency_col].map(fill)
+
+
+def _write_sheet(writer, df, sheet_name, urgency_col=None, **formats):
+    """Write df as a formatted sheet (header band, widths, number formats, urgency fills)."""
+    writer.write_sheet(
+        df, sheet_name,
+        row_fills=_urgency_fills(df, urgency_col) if urgency_col else None,
+        **formats
     )
-    hdr_font = Font(name='Arial', bold=True, color=HEADER_FONT_COLOR, size=10)
-    hdr_fill = PatternFill(start_color=HEADER_FILL_HEX, end_color=HEADER_FILL_HEX, fill_type='solid')
-    hdr_align = Alignment(horizontal='center', vertical='center', wrap_text=True)
-    dfont = Font(name='Arial', size=10)
-
-    nrows, ncols = len(df), len(df.columns)
-
-    for ci in range(1, ncols + 1):
-        c = ws.cell(row=1, column=ci)
-        c.font, c.fill, c.alignment, c.border = hdr_font, hdr_fill, hdr_align, thin
-
-    ws.freeze_panes = 'A2'
-    if nrows > 0:
-        ws.auto_filter.ref = ws.dimensions
-
-    col_map = {name: idx + 1 for idx, name in enumerate(df.columns)}
-    widths = dict(DEFAULT_COL_WIDTHS)
-    if col_widths:
-        widths.update(col_widths)
-    for name, ci in col_map.items():
-        ws.column_dimensions[get_column_letter(ci)].width = widths.get(name, max(len(str(name)) + 2, 12))
-
-    curr_set = set(currency_cols or [])
-    num_set = set(number_cols or [])
-    date_set = set(date_cols or [])
-
-    for ri in range(2, nrows + 2):
-        for name, ci in col_map.items():
-            c = ws.cell(row=ri, column=ci)
-            c.font, c.border = dfont, thin
-            c.alignment = Alignment(vertical='center')
-            if name in curr_set:
-                c.number_format = '$#,##0.00'
-            elif name in num_set:
-                c.number_format = '#,##0'
-            elif name in date_set:
-                c.number_format = 'YYYY-MM-DD'
-
-    if urgency_col and urgency_col in col_map:
-        uci = col_map[urgency_col]
-        for ri in range(2, nrows + 2):
-            val = ws.cell(row=ri, column=uci).value
-            if not val:
-                continue
-            vu = str(val).upper()
-            for uk, hx in URGENCY_COLORS.items():
-                if uk in vu:
-                    fill = PatternFill(start_color=hx, end_color=hx, fill_type='solid')
-                    for ci in range(1, ncols + 1):
-                        ws.cell(row=ri, column=ci).fill = fill
-                    break
 
 
 # =============================================================================
@@ -128,8 +90,7 @@ def _get_scope_display(result):
 
 def export_po_suggestions_to_excel(result, gap_summary=None):
     """Export PO suggestions to formatted Excel workbook."""
-    buffer = BytesIO()
-    with pd.ExcelWriter(buffer, engine='openpyxl') as writer:
+    def write(writer):
         _write_summary_sheet(writer, result, gap_summary)
         _write_po_lines_sheet(writer, result)
         _write_vendor_sheet(writer, result)
@@ -137,8 +98,8 @@ def export_po_suggestions_to_excel(result, gap_summary=None):
             _write_unmatched_sheet(writer, result)
         if hasattr(result, 'skipped_items') and result.skipped_items:
             _write_skipped_sheet(writer, result)
-    buffer.seek(0)
-    return buffer
+
+    return ExcelStreamWriter.to_buffer(write, default_widths=DEFAULT_COL_WIDTHS)
 
 
 def _write_summary_sheet(writer, result, gap_summary):
@@ -225,14 +186,13 @@ def _write_summary_sheet(writer, result, gap_summary):
                 data.append([key.replace('_', ' ').title(), gap_summary[key]])
 
     df = pd.DataFrame(data, columns=['Metric', 'Value'])
-    df.to_excel(writer, sheet_name='Summary', index=False)
-    _apply_sheet_formatting(writer.sheets['Summary'], df)
+    _write_sheet(writer, df, 'Summary')
 
 
 def _write_po_lines_sheet(writer, result):
     lines_df = result.get_all_lines_df()
     if lines_df.empty:
-        pd.DataFrame({'Note': ['No PO suggestions']}).to_excel(writer, sheet_name='PO Lines', index=False)
+        writer.write_sheet(pd.DataFrame({'Note': ['No PO suggestions']}), 'PO Lines')
         return
 
     lines_df = lines_df.sort_values(['urgency_priority', 'vendor_name', 'pt_code']).reset_index(drop=True)
@@ -281,9 +241,8 @@ def _write_po_lines_sheet(writer, result):
         if col in export_df.columns:
             export_df[col] = export_df[col].apply(lambda x: 'Yes' if x else 'No')
 
-    export_df.to_excel(writer, sheet_name='PO Lines', index=False)
-    _apply_sheet_formatting(
-        writer.sheets['PO Lines'], export_df,
+    _write_sheet(
+        writer, export_df, 'PO Lines',
         currency_cols=['Unit Price', 'Unit Price (USD)', 'Line Value (USD)'],
         number_cols=['GAP Shortage', 'Pending PO', 'Net Need', 'Order Qty',
                      'MOQ', 'SPQ', 'Excess Qty', 'Lead Time (days)', 'Days to Order'],
@@ -295,7 +254,7 @@ def _write_po_lines_sheet(writer, result):
 def _write_vendor_sheet(writer, result):
     vendor_df = result.get_vendor_summary_df()
     if vendor_df.empty:
-        pd.DataFrame({'Note': ['No vendor data']}).to_excel(writer, sheet_name='By Vendor', index=False)
+        writer.write_sheet(pd.DataFrame({'Note': ['No vendor data']}), 'By Vendor')
         return
     vendor_df = vendor_df.sort_values('max_urgency_priority').reset_index(drop=True)
     rename = {
@@ -307,9 +266,8 @@ def _write_vendor_sheet(writer, result):
         'trade_term': 'Trade Term', 'payment_term': 'Payment Term',
     }
     export_df = vendor_df.rename(columns=rename)
-    export_df.to_excel(writer, sheet_name='By Vendor', index=False)
-    _apply_sheet_formatting(
-        writer.sheets['By Vendor'], export_df,
+    _write_sheet(
+        writer, export_df, 'By Vendor',
         currency_cols=['Total Value (USD)'], number_cols=['PO Lines', 'Priority'],
         urgency_col='Max Urgency',
     )
@@ -325,8 +283,7 @@ def _write_unmatched_sheet(writer, result):
         'uom': 'UOM', 'reason': 'Reason',
     }
     export_df = unmatched_df.rename(columns=rename)
-    export_df.to_excel(writer, sheet_name='Unmatched', index=False)
-    _apply_sheet_formatting(writer.sheets['Unmatched'], export_df, number_cols=['Shortage Qty'])
+    _write_sheet(writer, export_df, 'Unmatched', number_cols=['Shortage Qty'])
 
 
 def _write_skipped_sheet(writer, result):
@@ -341,9 +298,8 @@ def _write_skipped_sheet(writer, result):
         'uom': 'UOM', 'vendor_name': 'Vendor', 'reason': 'Reason',
     }
     export_df = skipped_df.rename(columns=rename)
-    export_df.to_excel(writer, sheet_name='Skipped (PO Covers)', index=False)
-    _apply_sheet_formatting(
-        writer.sheets['Skipped (PO Covers)'], export_df,
+    _write_sheet(
+        writer, export_df, 'Skipped (PO Covers)',
         number_cols=['Shortage Qty', 'Pending PO Qty', 'Net Shortage'],
     )
 
@@ -9,12 +9,17 @@ For each product that needs purchasing:
 3. No match: Flag as VENDOR_NEEDED
 
 Also resolves MOQ/SPQ rounding and multi-vendor selection.
+
+resolve_batch_frame() ranks vendors for many products in one grouped pass
+(strategy tiers + sort, first row per product) with the last-PO fallback as
+a join — columnar output, one row per product.
 """
 
+import numpy as np
 import pandas as pd
 import logging
-from typing import Dict, Any, List, Optional
-from dataclasses import dataclass
+from typing import Dict, Any, Iterable, List, Optional
+from dataclasses import dataclass, fields
 
 from .planning_constants import (
     PRICE_SOURCE, MOQ_SPQ_CONFIG, SHORTAGE_SOURCE
@@ -79,6 +84,40 @@ class VendorMatch:
     match_notes: str = ''
 
 
+# VendorMatch field → source column (batch resolver)
+_COSTBOOK_COLUMNS = {
+    f.name: f.name for f in fields(VendorMatch)
+    if f.name not in ('shipping_mode', 'price_source', 'matched', 'match_notes',
+                      'last_po_number', 'last_po_date')
+}
+_COSTBOOK_COLUMNS['shipping_mode'] = 'shipping_mode_name'
+
+_LAST_PO_COLUMNS = {
+    'product_id': 'product_id',
+    'pt_code': 'pt_code',
+    'product_name': 'product_name',
+    'standard_uom': 'standard_uom',
+    'vendor_id': 'vendor_id',
+    'vendor_name': 'vendor_name',
+    'standard_unit_price': 'standard_unit_price',
+    'buying_unit_price': 'buying_unit_price',
+    'standard_unit_price_usd': 'standard_unit_price_usd',
+    'currency_code': 'currency_code',
+    'buying_uom': 'buying_uom',
+    'uom_conversion': 'uom_conversion',
+    'last_po_number': 'po_number',
+    'last_po_date': 'po_date',
+}
+
+# Costbook ranking tiers (lower wins) → match_notes
+_TIER_PREFERRED, _TIER_FASTEST, _TIER_CHEAPEST, _TIER_FIRST = 0, 1, 2, 3
+_TIER_NOTES = {
+    _TIER_FASTEST: 'Fastest lead time',
+    _TIER_CHEAPEST: 'Cheapest price',
+    _TIER_FIRST: 'First available costbook',
+}
+
+
 @dataclass
 class QuantitySuggestion:
     """Result of MOQ/SPQ rounding"""
@@ -307,8 +346,8 @@ class POPricingResolver:
             spq=float(row.get('spq', 0) or 0),
             moq_value_usd=float(row.get('moq_value_usd', 0) or 0),
 
-            lead_time_max_days=int(row['lead_time_max_days']) if pd.notna(row.get('lead_time_max_days')) else None,
-            lead_time_min_days=int(row['lead_time_min_days']) if pd.notna(row.get('lead_time_min_days')) else None,
+            lead_time_max_days=int(round(float(row['lead_time_max_days']))) if pd.notna(row.get('lead_time_max_days')) else None,
+            lead_time_min_days=int(round(float(row['lead_time_min_days']))) if pd.notna(row.get('lead_time_min_days')) else None,
 
             trade_term=str(row.get('trade_term', '')) if pd.notna(row.get('trade_term')) else '',
             payment_term=str(row.get('payment_term', '')) if pd.notna(row.get('payment_term')) else '',
@@ -340,16 +379,151 @@ class POPricingResolver:
         Returns:
             Dict mapping product_id → VendorMatch
         """
-        results = {}
-        for pid in product_ids:
-            results[pid] = self.resolve_product(pid, strategy=strategy)
+        frame = self.resolve_batch_frame(product_ids, strategy=strategy)
+        names = list(frame.columns)
+        results = {
+            int(values[0]): VendorMatch(**dict(zip(names, values)))
+            for values in zip(*(frame[c].tolist() for c in names))
+        }
 
-        matched = sum(1 for m in results.values() if m.matched)
+        matched = int(frame['matched'].sum()) if not frame.empty else 0
         logger.info(
-            f"Batch resolve: {matched}/{len(product_ids)} products matched to vendors"
+            f"Batch resolve: {matched}/{len(results)} products matched to vendors"
         )
         return results
 
+    def resolve_batch_frame(
+        self,
+        product_ids: Iterable[int],
+        strategy: str = 'CHEAPEST',
+        preferred_vendor_ids: Optional[Dict[int, int]] = None,
+    ) -> pd.DataFrame:
+        """
+        Columnar resolve_product for many products at once.
+
+        Same selection rules as resolve_product:
+            preferred vendor (if given per product) → FASTEST (when strategy
+            is FASTEST and lead time known) → CHEAPEST (USD price > 0) →
+            first costbook row → most recent last PO → NO_SOURCE.
+
+        Returns:
+            DataFrame with one row per product_id (input order), columns =
+            VendorMatch fields
+        """
+        ids = pd.unique(pd.Series(list(product_ids), dtype='int64'))
+        if len(ids) == 0:
+            return pd.DataFrame(columns=[f.name for f in fields(VendorMatch)])
+
+        parts = []
+
+        # --- 1. Costbook: rank all options of all products in one sort ---
+        best = self._rank_costbook(ids, strategy, preferred_vendor_ids)
+        if not best.empty:
+            cb = self._to_match_frame(best, _COSTBOOK_COLUMNS)
+            cb['price_source'] = 'COSTBOOK'
+            cb['matched'] = True
+            cb['match_notes'] = best['_notes'].to_numpy()
+            parts.append(cb)
+
+        # --- 2. Last PO fallback: join first (most recent) PO row per product ---
+        remaining = np.setdiff1d(ids, best['product_id'].to_numpy(dtype='int64')) \
+            if not best.empty else ids
+        if len(remaining) and not self._last_po.empty:
+            last_po = self._last_po[self._last_po['product_id'].isin(remaining)] \
+                .drop_duplicates('product_id', keep='first')
+            if not last_po.empty:
+                lp = self._to_match_frame(last_po, _LAST_PO_COLUMNS)
+                lp['price_source'] = 'LAST_PO'
+                lp['matched'] = True
+                po_number = last_po['po_number'] if 'po_number' in last_po.columns \
+                    else pd.Series('', index=last_po.index)
+                po_date = last_po['po_date'] if 'po_date' in last_po.columns \
+                    else pd.Series('', index=last_po.index)
+                lp['match_notes'] = [
+                    f"Fallback: last PO {n} ({d})" for n, d in zip(po_number, po_date)
+                ]
+                parts.append(lp)
+                remaining = np.setdiff1d(remaining, lp['product_id'].to_numpy(dtype='int64'))
+
+        # --- 3. No source ---
+        if len(remaining):
+            none = self._to_match_frame(pd.DataFrame({'product_id': remaining}), {'product_id': 'product_id'})
+            none['match_notes'] = 'No costbook or PO history found for this product'
+            parts.append(none)
+
+        out = pd.concat(parts, ignore_index=True)
+        return out.set_index('product_id').reindex(ids).reset_index()
+
+    def _rank_costbook(
+        self,
+        ids: np.ndarray,
+        strategy: str,
+        preferred_vendor_ids: Optional[Dict[int, int]],
+    ) -> pd.DataFrame:
+        """Best costbook row per product (+ _notes column)."""
+        if self._pricing.empty:
+            return pd.DataFrame()
+
+        opts = self._pricing[self._pricing['product_id'].isin(ids)]
+        if opts.empty:
+            return pd.DataFrame()
+
+        n = len(opts)
+        price = pd.to_numeric(opts['standard_unit_price_usd'], errors='coerce').to_numpy(dtype=float) \
+            if 'standard_unit_price_usd' in opts.columns else np.full(n, np.nan)
+        lead = pd.to_numeric(opts['lead_time_max_days'], errors='coerce').to_numpy(dtype=float) \
+            if 'lead_time_max_days' in opts.columns else np.full(n, np.nan)
+
+        tier = np.where(price > 0, _TIER_CHEAPEST, _TIER_FIRST)
+        if strategy == 'FASTEST' and 'lead_time_max_days' in opts.columns:
+            tier = np.where(~np.isnan(lead), _TIER_FASTEST, tier)
+        if preferred_vendor_ids:
+            wanted = opts['product_id'].map(preferred_vendor_ids)
+            tier = np.where((wanted == opts['vendor_id']).to_numpy(), _TIER_PREFERRED, tier)
+
+        ranked = opts.assign(
+            _tier=tier,
+            _k1=np.where(tier == _TIER_FASTEST, lead, np.where(tier == _TIER_CHEAPEST, price, 0.0)),
+            _k2=np.where(tier == _TIER_FASTEST, price, 0.0),
+            _pos=np.arange(n),
+        ).sort_values(['product_id', '_tier', '_k1', '_k2', '_pos'], na_position='last')
+
+        best = ranked.drop_duplicates('product_id', keep='first')
+        notes = best['_tier'].map(_TIER_NOTES)
+        preferred = best['_tier'] == _TIER_PREFERRED
+        if preferred.any():
+            notes[preferred] = 'Preferred vendor #' + best.loc[preferred, 'vendor_id'].astype('int64').astype(str)
+        return best.assign(_notes=notes)
+
+    @staticmethod
+    def _to_match_frame(src: pd.DataFrame, columns: Dict[str, str]) -> pd.DataFrame:
+        """Source rows → VendorMatch-shaped columns (NaN → field default)."""
+        out = {}
+        n = len(src)
+        for f in fields(VendorMatch):
+            col = columns.get(f.name)
+            values = src[col] if col is not None and col in src.columns else None
+
+            if f.type is bool:
+                out[f.name] = np.full(n, f.default, dtype=bool)
+            elif values is None:
+                out[f.name] = np.full(n, f.default, dtype=object if f.default is None else None)
+            elif f.type is float:
+                out[f.name] = pd.to_numeric(values, errors='coerce').fillna(0).to_numpy(dtype=float)
+            elif f.type in (int, Optional[int]):
+                num = pd.to_numeric(values, errors='coerce')
+                missing = num.isna().to_numpy()
+                # Rounded like _row_to_match (fractional lead times), not truncated
+                arr = num.round().fillna(0).astype('int64').to_numpy(dtype=object)
+                arr[missing] = None
+                out[f.name] = arr
+            else:
+                missing = values.isna().to_numpy()
+                arr = values.map(str, na_action='ignore').to_numpy(dtype=object)
+                arr[missing] = None if f.type == Optional[str] else ''
+                out[f.name] = arr
+        return pd.DataFrame(out)
+
     # =========================================================================
     # GET ALL VENDOR OPTIONS FOR A PRODUCT (for multi-vendor comparison)
     # =========================================================================
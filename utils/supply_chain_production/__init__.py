@@ -1,7 +1,7 @@
 # utils/supply_chain_production/__init__.py
 
 """
-Supply Chain Production Planning Module — v1.1.0
+Supply Chain Production Planning Module — v1.2.0
 Layer 3 Phase 2: Manufacturing Order Suggestions
 
 ZERO ASSUMPTION: All parameters from production_planning_config table
@@ -16,6 +16,7 @@ from .production_constants import (
     MO_URGENCY_LEVELS, MO_URGENCY_THRESHOLDS, URGENCY_LEVELS,
     MO_ACTION_TYPES, LEAD_TIME_SOURCE, YIELD_SOURCE,
     UNSCHEDULABLE_REASONS, CONFIG_GROUPS,
+    ALLOCATION_STRATEGIES, DEFAULT_ALLOCATION_STRATEGY,
     PRODUCTION_UI, RECOMMENDED_DEFAULTS,
 )
 from .production_config import (
@@ -37,6 +38,7 @@ from .production_validators import (
     validate_gap_filters_for_production,
 )
 from .material_readiness_checker import MaterialReadinessChecker
+from .material_allocation import JointMaterialAllocator
 from .mo_scheduling_engine import (
     MOSchedulingEngine,
     ConfigMissingError,
@@ -44,6 +46,9 @@ from .mo_scheduling_engine import (
     YieldResolution,
     SchedulingResult,
 )
+from .capacity_scheduler import (
+    FiniteCapacityScheduler, CapacityReport, CapacityPlacement,
+)
 from .mo_result import MOLineItem, MOSuggestionResult
 from .mo_planner import MOPlanner
 from .production_export import export_mo_suggestions_to_excel, get_mo_export_filename
@@ -0,0 +1,294 @@
+# utils/supply_chain_production/capacity_scheduler.py
+
+"""
+Finite-capacity MO placement — runs after backward scheduling.
+
+MOSchedulingEngine.schedule() plans every product on its own (infinite
+capacity): actual_start = MAX(must_start_by, materials_ready_date). When many
+MOs land on the same plant in the same week that plan is not feasible.
+
+This pass places the scheduled MOs in priority-score order onto a day
+calendar per resource (plant × BOM type):
+  - capacity     = max MOs of that BOM type a plant runs on the same day
+                   (CAPACITY.<PLANT_CODE>.<BOM_TYPE>.DAILY_MO_LIMIT, else
+                   CAPACITY.<BOM_TYPE>.DAILY_MO_LIMIT)
+  - an MO occupies one unit on each day of its lead time
+  - placement    = earliest start ≥ unconstrained actual_start whose whole
+                   lead-time window has free capacity (earlier gaps are
+                   back-filled by lower-priority MOs that fit)
+  - plant        = plants the BOM has plant-specific lead times for (earliest
+                   slot wins), else the only active plant, else a shared pool
+
+Resources without a configured capacity stay unconstrained and are reported.
+Blocked MOs without a start date (no material ETA) are not placed.
+"""
+
+import logging
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Shared pool when an MO cannot be tied to a plant
+POOL_PLANT_KEY = -1
+
+
+# =============================================================================
+# RESULT DATACLASSES
+# =============================================================================
+
+@dataclass
+class CapacityPlacement:
+    """Where and when one MO was placed by the finite-capacity pass."""
+    product_id: int
+    pt_code: str
+    bom_type: str
+    plant_id: Optional[int]
+    plant_code: str
+    daily_capacity: Optional[int]        # None = unconstrained resource
+    requested_start: date                # infinite-capacity actual_start
+    scheduled_start: date
+    lead_time_days: int
+    pushed_days: int = 0
+
+    def to_dict(self) -> Dict:
+        return {
+            'product_id': self.product_id,
+            'pt_code': self.pt_code,
+            'bom_type': self.bom_type,
+            'plant_id': self.plant_id,
+            'plant_code': self.plant_code,
+            'daily_capacity': self.daily_capacity,
+            'requested_start': self.requested_start,
+            'scheduled_start': self.scheduled_start,
+            'lead_time_days': self.lead_time_days,
+            'pushed_days': self.pushed_days,
+        }
+
+
+@dataclass
+class CapacityReport:
+    """Outcome of one finite-capacity pass."""
+    placements: List[CapacityPlacement] = field(default_factory=list)
+    not_placed: int = 0                                  # no start date (blocked, no ETA)
+    unconstrained_resources: List[str] = field(default_factory=list)
+    peak_load: Dict[str, int] = field(default_factory=dict)   # resource → max MOs on one day
+
+    @property
+    def pushed(self) -> List[CapacityPlacement]:
+        return [p for p in self.placements if p.pushed_days > 0]
+
+    def get_summary(self) -> Dict:
+        pushed = self.pushed
+        return {
+            'placed': len(self.placements),
+            'not_placed': self.not_placed,
+            'pushed_count': len(pushed),
+            'total_pushed_days': sum(p.pushed_days for p in pushed),
+            'max_pushed_days': max((p.pushed_days for p in pushed), default=0),
+            'unconstrained_resources': list(self.unconstrained_resources),
+            'peak_load': dict(self.peak_load),
+        }
+
+    def get_pushed_df(self) -> pd.DataFrame:
+        pushed = self.pushed
+        if not pushed:
+            return pd.DataFrame()
+        return pd.DataFrame([p.to_dict() for p in pushed]) \
+            .sort_values('pushed_days', ascending=False).reset_index(drop=True)
+
+
+# =============================================================================
+# DAY CALENDAR (one per plant × BOM type)
+# =============================================================================
+
+class _ResourceCalendar:
+    """Daily MO load of one resource, indexed by days from reference_date."""
+
+    def __init__(self, capacity: int, horizon_days: int):
+        self.capacity = capacity
+        self.load = np.zeros(max(horizon_days, 1), dtype=np.int32)
+
+    def _ensure(self, end: int):
+        if end > len(self.load):
+            grown = np.zeros(max(end, 2 * len(self.load)), dtype=np.int32)
+            grown[:len(self.load)] = self.load
+            self.load = grown
+
+    def earliest_start(self, release: int, duration: int) -> int:
+        """Earliest day ≥ release with free capacity on all `duration` days."""
+        start = release
+        while True:
+            self._ensure(start + duration)
+            full = np.flatnonzero(self.load[start:start + duration] >= self.capacity)
+            if full.size == 0:
+                return start
+            # Jump past the last full day inside the window
+            start += int(full[-1]) + 1
+
+    def book(self, start: int, duration: int):
+        self._ensure(start + duration)
+        self.load[start:start + duration] += 1
+
+    @property
+    def peak(self) -> int:
+        return int(self.load.max()) if len(self.load) else 0
+
+
+# =============================================================================
+# SCHEDULER
+# =============================================================================
+
+class FiniteCapacityScheduler:
+    """
+    Capacity-aware placement of already scheduled MOs.
+
+    Usage:
+        scheduler = FiniteCapacityScheduler(config, plants_df, bom_lead_times_df)
+        report = scheduler.place(scheduled, reference_date)
+        # scheduled: [(item, SchedulingResult, readiness)] sorted by priority
+        # SchedulingResult dates are updated in place
+    """
+
+    def __init__(
+        self,
+        config,
+        plants_df: Optional[pd.DataFrame] = None,
+        bom_lead_times_df: Optional[pd.DataFrame] = None,
+    ):
+        self._config = config
+        self._plant_codes: Dict[int, str] = {}
+        if plants_df is not None and not plants_df.empty:
+            for pid, code in zip(plants_df['plant_id'], plants_df['plant_code']):
+                if pid is not None and not pd.isna(pid):
+                    self._plant_codes[int(pid)] = str(code)
+
+        # BOM → plants with plant-specific lead times (the plants that make it)
+        self._bom_plants: Dict[int, List[int]] = {}
+        if bom_lead_times_df is not None and not bom_lead_times_df.empty \
+                and {'bom_header_id', 'plant_id'} <= set(bom_lead_times_df.columns):
+            pairs = bom_lead_times_df[['bom_header_id', 'plant_id']].dropna()
+            for bom_id, plant_id in zip(pairs['bom_header_id'], pairs['plant_id']):
+                plants = self._bom_plants.setdefault(int(bom_id), [])
+                if int(plant_id) not in plants:
+                    plants.append(int(plant_id))
+
+    # -----------------------------------------------------------------
+    # Plants + capacity
+    # -----------------------------------------------------------------
+
+    def candidate_plants(self, bom_id: Optional[int]) -> List[int]:
+        """Plants that can run this BOM (POOL_PLANT_KEY if unknown)."""
+        if bom_id:
+            plants = self._bom_plants.get(int(bom_id))
+            if plants:
+                return plants
+        if len(self._plant_codes) == 1:
+            return list(self._plant_codes)
+        return [POOL_PLANT_KEY]
+
+    def plant_code(self, plant_id: int) -> str:
+        if plant_id == POOL_PLANT_KEY:
+            return ''
+        return self._plant_codes.get(plant_id, str(plant_id))
+
+    def daily_capacity(self, plant_id: int, bom_type: str) -> Optional[int]:
+        code = self.plant_code(plant_id) or None
+        return self._config.get_daily_mo_capacity(bom_type, code)
+
+    # -----------------------------------------------------------------
+    # Placement
+    # -----------------------------------------------------------------
+
+    def place(self, scheduled: List[Tuple], reference_date: date) -> CapacityReport:
+        """
+        Place MOs in the given (priority) order; update SchedulingResult dates.
+
+        Returns: CapacityReport with per-MO placement + pushed-out dates
+        """
+        report = CapacityReport()
+        horizon = self._config.planning_horizon_days or 180
+        calendars: Dict[Tuple[int, str], Optional[_ResourceCalendar]] = {}
+
+        def calendar_for(plant_id: int, bom_type: str) -> Optional[_ResourceCalendar]:
+            key = (plant_id, bom_type)
+            if key not in calendars:
+                capacity = self.daily_capacity(plant_id, bom_type)
+                calendars[key] = _ResourceCalendar(capacity, horizon) if capacity else None
+                if not capacity:
+                    report.unconstrained_resources.append(self._resource_label(plant_id, bom_type))
+            return calendars[key]
+
+        for item, sched, _readiness in scheduled:
+            if sched.actual_start is None:
+                report.not_placed += 1
+                continue
+
+            duration = max(int(sched.lead_time_days or 0), 1)
+            release = max((sched.actual_start - reference_date).days, 0)
+
+            best_plant, best_start, best_calendar = None, None, None
+            for plant_id in self.candidate_plants(item.bom_id):
+                calendar = calendar_for(plant_id, item.bom_type)
+                start = release if calendar is None else calendar.earliest_start(release, duration)
+                if best_start is None or start < best_start:
+                    best_plant, best_start, best_calendar = plant_id, start, calendar
+                if start == release:
+                    break
+
+            if best_calendar is not None:
+                best_calendar.book(best_start, duration)
+
+            requested = sched.actual_start
+            placement = CapacityPlacement(
+                product_id=item.product_id,
+                pt_code=item.pt_code,
+                bom_type=item.bom_type,
+                plant_id=None if best_plant == POOL_PLANT_KEY else best_plant,
+                plant_code=self.plant_code(best_plant),
+                daily_capacity=best_calendar.capacity if best_calendar is not None else None,
+                requested_start=requested,
+                scheduled_start=reference_date + timedelta(days=best_start),
+                lead_time_days=duration,
+                pushed_days=max(best_start - release, 0),
+            )
+            report.placements.append(placement)
+            self._apply(sched, placement)
+
+        report.peak_load = {
+            self._resource_label(plant_id, bom_type): calendar.peak
+            for (plant_id, bom_type), calendar in calendars.items()
+            if calendar is not None
+        }
+
+        summary = report.get_summary()
+        logger.info(
+            f"Finite capacity: {summary['placed']} placed, "
+            f"{summary['pushed_count']} pushed (max {summary['max_pushed_days']}d), "
+            f"{summary['not_placed']} without start date"
+        )
+        return report
+
+    @staticmethod
+    def _apply(sched, placement: CapacityPlacement):
+        """Move the SchedulingResult to its capacity-feasible start."""
+        sched.plant_id = placement.plant_id
+        sched.plant_code = placement.plant_code
+        sched.unconstrained_start = placement.requested_start
+        sched.capacity_push_days = placement.pushed_days
+        if placement.pushed_days <= 0:
+            return
+
+        sched.actual_start = placement.scheduled_start
+        sched.expected_completion = sched.actual_start + timedelta(days=sched.lead_time_days)
+        if sched.must_start_by is not None and sched.actual_start > sched.must_start_by:
+            sched.is_delayed = True
+            sched.delay_days = (sched.actual_start - sched.must_start_by).days
+            sched.delay_reason = 'CAPACITY_WAIT'
+
+    def _resource_label(self, plant_id: int, bom_type: str) -> str:
+        return f"{self.plant_code(plant_id) or 'ALL'}/{bom_type}"
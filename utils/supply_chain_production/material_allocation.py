@@ -0,0 +1,189 @@
+# utils/supply_chain_production/material_allocation.py
+
+"""
+Joint material allocation — Pass 2 strategy 'JOINT' of MaterialReadinessChecker.
+
+The GREEDY strategy allocates each contested material on its own. A product
+can then receive 100% of material A and 0% of material B — the A stock is
+reserved for an MO that cannot run, while lower-priority products that could
+have used it are left short.
+
+JOINT allocates per product across all of its primary materials at once:
+  1. Products are processed in scheduling priority order (lower score first)
+  2. Producible fraction f = min over materials of remaining / required,
+     rounded down to full BOM batches (0 if partial production not allowed)
+  3. The product reserves required × f of every material — never more than
+     it can actually turn into output
+  4. Unreserved stock stays available for the next product
+
+Only materials whose total primary demand exceeds supply can bind; products
+that do not touch one keep their Pass 1 readiness untouched. Duplicate BOM
+lines of one material within a product are summed into one demand row; each
+line then gets its share of the allocation.
+
+Material fields after allocation:
+  available_now   = Pass 1 supply (unchanged)
+  allocated_qty   = reserved for this product (required × f)
+  status/coverage = stock left for this product when its turn came
+"""
+
+import logging
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from .production_interfaces import ProductionInputItem, ProductReadiness
+
+logger = logging.getLogger(__name__)
+
+
+class JointMaterialAllocator:
+    """
+    Max-producible aware allocation of shared materials across products.
+
+    Usage:
+        allocator = JointMaterialAllocator(allow_partial=config.allow_partial_production)
+        readiness_map = allocator.allocate(items, readiness_map, supply_lookup, priority_scores)
+    """
+
+    def __init__(self, allow_partial: bool = True):
+        self._allow_partial = allow_partial
+
+    def allocate(
+        self,
+        items: List[ProductionInputItem],
+        readiness_map: Dict[int, ProductReadiness],
+        supply_lookup: Dict[int, float],
+        priority_scores: Optional[Dict[int, float]] = None,
+    ) -> Dict[int, ProductReadiness]:
+        """
+        Allocate supply jointly; updates ProductReadiness in place.
+
+        Args:
+            priority_scores: product_id → scheduling priority (lower = first).
+                Without scores, higher at_risk_value goes first.
+        """
+        if priority_scores is not None:
+            order = sorted(
+                (i for i in items if i.product_id in readiness_map),
+                key=lambda i: priority_scores.get(i.product_id, float('inf')),
+            )
+        else:
+            order = sorted(
+                (i for i in items if i.product_id in readiness_map),
+                key=lambda i: -i.at_risk_value,
+            )
+
+        # --- Indexed demand table: one row per (product, primary material) ---
+        mat_pos: Dict[int, int] = {}
+        row_mat: List[int] = []
+        row_req: List[float] = []
+        row_obj: List[List] = []
+        indptr = [0]
+        for item in order:
+            item_rows: Dict[int, int] = {}
+            for mat in readiness_map[item.product_id].materials:
+                if not mat.is_primary or mat.required_qty <= 0:
+                    continue
+                pos = mat_pos.setdefault(mat.material_id, len(mat_pos))
+                row = item_rows.get(pos)
+                if row is None:
+                    row = item_rows[pos] = len(row_mat)
+                    row_mat.append(pos)
+                    row_req.append(0.0)
+                    row_obj.append([])
+                row_req[row] += mat.required_qty
+                row_obj[row].append(mat)
+            indptr.append(len(row_mat))
+
+        if not row_mat:
+            return readiness_map
+
+        row_mat_arr = np.asarray(row_mat, dtype=np.int64)
+        row_req_arr = np.asarray(row_req, dtype=np.float64)
+        n_mats = len(mat_pos)
+
+        supply = np.zeros(n_mats, dtype=np.float64)
+        for mid, pos in mat_pos.items():
+            supply[pos] = max(0.0, supply_lookup.get(mid, 0.0))
+
+        total_demand = np.bincount(row_mat_arr, weights=row_req_arr, minlength=n_mats)
+        demand_count = np.bincount(row_mat_arr, minlength=n_mats)
+        oversubscribed = total_demand > supply + 1e-9
+        if not oversubscribed.any():
+            return readiness_map
+
+        # Products touching at least one oversubscribed material
+        row_over = oversubscribed[row_mat_arr]
+        touches = np.zeros(len(order), dtype=bool)
+        nonempty = np.flatnonzero(np.diff(indptr) > 0)
+        if nonempty.size:
+            touches[nonempty] = np.logical_or.reduceat(
+                row_over, np.asarray(indptr)[nonempty],
+            )
+
+        remaining = supply.copy()
+        affected = 0
+
+        for k in np.flatnonzero(touches):
+            item = order[k]
+            pr = readiness_map[item.product_id]
+            start, end = indptr[k], indptr[k + 1]
+            pos = row_mat_arr[start:end]
+            req = row_req_arr[start:end]
+
+            avail = np.minimum(remaining[pos], req)
+            fraction = float(np.min(avail / req))
+            producible = self._producible_qty(fraction, item.shortage_qty, item.bom_output_qty)
+            if item.shortage_qty > 0:
+                fraction = producible / item.shortage_qty
+
+            take = req * fraction
+            remaining[pos] -= take
+
+            for j in range(end - start):
+                a, r = float(avail[j]), float(req[j])
+                for mat in row_obj[start + j]:
+                    share = mat.required_qty / r
+                    mat.allocated_qty = float(take[j]) * share
+                    if not oversubscribed[pos[j]]:
+                        continue
+                    if demand_count[pos[j]] > 1:
+                        mat.is_contested = True
+                        mat.contention_products = int(demand_count[pos[j]])
+                    mat.shortage_qty = max(0.0, r - a) * share
+                    if a >= r:
+                        mat.status, mat.coverage_pct = 'READY', 100.0
+                    elif a > 0:
+                        mat.status, mat.coverage_pct = 'PARTIAL', round(a / r * 100, 1)
+                    else:
+                        mat.status, mat.coverage_pct = 'BLOCKED', 0.0
+
+            pr.max_producible_now = producible
+            pr.max_producible_pct = (
+                round(producible / item.shortage_qty * 100, 1)
+                if item.shortage_qty > 0 else 0.0
+            )
+            pr.recompute_overall_status()
+            affected += 1
+
+        logger.info(
+            f"Joint allocation: {int(oversubscribed.sum())} oversubscribed materials, "
+            f"{affected} products re-allocated"
+        )
+        return readiness_map
+
+    def _producible_qty(
+        self, fraction: float, shortage_qty: float, bom_output_qty: float,
+    ) -> float:
+        """Output the allocated fraction supports — full batches only."""
+        if shortage_qty <= 0 or fraction <= 0:
+            return 0.0
+        if fraction >= 1.0:
+            return shortage_qty
+        if not self._allow_partial:
+            return 0.0
+        producible = shortage_qty * fraction
+        if bom_output_qty > 0:
+            producible = int(producible / bom_output_qty) * bom_output_qty
+        return max(0.0, producible)
@@ -10,6 +10,8 @@ Two-pass architecture:
   Pass 1: Check each product's BOM materials independently against supply
   Pass 2: Resolve contention when multiple products compete for the same material
            (allocate by priority score — higher priority gets first pick)
+           GREEDY: per material, independently (default)
+           JOINT:  per product across all its materials (see material_allocation.py)
 
 Inputs (all from GAP result, no DB queries):
   - bom_explosion_df: BOM materials per product
@@ -25,12 +27,14 @@ Output:
 import logging
 from collections import defaultdict
 from datetime import date, timedelta
-from typing import Dict, List, Optional, Set, Tuple
+from typing import Callable, Dict, List, Optional, Set, Tuple
 
 import numpy as np
 import pandas as pd
 
+from .material_allocation import JointMaterialAllocator
 from .production_config import ProductionConfig
+from .production_constants import ALLOCATION_STRATEGIES
 from .production_interfaces import (
     MaterialReadiness,
     MaterialRequirement,
@@ -51,10 +55,27 @@ class MaterialReadinessChecker:
         checker = MaterialReadinessChecker(config)
         readiness_map = checker.check_all(items, gap_result, po_result)
         # readiness_map: Dict[product_id → ProductReadiness]
+
+        # Joint allocation ordered by real scheduling priority
+        checker = MaterialReadinessChecker(config, strategy='JOINT')
+        readiness_map = checker.check_all(
+            items, gap_result, po_result,
+            priority_fn=lambda rm: engine.preview_priority_scores(items, rm),
+        )
     """
 
-    def __init__(self, config: ProductionConfig):
+    def __init__(self, config: ProductionConfig, strategy: Optional[str] = None):
         self._config = config
+        self._strategy = strategy or config.material_allocation_strategy
+        if self._strategy not in ALLOCATION_STRATEGIES:
+            raise ValueError(
+                f"Unknown allocation strategy '{self._strategy}' — "
+                f"expected one of {list(ALLOCATION_STRATEGIES)}"
+            )
+
+    @property
+    def strategy(self) -> str:
+        return self._strategy
 
     # =====================================================================
     # PUBLIC: Check all products
@@ -65,6 +86,7 @@ class MaterialReadinessChecker:
         items: List[ProductionInputItem],
         gap_result,
         po_result=None,
+        priority_fn: Optional[Callable[[Dict[int, ProductReadiness]], Dict[int, float]]] = None,
     ) -> Dict[int, ProductReadiness]:
         """
         Two-pass material readiness check for all production input items.
@@ -72,12 +94,17 @@ class MaterialReadinessChecker:
         Pass 1: Check each product independently
         Pass 2: Resolve contention (multiple products → same material)
 
+        Args:
+            priority_fn: Pass 1 readiness_map → {product_id: priority_score}
+                (lower = more urgent). Without it, at_risk_value is the proxy.
+
         Returns: Dict[product_id → ProductReadiness]
         """
         if not items:
             return {}
 
         # Pre-build lookups from GAP result (once, shared across all products)
+        bom_graph = self._get_bom_graph(gap_result)
         supply_lookup = self._build_supply_lookup(gap_result)
         alt_lookup = self._build_alternative_lookup(gap_result)
         period_lookup = self._build_period_eta_lookup(gap_result)
@@ -85,25 +112,66 @@ class MaterialReadinessChecker:
 
         # === PASS 1: Individual readiness ===
         readiness_map: Dict[int, ProductReadiness] = {}
-        material_demand_registry: Dict[int, List[Dict]] = defaultdict(list)
 
         for item in items:
             readiness = self._check_single_product(
                 item, gap_result, supply_lookup, alt_lookup,
-                period_lookup, po_eta_lookup,
+                period_lookup, po_eta_lookup, bom_graph,
             )
             readiness_map[item.product_id] = readiness
 
+        priority_scores = priority_fn(readiness_map) if priority_fn is not None else None
+
+        # === PASS 2: Contention resolution ===
+        if self._strategy == 'JOINT':
+            readiness_map = JointMaterialAllocator(
+                allow_partial=self._config.allow_partial_production,
+            ).allocate(items, readiness_map, supply_lookup, priority_scores)
+        else:
+            readiness_map = self._resolve_contention_greedy(
+                items, readiness_map, supply_lookup, priority_scores,
+            )
+
+        # Summary log
+        statuses = defaultdict(int)
+        for pr in readiness_map.values():
+            statuses[pr.overall_status] += 1
+        logger.info(
+            f"Material readiness check complete ({self._strategy}): "
+            f"{len(readiness_map)} products — "
+            + ", ".join(f"{s}: {c}" for s, c in sorted(statuses.items()))
+        )
+
+        return readiness_map
+
+    def _resolve_contention_greedy(
+        self,
+        items: List[ProductionInputItem],
+        readiness_map: Dict[int, ProductReadiness],
+        supply_lookup: Dict[int, float],
+        priority_scores: Optional[Dict[int, float]],
+    ) -> Dict[int, ProductReadiness]:
+        """GREEDY strategy: register non-ready demand per material, resolve each."""
+        material_demand_registry: Dict[int, List[Dict]] = defaultdict(list)
+
+        for item in items:
+            # Sort key (ascending = first pick): real priority score when
+            # available, else at_risk_value (higher value first)
+            if priority_scores is not None:
+                rank = priority_scores.get(item.product_id, float('inf'))
+            else:
+                rank = -item.at_risk_value
+
             # Register material demand for contention detection
-            for mat in readiness.materials:
+            for mat in readiness_map[item.product_id].materials:
                 if mat.is_primary and mat.status != 'READY':
                     material_demand_registry[mat.material_id].append({
                         'product_id': item.product_id,
                         'required_qty': mat.required_qty,
-                        'priority_score': item.at_risk_value,  # temp proxy; real score set in scheduling
+                        'priority_rank': rank,
+                        'material': mat,
                     })
 
-        # === PASS 2: Contention resolution ===
         contested = {
             mid: demands
             for mid, demands in material_demand_registry.items()
@@ -119,15 +187,6 @@ class MaterialReadinessChecker:
                 readiness_map, contested, supply_lookup,
             )
 
-        # Summary log
-        statuses = defaultdict(int)
-        for pr in readiness_map.values():
-            statuses[pr.overall_status] += 1
-        logger.info(
-            f"Material readiness check complete: {len(readiness_map)} products — "
-            + ", ".join(f"{s}: {c}" for s, c in sorted(statuses.items()))
-        )
-
         return readiness_map
 
     # =====================================================================
@@ -142,6 +201,7 @@ class MaterialReadinessChecker:
         alt_lookup: Dict[int, Dict],
         period_lookup: Dict[int, Optional[date]],
         po_eta_lookup: Dict[int, Optional[date]],
+        bom_graph=None,
     ) -> ProductReadiness:
         """Check material readiness for one product."""
 
@@ -151,6 +211,7 @@ class MaterialReadinessChecker:
             product_id=item.product_id,
             shortage_qty=item.shortage_qty,
             bom_output_qty=item.bom_output_qty,
+            bom_graph=bom_graph,
         )
 
         if not mat_requirements:
@@ -347,63 +408,50 @@ class MaterialReadinessChecker:
         Allocate contested materials by priority.
 
         For each contested material:
-        1. Sort competing products by priority (higher at_risk_value = higher priority)
+        1. Sort competing products by priority_rank (ascending)
         2. Allocate available supply to highest priority first
         3. Lower-priority products get reduced allocation → may downgrade status
         """
+        affected_pids: Set[int] = set()
         for material_id, demands in contested.items():
             available = supply_lookup.get(material_id, 0.0)
 
-            # Sort: highest at_risk_value first (proxy for priority before scoring).
-            # NOTE: This uses at_risk_value as proxy because real priority_score
-            # is not yet computed (scheduling runs AFTER readiness check).
-            # Higher at_risk_value = more business-critical = gets material first.
-            # If refactoring to use real priority_score (lower=more urgent),
-            # reverse the sort order.
-            sorted_demands = sorted(
-                demands, key=lambda d: d['priority_score'], reverse=True,
-            )
+            # Sort: lowest priority_rank first (real priority score, or
+            # negated at_risk_value when no scores were supplied)
+            sorted_demands = sorted(demands, key=lambda d: d['priority_rank'])
 
             remaining = available
             for demand in sorted_demands:
-                product_id = demand['product_id']
-                required = demand['required_qty']
-                allocated = min(remaining, required)
+                allocated = min(remaining, demand['required_qty'])
                 remaining = max(0, remaining - allocated)
 
                 # Update material allocation in the product's readiness
-                pr = readiness_map.get(product_id)
-                if pr is None:
-                    continue
-
-                for mat in pr.materials:
-                    if mat.material_id == material_id and mat.is_primary:
-                        mat.allocated_qty = allocated
-                        mat.is_contested = True
-                        mat.contention_products = len(sorted_demands)
-
-                        # Recompute status based on allocation (not raw available)
-                        if allocated >= mat.required_qty:
-                            mat.status = 'READY'
-                            mat.coverage_pct = 100.0
-                        elif allocated > 0:
-                            mat.status = 'PARTIAL'
-                            mat.coverage_pct = round(
-                                allocated / mat.required_qty * 100, 1
-                            )
-                        else:
-                            mat.status = 'BLOCKED'
-                            mat.coverage_pct = 0.0
-
-                        mat.shortage_qty = max(0, mat.required_qty - allocated)
-                        break
-
-            # Recompute overall status for all affected products
-            affected_pids = {d['product_id'] for d in sorted_demands}
-            for pid in affected_pids:
-                pr = readiness_map.get(pid)
-                if pr:
-                    pr.recompute_overall_status()
+                mat = demand['material']
+                mat.allocated_qty = allocated
+                mat.is_contested = True
+                mat.contention_products = len(sorted_demands)
+
+                # Recompute status based on allocation (not raw available)
+                if allocated >= mat.required_qty:
+                    mat.status = 'READY'
+                    mat.coverage_pct = 100.0
+                elif allocated > 0:
+                    mat.status = 'PARTIAL'
+                    mat.coverage_pct = round(
+                        allocated / mat.required_qty * 100, 1
+                    )
+                else:
+                    mat.status = 'BLOCKED'
+                    mat.coverage_pct = 0.0
+
+                mat.shortage_qty = max(0, mat.required_qty - allocated)
+                affected_pids.add(demand['product_id'])
+
+        # Recompute overall status once per affected product
+        for pid in affected_pids:
+            pr = readiness_map.get(pid)
+            if pr:
+                pr.recompute_overall_status()
 
         return readiness_map
 
@@ -411,6 +459,19 @@ class MaterialReadinessChecker:
     # LOOKUP BUILDERS (from GAP result, built once)
     # =====================================================================
 
+    @staticmethod
+    def _get_bom_graph(gap_result):
+        """
+        BOM index for per-product BOM slicing.
+        Reuses the graph compiled by the GAP calculator when it matches the
+        result's bom_explosion_df; otherwise compiles one for this run.
+        """
+        bom_df = getattr(gap_result, 'bom_explosion_df', None)
+        if bom_df is None or not isinstance(bom_df, pd.DataFrame) or bom_df.empty:
+            return None
+        from utils.supply_chain_gap.bom_graph import get_bom_graph
+        return get_bom_graph(bom_df, getattr(gap_result, 'bom_graph', None))
+
     def _build_supply_lookup(self, gap_result) -> Dict[int, float]:
         """
         Build material_id → available_supply from raw_gap_df.
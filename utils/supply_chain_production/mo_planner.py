@@ -9,6 +9,7 @@ Pipeline:
 3. Load supplementary data (existing MOs, historical stats)
 4. Material readiness check (2-pass: individual + contention)
 5. Schedule + prioritize (3-tier lead time, backward scheduling)
+   + optional finite-capacity placement (CAPACITY.FINITE_SCHEDULING)
 6. Build MOLineItems + categorize (Ready / Waiting / Blocked)
 7. Reconciliation (input = output, no items disappear)
 
@@ -59,6 +60,7 @@ class MOPlanner:
         existing_mo_df: Optional[pd.DataFrame] = None,
         so_linkage_df: Optional[pd.DataFrame] = None,
         bom_lead_times_df: Optional[pd.DataFrame] = None,
+        plants_df: Optional[pd.DataFrame] = None,
     ):
         if not config.is_ready:
             raise ValueError(
@@ -70,7 +72,7 @@ class MOPlanner:
         self._config = config
         self._readiness_checker = MaterialReadinessChecker(config)
         self._scheduling_engine = MOSchedulingEngine(
-            config, lead_time_stats_df, bom_lead_times_df,
+            config, lead_time_stats_df, bom_lead_times_df, plants_df,
         )
 
         # Existing MO lookup: product_id → summary row
@@ -158,13 +160,25 @@ class MOPlanner:
         )
 
         # Step 2: Material readiness check (2-pass)
-        readiness_map = self._readiness_checker.check_all(items, gap_result, po_result)
+        readiness_map = self._readiness_checker.check_all(
+            items, gap_result, po_result,
+            priority_fn=lambda rm: self._scheduling_engine.preview_priority_scores(
+                items, rm, reference_date,
+            ),
+        )
 
         # Step 3: Schedule + prioritize
         scheduled, unschedulable = self._scheduling_engine.schedule_and_prioritize(
             items, readiness_map, reference_date,
         )
 
+        # Step 3b: Finite capacity — push out MOs beyond daily plant capacity
+        capacity_report = None
+        if self._config.capacity_finite_enabled:
+            capacity_report = self._scheduling_engine.apply_finite_capacity(
+                scheduled, reference_date,
+            )
+
         # Step 4: Build MOLineItems
         all_lines: List[MOLineItem] = []
         processing_errors: List[str] = []
@@ -202,7 +216,10 @@ class MOPlanner:
                 'use_historical_yield': self._config.yield_use_historical,
                 'planning_horizon': self._config.planning_horizon_days,
                 'allow_partial': self._config.allow_partial_production,
+                'allocation_strategy': self._readiness_checker.strategy,
+                'finite_capacity': self._config.capacity_finite_enabled,
             },
+            capacity_report=capacity_report,
         )
 
         # Step 6: Categorize
@@ -303,6 +320,11 @@ class MOPlanner:
             delay_days=sched.delay_days,
             delay_reason=sched.delay_reason,
 
+            # Finite capacity
+            plant_code=sched.plant_code,
+            unconstrained_start=sched.unconstrained_start,
+            capacity_push_days=sched.capacity_push_days,
+
             # Urgency
             urgency_level=sched.urgency_level,
             urgency_priority=sched.urgency_priority,
@@ -400,6 +422,7 @@ class MOPlanner:
         existing_mos = data_loader.load_existing_mo_summary()
         so_linkage = data_loader.load_product_so_linkage()
         bom_lead_times = data_loader.load_bom_lead_times()
+        plants = data_loader.load_plants() if config.capacity_finite_enabled else None
 
         return cls(
             config=config,
@@ -407,4 +430,5 @@ class MOPlanner:
             existing_mo_df=existing_mos,
             so_linkage_df=so_linkage,
             bom_lead_times_df=bom_lead_times,
+            plants_df=plants,
         )
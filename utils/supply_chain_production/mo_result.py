@@ -78,7 +78,12 @@ class MOLineItem:
     # Delay
     is_delayed: bool = False
     delay_days: int = 0
-    delay_reason: str = ''               # ON_TIME, MATERIAL_WAIT, MATERIAL_BLOCKED_NO_ETA
+    delay_reason: str = ''               # ON_TIME, MATERIAL_WAIT, MATERIAL_BLOCKED_NO_ETA, CAPACITY_WAIT
+
+    # Finite capacity (empty unless CAPACITY.FINITE_SCHEDULING)
+    plant_code: str = ''
+    unconstrained_start: Optional[date] = None
+    capacity_push_days: int = 0
 
     # Urgency
     urgency_level: str = 'PLANNED'
@@ -141,6 +146,9 @@ class MOLineItem:
             'is_delayed': self.is_delayed,
             'delay_days': self.delay_days,
             'delay_reason': self.delay_reason,
+            'plant_code': self.plant_code,
+            'unconstrained_start': self.unconstrained_start,
+            'capacity_push_days': self.capacity_push_days,
             'urgency_level': self.urgency_level,
             'urgency_priority': self.urgency_priority,
             'priority_score': self.priority_score,
@@ -187,6 +195,9 @@ class MOSuggestionResult:
     # Config used
     config_snapshot: Dict[str, Any] = field(default_factory=dict)
 
+    # Finite-capacity placement (CapacityReport, None = infinite capacity)
+    capacity_report: Optional[Any] = None
+
     # =====================================================================
     # CATEGORIZE
     # =====================================================================
@@ -368,6 +379,7 @@ class MOSuggestionResult:
 
         overdue_count = sum(1 for l in self.all_lines if l.urgency_level == 'OVERDUE')
         delayed_count = sum(1 for l in self.all_lines if l.is_delayed)
+        capacity_pushed_count = sum(1 for l in self.all_lines if l.capacity_push_days > 0)
 
         # BOM type distribution
         bom_dist = {}
@@ -392,6 +404,7 @@ class MOSuggestionResult:
             'urgency_distribution': urgency_dist,
             'overdue_count': overdue_count,
             'delayed_count': delayed_count,
+            'capacity_pushed_count': capacity_pushed_count,
             'bom_type_distribution': bom_dist,
             'contention_count': contention_count,
             'reconciliation': self.get_reconciliation(),
@@ -14,6 +14,11 @@ Core calculations:
   expected_complete  = actual_start + production_lead_time
   is_delayed         = actual_start > must_start_by
 
+Finite capacity (optional, CAPACITY.FINITE_SCHEDULING=true):
+  apply_finite_capacity() re-places the prioritized MOs on a per plant ×
+  BOM type day calendar (see capacity_scheduler.py) and pushes out starts
+  that would exceed the daily MO limit (delay_reason = CAPACITY_WAIT).
+
 Priority scoring:
   Composite of 4 weighted factors (weights from config, must sum to 100):
   - Time urgency (days to demand)
@@ -100,7 +105,13 @@ class SchedulingResult:
     # Delay analysis
     is_delayed: bool = False
     delay_days: int = 0
-    delay_reason: str = 'ON_TIME'   # ON_TIME, MATERIAL_WAIT, MATERIAL_BLOCKED_NO_ETA
+    delay_reason: str = 'ON_TIME'   # ON_TIME, MATERIAL_WAIT, MATERIAL_BLOCKED_NO_ETA, CAPACITY_WAIT
+
+    # Finite capacity (set by apply_finite_capacity)
+    plant_id: Optional[int] = None
+    plant_code: str = ''
+    unconstrained_start: Optional[date] = None   # actual_start before capacity placement
+    capacity_push_days: int = 0
 
     # Urgency
     urgency_level: str = 'PLANNED'
@@ -126,8 +137,10 @@ class MOSchedulingEngine:
         config: ProductionConfig,
         lead_time_stats_df: Optional[pd.DataFrame] = None,
         bom_lead_times_df: Optional[pd.DataFrame] = None,
+        plants_df: Optional[pd.DataFrame] = None,
     ):
         self._config = config
+        self._plants = plants_df if plants_df is not None else pd.DataFrame()
         self._lt_stats = lead_time_stats_df if lead_time_stats_df is not None else pd.DataFrame()
         self._bom_lt = bom_lead_times_df if bom_lead_times_df is not None else pd.DataFrame()
 
@@ -794,6 +807,72 @@ class MOSchedulingEngine:
 
         return scheduled, unschedulable
 
+    def preview_priority_scores(
+        self,
+        items: List[ProductionInputItem],
+        readiness_map: Dict[int, ProductReadiness],
+        reference_date: Optional[date] = None,
+    ) -> Dict[int, float]:
+        """
+        Priority scores from a preliminary readiness map (no side effects).
+
+        Lets material allocation run in the same order scheduling will use.
+        Unschedulable items get no score.
+        """
+        if reference_date is None:
+            reference_date = date.today()
+
+        scheduled = []
+        for item in items:
+            readiness = readiness_map.get(item.product_id)
+            if readiness is None:
+                continue
+            sched_result, _ = self.try_schedule(item, readiness, reference_date)
+            if sched_result is not None:
+                scheduled.append((item, sched_result, readiness))
+
+        max_arv = max((i.at_risk_value for i, _, _ in scheduled), default=1.0) or 1.0
+        return {
+            item.product_id: self.calculate_priority(
+                item, readiness, sched, max_arv, reference_date,
+            )
+            for item, sched, readiness in scheduled
+        }
+
+    # =====================================================================
+    # BATCH: Finite-capacity placement
+    # =====================================================================
+
+    def apply_finite_capacity(
+        self,
+        scheduled: List[Tuple[ProductionInputItem, SchedulingResult, ProductReadiness]],
+        reference_date: Optional[date] = None,
+    ):
+        """
+        Re-place prioritized MOs against daily plant capacity.
+
+        scheduled must be in priority order (output of schedule_and_prioritize).
+        Pushed-out MOs get new actual_start / expected_completion, delay and
+        urgency; the original start is kept in unconstrained_start.
+
+        Returns: CapacityReport
+        """
+        from .capacity_scheduler import FiniteCapacityScheduler
+
+        if reference_date is None:
+            reference_date = date.today()
+
+        scheduler = FiniteCapacityScheduler(self._config, self._plants, self._bom_lt)
+        report = scheduler.place(scheduled, reference_date)
+
+        for _, sched, _ in scheduled:
+            if sched.capacity_push_days > 0:
+                urgency = self._classify_urgency((sched.actual_start - reference_date).days)
+                sched.urgency_level = urgency
+                sched.urgency_priority = MO_URGENCY_LEVELS.get(urgency, {}).get('priority', 5)
+
+        return report
+
     # =====================================================================
     # HISTORICAL INDEX BUILDERS
     # =====================================================================
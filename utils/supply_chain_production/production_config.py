@@ -21,6 +21,8 @@ from typing import Dict, Any, List, Optional, Tuple
 
 import pandas as pd
 
+from .production_constants import ALLOCATION_STRATEGIES, DEFAULT_ALLOCATION_STRATEGY
+
 logger = logging.getLogger(__name__)
 
 
@@ -62,6 +64,15 @@ class ProductionConfig:
     # -- PLANNING --
     planning_horizon_days: Optional[int] = None
     allow_partial_production: bool = False
+    material_allocation_strategy: str = DEFAULT_ALLOCATION_STRATEGY   # GREEDY, JOINT
+
+    # -- CAPACITY (finite-capacity scheduling, optional) --
+    capacity_finite_enabled: bool = False
+    capacity_cutting_daily_mos: Optional[int] = None
+    capacity_repacking_daily_mos: Optional[int] = None
+    capacity_kitting_daily_mos: Optional[int] = None
+    # (plant_code, bom_type) → daily MO limit, overrides the BOM-type default
+    plant_capacity: Dict[Tuple[str, str], int] = field(default_factory=dict)
 
     # -- Validation state --
     missing_required: List[str] = field(default_factory=list)
@@ -89,6 +100,24 @@ class ProductionConfig:
         }
         return mapping.get(bom_type)
 
+    def get_daily_mo_capacity(
+        self, bom_type: str, plant_code: Optional[str] = None
+    ) -> Optional[int]:
+        """
+        Max MOs of a BOM type one plant runs per day.
+        Plant-specific limit first, then BOM-type default. None = unconstrained.
+        """
+        if plant_code:
+            limit = self.plant_capacity.get((plant_code, bom_type))
+            if limit is not None:
+                return limit
+        mapping = {
+            'CUTTING': self.capacity_cutting_daily_mos,
+            'REPACKING': self.capacity_repacking_daily_mos,
+            'KITTING': self.capacity_kitting_daily_mos,
+        }
+        return mapping.get(bom_type)
+
 
 # =============================================================================
 # CONFIG FIELD MAPPING — DB key → dataclass field + cast function
@@ -116,8 +145,17 @@ _FIELD_MAP: Dict[Tuple[str, str], Tuple[str, type]] = {
 
     ('PLANNING', 'DEFAULT_HORIZON_DAYS'):       ('planning_horizon_days', int),
     ('PLANNING', 'ALLOW_PARTIAL_PRODUCTION'):   ('allow_partial_production', bool),
+    ('PLANNING', 'MATERIAL_ALLOCATION_STRATEGY'): ('material_allocation_strategy', str),
+
+    ('CAPACITY', 'FINITE_SCHEDULING'):          ('capacity_finite_enabled', bool),
+    ('CAPACITY', 'CUTTING.DAILY_MO_LIMIT'):     ('capacity_cutting_daily_mos', int),
+    ('CAPACITY', 'REPACKING.DAILY_MO_LIMIT'):   ('capacity_repacking_daily_mos', int),
+    ('CAPACITY', 'KITTING.DAILY_MO_LIMIT'):     ('capacity_kitting_daily_mos', int),
 }
 
+# Plant-specific capacity: CAPACITY.<PLANT_CODE>.<BOM_TYPE>.DAILY_MO_LIMIT
+_PLANT_CAPACITY_SUFFIX = '.DAILY_MO_LIMIT'
+
 
 def _cast_value(raw: str, target_type: type):
     """
@@ -193,6 +231,11 @@ class ProductionConfigLoader:
 
             mapping = _FIELD_MAP.get((group, key))
             if mapping is None:
+                if group == 'CAPACITY' and key.endswith(_PLANT_CAPACITY_SUFFIX):
+                    parts = key[:-len(_PLANT_CAPACITY_SUFFIX)].rsplit('.', 1)
+                    limit = _cast_value(raw_value, int)
+                    if len(parts) == 2 and limit is not None:
+                        config.plant_capacity[(parts[0], parts[1])] = limit
                 continue
 
             field_name, cast_type = mapping
@@ -257,6 +300,31 @@ class ProductionConfigLoader:
                         f"{config_key}: value {val} outside allowed range [{min_val}, {max_val}]"
                     )
 
+        if config.material_allocation_strategy not in ALLOCATION_STRATEGIES:
+            errors.append(
+                f"PLANNING.MATERIAL_ALLOCATION_STRATEGY: '{config.material_allocation_strategy}' "
+                f"not one of {list(ALLOCATION_STRATEGIES)}"
+            )
+
+        # Daily MO capacity (finite scheduling)
+        capacity_checks = [
+            ('CAPACITY.CUTTING.DAILY_MO_LIMIT', config.capacity_cutting_daily_mos),
+            ('CAPACITY.REPACKING.DAILY_MO_LIMIT', config.capacity_repacking_daily_mos),
+            ('CAPACITY.KITTING.DAILY_MO_LIMIT', config.capacity_kitting_daily_mos),
+        ] + [
+            (f"CAPACITY.{plant}.{bom_type}.DAILY_MO_LIMIT", limit)
+            for (plant, bom_type), limit in config.plant_capacity.items()
+        ]
+        for config_key, val in capacity_checks:
+            if val is not None and (val < 1 or val > 1000):
+                errors.append(f"{config_key}: value {val} outside allowed range [1, 1000]")
+        if config.capacity_finite_enabled and not any(
+            val is not None for _, val in capacity_checks
+        ):
+            errors.append(
+                "CAPACITY.FINITE_SCHEDULING is enabled but no DAILY_MO_LIMIT is configured"
+            )
+
         # Scrap pct range
         for bom_type in ('cutting', 'repacking', 'kitting'):
             val = getattr(config, f'yield_{bom_type}_default_scrap_pct', None)
@@ -11,7 +11,7 @@ production_planning_config table via production_config.py.
 # =============================================================================
 # VERSION
 # =============================================================================
-VERSION = "1.1.0"
+VERSION = "1.2.0"
 
 # =============================================================================
 # BOM TYPES — matches bom_headers.bom_type enum
@@ -204,6 +204,22 @@ UNSCHEDULABLE_REASONS = {
     },
 }
 
+# =============================================================================
+# MATERIAL ALLOCATION STRATEGIES — PLANNING.MATERIAL_ALLOCATION_STRATEGY
+# =============================================================================
+ALLOCATION_STRATEGIES = {
+    'GREEDY': {
+        'label': 'Per Material',
+        'description': 'Each contested material allocated independently by priority',
+    },
+    'JOINT': {
+        'label': 'Joint (Max Producible)',
+        'description': 'Allocate all materials of a product together — '
+                       'only reserve what the product can actually produce',
+    },
+}
+DEFAULT_ALLOCATION_STRATEGY = 'GREEDY'
+
 # =============================================================================
 # CONFIG GROUPS — for Settings UI rendering
 # =============================================================================
@@ -228,6 +244,11 @@ CONFIG_GROUPS = {
         'icon': '📋',
         'description': 'General planning parameters',
     },
+    'CAPACITY': {
+        'label': 'Capacity Setup',
+        'icon': '🏭',
+        'description': 'Daily MO limit per BOM type / plant for finite-capacity scheduling (optional)',
+    },
 }
 
 # =============================================================================
@@ -10,6 +10,9 @@ Sheets:
 4. Unschedulable — missing config items
 5. Material Matrix — readiness matrix (product × material)
 6. Summary — KPIs, reconciliation, config snapshot
+
+Written through utils.excel_stream (xlsxwriter, constant_memory); row colors
+and number formats are applied while rows stream.
 """
 
 import pandas as pd
@@ -18,13 +21,13 @@ from datetime import datetime
 import logging
 from typing import Optional
 
+from utils.excel_stream import ExcelStreamWriter
+
 from .production_constants import URGENCY_LEVELS, READINESS_STATUS, VERSION
 from .mo_result import MOSuggestionResult
 
 logger = logging.getLogger(__name__)
 
-HEADER_FILL_HEX = '2E75B6'
-HEADER_FONT_COLOR = 'FFFFFF'
 URGENCY_COLORS = {
     'OVERDUE': 'F2DCDB', 'CRITICAL': 'F2DCDB',
     'URGENT': 'FDE9D9', 'THIS_WEEK': 'FFFFCC', 'PLANNED': 'D6EAFF',
@@ -97,6 +100,9 @@ def _lines_to_df(lines, include_readiness=True):
         else:
             row['Delay Days'] = l.delay_days if l.is_delayed else ''
         row['Delay Reason'] = l.delay_reason if l.is_delayed else ''
+        if l.capacity_push_days > 0:
+            row['Plant'] = l.plant_code
+            row['Capacity Push (days)'] = l.capacity_push_days
         row['At Risk Value ($)'] = round(l.at_risk_value, 2)
         row['Customers'] = l.customer_count
         row['Has SO'] = 'Yes' if l.has_sales_order else ''
@@ -112,108 +118,33 @@ def _lines_to_df(lines, include_readiness=True):
     return pd.DataFrame(rows)
 
 
-def _apply_sheet_formatting(ws, df, col_widths=None, currency_cols=None,
-                            number_cols=None, date_cols=None,
-                            urgency_col=None, readiness_col=None):
-    """Apply professional formatting to a worksheet."""
-    try:
-        from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-        from openpyxl.utils import get_column_letter
-    except ImportError:
-        return
-
-    thin = Border(
-        left=Side(style='thin', color='D9D9D9'),
-        right=Side(style='thin', color='D9D9D9'),
-        top=Side(style='thin', color='D9D9D9'),
-        bottom=Side(style='thin', color='D9D9D9'),
-    )
-    hdr_font = Font(name='Arial', bold=True, color=HEADER_FONT_COLOR, size=10)
-    hdr_fill = PatternFill(start_color=HEADER_FILL_HEX, end_color=HEADER_FILL_HEX, fill_type='solid')
-    hdr_align = Alignment(horizontal='center', vertical='center', wrap_text=True)
-    dfont = Font(name='Arial', size=10)
-
-    nrows, ncols = len(df), len(df.columns)
-
-    # Header row
-    for ci in range(1, ncols + 1):
-        c = ws.cell(row=1, column=ci)
-        c.font, c.fill, c.alignment, c.border = hdr_font, hdr_fill, hdr_align, thin
-
-    ws.freeze_panes = 'A2'
-    if nrows > 0:
-        ws.auto_filter.ref = ws.dimensions
-
-    col_map = {name: idx + 1 for idx, name in enumerate(df.columns)}
-    widths = dict(DEFAULT_COL_WIDTHS)
-    if col_widths:
-        widths.update(col_widths)
-
-    for col_name, ci in col_map.items():
-        letter = get_column_letter(ci)
-        ws.column_dimensions[letter].width = widths.get(col_name, 14)
-
-    # Data formatting
-    for ri in range(2, nrows + 2):
-        for ci in range(1, ncols + 1):
-            c = ws.cell(row=ri, column=ci)
-            c.font = dfont
-            c.border = thin
-
-    # Currency formatting
-    if currency_cols:
-        for col_name in currency_cols:
-            if col_name in col_map:
-                ci = col_map[col_name]
-                for ri in range(2, nrows + 2):
-                    ws.cell(row=ri, column=ci).number_format = '$#,##0.00'
-
-    # Number formatting
-    if number_cols:
-        for col_name in number_cols:
-            if col_name in col_map:
-                ci = col_map[col_name]
-                for ri in range(2, nrows + 2):
-                    ws.cell(row=ri, column=ci).number_format = '#,##0'
-
-    # Urgency row coloring
-    if urgency_col and urgency_col in col_map:
-        ci = col_map[urgency_col]
-        for ri in range(2, nrows + 2):
-            val = ws.cell(row=ri, column=ci).value
-            color = URGENCY_COLORS.get(val)
-            if color:
-                fill = PatternFill(start_color=color, end_color=color, fill_type='solid')
-                for cj in range(1, ncols + 1):
-                    ws.cell(row=ri, column=cj).fill = fill
-
-    # Readiness row coloring
-    if readiness_col and readiness_col in col_map:
-        ci = col_map[readiness_col]
-        for ri in range(2, nrows + 2):
-            val = ws.cell(row=ri, column=ci).value
-            # Map label back to key
-            label_to_key = {v.get('label', k): k for k, v in READINESS_STATUS.items()}
-            key = label_to_key.get(val, val)
-            color = READINESS_COLORS.get(key)
-            if color:
-                fill = PatternFill(start_color=color, end_color=color, fill_type='solid')
-                for cj in range(1, ncols + 1):
-                    ws.cell(row=ri, column=cj).fill = fill
+def _row_fills(df, urgency_col=None, readiness_col=None):
+    """Row fill color per row: urgency key, else readiness label → key."""
+    fills = pd.Series([None] * len(df), index=df.index, dtype=object)
+    if urgency_col and urgency_col in df.columns:
+        fills = df[urgency_col].map(URGENCY_COLORS).where(lambda s: s.notna(), fills)
+    if readiness_col and readiness_col in df.columns:
+        label_to_key = {v.get('label', k): k for k, v in READINESS_STATUS.items()}
+        keys = df[readiness_col].map(lambda val: label_to_key.get(val, val))
+        fills = keys.map(READINESS_COLORS).where(lambda s: s.notna(), fills)
+    return fills
+
+
+def _write_sheet(writer, df, sheet_name, urgency_col=None, readiness_col=None, **formats):
+    """Write df as a formatted sheet (header band, widths, number formats, row fills)."""
+    fills = _row_fills(df, urgency_col, readiness_col) if (urgency_col or readiness_col) else None
+    writer.write_sheet(df, sheet_name, row_fills=fills, **formats)
 
 
 def export_mo_suggestions_to_excel(result: MOSuggestionResult) -> BytesIO:
     """Export full MO suggestion result to multi-sheet Excel."""
-    buffer = BytesIO()
-
-    with pd.ExcelWriter(buffer, engine='openpyxl') as writer:
+    def write(writer):
         # Sheet 1: Ready MOs
         ready_df = _lines_to_df(result.ready_lines, include_readiness=False)
         if ready_df.empty:
             ready_df = pd.DataFrame({'Info': ['No items ready to produce']})
-        ready_df.to_excel(writer, sheet_name='Ready MOs', index=False)
-        _apply_sheet_formatting(
-            writer.sheets['Ready MOs'], ready_df,
+        _write_sheet(
+            writer, ready_df, 'Ready MOs',
             currency_cols=['At Risk Value ($)'],
             number_cols=['Shortage Qty', 'Suggested Qty', 'Batches'],
             urgency_col='Urgency',
@@ -223,9 +154,8 @@ def export_mo_suggestions_to_excel(result: MOSuggestionResult) -> BytesIO:
         waiting_df = _lines_to_df(result.waiting_lines, include_readiness=True)
         if waiting_df.empty:
             waiting_df = pd.DataFrame({'Info': ['No items waiting for materials']})
-        waiting_df.to_excel(writer, sheet_name='Waiting MOs', index=False)
-        _apply_sheet_formatting(
-            writer.sheets['Waiting MOs'], waiting_df,
+        _write_sheet(
+            writer, waiting_df, 'Waiting MOs',
             currency_cols=['At Risk Value ($)'],
             number_cols=['Shortage Qty', 'Suggested Qty'],
             readiness_col='Readiness',
@@ -235,9 +165,8 @@ def export_mo_suggestions_to_excel(result: MOSuggestionResult) -> BytesIO:
         blocked_df = _lines_to_df(result.blocked_lines, include_readiness=True)
         if blocked_df.empty:
             blocked_df = pd.DataFrame({'Info': ['No blocked items']})
-        blocked_df.to_excel(writer, sheet_name='Blocked MOs', index=False)
-        _apply_sheet_formatting(
-            writer.sheets['Blocked MOs'], blocked_df,
+        _write_sheet(
+            writer, blocked_df, 'Blocked MOs',
             currency_cols=['At Risk Value ($)'],
             number_cols=['Shortage Qty', 'Suggested Qty'],
         )
@@ -248,9 +177,8 @@ def export_mo_suggestions_to_excel(result: MOSuggestionResult) -> BytesIO:
             unsch_df = pd.DataFrame({'Info': ['All items schedulable']})
         else:
             unsch_df.columns = [c.replace('_', ' ').title() for c in unsch_df.columns]
-        unsch_df.to_excel(writer, sheet_name='Unschedulable', index=False)
-        _apply_sheet_formatting(
-            writer.sheets['Unschedulable'], unsch_df,
+        _write_sheet(
+            writer, unsch_df, 'Unschedulable',
             number_cols=['Shortage Qty'],
         )
 
@@ -260,20 +188,17 @@ def export_mo_suggestions_to_excel(result: MOSuggestionResult) -> BytesIO:
             mat_df = pd.DataFrame({'Info': ['No material readiness data']})
         else:
             mat_df.columns = [c.replace('_', ' ').title() for c in mat_df.columns]
-        mat_df.to_excel(writer, sheet_name='Material Matrix', index=False)
-        _apply_sheet_formatting(
-            writer.sheets['Material Matrix'], mat_df,
+        _write_sheet(
+            writer, mat_df, 'Material Matrix',
             number_cols=['Required Qty', 'Available Now', 'Allocated Qty'],
         )
 
         # Sheet 6: Summary
         summary_rows = _build_summary_rows(result)
         summary_df = pd.DataFrame(summary_rows)
-        summary_df.to_excel(writer, sheet_name='Summary', index=False)
-        _apply_sheet_formatting(writer.sheets['Summary'], summary_df)
+        _write_sheet(writer, summary_df, 'Summary')
 
-    buffer.seek(0)
-    return buffer
+    return ExcelStreamWriter.to_buffer(write, default_widths=DEFAULT_COL_WIDTHS, default_width=14)
 
 
 def _build_summary_rows(result: MOSuggestionResult):
@@ -440,6 +440,7 @@ def extract_material_requirements(
     product_id: int,
     shortage_qty: float,
     bom_output_qty: float,
+    bom_graph=None,
 ) -> List[MaterialRequirement]:
     """
     Extract BOM materials for a specific product from GAP's bom_explosion_df.
@@ -447,14 +448,20 @@ def extract_material_requirements(
     Calculates required_qty per material:
       required_qty = (shortage_qty / bom_output_qty) × qty_per_output × (1 + scrap/100)
 
+    bom_graph: optional BOMGraph over the same bom_explosion_df — BOM rows are
+    then sliced from its index instead of scanning the whole frame per product.
+
     Returns: List[MaterialRequirement]
     """
     bom_df = getattr(gap_result, 'bom_explosion_df', None)
     if bom_df is None or not isinstance(bom_df, pd.DataFrame) or bom_df.empty:
         return []
 
-    id_col = 'output_product_id' if 'output_product_id' in bom_df.columns else 'fg_product_id'
-    product_bom = bom_df[bom_df[id_col] == product_id]
+    if bom_graph is not None and bom_graph.bom_df is bom_df:
+        product_bom = bom_graph.bom_lines(product_id)
+    else:
+        id_col = 'output_product_id' if 'output_product_id' in bom_df.columns else 'fg_product_id'
+        product_bom = bom_df[bom_df[id_col] == product_id]
 
     if product_bom.empty:
         return []